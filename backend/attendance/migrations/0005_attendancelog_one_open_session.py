@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """
+    قبل إضافة الـ unique index: لو موظف عنده أكتر من session مفتوحة
+    بنسيب أحدث واحدة ونقفل الباقي على وقت الدخول (مدة = 0) علشان تتراجع يدويًا.
+    """
+    AttendanceLog = apps.get_model("attendance", "AttendanceLog")
+
+    seen = set()
+    duplicates = []
+    open_logs = (
+        AttendanceLog.objects.filter(check_out__isnull=True)
+        .order_by("employee_id", "-check_in", "-id")
+        .values_list("id", "employee_id")
+    )
+    for log_id, employee_id in open_logs.iterator():
+        if employee_id in seen:
+            duplicates.append(log_id)
+        else:
+            seen.add(employee_id)
+
+    for log in AttendanceLog.objects.filter(id__in=duplicates):
+        log.check_out = log.check_in
+        log.duration_minutes = 0
+        log.save(update_fields=["check_out", "duration_minutes"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("attendance", "0004_attendancelink"),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="attendancelog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("check_out__isnull", True)),
+                fields=("employee",),
+                name="attendance_one_open_session_per_employee",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendancelog_one_open_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancelink',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -2,10 +2,10 @@
 
 import uuid
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 
 class AttendanceLogQuerySet(models.QuerySet):
     def today(self):
@@ -95,6 +95,14 @@ class AttendanceLog(models.Model):
         indexes = [
             models.Index(fields=["employee", "work_date"]),
         ]
+        constraints = [
+            # session مفتوحة واحدة بس لكل موظف (double-tap مايفتحش اتنين)
+            models.UniqueConstraint(
+                fields=["employee"],
+                condition=models.Q(check_out__isnull=True),
+                name="attendance_one_open_session_per_employee",
+            ),
+        ]
 
     def clean(self):
         if self.check_out and self.check_in and self.check_out < self.check_in:
@@ -104,19 +112,6 @@ class AttendanceLog(models.Model):
     def is_active(self):
         return self.check_out is None
 
-    def _get_assigned_shift_for_date(self, day):
-        """
-        يرجع أحدث شفت متعيّن للموظف في اليوم ده.
-        """
-        return (
-            EmployeeShiftAssignment.objects
-            .filter(employee=self.employee, start_date__lte=day)
-            .filter(Q(end_date__isnull=True) | Q(end_date__gte=day))
-            .select_related("shift")
-            .order_by("-start_date")
-            .first()
-        )
-
     def _calc_late_and_penalty(self):
         """
         يحسب التأخير والغرامة من:
@@ -126,7 +121,11 @@ class AttendanceLog(models.Model):
            - attendance_shift_start (وقت)
            - attendance_grace_minutes (دقائق)
            - attendance_penalty_per_15min (قيمة)
+
+        القواعد بتتقرا من cache لكل (store, date) → check-in مابيعملش queries للشفتات.
         """
+        from attendance.services.shift_cache import resolve_shift_rule
+
         if not self.check_in:
             return
         
@@ -137,38 +136,11 @@ class AttendanceLog(models.Model):
         if not self.work_date:
             self.work_date = day
 
-        # 1) Try shift assignment
-        assignment = self._get_assigned_shift_for_date(day)
-        if assignment and assignment.shift:
-            shift = assignment.shift
-            shift_start_time = shift.start_time
-            grace_minutes = int(shift.grace_minutes or 0)
-            penalty_per_15 = float(shift.penalty_per_15min or 0)
-        else:
-            # 2) Employee-specific shift
-            employee_shift_start = getattr(self.employee, "shift_start_time", None)
-            store_settings = getattr(self.employee.store, "settings", None)
-            if employee_shift_start:
-                shift_start_time = employee_shift_start
-                grace_minutes = int(getattr(store_settings, "attendance_grace_minutes", 0) or 0) if store_settings else 0
-            else:
-                # 3) Fallback to store settings
-                if not store_settings:
-                    return
-                shift_start_time = getattr(store_settings, "attendance_shift_start", None)
-                if not shift_start_time:
-                    return
-                grace_minutes = int(getattr(store_settings, "attendance_grace_minutes", 0) or 0)
-
-            branch_penalty = None
-            if getattr(self.employee, "branch_id", None):
-                branch_penalty = getattr(self.employee.branch, "attendance_penalty_per_15min", None)
-
-            if branch_penalty is not None:
-                penalty_per_15 = float(branch_penalty or 0)
-            else:
-                penalty_per_15 = float(getattr(store_settings, "attendance_penalty_per_15min", 0) or 0) if store_settings else 0
-                
+        rule = resolve_shift_rule(self.employee, day)
+        if rule is None:
+            return
+        shift_start_time, grace_minutes, penalty_per_15 = rule
+
         shift_start_dt = timezone.make_aware(
             timezone.datetime.combine(day, shift_start_time),
             timezone.get_current_timezone(),
@@ -212,7 +184,8 @@ class AttendanceLink(models.Model):
 
     work_date = models.DateField(default=timezone.localdate, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField(null=True, blank=True)
+    # index علشان الـ purge الدوري يمسح المنتهي بالـ batches
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     used_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
@@ -245,10 +218,16 @@ class AttendanceLink(models.Model):
                 timezone.datetime.combine(self.work_date, timezone.datetime.max.time()),
                 timezone.get_current_timezone(),
             )
-            self.expires_at = end_of_day
+            # الرابط لمرة واحدة → عمره قصير (ATTENDANCE_LINK_TTL_MINUTES) ومايعديش آخر اليوم
+            ttl = timezone.timedelta(minutes=getattr(settings, "ATTENDANCE_LINK_TTL_MINUTES", 15))
+            self.expires_at = min(end_of_day, timezone.now() + ttl)
 
         super().save(*args, **kwargs)
 
+        from attendance.services.links import remember_link
+
+        remember_link(self)
+
     def __str__(self):
         return f"{self.employee} - {self.action} ({self.token})"
 
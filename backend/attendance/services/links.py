@@ -0,0 +1,99 @@
+# attendance/services/links.py
+"""
+روابط الحضور لمرة واحدة (AttendanceLink):
+
+- الروابط الصالحة بتتحفظ في الـ Django cache (Redis لو REDIS_URL متحدد) لحد ما تنتهي،
+  فـ qr_use بيتحقق من الرابط من غير ما يدوّر في جدول الروابط.
+  لو الـ cache مش موجود/فاضي بنرجع للـ DB عادي.
+- purge_expired_links بيمسح المنتهي على batches صغيرة (كل batch transaction قصيرة)
+  علشان الجدول مايكبرش ومايحصلش lock طويل.
+"""
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from attendance.models import AttendanceLink
+
+PURGE_BATCH_SIZE = 1000
+
+_CACHED_FIELDS = ("id", "employee_id", "action", "token", "work_date", "created_at", "expires_at", "used_at")
+
+
+def _link_key(token):
+    return f"attendance:link:{token}"
+
+
+def remember_link(link):
+    """
+    يحفظ الرابط في الـ cache لحد وقت انتهائه (الروابط المستخدمة/المنتهية بتتشال).
+    """
+    try:
+        if link.used_at or not link.expires_at:
+            cache.delete(_link_key(link.token))
+            return
+
+        timeout = int((link.expires_at - timezone.now()).total_seconds())
+        if timeout <= 0:
+            cache.delete(_link_key(link.token))
+            return
+
+        cache.set(_link_key(link.token), {f: getattr(link, f) for f in _CACHED_FIELDS}, timeout)
+    except Exception:
+        # الـ cache اختياري؛ مايكسرش إنشاء الرابط
+        return
+
+
+def forget_link(token):
+    try:
+        cache.delete(_link_key(token))
+    except Exception:
+        return
+
+
+def get_link(token):
+    """
+    يرجع AttendanceLink (من الـ cache لو موجود، وإلا من الـ DB) أو None.
+    الـ instance اللي جاي من الـ cache مش محمّل employee؛ بيتجاب lazy لما يتطلب.
+    """
+    try:
+        cached = cache.get(_link_key(token))
+    except Exception:
+        cached = None
+
+    if cached:
+        link = AttendanceLink(**cached)
+        link._state.adding = False
+        return link
+
+    try:
+        return AttendanceLink.objects.select_related("employee").get(token=token)
+    except (AttendanceLink.DoesNotExist, ValidationError, ValueError):
+        return None
+
+
+def purge_expired_links(now=None, batch_size=PURGE_BATCH_SIZE, max_batches=None):
+    """
+    يمسح الروابط اللي انتهت صلاحيتها على batches (expires_at عليه index).
+    يرجع عدد الصفوف اللي اتمسحت.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            AttendanceLink.objects.filter(expires_at__lt=now)
+            .order_by("expires_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        count, _ = AttendanceLink.objects.filter(id__in=ids).delete()
+        deleted += count
+        batches += 1
+
+        if len(ids) < batch_size:
+            break
+
+    return deleted
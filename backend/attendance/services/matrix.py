@@ -0,0 +1,96 @@
+# attendance/services/matrix.py
+"""
+مصفوفة حضور شهرية (موظفين × أيام) من query واحدة مجمّعة على (employee, work_date).
+
+الشكل columnar: لكل موظف arrays بطول أيام الشهر بدل dict لكل خانة:
+{
+    "month": "2024-06",
+    "days": 30,
+    "employees": [
+        {
+            "id": 1, "name": "...", "branch_id": 2,
+            "present": [0, 1, ...],
+            "late_minutes": [0, 12, ...],
+            "penalty": [0, 50.0, ...],
+            "worked_minutes": [0, 480, ...],
+            "totals": {"present_days": .., "late_minutes": .., "penalty": .., "worked_minutes": ..},
+        },
+    ],
+}
+"""
+import calendar
+from datetime import timedelta
+
+from django.db.models import Count, Sum
+
+from attendance.models import AttendanceLog
+
+
+def monthly_attendance_matrix(employees, month_date):
+    """
+    employees: queryset موظفين (متفلتر بالصلاحيات والمتجر/الفرع).
+    month_date: أي تاريخ في الشهر.
+    """
+    start = month_date.replace(day=1)
+    days = calendar.monthrange(start.year, start.month)[1]
+    end_exclusive = start + timedelta(days=days)
+
+    employee_rows = list(
+        employees.order_by("id").values_list("id", "user__name", "user__email", "branch_id")
+    )
+
+    columns = {}
+    payload_rows = []
+    for employee_id, name, email, branch_id in employee_rows:
+        row = {
+            "id": employee_id,
+            "name": name or email,
+            "branch_id": branch_id,
+            "present": [0] * days,
+            "late_minutes": [0] * days,
+            "penalty": [0.0] * days,
+            "worked_minutes": [0] * days,
+        }
+        columns[employee_id] = row
+        payload_rows.append(row)
+
+    if columns:
+        cells = (
+            AttendanceLog.objects.filter(
+                employee__in=employees.order_by().values("id"),
+                work_date__gte=start,
+                work_date__lt=end_exclusive,
+            )
+            .order_by()
+            .values_list("employee_id", "work_date")
+            .annotate(
+                sessions=Count("id"),
+                late=Sum("late_minutes"),
+                penalty=Sum("penalty_applied"),
+                worked=Sum("duration_minutes"),
+            )
+        )
+        for employee_id, work_date, sessions, late, penalty, worked in cells:
+            row = columns.get(employee_id)
+            if row is None:
+                continue
+            idx = (work_date - start).days
+            row["present"][idx] = 1 if sessions else 0
+            row["late_minutes"][idx] = int(late or 0)
+            row["penalty"][idx] = float(penalty or 0)
+            row["worked_minutes"][idx] = int(worked or 0)
+
+    for row in payload_rows:
+        row["totals"] = {
+            "present_days": sum(row["present"]),
+            "late_minutes": sum(row["late_minutes"]),
+            "penalty": round(sum(row["penalty"]), 2),
+            "worked_minutes": sum(row["worked_minutes"]),
+        }
+
+    return {
+        "month": start.strftime("%Y-%m"),
+        "start": start,
+        "days": days,
+        "employees": payload_rows,
+    }
@@ -0,0 +1,279 @@
+# attendance/services/sessions.py
+"""
+فتح/قفل sessions الحضور في statement واحدة بدل (active_for_employee ثم INSERT/UPDATE).
+
+- الـ unique index الجزئي (check_out IS NULL) بيضمن session مفتوحة واحدة لكل موظف.
+- الفتح: INSERT ... ON CONFLICT DO NOTHING RETURNING → لو رجع فاضي يبقى فيه session مفتوحة.
+- القفل: UPDATE ... WHERE check_out IS NULL RETURNING → لو رجع فاضي يبقى مفيش session.
+- الـ toggle على PostgreSQL: CTE واحدة (UPDATE + INSERT) = round-trip واحد.
+  على SQLite (التيستات) نفس الـ statements بس على خطوتين جوه transaction.
+- debounce: ضغطة toggle خلال ATTENDANCE_TOGGLE_DEBOUNCE_SECONDS بعد الانصراف بترجع نفس الانصراف
+  بدل ما تفتح session جديدة (الضغطة المكررة عند الخروج). الـ toggle بيقفل صف الموظف (FOR UPDATE)
+  الأول: شرط الـ debounce (NOT EXISTS) بيشوف snapshot بداية الـ statement، فمن غير القفل ماكانش
+  هيشوف انصراف اتعمله commit من طلب متزامن.
+
+ملحوظة: الـ statements دي raw فمابتعملش save() للـ AttendanceLog؛ الـ validation (full_clean)
+والتأخير/الغرامة بيتحسبوا في بايثون قبل الـ INSERT (من cache الشفتات)، والـ post_save
+بيتبعت يدوي بعد كل INSERT/UPDATE (إشعار التأخير وغيره).
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from attendance.models import AttendanceLog
+
+CHECKIN = "checkin"
+CHECKOUT = "checkout"
+
+
+def _table():
+    return connection.ops.quote_name(AttendanceLog._meta.db_table)
+
+
+def get_toggle_debounce():
+    return timedelta(seconds=int(getattr(settings, "ATTENDANCE_TOGGLE_DEBOUNCE_SECONDS", 60)))
+
+
+def _insert_fields():
+    return [f for f in AttendanceLog._meta.concrete_fields if not f.primary_key]
+
+
+def _duration_sql():
+    """
+    مدة الـ session بالدقايق (floor) من check_in لحد الـ param، ومش أقل من صفر.
+    """
+    if connection.vendor == "postgresql":
+        return "GREATEST(0, FLOOR(EXTRACT(EPOCH FROM (CAST(%s AS timestamp with time zone) - check_in)) / 60))::integer"
+    return "MAX(0, CAST(ROUND((julianday(%s) - julianday(check_in)) * 86400000) AS INTEGER) / 60000)"
+
+
+def build_check_in(employee, *, now, work_date, method, gps=None, location=None, ip_address=None, user_agent=""):
+    """
+    يجهز AttendanceLog (من غير حفظ) ويحسب التأخير والغرامة.
+    الـ unique/constraints بتتضمن في الـ INSERT نفسه، والموظف جاي من الـ request.
+    """
+    log = AttendanceLog(
+        employee=employee,
+        check_in=now,
+        work_date=work_date,
+        method=method,
+        gps=gps,
+        location=location,
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+    log._calc_late_and_penalty()
+    log.full_clean(exclude=["employee"], validate_unique=False, validate_constraints=False)
+    return log
+
+
+def _insert_sql(log):
+    fields = _insert_fields()
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    params = [f.get_db_prep_save(getattr(log, f.attname), connection) for f in fields]
+    return columns, placeholders, params
+
+
+def _recently_closed_sql(employee_id, now, debounce):
+    """
+    شرط الـ debounce: مفيش session للموظف اتقفلت بعد (now - debounce).
+    """
+    since = AttendanceLog._meta.get_field("check_out").get_db_prep_save(now - debounce, connection)
+    sql = f"NOT EXISTS (SELECT 1 FROM {_table()} WHERE employee_id = %s AND check_out > %s)"
+    return sql, [employee_id, since]
+
+
+def _close_sql(employee_id, now):
+    check_out = AttendanceLog._meta.get_field("check_out").get_db_prep_save(now, connection)
+    sql = (
+        f"UPDATE {_table()} SET check_out = %s, duration_minutes = {_duration_sql()} "
+        "WHERE employee_id = %s AND check_out IS NULL"
+    )
+    return sql, [check_out, check_out, employee_id]
+
+
+def _first(raw_qs):
+    rows = list(raw_qs)
+    return rows[0] if rows else None
+
+
+def _saved(log, created):
+    """
+    post_save للصف اللي رجع من الـ RETURNING (الـ raw SQL مابيبعتهاش).
+    """
+    if log is not None:
+        post_save.send(
+            sender=AttendanceLog, instance=log, created=created, update_fields=None, raw=False, using=connection.alias
+        )
+    return log
+
+
+def open_session(log, debounce=None):
+    """
+    INSERT واحدة؛ ترجع الـ log المحفوظ أو None لو الموظف عنده session مفتوحة
+    (أو قفل session من أقل من debounce لو متحدد).
+    """
+    columns, placeholders, params = _insert_sql(log)
+    guard, guard_params = "1 = 1", []
+    if debounce:
+        guard, guard_params = _recently_closed_sql(log.employee_id, log.check_in, debounce)
+    sql = (
+        f"INSERT INTO {_table()} ({columns}) SELECT {placeholders} WHERE {guard} "
+        "ON CONFLICT (employee_id) WHERE check_out IS NULL DO NOTHING RETURNING *"
+    )
+    return _saved(_first(AttendanceLog.objects.raw(sql, params + guard_params)), True)
+
+
+def close_open_session(employee, now):
+    """
+    UPDATE واحدة؛ ترجع الـ log بعد القفل أو None لو مفيش session مفتوحة.
+    """
+    sql, params = _close_sql(employee.pk, now)
+    return _saved(_first(AttendanceLog.objects.raw(f"{sql} RETURNING *", params)), False)
+
+
+def _toggle_sql(log, now, debounce):
+    """
+    (sql, params) للـ toggle على PostgreSQL: CTE بتقفل المفتوحة، ولو مفيش بتفتح جديدة
+    (إلا لو الموظف قافل من أقل من debounce). كل صف راجع معاه toggle_state.
+    """
+    close_sql, close_params = _close_sql(log.employee_id, now)
+    columns, placeholders, insert_params = _insert_sql(log)
+    guard, guard_params = _recently_closed_sql(log.employee_id, now, debounce)
+    sql = (
+        f"WITH closed AS ({close_sql} RETURNING *), "
+        f"opened AS (INSERT INTO {_table()} ({columns}) "
+        f"SELECT {placeholders} WHERE NOT EXISTS (SELECT 1 FROM closed) AND {guard} "
+        "ON CONFLICT (employee_id) WHERE check_out IS NULL DO NOTHING RETURNING *) "
+        f"SELECT '{CHECKOUT}' AS toggle_state, * FROM closed "
+        f"UNION ALL SELECT '{CHECKIN}' AS toggle_state, * FROM opened"
+    )
+    return sql, close_params + insert_params + guard_params
+
+
+def _lock_employee(employee):
+    """
+    toggles نفس الموظف بتستنى بعض؛ الـ statement اللي بعد القفل بتشوف اللي اتعمله commit قبلها.
+    (SQLite بيتجاهل FOR UPDATE وبيكتب واحد واحد أصلًا.)
+    """
+    from core.models import Employee
+
+    list(Employee.objects.select_for_update().filter(pk=employee.pk).values_list("pk", flat=True))
+
+
+def toggle_session(employee, *, now, work_date, method, gps=None, location=None, ip_address=None, user_agent=""):
+    """
+    Toggle حضور/انصراف بشكل آمن مع الضغط المزدوج.
+
+    يرجع (state, log, created):
+    - (CHECKOUT, log, False): اتقفلت الـ session المفتوحة.
+    - (CHECKIN, log, True): اتفتحت session جديدة.
+    - (CHECKIN, log, False): طلب تاني فتح session في نفس اللحظة → نرجع نفس الـ session (idempotent).
+    - (CHECKOUT, log, False) برضه لو الموظف قافل من أقل من الـ debounce → نرجع نفس الانصراف.
+    """
+    log = build_check_in(
+        employee,
+        now=now,
+        work_date=work_date,
+        method=method,
+        gps=gps,
+        location=location,
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+
+    debounce = get_toggle_debounce()
+
+    # atomic: الـ post_save receivers (زي إشعار التأخير في الـ outbox) في نفس transaction الحضور
+    with transaction.atomic():
+        _lock_employee(employee)
+        if connection.vendor == "postgresql":
+            sql, params = _toggle_sql(log, now, debounce)
+            row = _first(AttendanceLog.objects.raw(sql, params))
+            if row is not None:
+                created = row.toggle_state == CHECKIN
+                return row.toggle_state, _saved(row, created), created
+        else:
+            closed = close_open_session(employee, now)
+            if closed is not None:
+                return CHECKOUT, closed, False
+            opened = open_session(log, debounce=debounce)
+            if opened is not None:
+                return CHECKIN, opened, True
+
+    # الـ INSERT ماحصلش: طلب متزامن فتح session → نرجعها هي
+    active = AttendanceLog.objects.active_for_employee(employee)
+    if active is not None:
+        return CHECKIN, active, False
+
+    # أو الضغطة جوه الـ debounce بعد الانصراف → نفس الانصراف (مش session جديدة)
+    recent = (
+        AttendanceLog.objects.filter(employee=employee, check_out__gt=now - debounce)
+        .order_by("-check_out")
+        .first()
+    )
+    return CHECKOUT, recent, False
+
+
+def _shift_hours_sql(column, hours, sign):
+    """
+    column ± hours ساعات (hours تعبير SQL) بصيغة الـ DB.
+    """
+    if connection.vendor == "postgresql":
+        return f"{column} {sign} {hours} * INTERVAL '1 hour'"
+    # SQLite بيخزن التاريخ كنص → نرجعه بنفس الصيغة علشان المقارنة
+    return f"strftime('%%Y-%%m-%%d %%H:%%M:%%f', {column}, '{sign}' || {hours} || ' hours')"
+
+
+def close_stale_sessions(now=None):
+    """
+    يقفل كل الـ sessions المفتوحة أكتر من StoreSettings.attendance_max_session_hours
+    في UPDATE ... FROM واحدة (كل المتاجر مرة واحدة): الحد بتاع كل متجر بيتجاب بـ join
+    مرة واحدة للصف بدل subquery مرتبطة في كل مكان بيستخدمه.
+
+    - check_out = check_in + أقصى مدة (مش وقت التشغيل) علشان المرتبات ماتتحسبش على ساعات وهمية.
+    - duration_minutes بيتحسب في SQL.
+    - المتاجر اللي قيمتها 0 أو من غير إعدادات مابتتقفلش.
+
+    يرجع {store_id: عدد الجلسات اللي اتقفلت}.
+    """
+    from core.models import Employee, StoreSettings
+
+    now = now or timezone.now()
+    log_table = _table()
+    employee_table = connection.ops.quote_name(Employee._meta.db_table)
+    settings_table = connection.ops.quote_name(StoreSettings._meta.db_table)
+
+    hours = "s.attendance_max_session_hours"
+    check_in = f"{log_table}.check_in"
+    if connection.vendor == "postgresql":
+        now_param = "CAST(%s AS timestamp with time zone)"
+        returning = "e.store_id"
+    else:
+        # RETURNING في SQLite مايشوفش جداول الـ FROM → subquery للصفوف اللي اتقفلت بس
+        now_param = "%s"
+        returning = f"(SELECT store_id FROM {employee_table} WHERE id = {log_table}.employee_id)"
+
+    sql = (
+        f"UPDATE {log_table} SET "
+        f"check_out = {_shift_hours_sql(check_in, hours, '+')}, "
+        f"duration_minutes = {hours} * 60 "
+        f"FROM {employee_table} e INNER JOIN {settings_table} s ON s.store_id = e.store_id "
+        f"WHERE e.id = {log_table}.employee_id "
+        f"AND {log_table}.check_out IS NULL AND {check_in} IS NOT NULL "
+        f"AND {hours} > 0 "
+        f"AND {check_in} < {_shift_hours_sql(now_param, hours, '-')} "
+        f"RETURNING {returning}"
+    )
+    params = [AttendanceLog._meta.get_field("check_out").get_db_prep_save(now, connection)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return dict(Counter(store_id for (store_id,) in rows))
@@ -0,0 +1,149 @@
+# attendance/services/shift_cache.py
+"""
+Cache لقواعد الشفتات لكل (store, date) علشان check-in مايعملش queries:
+
+snapshot = {
+    "assignments": {employee_id: (shift_start, grace_minutes, penalty_per_15)},
+    "settings": (attendance_shift_start, attendance_grace_minutes, attendance_penalty_per_15min) | None,
+    "branch_penalties": {branch_id: penalty_per_15 | None},
+}
+
+- الـ snapshot بيتبني مرة واحدة (queries للـ assignments والفروع، والإعدادات من
+  core.services.store_settings) وبيتخزن في ذاكرة الـ process.
+- أي تعديل في Shift / EmployeeShiftAssignment / StoreSettings / Branch / Employee
+  بيغيّر version المتجر في الـ Django cache → كل الـ workers بيعيدوا البناء.
+  (لو الـ cache مش مشترك بين الـ processes، الـ TTL هو الحد الأقصى لأي بيانات قديمة.)
+"""
+import time as _time
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Q
+
+SHIFT_CACHE_TTL_SECONDS = 300
+_MAX_LOCAL_ENTRIES = 2048
+
+# (store_id, day) -> (version, expires_at, snapshot)
+_local_snapshots = {}
+
+
+def _version_key(store_id):
+    return f"attendance:shift-cache-version:{store_id}"
+
+
+def _store_version(store_id):
+    try:
+        return cache.get(_version_key(store_id))
+    except Exception:
+        # الـ cache واقع → نعتمد على الـ TTL بس
+        return None
+
+
+def invalidate_store_shift_cache(store_id):
+    if not store_id:
+        return
+
+    for key in [key for key in _local_snapshots if key[0] == store_id]:
+        _local_snapshots.pop(key, None)
+
+    try:
+        cache.set(_version_key(store_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def clear_shift_cache():
+    _local_snapshots.clear()
+
+
+def build_store_shift_snapshot(store_id, day):
+    from branches.models import Branch
+    from core.services.store_settings import get_store_settings
+
+    from attendance.models import EmployeeShiftAssignment
+
+    assignments = {}
+    rows = (
+        EmployeeShiftAssignment.objects.filter(employee__store_id=store_id, start_date__lte=day)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=day))
+        .order_by("employee_id", "-start_date")
+        .values_list("employee_id", "shift__start_time", "shift__grace_minutes", "shift__penalty_per_15min")
+    )
+    for employee_id, start_time, grace_minutes, penalty in rows:
+        # أحدث assignment لكل موظف (مترتبين -start_date)
+        assignments.setdefault(employee_id, (start_time, int(grace_minutes or 0), float(penalty or 0)))
+
+    store_settings = get_store_settings(store_id)
+    settings_row = None
+    if store_settings is not None:
+        settings_row = (
+            store_settings.attendance_shift_start,
+            store_settings.attendance_grace_minutes,
+            store_settings.attendance_penalty_per_15min,
+        )
+
+    branch_penalties = dict(
+        Branch.objects.filter(store_id=store_id).values_list("id", "attendance_penalty_per_15min")
+    )
+
+    return {
+        "assignments": assignments,
+        "settings": settings_row,
+        "branch_penalties": branch_penalties,
+    }
+
+
+def get_store_shift_snapshot(store_id, day):
+    version = _store_version(store_id)
+    key = (store_id, day)
+    entry = _local_snapshots.get(key)
+    now = _time.monotonic()
+
+    if entry and entry[0] == version and entry[1] > now:
+        return entry[2]
+
+    snapshot = build_store_shift_snapshot(store_id, day)
+    if len(_local_snapshots) >= _MAX_LOCAL_ENTRIES:
+        _local_snapshots.clear()
+    _local_snapshots[key] = (version, now + SHIFT_CACHE_TTL_SECONDS, snapshot)
+    return snapshot
+
+
+def resolve_shift_rule(employee, day):
+    """
+    يرجع (shift_start_time, grace_minutes, penalty_per_15) للموظف في اليوم ده أو None.
+    نفس الأولوية القديمة:
+    1) Shift assignment
+    2) employee.shift_start_time (+ سماحية المتجر)
+    3) StoreSettings.attendance_shift_start
+    والغرامة (لغير الـ assignment): غرامة الفرع لو متحددة وإلا غرامة المتجر.
+    """
+    snapshot = get_store_shift_snapshot(employee.store_id, day)
+
+    assigned = snapshot["assignments"].get(employee.id)
+    if assigned:
+        return assigned
+
+    store_settings = snapshot["settings"]
+    settings_start, settings_grace, settings_penalty = store_settings or (None, 0, 0)
+
+    employee_shift_start = getattr(employee, "shift_start_time", None)
+    if employee_shift_start:
+        shift_start_time = employee_shift_start
+    elif store_settings and settings_start:
+        shift_start_time = settings_start
+    else:
+        return None
+
+    grace_minutes = int(settings_grace or 0) if store_settings else 0
+
+    branch_penalty = None
+    if getattr(employee, "branch_id", None):
+        branch_penalty = snapshot["branch_penalties"].get(employee.branch_id)
+
+    if branch_penalty is not None:
+        penalty_per_15 = float(branch_penalty or 0)
+    else:
+        penalty_per_15 = float(settings_penalty or 0) if store_settings else 0
+
+    return shift_start_time, grace_minutes, penalty_per_15
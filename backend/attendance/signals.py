@@ -1,9 +1,10 @@
 # attendance/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import AttendanceLog
-from core.tasks import send_notification_whatsapp
+from .models import AttendanceLog, EmployeeShiftAssignment, Shift
+from attendance.services.shift_cache import invalidate_store_shift_cache
+from core.services.outbox import enqueue_notification, notification_preferences
 
 @receiver(post_save, sender=AttendanceLog)
 def employee_late_notification(sender, instance, created, **kwargs):
@@ -11,12 +12,8 @@ def employee_late_notification(sender, instance, created, **kwargs):
         return
 
     try:
-        store_settings = getattr(instance.employee.store, "settings", None)
-        if not store_settings:
-            return
-
         # لو عندك notifications JSONField داخل settings
-        notifications = getattr(store_settings, "notifications", {}) or {}
+        notifications = notification_preferences(instance.employee.store_id)
         if not notifications.get("late_employee_enabled", True):
             return
 
@@ -26,8 +23,35 @@ def employee_late_notification(sender, instance, created, **kwargs):
 
         late_by = instance.late_minutes or 0
         message = f"{instance.employee.user.name} تأخر اليوم {late_by} دقيقة"
-        send_notification_whatsapp.delay(numbers, "تأخير موظف", message)
+        enqueue_notification(
+            "WHATSAPP", numbers, "تأخير موظف", message,
+            store=instance.employee.store_id, event_type="employee_late",
+        )
 
     except Exception:
         # مهم: ما تكسرش تسجيل الحضور بسبب الاشعارات
         return
+
+
+# =========================
+# Shift cache invalidation
+# =========================
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender="core.StoreSettings")
+@receiver(post_delete, sender="core.StoreSettings")
+@receiver(post_save, sender="branches.Branch")
+@receiver(post_delete, sender="branches.Branch")
+@receiver(post_save, sender="core.Employee")
+@receiver(post_delete, sender="core.Employee")
+def invalidate_shift_cache_for_store(sender, instance, **kwargs):
+    invalidate_store_shift_cache(getattr(instance, "store_id", None))
+
+
+@receiver(post_save, sender=EmployeeShiftAssignment)
+@receiver(post_delete, sender=EmployeeShiftAssignment)
+def invalidate_shift_cache_for_assignment(sender, instance, **kwargs):
+    from core.models import Employee
+
+    store_id = Employee.objects.filter(pk=instance.employee_id).values_list("store_id", flat=True).first()
+    invalidate_store_shift_cache(store_id)
@@ -0,0 +1,37 @@
+# attendance/tasks.py
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def auto_close_stale_sessions():
+    """
+    مهمة دورية (beat): تقفل جلسات الحضور المنسية لكل المتاجر مرة واحدة
+    وترجع ملخص لكل متجر.
+    """
+    from attendance.services.sessions import close_stale_sessions
+
+    per_store = close_stale_sessions()
+    for store_id, closed in per_store.items():
+        logger.info("Auto-closed %s stale attendance sessions for store %s", closed, store_id)
+
+    return {
+        "closed": sum(per_store.values()),
+        "stores": {str(store_id): closed for store_id, closed in per_store.items()},
+    }
+
+
+@shared_task
+def purge_expired_attendance_links():
+    """
+    مهمة دورية (beat): تمسح روابط الحضور المنتهية على batches.
+    """
+    from attendance.services.links import purge_expired_links
+
+    deleted = purge_expired_links()
+    if deleted:
+        logger.info("Purged %s expired attendance links", deleted)
+    return {"deleted": deleted}
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendance.models import AttendanceLog
+from attendance.tasks import auto_close_stale_sessions
+from branches.models import Branch
+from core.models import Employee, Store, StoreSettings, User
+
+
+def _store(owner, name, max_hours):
+    store = Store.objects.create(name=name, owner=owner)
+    StoreSettings.objects.update_or_create(store=store, defaults={"attendance_max_session_hours": max_hours})
+    branch = Branch.objects.create(name=f"{name} Branch", store=store)
+    return store, branch
+
+
+def _open_log(store, branch, idx, check_in):
+    user = User.objects.create_user(email=f"stale{store.id}-{idx}@example.com", password="pass", is_active=True)
+    employee = Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100"))
+    return AttendanceLog.objects.create(employee=employee, check_in=check_in, work_date=check_in.date())
+
+
+@pytest.fixture
+def stale_sessions(db):
+    now = timezone.now().replace(microsecond=0)
+    owner = User.objects.create_user(email="stale-owner@example.com", password="pass", is_active=True, role="OWNER")
+    twelve, twelve_branch = _store(owner, "Twelve", 12)
+    four, four_branch = _store(owner, "Four", 4)
+    disabled, disabled_branch = _store(owner, "Disabled", 0)
+
+    logs = {
+        "twelve_stale": _open_log(twelve, twelve_branch, 1, now - timedelta(hours=20)),
+        "twelve_fresh": _open_log(twelve, twelve_branch, 2, now - timedelta(hours=2)),
+        "four_stale_a": _open_log(four, four_branch, 1, now - timedelta(hours=5)),
+        "four_stale_b": _open_log(four, four_branch, 2, now - timedelta(hours=30)),
+        "disabled_stale": _open_log(disabled, disabled_branch, 1, now - timedelta(hours=50)),
+    }
+    return now, (twelve, four, disabled), logs
+
+
+@pytest.mark.django_db
+def test_auto_close_stale_sessions_uses_one_update_per_run(stale_sessions):
+    now, (twelve, four, disabled), logs = stale_sessions
+
+    with CaptureQueriesContext(connection) as ctx:
+        summary = auto_close_stale_sessions()
+
+    assert len(ctx.captured_queries) == 1
+    # الحد بتاع المتجر من join واحد، مش subquery مرتبطة متكررة لكل صف
+    assert ctx.captured_queries[0]["sql"].count(StoreSettings._meta.db_table) == 1
+    assert summary == {"closed": 3, "stores": {str(twelve.id): 1, str(four.id): 2}}
+
+    for key in logs:
+        logs[key].refresh_from_db()
+
+    assert logs["twelve_stale"].check_out == logs["twelve_stale"].check_in + timedelta(hours=12)
+    assert logs["twelve_stale"].duration_minutes == 12 * 60
+    assert logs["four_stale_a"].check_out == logs["four_stale_a"].check_in + timedelta(hours=4)
+    assert logs["four_stale_b"].duration_minutes == 4 * 60
+    assert logs["twelve_fresh"].check_out is None
+    assert logs["disabled_stale"].check_out is None
+
+    # التشغيل التاني مالوش شغل
+    assert auto_close_stale_sessions() == {"closed": 0, "stores": {}}
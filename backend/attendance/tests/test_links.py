@@ -0,0 +1,87 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import AttendanceLink, AttendanceLog
+from attendance.services.links import get_link, purge_expired_links
+from attendance.tasks import purge_expired_attendance_links
+from core.models import Employee, User
+
+
+@pytest.fixture
+def link_employee(owner_store):
+    user = User.objects.create_user(email="link-emp@example.com", password="pass", is_active=True)
+    return Employee.objects.create(user=user, store=owner_store.store, branch=owner_store.branch, salary=Decimal("100"))
+
+
+def _link(employee, action=AttendanceLink.Action.CHECKIN):
+    return AttendanceLink.objects.create(employee=employee, action=action, work_date=timezone.localdate())
+
+
+@pytest.mark.django_db
+def test_links_expire_after_ttl(link_employee, settings):
+    settings.ATTENDANCE_LINK_TTL_MINUTES = 5
+    before = timezone.now()
+    link = _link(link_employee)
+
+    assert link.expires_at <= before + timedelta(minutes=5, seconds=1)
+    assert link.is_valid(now=before + timedelta(minutes=6)) is False
+
+
+@pytest.mark.django_db
+def test_purge_expired_links_in_batches(link_employee):
+    expired = [_link(link_employee) for _ in range(5)]
+    active = [_link(link_employee) for _ in range(2)]
+    AttendanceLink.objects.filter(id__in=[link.id for link in expired]).update(
+        expires_at=timezone.now() - timedelta(minutes=1)
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        deleted = purge_expired_links(batch_size=2)
+
+    assert deleted == 5
+    # 3 batches (2 + 2 + 1): SELECT ids + DELETE لكل batch
+    assert len(ctx.captured_queries) == 6
+    assert set(AttendanceLink.objects.values_list("id", flat=True)) == {link.id for link in active}
+
+    assert purge_expired_attendance_links() == {"deleted": 0}
+
+
+@pytest.mark.django_db
+def test_qr_use_validates_cached_link_without_link_lookup(link_employee):
+    link = _link(link_employee)
+    client = APIClient()
+    url = reverse("attendance-qr-use")
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post(url, {"token": str(link.token)}, format="json")
+
+    assert response.status_code == 200
+    assert response.data["status"] == "checkin"
+    link_selects = [
+        q["sql"] for q in ctx.captured_queries
+        if q["sql"].startswith("SELECT") and "attendance_attendancelink" in q["sql"]
+    ]
+    assert link_selects == []
+    assert AttendanceLog.objects.filter(employee=link_employee).count() == 1
+
+    # الرابط اتشال من الـ cache بعد الاستخدام → التحقق من الـ DB يرفضه
+    again = client.post(url, {"token": str(link.token)}, format="json")
+    assert again.status_code == 400
+
+
+@pytest.mark.django_db
+def test_get_link_falls_back_to_database(link_employee):
+    link = _link(link_employee)
+    cache.clear()
+
+    found = get_link(link.token)
+    assert found.pk == link.pk
+    assert get_link("not-a-uuid") is None
@@ -0,0 +1,95 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendance.models import AttendanceLog, EmployeeShiftAssignment, Shift
+from core.models import Employee, StoreSettings, User
+
+DAY = date(2024, 6, 3)
+
+
+def _at(hour, minute=0):
+    return timezone.make_aware(datetime(2024, 6, 3, hour, minute))
+
+
+def _employee(store, branch, idx):
+    user = User.objects.create_user(email=f"shift{store.id}-{idx}@example.com", password="pass", is_active=True)
+    return Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100"))
+
+
+def _shift_queries(ctx):
+    tables = ("attendance_shift", "attendance_employeeshiftassignment", "core_storesettings", "branches_branch")
+    return [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in tables)]
+
+
+@pytest.fixture
+def shift_store(owner_store):
+    _, _, store, branch = owner_store
+    branch.attendance_penalty_per_15min = Decimal("15")
+    branch.save(update_fields=["attendance_penalty_per_15min"])
+    StoreSettings.objects.update_or_create(
+        store=store,
+        defaults={
+            "attendance_shift_start": time(9, 0),
+            "attendance_grace_minutes": 10,
+            "attendance_penalty_per_15min": Decimal("20"),
+        },
+    )
+    return store, branch
+
+
+@pytest.mark.django_db
+def test_check_in_reuses_cached_shift_rules(shift_store):
+    store, branch = shift_store
+    shift = Shift.objects.create(
+        store=store, name="Morning", start_time=time(8, 0), end_time=time(16, 0),
+        grace_minutes=0, penalty_per_15min=Decimal("5"),
+    )
+    assigned = _employee(store, branch, 1)
+    EmployeeShiftAssignment.objects.create(employee=assigned, shift=shift, start_date=date(2024, 6, 1))
+    fallback = _employee(store, branch, 2)
+
+    first = AttendanceLog.objects.create(employee=assigned, check_in=_at(8, 31))
+    assert first.is_late is True
+    assert first.late_minutes == 31
+    assert first.penalty_applied == 10
+
+    with CaptureQueriesContext(connection) as ctx:
+        second = AttendanceLog.objects.create(employee=fallback, check_in=_at(9, 40))
+    assert _shift_queries(ctx) == []
+    # 9:00 + 10 دقائق سماحية من إعدادات المتجر، والغرامة من الفرع
+    assert second.late_minutes == 30
+    assert second.penalty_applied == 30
+
+
+@pytest.mark.django_db
+def test_shift_change_invalidates_cached_rules(shift_store):
+    store, branch = shift_store
+    shift = Shift.objects.create(
+        store=store, name="Morning", start_time=time(8, 0), end_time=time(16, 0),
+        grace_minutes=0, penalty_per_15min=Decimal("5"),
+    )
+    employee = _employee(store, branch, 1)
+    EmployeeShiftAssignment.objects.create(employee=employee, shift=shift, start_date=date(2024, 6, 1))
+
+    log = AttendanceLog.objects.create(employee=employee, check_in=_at(8, 20), check_out=_at(17))
+    assert log.late_minutes == 20
+
+    shift.grace_minutes = 30
+    shift.save()
+
+    log = AttendanceLog.objects.create(employee=employee, check_in=_at(8, 20), check_out=_at(17))
+    assert log.is_late is False
+
+    EmployeeShiftAssignment.objects.filter(employee=employee).delete()
+    branch.attendance_penalty_per_15min = None
+    branch.save()
+
+    # مفيش شفت → إعدادات المتجر (9:00 + 10) وغرامة المتجر
+    log = AttendanceLog.objects.create(employee=employee, check_in=_at(9, 40), check_out=_at(17))
+    assert log.late_minutes == 30
+    assert log.penalty_applied == 40
@@ -9,6 +9,7 @@ from django.conf import settings
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.shortcuts import redirect, render
+from django.db import transaction
 from django.db.models import Q, Sum
 from rest_framework import viewsets
 from rest_framework.decorators import api_view, permission_classes
@@ -18,6 +19,8 @@ from django.utils import timezone
 
 from .models import AttendanceLink, AttendanceLog, LeaveRequest, EmployeeShiftAssignment
 from .serializers import AttendanceLogSerializer
+from .services.links import forget_link, get_link
+from .services.sessions import CHECKIN, build_check_in, close_open_session, open_session, toggle_session
 
 
 def _build_qr_base64(url: str) -> str:
@@ -295,31 +298,34 @@ def attendance_check(request):
     ip = request.META.get("REMOTE_ADDR")
     user_agent = request.META.get("HTTP_USER_AGENT", "")
 
-    active_log = AttendanceLog.objects.active_for_employee(employee)
-
-    # لو مفيش session -> Check-in
-    if not active_log:
-        try:
-            log = AttendanceLog.objects.create(
-                employee=employee,
-                check_in=now,
-                work_date=work_date,
-                method="MANUAL",
-                gps=gps,
-                location=location,
-                ip_address=ip,
-                user_agent=user_agent,
-            )
-        except ValidationError as exc:
-            return Response(
-                {
-                    "status": "error",
-                    "message": "تعذر تسجيل الحضور.",
-                    "detail": exc.messages,
-                },
-                status=400,
-            )
+    # ✅ statement واحدة (آمنة مع الضغط المزدوج): تقفل المفتوحة أو تفتح جديدة
+    try:
+        state, log, _ = toggle_session(
+            employee,
+            now=now,
+            work_date=work_date,
+            method="MANUAL",
+            gps=gps,
+            location=location,
+            ip_address=ip,
+            user_agent=user_agent,
+        )
+    except ValidationError as exc:
+        return Response(
+            {
+                "status": "error",
+                "message": "تعذر تسجيل الحضور.",
+                "detail": exc.messages,
+            },
+            status=400,
+        )
+    if log is None:
+        return Response(
+            {"status": "error", "message": "تعذر تسجيل الحضور، حاول مرة أخرى."},
+            status=409,
+        )
 
+    if state == CHECKIN:
         return Response(
             {
                 "status": "checkin",
@@ -332,30 +338,15 @@ def attendance_check(request):
             }
         )
 
-    # لو فيه session مفتوحة -> Check-out
-    active_log.check_out = now
-    try:
-        active_log.full_clean()
-        active_log.save(update_fields=["check_out", "duration_minutes"])        
-    except ValidationError as exc:
-        return Response(
-            {
-                "status": "error",
-                "message": "تعذر تسجيل الانصراف.",
-                "detail": exc.messages,
-            },
-            status=400,
-        )
-
     return Response(
         {
             "status": "checkout",
             "message": "تم تسجيل الانصراف بنجاح",
-            "check_out": active_log.check_out,
-            "work_date": active_log.work_date,
-            "duration_minutes": active_log.duration_minutes,
-            "location": active_log.location,
-            "gps": active_log.gps,
+            "check_out": log.check_out,
+            "work_date": log.work_date,
+            "duration_minutes": log.duration_minutes,
+            "location": log.location,
+            "gps": log.gps,
         }
     )
 
@@ -481,9 +472,9 @@ def qr_use(request):
 
     now = timezone.localtime()
 
-    try:
-        link = AttendanceLink.objects.select_related("employee").get(token=token)
-    except AttendanceLink.DoesNotExist:
+    # من الـ cache لو موجود (من غير lookup في جدول الروابط) وإلا من الـ DB
+    link = get_link(token)
+    if link is None:
         return Response(
             {"status": "error", "message": "الرابط غير صالح أو منتهي."},
             status=404,
@@ -501,23 +492,13 @@ def qr_use(request):
     ip = request.META.get("REMOTE_ADDR")
     user_agent = request.META.get("HTTP_USER_AGENT", "")
 
-    active_log = AttendanceLog.objects.active_for_employee(employee)
-
-    # تنفيذ الحضور/الانصراف بناءً على action
+    # الـ validation قبل ما نحجز الرابط (الرابط مايتحرقش على طلب غلط)
+    check_in = None
     if link.action == AttendanceLink.Action.CHECKIN:
-        if active_log:
-            return Response(
-                {
-                    "status": "error",
-                    "message": "يوجد جلسة عمل مفتوحة بالفعل.",
-                },
-                status=400,
-            )
-
         try:
-            log = AttendanceLog.objects.create(
-                employee=employee,
-                check_in=now,
+            check_in = build_check_in(
+                employee,
+                now=now,
                 work_date=work_date,
                 method="QR",
                 gps=gps,
@@ -535,57 +516,62 @@ def qr_use(request):
                 status=400,
             )
 
-        link.used_at = now
-        link.save(update_fields=["used_at"])
+    with transaction.atomic():
+        # ✅ نحجز الرابط في نفس الـ transaction (مايتستخدمش مرتين لو اتضغط مرتين)
+        claimed = AttendanceLink.objects.filter(pk=link.pk, used_at__isnull=True).update(used_at=now)
+        forget_link(link.token)
+        if not claimed:
+            return Response(
+                {"status": "error", "message": "انتهت صلاحية الرابط أو تم استخدامه."},
+                status=400,
+            )
 
-        return Response(
-            {
-                "status": "checkin",
-                "message": "تم تسجيل الحضور بنجاح عبر QR.",
-                "log_id": log.id,
-                "check_in": log.check_in,
-                "work_date": log.work_date,
-                "location": log.location,
-                "gps": log.gps,
-            }
-        )
+        # تنفيذ الحضور/الانصراف بناءً على action
+        if check_in is not None:
+            log = open_session(check_in)
+            if log is None:
+                transaction.set_rollback(True)
+                return Response(
+                    {
+                        "status": "error",
+                        "message": "يوجد جلسة عمل مفتوحة بالفعل.",
+                    },
+                    status=400,
+                )
 
-    # في حالة CHECKOUT
-    if not active_log:
-        return Response(
-            {
-                "status": "error",
-                "message": "لا توجد جلسة عمل مفتوحة لإنهائها.",
-            },
-            status=400,
-        )
-
-    active_log.check_out = now
-    try:
-        active_log.full_clean()
-        active_log.save(update_fields=["check_out", "duration_minutes"])        
-    except ValidationError as exc:
-        return Response(
-            {
-                "status": "error",
-                "message": "تعذر تسجيل الانصراف عبر QR.",
-                "detail": exc.messages,
-            },
-            status=400,
-        )
+            return Response(
+                {
+                    "status": "checkin",
+                    "message": "تم تسجيل الحضور بنجاح عبر QR.",
+                    "log_id": log.id,
+                    "check_in": log.check_in,
+                    "work_date": log.work_date,
+                    "location": log.location,
+                    "gps": log.gps,
+                }
+            )
 
-    link.used_at = now
-    link.save(update_fields=["used_at"])
+        # في حالة CHECKOUT
+        log = close_open_session(employee, now)
+        if log is None:
+            transaction.set_rollback(True)
+            return Response(
+                {
+                    "status": "error",
+                    "message": "لا توجد جلسة عمل مفتوحة لإنهائها.",
+                },
+                status=400,
+            )
 
     return Response(
         {
             "status": "checkout",
             "message": "تم تسجيل الانصراف بنجاح عبر QR.",
-            "check_out": active_log.check_out,
-            "work_date": active_log.work_date,
-            "duration_minutes": active_log.duration_minutes,
-            "location": active_log.location,
-            "gps": active_log.gps,
+            "check_out": log.check_out,
+            "work_date": log.work_date,
+            "duration_minutes": log.duration_minutes,
+            "location": log.location,
+            "gps": log.gps,
         }
     )
 
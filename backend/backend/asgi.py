@@ -4,6 +4,7 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 
 import orders.routing
+import reports.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
@@ -12,6 +13,9 @@ django_asgi_app = get_asgi_application()
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(orders.routing.websocket_urlpatterns)
+        URLRouter(
+            orders.routing.websocket_urlpatterns
+            + reports.routing.websocket_urlpatterns
+        )
     ),
 })
@@ -2,6 +2,7 @@
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from celery.schedules import crontab
 import importlib.util
 import os
 import dj_database_url
@@ -96,6 +97,13 @@ if REDIS_URL:
             "CONFIG": {"hosts": [REDIS_URL]},
         },
     }
+    # cache مشترك بين الـ workers (نسخ cache الشفتات وغيرها)
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
 else:
     CHANNEL_LAYERS = {
         "default": {
@@ -153,7 +161,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DRF Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT بـ claims المتجر/الدور (من غير query للـ User) + deny list
+        'core.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -221,6 +230,69 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Africa/Cairo'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# DatabaseScheduler بيزامن الجدول ده مع PeriodicTask عند التشغيل
+CELERY_BEAT_SCHEDULE = {
+    'attendance-auto-close-stale-sessions': {
+        'task': 'attendance.tasks.auto_close_stale_sessions',
+        'schedule': 30 * 60,
+    },
+    'attendance-purge-expired-links': {
+        'task': 'attendance.tasks.purge_expired_attendance_links',
+        'schedule': 60 * 60,
+    },
+    # احتياطي لو الـ view ماقدرش يشغّل الـ consumer (broker واقع)
+    'payments-process-webhook-events': {
+        'task': 'payments.tasks.process_webhook_events',
+        'schedule': 60,
+    },
+    # احتياطي لإشعارات الـ outbox لو الـ dispatcher ماتشغلش بعد الـ commit
+    'core-dispatch-notification-outbox': {
+        'task': 'core.tasks.dispatch_notification_outbox',
+        'schedule': 30,
+    },
+    # مراجعة المخزون المنخفض الليلية (التنبيهات الفورية من انتقالات is_low)
+    'inventory-low-stock-daily': {
+        'task': 'core.tasks.check_low_stock_daily',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # snapshot المخزون اليومي (تقييم المخزون في تاريخ سابق)
+    'inventory-daily-snapshots': {
+        'task': 'inventory.tasks.take_daily_inventory_snapshots',
+        'schedule': crontab(hour=23, minute=55),
+    },
+    # مسح سجلات الحذف (delta sync) الأقدم من DELTA_SYNC_TOMBSTONE_RETENTION_DAYS
+    'core-prune-sync-tombstones': {
+        'task': 'core.tasks.prune_sync_tombstones',
+        'schedule': crontab(hour=4, minute=30),
+    },
+}
+
+# عمر رابط الحضور لمرة واحدة (بالدقايق)
+ATTENDANCE_LINK_TTL_MINUTES = config('ATTENDANCE_LINK_TTL_MINUTES', default=15, cast=int)
+# toggle الحضور: ضغطة خلال المدة دي بعد الانصراف مابتفتحش session جديدة (بالثواني)
+ATTENDANCE_TOGGLE_DEBOUNCE_SECONDS = config('ATTENDANCE_TOGGLE_DEBOUNCE_SECONDS', default=60, cast=int)
+
+# PayMob API (بيتغير للسيرفر المحلي في التستات/الـ benchmarks)
+PAYMOB_API_BASE = config('PAYMOB_API_BASE', default='https://accept.paymob.com/api')
+# webhook الدفع بيشغّل الـ consumer فورًا (غير كده الـ beat كل دقيقة)
+PAYMOB_WEBHOOK_KICK_CONSUMER = config('PAYMOB_WEBHOOK_KICK_CONSUMER', default=True, cast=bool)
+
+# إشعارات واتساب (Twilio): عدد الإرسالات المتوازية وحد الرسائل في الثانية لكل حساب
+TWILIO_API_BASE = config('TWILIO_API_BASE', default='https://api.twilio.com')
+WHATSAPP_DISPATCH_CONCURRENCY = config('WHATSAPP_DISPATCH_CONCURRENCY', default=8, cast=int)
+TWILIO_MESSAGES_PER_SECOND = config('TWILIO_MESSAGES_PER_SECOND', default=10, cast=float)
+
+# Outbox الإشعارات: إشعارات نفس المستلم خلال النافذة دي بتتبعت رسالة واحدة (digest)
+NOTIFICATION_DIGEST_WINDOW_SECONDS = config('NOTIFICATION_DIGEST_WINDOW_SECONDS', default=60, cast=int)
+# بعد الـ commit بيتجدول الـ dispatcher (غير كده الـ beat كل 30 ثانية)
+NOTIFICATION_OUTBOX_KICK_DISPATCHER = config('NOTIFICATION_OUTBOX_KICK_DISPATCHER', default=True, cast=bool)
+# تنبيه نفس الصنف في نفس الفرع مابيتكررش قبل المدة دي (بالثواني)
+LOW_STOCK_ALERT_COOLDOWN_SECONDS = config('LOW_STOCK_ALERT_COOLDOWN_SECONDS', default=6 * 60 * 60, cast=int)
+# Delta sync (changes/): نرجع لورا عن الـ token بالمدة دي، وtokens أقدم من مدة الاحتفاظ بالحذف → reset
+DELTA_SYNC_OVERLAP_SECONDS = config('DELTA_SYNC_OVERLAP_SECONDS', default=5, cast=int)
+DELTA_SYNC_TOMBSTONE_RETENTION_DAYS = config('DELTA_SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+# الـ token مابيعديش بداية أقدم transaction مفتوحة، إلا لو أقدم من كده (عالقة)
+DELTA_SYNC_MAX_OPEN_WRITE_SECONDS = config('DELTA_SYNC_MAX_OPEN_WRITE_SECONDS', default=600, cast=int)
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -1,9 +1,18 @@
 # backend/conftest.py
+from collections import namedtuple
+
 import pytest
 import factory
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
+from attendance.services.shift_cache import clear_shift_cache
+from branches.models import Branch
 from core.models import Employee, Store, User
+from core.services.store_settings import clear_store_settings_cache
+from inventory.services.item_lookup import clear_item_index_cache
+
+OwnerStore = namedtuple("OwnerStore", "client owner store branch")
 
 # Factory داخل conftest عشان Pylance يشوفها
 class StoreFactory(factory.django.DjangoModelFactory):
@@ -30,4 +39,36 @@ def authenticated_manager():
     Employee.objects.create(user=user, role='MANAGER', store=store)
 
     client.force_authenticate(user=user)
-    return client
\ No newline at end of file
+    return client
+
+
+def _clear_process_caches():
+    cache.clear()
+    clear_store_settings_cache()
+    clear_item_index_cache()
+    clear_shift_cache()
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches(settings):
+    """
+    الـ cache والـ LRU المحلية (إعدادات المتجر، index الأصناف، الورديات) عايشين طول الـ process
+    → بنفضيهم قبل وبعد كل test. والـ outbox مايشغلش الـ dispatcher من جوه الـ tests.
+    """
+    settings.NOTIFICATION_OUTBOX_KICK_DISPATCHER = False
+    _clear_process_caches()
+    yield
+    _clear_process_caches()
+
+
+@pytest.fixture
+def owner_store(db):
+    """
+    مالك + متجر + فرع + APIClient داخل بالمالك؛ fixtures كل ملف بتبني عليه.
+    """
+    owner = User.objects.create_user(email="store-owner@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name="Test Store", owner=owner)
+    branch = Branch.objects.create(name="Main", store=store)
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return OwnerStore(client, owner, store, branch)
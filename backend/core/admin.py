@@ -323,7 +323,12 @@ class StoreSettingsAdmin(admin.ModelAdmin):
             "classes": ("collapse",)
         }),
         ("إعدادات الحضور", {
-            "fields": ("attendance_shift_start", "attendance_grace_minutes", "attendance_penalty_per_15min"),
+            "fields": (
+                "attendance_shift_start",
+                "attendance_grace_minutes",
+                "attendance_penalty_per_15min",
+                "attendance_max_session_hours",
+            ),
             "classes": ("collapse",)
         }),
     )
@@ -0,0 +1,230 @@
+# core/authentication.py
+"""
+JWT بـ claims للمتجر/الصلاحيات علشان الـ endpoints السريعة (KDS / POS) ماتعملش identity queries.
+
+- التوكن (login/refresh) فيه: role, is_superuser, store_id, branch_id, employee_id, access_until.
+- ClaimsJWTAuthentication بيرجع ClaimsUser: user lazy بيجاوب على الـ id/role/الاشتراك من الـ claims،
+  وأي attribute تاني (email, employee, ...) بيحمّل الـ User الحقيقي مرة واحدة.
+- الإلغاء (logout / تغيير دور أو متجر) عن طريق deny list في الـ Django cache (Redis لو متحدد):
+  * jti معيّن (logout)
+  * كل توكنات user اتصدرت قبل وقت معيّن (revoke_user_tokens)
+  لو الـ deny list مش متاحة (الـ cache واقع) مابنثقش في الـ claims: الـ User بيتحمّل من الـ DB
+  (ولازم يكون is_active) زي التوكنات القديمة.
+- التوكنات القديمة اللي مافيهاش claims بتتعامل بالطريقة العادية (User من الـ DB).
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+CLAIMS_VERSION = 1
+CLAIMS_VERSION_CLAIM = "tenant_v"
+TENANT_CLAIMS = ("role", "is_superuser", "store_id", "branch_id", "employee_id", "access_until")
+# وقت الإصدار بكسور الثانية (الـ iat بالثواني بس) علشان المقارنة مع وقت الإلغاء تبقى دقيقة
+ISSUED_AT_CLAIM = "tenant_iat"
+
+ACCESS_BLOCK_REASON = "انتهت الفترة التجريبية الخاصة بحسابك. برجاء التواصل مع الشركة للترقية وتفعيل الحساب."
+
+
+# =========================
+# Claims
+# =========================
+
+def _access_until(user):
+    """
+    آخر وقت مسموح فيه بالوصول (timestamp) أو None لو مفيش حد.
+    نفس منطق User.has_active_access.
+    """
+    if user.is_superuser or user.is_payment_verified:
+        return None
+    if user.role in [user.RoleChoices.OWNER, user.RoleChoices.MANAGER] and user.trial_ends_at:
+        return int(user.trial_ends_at.timestamp())
+    return None
+
+
+def build_tenant_claims(user):
+    from core.models import Employee
+    from core.utils.store_context import get_user_default_store
+
+    employee = Employee.objects.filter(user=user).only("id", "store_id", "branch_id").first()
+    if employee is not None:
+        store_id = employee.store_id
+    else:
+        store = get_user_default_store(user)
+        store_id = store.id if store else None
+
+    return {
+        CLAIMS_VERSION_CLAIM: CLAIMS_VERSION,
+        "role": user.role,
+        "is_superuser": bool(user.is_superuser),
+        "store_id": store_id,
+        "branch_id": employee.branch_id if employee else None,
+        "employee_id": employee.id if employee else None,
+        "access_until": _access_until(user),
+        ISSUED_AT_CLAIM: time.time(),
+    }
+
+
+def apply_tenant_claims(token, user):
+    for key, value in build_tenant_claims(user).items():
+        token[key] = value
+    return token
+
+
+# =========================
+# Deny list
+# =========================
+
+def _jti_key(jti):
+    return f"auth:deny:jti:{jti}"
+
+
+def _user_key(user_id):
+    return f"auth:deny:user:{user_id}"
+
+
+def deny_token(token):
+    """
+    يمنع توكن معيّن (access أو refresh) لحد ما يخلص عمره.
+    """
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti:
+        return
+    timeout = max(1, int(token.get("exp", time.time() + 60) - time.time()))
+    try:
+        cache.set(_jti_key(jti), 1, timeout)
+    except Exception:
+        return
+
+
+def revoke_user_tokens(user_id):
+    """
+    يلغي كل التوكنات اللي اتصدرت للمستخدم قبل دلوقتي (بعد تغيير الدور/المتجر/التفعيل).
+    """
+    if not user_id:
+        return
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    try:
+        cache.set(_user_key(user_id), time.time(), timeout)
+    except Exception:
+        return
+
+
+class DenyListUnavailable(Exception):
+    pass
+
+
+def is_token_denied(token):
+    """
+    بيرمي DenyListUnavailable لو الـ cache مش بيتقري (مانقدرش نقول إن التوكن سليم).
+    """
+    jti = token.get(api_settings.JTI_CLAIM)
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    try:
+        found = cache.get_many([_jti_key(jti), _user_key(user_id)])
+    except Exception as exc:
+        raise DenyListUnavailable() from exc
+
+    if found.get(_jti_key(jti)):
+        return True
+
+    revoked_at = found.get(_user_key(user_id))
+    if not revoked_at:
+        return False
+    # التوكنات القديمة (من غير claims) بنقارنها بالـ iat
+    issued_at = token.get(ISSUED_AT_CLAIM) or token.get("iat", 0) + 1
+    return issued_at < revoked_at
+
+
+# =========================
+# Lazy user
+# =========================
+
+def _load_user(user_id):
+    from core.models import User
+
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        raise AuthenticationFailed("المستخدم غير موجود أو غير مفعل.", code="user_not_found")
+    return user
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    User من claims التوكن. الـ id والدور والاشتراك ومتجر/فرع الموظف من غير DB؛
+    غير كده بيحمّل الـ User الحقيقي (query واحدة) ويتصرف زيه.
+    """
+
+    def __init__(self, token):
+        user_id = token[api_settings.USER_ID_CLAIM]
+        super().__init__(lambda: _load_user(user_id))
+        self.__dict__["_user_id"] = int(user_id)
+        self.__dict__["tenant_claims"] = {key: token.get(key) for key in TENANT_CLAIMS}
+
+    @property
+    def id(self):
+        return self.__dict__["_user_id"]
+
+    pk = id
+
+    @property
+    def role(self):
+        return self.tenant_claims["role"]
+
+    @property
+    def is_superuser(self):
+        return bool(self.tenant_claims["is_superuser"])
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    @property
+    def has_active_access(self):
+        access_until = self.tenant_claims["access_until"]
+        if access_until is None:
+            return True
+        return timezone.now() <= datetime.fromtimestamp(access_until, tz=dt_timezone.utc)
+
+    @property
+    def access_block_reason(self):
+        return None if self.has_active_access else ACCESS_BLOCK_REASON
+
+    def __bool__(self):
+        return True
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication من غير query للـ User لو التوكن فيه claims المتجر.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        try:
+            denied = is_token_denied(token)
+        except DenyListUnavailable:
+            # fail closed على الـ claims: get_user بيحمّل الـ User من الـ DB ويتأكد إنه مفعل
+            token.deny_list_unavailable = True
+            return token
+        if denied:
+            # نفس كود التوكن المنتهي → الواجهة بتعمل refresh (والـ refresh بيجدد الـ claims)
+            raise InvalidToken("تم إلغاء هذا التوكن.")
+        return token
+
+    def get_user(self, validated_token):
+        if (
+            validated_token.get(CLAIMS_VERSION_CLAIM) != CLAIMS_VERSION
+            or getattr(validated_token, "deny_list_unavailable", False)
+        ):
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
@@ -0,0 +1,62 @@
+# core/management/commands/benchmark_whatsapp_dispatch.py
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.services.whatsapp import WhatsAppDispatcher
+from core.testing import FakeTwilioServer
+
+
+def _legacy_send(api_base, to, body):
+    """
+    الطريقة القديمة للمقارنة بس: requests.post جديد لكل رقم وبالتسلسل.
+    """
+    url = f"{api_base}/2010-04-01/Accounts/ACbenchmark/Messages.json"
+    payload = {"From": "whatsapp:+14155238886", "To": f"whatsapp:{to}", "Body": body}
+    return requests.post(url, data=payload, auth=("ACbenchmark", "secret"), timeout=10).status_code == 201
+
+
+class Command(BaseCommand):
+    help = "مقارنة سرعة إرسال إشعارات واتساب (بالتسلسل vs WhatsAppDispatcher) على Twilio محلي."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipients", type=int, default=100)
+        parser.add_argument("--latency-ms", type=float, default=50.0, help="تأخير السيرفر لكل رسالة")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--rate", type=float, default=100.0, help="رسائل في الثانية للحساب")
+
+    def handle(self, *args, **options):
+        numbers = [f"+2010{i:08d}" for i in range(options["recipients"])]
+        body = "benchmark"
+
+        with FakeTwilioServer(latency=options["latency_ms"] / 1000) as server:
+            started = time.perf_counter()
+            for number in numbers:
+                _legacy_send(server.api_base, number, body)
+            legacy = time.perf_counter() - started
+            legacy_connections = server.connections
+
+            server.connections = 0
+            with override_settings(TWILIO_API_BASE=server.api_base):
+                dispatcher = WhatsAppDispatcher(
+                    account_sid="ACbenchmark",
+                    auth_token="secret",
+                    concurrency=options["concurrency"],
+                    rate=options["rate"],
+                )
+                started = time.perf_counter()
+                summary = dispatcher.send_many(numbers, body)
+                pooled = time.perf_counter() - started
+
+        self.stdout.write(f"{'':12}{'total (s)':>12}{'msg/s':>10}{'connections':>14}")
+        for label, seconds, connections in (
+            ("sequential", legacy, legacy_connections),
+            ("dispatcher", pooled, server.connections),
+        ):
+            self.stdout.write(
+                f"{label:12}{seconds:>12.3f}{len(numbers) / seconds:>10.1f}{connections:>14}"
+            )
+        if summary["failed"]:
+            self.stdout.write(self.style.WARNING(f"failed: {len(summary['failed'])}"))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_storesettings_notification_email"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storesettings",
+            name="attendance_max_session_hours",
+            field=models.PositiveIntegerField(default=16, verbose_name="أقصى مدة للجلسة بالساعات"),
+        ),
+    ]
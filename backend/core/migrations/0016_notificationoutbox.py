@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_storesettings_attendance_max_session_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('WHATSAPP', 'WhatsApp'), ('EMAIL', 'Email')], max_length=20)),
+                ('recipient', models.CharField(max_length=255)),
+                ('event_type', models.CharField(blank=True, max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('PENDING', 'في الانتظار'), ('SENDING', 'جاري الإرسال'), ('SENT', 'تم الإرسال'), ('FAILED', 'فشل')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('digest_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_notifications', to='core.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_outbox_status_created')],
+            },
+        ),
+    ]
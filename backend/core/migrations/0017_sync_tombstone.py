@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'model', 'deleted_at'], name='core_tombstone_feed'), models.Index(fields=['deleted_at'], name='core_tombstone_deleted_at')],
+            },
+        ),
+    ]
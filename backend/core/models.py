@@ -269,6 +269,15 @@ class Store(models.Model):
         verbose_name_plural = "الفروع"
         ordering = ["-created_at"]
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Store متبني من claims التوكن (id بس): أول حقل deferred يتطلب بيحمّل كل الباقي
+        # في query واحدة بدل query لكل حقل
+        if fields is not None:
+            deferred = self.get_deferred_fields()
+            if deferred.intersection(fields):
+                fields = set(fields) | deferred
+        super().refresh_from_db(using=using, fields=fields)
+
     def _generate_qr_image_and_base64(self, url: str):
         qr = qrcode.QRCode(version=1, box_size=10, border=4)
         qr.add_data(url)
@@ -335,6 +344,8 @@ class StoreSettings(models.Model):
     attendance_shift_start = models.TimeField("بداية الشفت", default=timezone.datetime(2000, 1, 1, 9, 0).time())
     attendance_grace_minutes = models.PositiveIntegerField("سماحية التأخير بالدقائق", default=30)
     attendance_penalty_per_15min = models.DecimalField("غرامة كل 15 دقيقة", max_digits=8, decimal_places=2, default=50.00)
+    # الجلسات المفتوحة أكتر من كده بتتقفل تلقائيًا (0 = من غير قفل تلقائي)
+    attendance_max_session_hours = models.PositiveIntegerField("أقصى مدة للجلسة بالساعات", default=16)
 
     def __str__(self):
         return f"إعدادات - {self.store.name}"
@@ -566,6 +577,77 @@ class EmployeeLedger(models.Model):
         return f"{self.employee} | {self.entry_type} | {sign}{abs(self.amount)}"
 
 
+# ======================
+# Notification Outbox
+# ======================
+
+class NotificationOutbox(models.Model):
+    """
+    إشعار مستني الإرسال. بيتكتب في نفس الـ transaction بتاع التغيير (طلب/حضور/مخزون)
+    فمفيش إشعار بيطلع لتغيير اتعمله rollback. الإرسال من dispatch_notification_outbox
+    (core.services.outbox) على batches مع تجميع رسايل نفس المستلم في digest.
+    """
+    CHANNEL_CHOICES = [
+        ("WHATSAPP", "WhatsApp"),
+        ("EMAIL", "Email"),
+    ]
+    STATUS_CHOICES = [
+        ("PENDING", "في الانتظار"),
+        ("SENDING", "جاري الإرسال"),
+        ("SENT", "تم الإرسال"),
+        ("FAILED", "فشل"),
+    ]
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True, blank=True, related_name="outbox_notifications")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=50, blank=True)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True, null=True)
+    # عدد الإشعارات اللي اتبعتت في نفس الرسالة (digest)
+    digest_size = models.PositiveIntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="core_outbox_status_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} → {self.recipient} | {self.title} ({self.status})"
+
+
+# ======================
+# Delta Sync Tombstones
+# ======================
+
+class SyncTombstone(models.Model):
+    """
+    سجل حذف لعميل الـ POS / KDS اللي بيزامن التغييرات بس (core.utils.delta_sync):
+    الصف اتمسح فمابقاش يظهر في updated_at، فالحذف بيتسجل هنا لحد ما يعدي DELTA_SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="+")
+    model = models.CharField(max_length=50)  # app_label.model زي inventory.item
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["store", "model", "deleted_at"], name="core_tombstone_feed"),
+            models.Index(fields=["deleted_at"], name="core_tombstone_deleted_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id} deleted @ {self.deleted_at}"
+
+
 # ======================
 # Signals
 # ======================
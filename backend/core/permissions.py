@@ -1,6 +1,6 @@
 from rest_framework import permissions
 
-from core.models import Employee
+from core.utils.store_context import get_tenant_context
 
 class IsSuperUser(permissions.BasePermission):
     """سوبر يوزر Django الحقيقي فقط"""
@@ -69,10 +69,8 @@ class IsStaff(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        try:
-            return request.user.employee.store is not None
-        except (AttributeError, Employee.DoesNotExist):
-            return False
+        employee = get_tenant_context(request).employee
+        return employee is not None and employee.store_id is not None
 
 class IsOwnerOfStore(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -105,22 +103,20 @@ class IsEmployeeOfStore(permissions.BasePermission):
         if role == 'OWNER':
             return True
         
-        try:
-            return request.user.employee.store is not None
-        except (AttributeError, Employee.DoesNotExist):
-            return False
+        employee = get_tenant_context(request).employee
+        return employee is not None and employee.store_id is not None
         
     def has_object_permission(self, request, view, obj):
         if request.user.is_superuser:
             return True
 
-        try:
-            user_store = request.user.employee.store
-        except (AttributeError, Employee.DoesNotExist):
+        employee = get_tenant_context(request).employee
+        if employee is None:
             role = getattr(request.user, 'role', None)
             if role == 'OWNER':                
                 return True
             return False
+        user_store = employee.store
         
         if hasattr(obj, 'store') and obj.store:
             return obj.store == user_store
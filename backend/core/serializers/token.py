@@ -6,6 +6,8 @@ from rest_framework_simplejwt.serializers import (
     TokenRefreshSerializer,
 )
 from rest_framework_simplejwt.settings import api_settings
+from core.authentication import apply_tenant_claims
+from core.models import User
 from core.serializers.user import UserSerializer
 
 
@@ -19,6 +21,11 @@ class SubscriptionTokenObtainPairSerializer(TokenObtainPairSerializer):
         "no_access": "انتهت الفترة التجريبية الخاصة بحسابك. برجاء التواصل مع الشركة للترقية وتفعيل الحساب.",
     }
 
+    @classmethod
+    def get_token(cls, user):
+        # claims الدور/المتجر/الفرع/الاشتراك علشان الـ requests ماتحتاجش تحمّل الـ User
+        return apply_tenant_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -38,6 +45,12 @@ class SafeTokenRefreshSerializer(TokenRefreshSerializer):
     def validate(self, attrs):
         refresh = self.token_class(attrs["refresh"])
 
+        # نجدد الـ claims من الـ DB (تغيير دور/متجر/اشتراك يظهر مع أول refresh)
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("المستخدم غير موجود أو غير مفعل.", code="user_not_found")
+        apply_tenant_claims(refresh, user)
+
         data = {"access": str(refresh.access_token)}
 
         if api_settings.ROTATE_REFRESH_TOKENS:
@@ -0,0 +1,319 @@
+# core/services/outbox.py
+"""
+Outbox للإشعارات (واتساب / إيميل):
+
+- enqueue_notification: بيكتب الصفوف في نفس الـ transaction بتاع التغيير (طلب/حضور/مخزون)،
+  فلو التغيير اتعمله rollback الإشعار بيختفي معاه. بعد الـ commit بيشغّل الـ dispatcher
+  (مرة كل نافذة على الأكتر) والـ beat schedule احتياطي.
+- dispatch_outbox_batch: بياخد المستلمين اللي أقدم إشعار مستني عندهم عدّى نافذة الـ digest
+  (NOTIFICATION_DIGEST_WINDOW_SECONDS)، يحجز صفوفهم (skip_locked)، ويبعت رسالة واحدة لكل مستلم
+  فيها كل إشعاراته. الإرسال برا الـ transaction، وبعده الصفوف بتتعلم SENT أو بترجع PENDING للـ retry.
+- الإرسال at-least-once: worker وقع بعد الإرسال وقبل التعليم → الصفوف بترجع بعد STALE_CLAIM_SECONDS.
+- زمن التوصيل (sent_at - created_at) بيتسجل لكل batch وفي delivery_latency_stats.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from core.models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100  # عدد المستلمين في الـ batch
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 30
+STALE_CLAIM_SECONDS = 5 * 60
+MAX_DIGEST_ITEMS = 20
+WHATSAPP_FOOTER = "— نظام إدارة المطاعم"
+
+
+def get_digest_window():
+    return int(getattr(settings, "NOTIFICATION_DIGEST_WINDOW_SECONDS", 60))
+
+
+def enqueue_notification(channel, recipients, title, body, store=None, event_type=""):
+    """
+    يضيف إشعار لكل مستلم في الـ outbox. لازم يتنادى جوه transaction التغيير نفسه.
+    أرقام واتساب من غير "+" بتتجاهل (زي send_notification_whatsapp). يرجع عدد الصفوف.
+    """
+    if isinstance(recipients, str):
+        recipients = [recipients]
+
+    recipients = [r.strip() for r in recipients or [] if r and r.strip()]
+    if channel == "WHATSAPP":
+        recipients = [r for r in recipients if r.startswith("+")]
+    recipients = list(dict.fromkeys(recipients))
+    if not recipients:
+        return 0
+
+    store_id = getattr(store, "pk", store)
+    NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(
+            store_id=store_id,
+            channel=channel,
+            recipient=recipient,
+            event_type=event_type,
+            title=title[:255],
+            body=body,
+        )
+        for recipient in recipients
+    ])
+    transaction.on_commit(kick_outbox_dispatcher)
+    return len(recipients)
+
+
+def kick_outbox_dispatcher():
+    """
+    يجدول الـ dispatcher بعد نافذة الـ digest (مرة واحدة لكل نافذة).
+    لو الـ broker واقع الـ beat schedule بيكمل الشغل.
+    """
+    if not getattr(settings, "NOTIFICATION_OUTBOX_KICK_DISPATCHER", True):
+        return
+
+    window = get_digest_window()
+    try:
+        if not cache.add("core:outbox-dispatcher-kick", 1, max(window, 1)):
+            return
+    except Exception:
+        pass
+
+    try:
+        from core.tasks import dispatch_notification_outbox
+
+        dispatch_notification_outbox.apply_async(countdown=window, retry=False)
+    except Exception:
+        logger.warning("Could not enqueue outbox dispatcher; beat schedule will pick the notifications up.")
+
+
+def release_stale_claims(now=None):
+    """
+    صفوف SENDING من worker وقع → ترجع PENDING.
+    """
+    now = now or timezone.now()
+    return NotificationOutbox.objects.filter(
+        status="SENDING",
+        claimed_at__lt=now - timedelta(seconds=STALE_CLAIM_SECONDS),
+    ).update(status="PENDING")
+
+
+def _claim(batch_size, now, window):
+    ready = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=RETRY_DELAY_SECONDS))
+
+    with transaction.atomic():
+        keys = list(
+            NotificationOutbox.objects.filter(ready, status="PENDING")
+            .values("channel", "store_id", "recipient")
+            .annotate(oldest=Min("created_at"))
+            .filter(oldest__lte=now - timedelta(seconds=window))
+            .order_by("oldest")[:batch_size]
+        )
+        if not keys:
+            return []
+
+        match = Q()
+        for key in keys:
+            match |= Q(channel=key["channel"], store_id=key["store_id"], recipient=key["recipient"])
+
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(match, ready, status="PENDING", created_at__lte=now)
+            .order_by("created_at", "id")
+        )
+        if rows:
+            NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                status="SENDING", claimed_at=now, attempts=F("attempts") + 1
+            )
+            for row in rows:
+                row.attempts += 1
+    return rows
+
+
+def build_digest(rows):
+    """
+    (title, body) لرسالة واحدة من صفوف نفس المستلم.
+    """
+    if len(rows) == 1:
+        return rows[0].title, rows[0].body
+
+    items = [f"• {row.title}\n{row.body}" for row in rows[:MAX_DIGEST_ITEMS]]
+    if len(rows) > MAX_DIGEST_ITEMS:
+        items.append(f"… و {len(rows) - MAX_DIGEST_ITEMS} إشعارات تانية")
+    return f"{len(rows)} إشعارات جديدة", "\n\n".join(items)
+
+
+def _send_whatsapp(groups):
+    from core.services.whatsapp import WhatsAppDispatcher
+
+    messages = []
+    for (_, _, recipient), rows in groups:
+        title, body = build_digest(rows)
+        messages.append((recipient, f"*{title}*\n\n{body}\n\n{WHATSAPP_FOOTER}"))
+    return WhatsAppDispatcher().send_messages(messages)
+
+
+def notification_preferences(store_id):
+    """
+    إعدادات الإشعارات (whatsapp_numbers / *_enabled) من StoreSettings.notifications لو موجودة.
+    """
+    from core.services.store_settings import get_store_settings
+
+    store_settings = get_store_settings(store_id) if store_id else None
+    return getattr(store_settings, "notifications", None) or {}
+
+
+def email_credentials(store_id):
+    from core.services.store_settings import get_store_settings
+
+    store_settings = get_store_settings(store_id) if store_id else None
+    email_user = getattr(store_settings, "notification_email", None) if store_settings else None
+    email_password = getattr(store_settings, "notification_email_password", None) if store_settings else None
+    if not email_user or not email_password:
+        email_user = getattr(settings, "EMAIL_HOST_USER", None)
+        email_password = getattr(settings, "EMAIL_HOST_PASSWORD", None)
+    return email_user, email_password
+
+
+def _send_email(groups):
+    """
+    connection واحدة (SMTP session) لكل متجر في الـ batch بدل connection لكل رسالة.
+    """
+    results = [False] * len(groups)
+    by_store = {}
+    for index, ((_, store_id, _), _) in enumerate(groups):
+        by_store.setdefault(store_id, []).append(index)
+
+    for store_id, indexes in by_store.items():
+        email_user, email_password = email_credentials(store_id)
+        if not email_user or not email_password:
+            logger.warning("No email credentials for store %s. Skipping outbox emails.", store_id)
+            continue
+
+        try:
+            connection = get_connection(username=email_user, password=email_password, fail_silently=False)
+            connection.open()
+        except Exception as exc:
+            logger.warning("Email connection failed for store %s: %s", store_id, exc)
+            continue
+
+        try:
+            for index in indexes:
+                (_, _, recipient), rows = groups[index]
+                subject, body = build_digest(rows)
+                try:
+                    EmailMessage(
+                        subject=subject,
+                        body=body,
+                        from_email=email_user,
+                        to=[recipient],
+                        connection=connection,
+                    ).send(fail_silently=False)
+                    results[index] = True
+                except Exception as exc:
+                    logger.warning("Outbox email to %s failed: %s", recipient, exc)
+        finally:
+            connection.close()
+
+    return results
+
+
+SENDERS = {
+    "WHATSAPP": _send_whatsapp,
+    "EMAIL": _send_email,
+}
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize_latencies(latencies):
+    return {
+        "count": len(latencies),
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "max": max(latencies) if latencies else None,
+    }
+
+
+def dispatch_outbox_batch(batch_size=OUTBOX_BATCH_SIZE, window=None, now=None):
+    """
+    يبعت batch واحد. يرجع dict (notifications, messages, sent, failed, retried, latency)
+    أو None لو مفيش حاجة جاهزة.
+    """
+    now = now or timezone.now()
+    window = get_digest_window() if window is None else window
+
+    release_stale_claims(now)
+    rows = _claim(batch_size, now, window)
+    if not rows:
+        return None
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.channel, row.store_id, row.recipient), []).append(row)
+
+    delivered, undelivered = [], []
+    for channel in {key[0] for key in groups}:
+        channel_groups = [(key, group) for key, group in groups.items() if key[0] == channel]
+        sender = SENDERS.get(channel)
+        try:
+            results = sender(channel_groups) if sender else [False] * len(channel_groups)
+        except Exception:
+            logger.exception("Outbox %s sender crashed", channel)
+            results = [False] * len(channel_groups)
+        for (_, group), ok in zip(channel_groups, results):
+            (delivered if ok else undelivered).append(group)
+
+    sent_at = timezone.now()
+    latencies = []
+    for group in delivered:
+        NotificationOutbox.objects.filter(id__in=[row.id for row in group]).update(
+            status="SENT", sent_at=sent_at, digest_size=len(group), error=None
+        )
+        latencies.extend((sent_at - row.created_at).total_seconds() for row in group)
+
+    failed_ids = [row.id for group in undelivered for row in group if row.attempts >= MAX_ATTEMPTS]
+    retry_ids = [row.id for group in undelivered for row in group if row.attempts < MAX_ATTEMPTS]
+    if failed_ids:
+        NotificationOutbox.objects.filter(id__in=failed_ids).update(status="FAILED", error="فشل الإرسال")
+    if retry_ids:
+        NotificationOutbox.objects.filter(id__in=retry_ids).update(status="PENDING", error="فشل الإرسال")
+
+    metrics = {
+        "notifications": len(rows),
+        "messages": len(groups),
+        "sent": sum(len(group) for group in delivered),
+        "failed": len(failed_ids),
+        "retried": len(retry_ids),
+        "latency": summarize_latencies(latencies),
+    }
+    logger.info("Outbox batch: %s", metrics)
+    return metrics
+
+
+def delivery_latency_stats(since=None, store=None, channel=None):
+    """
+    زمن التوصيل بالثواني (من الإنشاء لحد الإرسال) للإشعارات المبعوتة.
+    """
+    qs = NotificationOutbox.objects.filter(status="SENT", sent_at__isnull=False)
+    if since is not None:
+        qs = qs.filter(sent_at__gte=since)
+    if store is not None:
+        qs = qs.filter(store_id=getattr(store, "pk", store))
+    if channel:
+        qs = qs.filter(channel=channel)
+
+    latencies = [
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in qs.values_list("created_at", "sent_at").iterator()
+    ]
+    return summarize_latencies(latencies)
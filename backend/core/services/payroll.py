@@ -9,7 +9,8 @@ from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
 
-from core.models import PayrollPeriod, EmployeeLedger
+from core.models import Employee, PayrollPeriod, EmployeeLedger
+from core.services.payroll_costs import store_payroll_costs
 
 try:
     # attendance app (as used by your serializers)
@@ -182,4 +183,117 @@ def generate_payroll(*, employee, month_date: date) -> PayrollPeriod:
         advances=advances,
         net_salary=net_salary,
     )
-    return payroll
\ No newline at end of file
+    return payroll
+
+PAYROLL_UPSERT_FIELDS = [
+    "monthly_salary",
+    "attendance_days",
+    "total_work_minutes",
+    "total_late_minutes",
+    "base_salary",
+    "penalties",
+    "late_penalties",
+    "bonuses",
+    "advances",
+    "net_salary",
+]
+
+
+def generate_store_payroll(
+    *,
+    store,
+    month_date: date,
+    branch=None,
+    batch_size: int = 200,
+    progress_callback=None,
+) -> dict:
+    """
+    Generate/refresh PayrollPeriod rows for every employee of a store (or branch) for one month.
+
+    Same formula as generate_payroll(), but per batch of employees:
+    - 3 grouped queries for attendance/ledger inputs (store_payroll_costs)
+    - 1 query (select_for_update) for existing payrolls of the batch
+    - bulk_create for new rows + bulk_update for unpaid/unlocked existing rows
+    Paid or locked payrolls are never touched. Employees without a daily rate are skipped.
+
+    progress_callback(done, total) is called after each batch.
+    Returns a summary: {"total", "created", "updated", "skipped_paid", "skipped_no_salary"}.
+    """
+    if not month_date:
+        raise ValueError("month_date مطلوب")
+
+    month_date = month_date.replace(day=1)
+    start, end_exclusive = _month_range(month_date)
+
+    employees_qs = Employee.objects.filter(store=store)
+    if branch:
+        employees_qs = employees_qs.filter(branch=branch)
+    employee_ids = list(employees_qs.order_by("id").values_list("id", flat=True))
+
+    summary = {
+        "total": len(employee_ids),
+        "created": 0,
+        "updated": 0,
+        "skipped_paid": 0,
+        "skipped_no_salary": 0,
+    }
+
+    for offset in range(0, len(employee_ids), batch_size):
+        batch_ids = employee_ids[offset:offset + batch_size]
+        rows = store_payroll_costs(
+            store=store,
+            start=start,
+            end_exclusive=end_exclusive,
+            employee_ids=batch_ids,
+        )
+
+        with transaction.atomic():
+            existing = {
+                payroll.employee_id: payroll
+                for payroll in PayrollPeriod.objects.select_for_update().filter(
+                    employee_id__in=batch_ids, month=month_date
+                )
+            }
+
+            to_create = []
+            to_update = []
+            for row in rows:
+                daily_salary = row["daily_rate"]
+                if daily_salary <= 0:
+                    summary["skipped_no_salary"] += 1
+                    continue
+
+                payroll = existing.get(row["employee_id"])
+                if payroll is not None and (payroll.is_paid or payroll.is_locked):
+                    summary["skipped_paid"] += 1
+                    continue
+
+                if payroll is None:
+                    payroll = PayrollPeriod(employee_id=row["employee_id"], month=month_date)
+                    to_create.append(payroll)
+                else:
+                    to_update.append(payroll)
+
+                payroll.monthly_salary = daily_salary * Decimal(30)
+                payroll.attendance_days = row["attendance_days"]
+                payroll.total_work_minutes = row["worked_minutes"]
+                payroll.total_late_minutes = row["late_minutes"]
+                payroll.base_salary = row["attendance_value"]
+                payroll.penalties = row["penalties"]
+                payroll.late_penalties = row["late_penalties"]
+                payroll.bonuses = row["bonuses"]
+                payroll.advances = row["advances"]
+                payroll.calculate_net_salary()
+
+            if to_create:
+                PayrollPeriod.objects.bulk_create(to_create, batch_size=batch_size)
+            if to_update:
+                PayrollPeriod.objects.bulk_update(to_update, PAYROLL_UPSERT_FIELDS, batch_size=batch_size)
+
+        summary["created"] += len(to_create)
+        summary["updated"] += len(to_update)
+
+        if progress_callback:
+            progress_callback(min(offset + batch_size, len(employee_ids)), len(employee_ids))
+
+    return summary
@@ -0,0 +1,124 @@
+# core/services/payroll_costs.py
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from attendance.models import AttendanceLog
+from core.models import Employee, EmployeeLedger
+
+ZERO = Decimal("0")
+LEDGER_COMPONENTS = {
+    "BONUS": "bonuses",
+    "PENALTY": "penalties",
+    "ADVANCE": "advances",
+}
+
+
+def store_payroll_costs(*, store, start: date, end_exclusive: date, branch=None, employee_ids=None) -> list[dict]:
+    """
+    Per-employee payroll inputs for one store within [start, end_exclusive).
+
+    Always 3 grouped queries (employees, attendance, ledger) regardless of how many
+    employees/tenants exist; every query is scoped by store (and branch if given).
+
+    Each row:
+        employee_id, employee_name, daily_rate,
+        attendance_days, worked_minutes, late_minutes, late_penalties,
+        attendance_value (= daily_rate * attendance_days),
+        bonuses, penalties, advances   (ledger entries by payout_date; SALARY ignored)
+    """
+    if not store:
+        return []
+
+    employees_qs = Employee.objects.filter(store=store)
+    if branch:
+        employees_qs = employees_qs.filter(branch=branch)
+    if employee_ids is not None:
+        employees_qs = employees_qs.filter(id__in=employee_ids)
+
+    employees = list(
+        employees_qs.order_by("id").values_list("id", "salary", "user__name", "user__email")
+    )
+    if not employees:
+        return []
+
+    scope = Q(employee__store=store)
+    if branch:
+        scope &= Q(employee__branch=branch)
+    if employee_ids is not None:
+        scope &= Q(employee_id__in=employee_ids)
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    attendance_rows = (
+        AttendanceLog.objects.filter(scope, work_date__gte=start, work_date__lt=end_exclusive)
+        .order_by()
+        .values("employee_id")
+        .annotate(
+            days=Count("work_date", distinct=True),
+            worked_minutes=Coalesce(Sum("duration_minutes"), Value(0)),
+            late_minutes=Coalesce(Sum("late_minutes"), Value(0)),
+            late_penalties=Coalesce(Sum("penalty_applied"), Value(0), output_field=money),
+        )
+    )
+    attendance_map = {row["employee_id"]: row for row in attendance_rows}
+
+    ledger_rows = (
+        EmployeeLedger.objects.filter(
+            scope,
+            payout_date__gte=start,
+            payout_date__lt=end_exclusive,
+            entry_type__in=LEDGER_COMPONENTS.keys(),
+        )
+        .order_by()
+        .values("employee_id", "entry_type")
+        .annotate(total=Sum("amount"))
+    )
+    ledger_map: dict[int, dict[str, Decimal]] = {}
+    for row in ledger_rows:
+        ledger_map.setdefault(row["employee_id"], {})[LEDGER_COMPONENTS[row["entry_type"]]] = row["total"] or ZERO
+
+    rows = []
+    for employee_id, salary, user_name, user_email in employees:
+        attendance = attendance_map.get(employee_id, {})
+        ledger = ledger_map.get(employee_id, {})
+
+        daily_rate = Decimal(salary or 0)
+        days = int(attendance.get("days") or 0)
+
+        rows.append(
+            {
+                "employee_id": employee_id,
+                "employee_name": user_name or user_email,
+                "daily_rate": daily_rate,
+                "attendance_days": days,
+                "attendance_value": daily_rate * Decimal(days),
+                "worked_minutes": int(attendance.get("worked_minutes") or 0),
+                "late_minutes": int(attendance.get("late_minutes") or 0),
+                "late_penalties": Decimal(attendance.get("late_penalties") or 0),
+                "bonuses": ledger.get("bonuses", ZERO),
+                "penalties": ledger.get("penalties", ZERO),
+                "advances": ledger.get("advances", ZERO),
+            }
+        )
+    return rows
+
+
+def summarize_payroll_costs(rows) -> dict:
+    """Totals over store_payroll_costs() rows (penalties here exclude late penalties)."""
+    totals = {
+        "attendance_days": 0,
+        "attendance_value": ZERO,
+        "bonuses": ZERO,
+        "penalties": ZERO,
+        "late_penalties": ZERO,
+        "advances": ZERO,
+    }
+    for row in rows:
+        for key in totals:
+            totals[key] += row[key]
+    return totals
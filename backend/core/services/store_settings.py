@@ -0,0 +1,103 @@
+# core/services/store_settings.py
+"""
+Cache لإعدادات المتجر (StoreSettings) في ذاكرة الـ process.
+
+الإعدادات بتتقري في أماكن كتير في نفس الـ request/task (الضريبة في update_total،
+السماح بالمخزون في update_inventory_for_order و adjust_stock، غرامات الحضور،
+إيميل الإشعارات)، فبدل query في كل مرة:
+
+- LRU محلي (STORE_SETTINGS_CACHE_SIZE متجر) لكل entry عمر STORE_SETTINGS_CACHE_TTL_SECONDS.
+- أي save/delete للإعدادات بيغيّر version المتجر في الـ Django cache (Redis لو متحدد)
+  → باقي الـ workers بيلاحظوا الفرق في أول قراءة ويعيدوا التحميل.
+  (لو الـ cache مش مشترك، الـ TTL هو الحد الأقصى لأي بيانات قديمة.)
+
+الـ instance اللي بيرجع مشترك بين الـ requests: للقراءة بس.
+للتعديل هات الإعدادات من الـ DB (store.settings) واعمل save عادي.
+"""
+import time as _time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+
+STORE_SETTINGS_CACHE_TTL_SECONDS = 60
+STORE_SETTINGS_CACHE_SIZE = 1024
+
+# store_id -> (version, expires_at, settings | None)
+_local_settings = OrderedDict()
+_lock = Lock()
+
+
+def _version_key(store_id):
+    return f"core:store-settings-version:{store_id}"
+
+
+def _store_version(store_id):
+    try:
+        return cache.get(_version_key(store_id))
+    except Exception:
+        return None
+
+
+def _bump_version(store_id):
+    try:
+        cache.set(_version_key(store_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def invalidate_store_settings(store_id):
+    """
+    يشيل إعدادات المتجر من الـ cache المحلي ويغيّر الـ version لكل الـ workers.
+    بنغيّر الـ version تاني بعد الـ commit علشان worker قرا القيمة القديمة قبل الـ commit
+    مايفضلش شايلها.
+    """
+    if not store_id:
+        return
+
+    with _lock:
+        _local_settings.pop(store_id, None)
+
+    _bump_version(store_id)
+    transaction.on_commit(lambda: _bump_version(store_id))
+
+
+def clear_store_settings_cache():
+    with _lock:
+        _local_settings.clear()
+
+
+def _load(store_id):
+    from core.models import StoreSettings
+
+    return StoreSettings.objects.filter(store_id=store_id).first()
+
+
+def get_store_settings(store):
+    """
+    يرجع StoreSettings للمتجر (store أو store_id) أو None لو مش موجودة.
+    """
+    store_id = getattr(store, "pk", store)
+    if not store_id:
+        return None
+
+    version = _store_version(store_id)
+    now = _time.monotonic()
+
+    with _lock:
+        entry = _local_settings.get(store_id)
+        if entry and entry[0] == version and entry[1] > now:
+            _local_settings.move_to_end(store_id)
+            return entry[2]
+
+    store_settings = _load(store_id)
+
+    with _lock:
+        _local_settings[store_id] = (version, now + STORE_SETTINGS_CACHE_TTL_SECONDS, store_settings)
+        _local_settings.move_to_end(store_id)
+        while len(_local_settings) > STORE_SETTINGS_CACHE_SIZE:
+            _local_settings.popitem(last=False)
+
+    return store_settings
@@ -0,0 +1,179 @@
+# core/services/whatsapp.py
+"""
+إرسال رسائل واتساب (Twilio) لأكتر من رقم بالتوازي:
+
+- requests.Session واحدة لكل process مع connection pool (keep-alive) بدل requests.post في كل رسالة.
+- ThreadPoolExecutor (WHATSAPP_DISPATCH_CONCURRENCY) → رقم بطيء مابيأخرش الباقي.
+- Token bucket لكل حساب Twilio (TWILIO_MESSAGES_PER_SECOND) علشان مانتخطاش الـ rate limit.
+  الـ bucket في ذاكرة الـ process، فالحد الفعلي = الحد × عدد الـ workers اللي بيبعتوا في نفس الوقت.
+- 429 بيتعاد بـ exponential backoff (وبنحترم Retry-After لو موجود)، وفشل الاتصال بيتعاد من الـ adapter.
+  الـ POST مش idempotent: 5xx أو timeout بعد ما الطلب اتبعت مابيتعادش هنا (ممكن الرسالة تكون اتبعتت)
+  والـ outbox هو اللي بيقرر يعيد.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from decouple import config
+from django.conf import settings
+
+from core.utils.http import get_process_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FROM_NUMBER = "whatsapp:+14155238886"  # Sandbox
+TIMEOUT = (3.05, 10)
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8
+
+
+class TokenBucket:
+    """
+    rate توكن في الثانية وسعة capacity (burst). acquire بيستنى لحد ما يبقى فيه توكن.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_account_bucket(account_sid, rate):
+    with _buckets_lock:
+        bucket = _buckets.get(account_sid)
+        if bucket is None or bucket.rate != float(rate):
+            bucket = TokenBucket(rate)
+            _buckets[account_sid] = bucket
+        return bucket
+
+
+def get_http_session():
+    """
+    Session مشتركة (pool بحجم الـ concurrency). بتتعمل من جديد بعد الـ fork.
+    """
+    pool_size = max(1, int(getattr(settings, "WHATSAPP_DISPATCH_CONCURRENCY", 8)))
+    return get_process_session(
+        "twilio", pool_connections=2, pool_maxsize=pool_size,
+        connect_retries=MAX_RETRIES, backoff_factor=BACKOFF_SECONDS,
+    )
+
+
+def format_whatsapp_number(number):
+    return number if number.startswith("whatsapp:") else f"whatsapp:{number}"
+
+
+class WhatsAppDispatcher:
+    def __init__(self, account_sid=None, auth_token=None, from_number=None, api_base=None,
+                 concurrency=None, rate=None, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        self.account_sid = account_sid or config("TWILIO_ACCOUNT_SID", default=None)
+        self.auth_token = auth_token or config("TWILIO_AUTH_TOKEN", default=None)
+        self.from_number = from_number or config("TWILIO_WHATSAPP_NUMBER", default=DEFAULT_FROM_NUMBER)
+        self.api_base = (api_base or getattr(settings, "TWILIO_API_BASE", "https://api.twilio.com")).rstrip("/")
+        self.concurrency = int(concurrency or getattr(settings, "WHATSAPP_DISPATCH_CONCURRENCY", 8))
+        rate = getattr(settings, "TWILIO_MESSAGES_PER_SECOND", 10) if rate is None else rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = get_http_session()
+        self.bucket = get_account_bucket(self.account_sid, rate) if self.account_sid else None
+
+    @property
+    def configured(self):
+        return bool(self.account_sid and self.auth_token)
+
+    @property
+    def messages_url(self):
+        return f"{self.api_base}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+            except ValueError:
+                pass
+        return min(self.backoff * (2 ** attempt), MAX_BACKOFF_SECONDS)
+
+    def send(self, to, body):
+        if not self.configured:
+            logger.warning("Twilio credentials not configured. Skipping WhatsApp message.")
+            return False
+
+        payload = {
+            "From": self.from_number,
+            "To": format_whatsapp_number(to),
+            "Body": body,
+        }
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(
+                    self.messages_url, data=payload, auth=(self.account_sid, self.auth_token), timeout=TIMEOUT
+                )
+            except requests.RequestException as e:
+                # فشل الاتصال اتعاد في الـ adapter؛ غير كده الرسالة ممكن تكون وصلت → مانعيدش
+                logger.warning(f"WhatsApp send exception ({to}): {str(e)}")
+                return False
+
+            if response.status_code in (200, 201):
+                logger.info(f"WhatsApp sent successfully to {to}")
+                return True
+            if response.status_code != 429:
+                logger.error(f"Twilio error {response.status_code}: {response.text}")
+                return False
+
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+
+        logger.error(f"WhatsApp send failed after {self.max_retries + 1} attempts: {to}")
+        return False
+
+    def send_messages(self, messages):
+        """
+        messages: [(to, body), ...] بالتوازي. يرجع list[bool] بنفس الترتيب.
+        """
+        if not messages:
+            return []
+        if not self.configured:
+            logger.warning("Twilio credentials not configured. Skipping WhatsApp message.")
+            return [False] * len(messages)
+
+        workers = max(1, min(self.concurrency, len(messages)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whatsapp") as pool:
+            return list(pool.map(lambda message: self.send(*message), messages))
+
+    def send_many(self, numbers, body):
+        """
+        يبعت نفس الرسالة لكل الأرقام بالتوازي. يرجع {"sent": n, "failed": [numbers]}.
+        """
+        numbers = list(dict.fromkeys(numbers))
+        results = self.send_messages([(number, body) for number in numbers])
+        failed = [number for number, ok in zip(numbers, results) if not ok]
+        return {"sent": len(numbers) - len(failed), "failed": failed}
@@ -0,0 +1,61 @@
+# core/signals.py
+"""
+- إلغاء توكنات JWT لما حاجة من الـ claims تتغير (دور، تفعيل، اشتراك، متجر/فرع الموظف).
+  التوكن القديم بيترفض والـ refresh بيطلع توكن بـ claims جديدة.
+- invalidation لـ cache إعدادات المتجر (core.services.store_settings) مع أي save/delete.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.authentication import revoke_user_tokens
+from core.models import Employee, StoreSettings, User
+from core.services.store_settings import invalidate_store_settings
+
+USER_CLAIM_FIELDS = ("role", "is_superuser", "is_active", "is_payment_verified", "trial_ends_at", "password")
+EMPLOYEE_CLAIM_FIELDS = ("user_id", "store_id", "branch_id")
+
+
+def _claims_changed(instance, fields, update_fields):
+    if instance._state.adding or not instance.pk:
+        return False
+    watched = set(fields) | {field.removesuffix("_id") for field in fields}
+    if update_fields is not None and not watched & set(update_fields):
+        return False
+
+    old = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+    if old is None:
+        return False
+    return any(old[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=User)
+def _track_user_claims(sender, instance, update_fields=None, **kwargs):
+    instance._revoke_tokens = _claims_changed(instance, USER_CLAIM_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def _revoke_user_on_claims_change(sender, instance, **kwargs):
+    if getattr(instance, "_revoke_tokens", False):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(pre_save, sender=Employee)
+def _track_employee_claims(sender, instance, update_fields=None, **kwargs):
+    instance._revoke_tokens = _claims_changed(instance, EMPLOYEE_CLAIM_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Employee)
+def _revoke_employee_on_claims_change(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_revoke_tokens", False):
+        revoke_user_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=Employee)
+def _revoke_employee_on_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=StoreSettings)
+@receiver(post_delete, sender=StoreSettings)
+def _invalidate_store_settings(sender, instance, **kwargs):
+    invalidate_store_settings(instance.store_id)
@@ -1,70 +1,97 @@
 # core/tasks.py
 from celery import shared_task
-from decouple import config
-import requests
 import logging
-from django.db.models import F
 
 logger = logging.getLogger(__name__)
 
 def send_whatsapp_message(to: str, body: str) -> bool:
     """إرسال رسالة واتساب - Twilio (Sandbox أو Production)"""
-    account_sid = config('TWILIO_ACCOUNT_SID', default=None)
-    auth_token = config('TWILIO_AUTH_TOKEN', default=None)
-    from_number = config('TWILIO_WHATSAPP_NUMBER', default='whatsapp:+14155238886')  # Sandbox
-
-    if not account_sid or not auth_token:
-        logger.warning("Twilio credentials not configured. Skipping WhatsApp message.")
-        return False
-
-    url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
-    payload = {
-        'From': from_number,
-        'To': f'whatsapp:{to}' if not to.startswith('whatsapp:') else to,
-        'Body': body
-    }
-    auth = (account_sid, auth_token)
-
-    try:
-        response = requests.post(url, data=payload, auth=auth, timeout=10)
-        if response.status_code == 201:
-            logger.info(f"WhatsApp sent successfully to {to}")
-            return True
-        else:
-            logger.error(f"Twilio error {response.status_code}: {response.text}")
-    except Exception as e:
-        logger.error(f"WhatsApp send exception: {str(e)}")
-    return False
+    from core.services.whatsapp import WhatsAppDispatcher
+
+    return WhatsAppDispatcher().send(to, body)
 
 
 @shared_task
 def send_notification_whatsapp(numbers, title, message):
+    """
+    نفس الرسالة لكل الأرقام بالتوازي (pool + rate limit لكل حساب Twilio + retry).
+    """
+    from core.services.whatsapp import WhatsAppDispatcher
+
     if not numbers:
         return
     body = f"*{title}*\n\n{message}\n\n— نظام إدارة المطاعم"
-    for number in numbers:
-        if number and number.startswith('+'):
-            send_whatsapp_message(number, body)
+    recipients = [number for number in numbers if number and number.startswith('+')]
+    summary = WhatsAppDispatcher().send_many(recipients, body)
+    if summary["failed"]:
+        logger.warning("WhatsApp notification failed for %s", summary["failed"])
+    return summary
 
 
-@shared_task
+@shared_task(ignore_result=True)
+def dispatch_notification_outbox(max_batches=20):
+    """
+    يفضّي الـ outbox على batches (digest لكل مستلم). بيتشغل بعد الـ commit ومن الـ beat كل 30 ثانية.
+    """
+    from core.services.outbox import dispatch_outbox_batch
+
+    totals = {"notifications": 0, "messages": 0, "sent": 0, "failed": 0, "retried": 0}
+    for _ in range(max_batches):
+        metrics = dispatch_outbox_batch()
+        if metrics is None:
+            break
+        for key in totals:
+            totals[key] += metrics[key]
+    return totals
+
+
+@shared_task(ignore_result=True)
 def check_low_stock_daily():
-    """مهمة يومية تفحص كل الفروع"""
-    from stores.models import Store
-    from inventory.models import Inventory
-
-    for store in Store.objects.filter(is_active=True):
-        low_items = Inventory.objects.filter(
-            store=store,
-            qty_on_hand__lte=F('reorder_level'),
-            item__track_inventory=True
-        ).select_related('item')
-
-        if low_items.exists():
-            items_text = "\n".join([
-                f"• {i.item.name}: {i.qty_on_hand} (الحد الأدنى: {i.reorder_level})"
-                for i in low_items
-            ])
-            message = f"تنبيه مخزون منخفض في فرع ({store.name})\n\n{items_text}"
-            numbers = store.settings.get('notifications', {}).get('whatsapp_numbers', [])
-            send_notification_whatsapp.delay(numbers, "تنبيه: مخزون منخفض!", message)
\ No newline at end of file
+    """
+    مراجعة ليلية: تصليح is_low + ملخص لكل فرع من query واحدة على is_low=True.
+    التنبيهات الفورية بتطلع من انتقالات is_low في مسار تعديل المخزون (inventory.services.stock_alerts).
+    """
+    from inventory.services.stock_alerts import reconcile_low_stock
+
+    return reconcile_low_stock()
+
+
+@shared_task(ignore_result=True)
+def prune_sync_tombstones():
+    """
+    يمسح سجلات الحذف الأقدم من مدة الاحتفاظ. العميل اللي token بتاعه أقدم منها بياخد reset (قايمة كاملة).
+    """
+    from django.utils import timezone
+    from core.models import SyncTombstone
+    from core.utils.delta_sync import get_tombstone_retention
+
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - get_tombstone_retention()).delete()
+    return deleted
+
+@shared_task(bind=True)
+def generate_store_payroll_task(self, store_id, month, branch_id=None):
+    """
+    توليد مرتبات الشهر لكل موظفين المتجر/الفرع مرة واحدة (Bulk).
+    التقدم بيتسجل كـ state=PROGRESS و meta={"done", "total"}.
+    """
+    from datetime import date
+
+    from branches.models import Branch
+    from core.models import Store
+    from core.services.payroll import generate_store_payroll
+
+    store = Store.objects.get(pk=store_id)
+    branch = Branch.objects.filter(pk=branch_id, store=store).first() if branch_id else None
+
+    def _progress(done, total):
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    summary = generate_store_payroll(
+        store=store,
+        branch=branch,
+        month_date=date.fromisoformat(month),
+        progress_callback=_progress,
+    )
+    logger.info("Bulk payroll for store %s (%s): %s", store_id, month, summary)
+    return summary
@@ -0,0 +1,124 @@
+# core/testing.py
+"""
+FakeTwilioServer: سيرفر محلي بيقلّد Messages API بتاع Twilio للتستات والـ benchmarks.
+
+    with FakeTwilioServer(latency=0.05, fail_first={"+2010": 2}) as server:
+        settings.TWILIO_API_BASE = server.api_base
+        ...
+        server.messages, server.peak_in_flight, server.connections
+
+- fail_first: رقم → عدد مرات يرجع فيها 503 الأول (لتست الأخطاء المؤقتة).
+- slow_numbers: رقم → تأخير إضافي بالثواني (رقم بطيء مايأخرش الباقي).
+- rate_limit: أقصى عدد requests في الثانية؛ الزيادة بترجع 429.
+"""
+import json
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _TwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake.register_connection()
+
+    def log_message(self, format, *args):
+        return
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        status, body, headers = self.server.fake.handle(self.path, form)
+
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class FakeTwilioServer:
+    def __init__(self, latency=0.0, fail_first=None, slow_numbers=None, rate_limit=None):
+        self.latency = latency
+        self.fail_first = Counter(fail_first or {})
+        self.slow_numbers = dict(slow_numbers or {})
+        self.rate_limit = rate_limit
+        self.messages = []
+        self.attempts = Counter()
+        self.timestamps = []
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def api_base(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def register_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def handle(self, path, form):
+        to = form.get("To", "").replace("whatsapp:", "")
+        now = time.monotonic()
+
+        with self._lock:
+            self.attempts[to] += 1
+            if self.rate_limit:
+                while self._recent and now - self._recent[0] >= 1:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    return 429, {"code": 20429, "message": "Too Many Requests"}, {"Retry-After": "0.1"}
+                self._recent.append(now)
+
+            if self.fail_first[to] > 0:
+                self.fail_first[to] -= 1
+                return 503, {"message": "Service Unavailable"}, {}
+
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        try:
+            delay = self.latency + self.slow_numbers.get(to, 0)
+            if delay:
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.messages.append(form)
+                self.timestamps.append(now)
+
+        if not path.endswith("/Messages.json"):
+            return 404, {"message": "not found"}, {}
+        return 201, {"sid": f"SM{len(self.messages):032d}", "status": "queued", "to": form.get("To")}, {}
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _TwilioHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
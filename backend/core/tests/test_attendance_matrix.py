@@ -0,0 +1,92 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from attendance.models import AttendanceLog
+from core.models import Employee, User
+
+URL = "/api/v1/employees/attendance-matrix/"
+
+
+def _log(employee, day, hour_in, hour_out):
+    return AttendanceLog.objects.create(
+        employee=employee,
+        work_date=day,
+        check_in=timezone.make_aware(datetime(day.year, day.month, day.day, hour_in)),
+        check_out=timezone.make_aware(datetime(day.year, day.month, day.day, hour_out)),
+    )
+
+
+def _add_employees(store, branch, count, start=0):
+    employees = []
+    for i in range(start, start + count):
+        user = User.objects.create_user(
+            email=f"matrix{store.id}-{i}@example.com", password="pass", is_active=True, name=f"Emp {i}"
+        )
+        employees.append(Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100")))
+    return employees
+
+
+@pytest.fixture
+def matrix_store(owner_store):
+    return owner_store.client, owner_store.store, owner_store.branch
+
+
+@pytest.mark.django_db
+def test_attendance_matrix_returns_columnar_month(matrix_store):
+    client, store, branch = matrix_store
+    first, second = _add_employees(store, branch, 2)
+    _log(first, date(2024, 6, 3), 9, 17)
+    _log(first, date(2024, 6, 3), 18, 20)
+    _log(second, date(2024, 6, 30), 9, 11)
+    _log(second, date(2024, 7, 1), 10, 12)  # شهر تاني
+
+    response = client.get(URL, {"month": "2024-06", "store_id": store.id})
+
+    assert response.status_code == 200
+    data = response.data
+    assert data["month"] == "2024-06"
+    assert data["days"] == 30
+    rows = {row["id"]: row for row in data["employees"]}
+
+    assert len(rows[first.id]["present"]) == 30
+    assert rows[first.id]["present"][2] == 1
+    assert rows[first.id]["worked_minutes"][2] == 8 * 60 + 2 * 60
+    june_3 = AttendanceLog.objects.filter(employee=first, work_date=date(2024, 6, 3))
+    assert rows[first.id]["penalty"][2] == float(sum(log.penalty_applied for log in june_3))
+    assert rows[first.id]["late_minutes"][2] == sum(log.late_minutes or 0 for log in june_3)
+    assert rows[first.id]["totals"]["present_days"] == 1
+
+    assert rows[second.id]["present"][29] == 1
+    assert rows[second.id]["totals"]["present_days"] == 1
+    assert rows[second.id]["totals"]["worked_minutes"] == 120
+
+
+@pytest.mark.django_db
+def test_attendance_matrix_query_count_is_constant(matrix_store):
+    client, store, branch = matrix_store
+    for employee in _add_employees(store, branch, 2):
+        _log(employee, date(2024, 6, 3), 9, 17)
+
+    client.get(URL, {"month": "2024-06", "store_id": store.id})
+    with CaptureQueriesContext(connection) as small:
+        client.get(URL, {"month": "2024-06", "store_id": store.id})
+
+    for employee in _add_employees(store, branch, 10, start=2):
+        _log(employee, date(2024, 6, 4), 9, 17)
+    with CaptureQueriesContext(connection) as large:
+        response = client.get(URL, {"month": "2024-06", "store_id": store.id})
+
+    assert len(response.data["employees"]) == 12
+    assert len(large.captured_queries) == len(small.captured_queries)
+
+
+@pytest.mark.django_db
+def test_attendance_matrix_rejects_bad_month(matrix_store):
+    client, store, _ = matrix_store
+    response = client.get(URL, {"month": "June", "store_id": store.id})
+    assert response.status_code == 400
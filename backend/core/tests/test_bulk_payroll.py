@@ -0,0 +1,153 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import AttendanceLog
+from core.models import Employee, EmployeeLedger, PayrollPeriod, Store, User
+from core.services.payroll import generate_store_payroll
+from core.tasks import generate_store_payroll_task
+
+JUNE = date(2024, 6, 1)
+
+
+def _add_employees(store, branch, count, start=0, salary=Decimal("100")):
+    employees = []
+    for i in range(start, start + count):
+        user = User.objects.create_user(email=f"bulk{store.id}-{i}@example.com", password="pass", is_active=True)
+        employee = Employee.objects.create(user=user, store=store, branch=branch, salary=salary)
+        AttendanceLog.objects.create(
+            employee=employee,
+            work_date=date(2024, 6, 3),
+            check_in=timezone.make_aware(datetime(2024, 6, 3, 9, 0)),
+            check_out=timezone.make_aware(datetime(2024, 6, 3, 17, 0)),
+            penalty_applied=Decimal("5"),
+        )
+        EmployeeLedger.objects.create(
+            employee=employee, entry_type="BONUS", amount=Decimal("20"), payout_date=date(2024, 6, 10)
+        )
+        employees.append(employee)
+    return employees
+
+
+@pytest.fixture
+def bulk_store(owner_store):
+    return owner_store.owner, owner_store.store, owner_store.branch
+
+
+@pytest.mark.django_db
+def test_generate_store_payroll_creates_rows_with_constant_queries(bulk_store):
+    _, store, branch = bulk_store
+    _add_employees(store, branch, 3)
+
+    with CaptureQueriesContext(connection) as small:
+        summary = generate_store_payroll(store=store, month_date=JUNE)
+    assert summary["created"] == 3
+
+    PayrollPeriod.objects.all().delete()
+    _add_employees(store, branch, 12, start=3)
+    with CaptureQueriesContext(connection) as large:
+        summary = generate_store_payroll(store=store, month_date=JUNE)
+
+    assert summary == {"total": 15, "created": 15, "updated": 0, "skipped_paid": 0, "skipped_no_salary": 0}
+    assert len(small.captured_queries) == len(large.captured_queries)
+
+    payroll = PayrollPeriod.objects.filter(month=JUNE).first()
+    assert payroll.attendance_days == 1
+    assert payroll.base_salary == Decimal("100")
+    assert payroll.late_penalties == Decimal("5")
+    assert payroll.bonuses == Decimal("20")
+    assert payroll.net_salary == Decimal("115")
+
+
+@pytest.mark.django_db
+def test_generate_store_payroll_updates_unpaid_and_keeps_paid(bulk_store):
+    _, store, branch = bulk_store
+    paid_employee, unpaid_employee = _add_employees(store, branch, 2)
+    _add_employees(store, branch, 1, start=2, salary=Decimal("0"))
+
+    PayrollPeriod.objects.create(employee=paid_employee, month=JUNE, base_salary=Decimal("1"), is_paid=True)
+    PayrollPeriod.objects.create(employee=unpaid_employee, month=JUNE, base_salary=Decimal("1"))
+
+    progress = []
+    summary = generate_store_payroll(
+        store=store,
+        month_date=JUNE,
+        batch_size=2,
+        progress_callback=lambda done, total: progress.append((done, total)),
+    )
+
+    assert summary == {"total": 3, "created": 0, "updated": 1, "skipped_paid": 1, "skipped_no_salary": 1}
+    assert progress == [(2, 3), (3, 3)]
+    assert PayrollPeriod.objects.get(employee=paid_employee).base_salary == Decimal("1")
+    assert PayrollPeriod.objects.get(employee=unpaid_employee).base_salary == Decimal("100")
+
+
+@pytest.mark.django_db
+def test_generate_payroll_bulk_endpoint_enqueues_task(bulk_store, monkeypatch):
+    owner, store, branch = bulk_store
+    _add_employees(store, branch, 2)
+
+    calls = []
+
+    class _Result:
+        id = "0f6f0c4e-1111-2222-3333-444455556666"
+
+    def fake_delay(*args):
+        calls.append(args)
+        return _Result()
+
+    monkeypatch.setattr(generate_store_payroll_task, "delay", fake_delay)
+
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    response = client.post("/api/v1/employees/generate-payroll-bulk/", {"month": "2024-06"}, format="json")
+
+    assert response.status_code == 202
+    assert response.data["task_id"] == _Result.id
+    assert calls == [(store.id, "2024-06-01", None)]
+
+    # الـ task نفسها (من غير broker)
+    summary = generate_store_payroll_task(*calls[0])
+    assert summary["created"] == 2
+
+
+@pytest.mark.django_db
+def test_generate_payroll_bulk_status_is_scoped_to_the_owning_store(bulk_store, monkeypatch):
+    owner, _, _ = bulk_store
+    other_owner = User.objects.create_user(email="bulk-other@example.com", password="pass", is_active=True, role="OWNER")
+    Store.objects.create(name="Other Store", owner=other_owner)
+
+    class _Result:
+        id = "9a1b2c3d-1111-2222-3333-444455556666"
+        state = "SUCCESS"
+        result = {"created": 0}
+
+        def __init__(self, task_id=None):
+            pass
+
+        def successful(self):
+            return True
+
+        def failed(self):
+            return False
+
+    monkeypatch.setattr(generate_store_payroll_task, "delay", lambda *args: _Result())
+    monkeypatch.setattr("celery.result.AsyncResult", _Result)
+
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    task_id = client.post("/api/v1/employees/generate-payroll-bulk/", {"month": "2024-06"}, format="json").data["task_id"]
+    status_url = f"/api/v1/employees/generate-payroll-bulk/{task_id}/"
+
+    own = client.get(status_url)
+    assert own.status_code == 200
+    assert own.data["summary"] == {"created": 0}
+
+    client.force_authenticate(user=other_owner)
+    assert client.get(status_url).status_code == 404
+    assert client.get("/api/v1/employees/generate-payroll-bulk/00000000-0000-0000-0000-000000000000/").status_code == 404
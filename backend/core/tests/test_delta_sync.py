@@ -0,0 +1,198 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import SyncTombstone
+from core.tasks import prune_sync_tombstones
+from core.utils.delta_sync import decode_token, encode_token, oldest_open_write
+from inventory.models import Category, Inventory, Item
+from inventory.services.stocktake import apply_stocktake
+from orders.models import Reservation, Table
+
+ITEMS_URL = "/api/v1/inventory/items/changes/"
+INVENTORY_URL = "/api/v1/inventory/inventory/changes/"
+TABLES_URL = "/api/v1/orders/tables/changes/"
+
+
+@pytest.fixture
+def sync_store(owner_store, settings):
+    settings.DELTA_SYNC_OVERLAP_SECONDS = 0
+    client, _, store, branch = owner_store
+    drinks = Category.objects.create(name="Drinks", store=store)
+    tea = Item.objects.create(name="Tea", store=store, unit_price=5, category=drinks)
+    coffee = Item.objects.create(name="Coffee", store=store, unit_price=15)
+    Item.objects.create(name="Cake", store=store, unit_price=20)
+    return client, store, branch, drinks, tea, coffee
+
+
+def _ids(response):
+    return sorted(row["id"] for row in response.data["changed"])
+
+
+def test_token_round_trips_to_the_microsecond():
+    moment = timezone.now()
+    assert decode_token(encode_token(moment)) == moment
+
+
+def test_item_feed_returns_only_changes_and_deletions(sync_store):
+    client, store, _, drinks, tea, coffee = sync_store
+
+    first = client.get(ITEMS_URL)
+    assert first.status_code == 200
+    assert first.data["reset"] is True
+    assert len(first.data["changed"]) == 3
+
+    unchanged = client.get(ITEMS_URL, {"since": first.data["token"]})
+    assert (unchanged.data["reset"], unchanged.data["changed"], unchanged.data["deleted"]) == (False, [], [])
+
+    coffee.unit_price = 16
+    coffee.save()
+    cake_id = Item.objects.get(name="Cake").id
+    Item.objects.filter(pk=cake_id).delete()
+    drinks.name = "Hot Drinks"
+    drinks.save()
+
+    delta = client.get(ITEMS_URL, {"since": unchanged.data["token"]})
+    assert _ids(delta) == sorted([tea.id, coffee.id])
+    assert {row["id"]: row["category_name"] for row in delta.data["changed"]}[tea.id] == "Hot Drinks"
+    assert delta.data["deleted"] == [cake_id]
+    assert int(delta.data["token"]) > int(unchanged.data["token"])
+
+
+def test_category_delete_reaches_its_items(sync_store):
+    client, _, _, drinks, tea, _ = sync_store
+    token = client.get(ITEMS_URL).data["token"]
+
+    drinks.delete()
+
+    delta = client.get(ITEMS_URL, {"since": token})
+    assert _ids(delta) == [tea.id]
+    assert delta.data["changed"][0]["category"] is None
+
+
+def test_stale_or_invalid_tokens(sync_store, settings):
+    client, _, _, _, _, _ = sync_store
+    settings.DELTA_SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+    stale = client.get(ITEMS_URL, {"since": encode_token(timezone.now() - timedelta(days=31))})
+    invalid = client.get(ITEMS_URL, {"since": "yesterday"})
+
+    assert stale.data["reset"] is True
+    assert len(stale.data["changed"]) == 3
+    assert invalid.status_code == 400
+
+
+def test_overlap_resends_rows_committed_just_before_the_token(sync_store, settings):
+    client, _, _, _, tea, _ = sync_store
+    settings.DELTA_SYNC_OVERLAP_SECONDS = 5
+    token = encode_token(timezone.now())
+    Item.objects.update(updated_at=decode_token(token) - timedelta(hours=1))
+    Item.objects.filter(pk=tea.pk).update(updated_at=decode_token(token) - timedelta(seconds=2))
+
+    delta = client.get(ITEMS_URL, {"since": token})
+
+    assert _ids(delta) == [tea.id]
+
+
+def test_token_does_not_pass_an_open_write(sync_store, monkeypatch):
+    client, _, _, _, tea, _ = sync_store
+    token = client.get(ITEMS_URL).data["token"]
+
+    # transaction طويلة بدأت وكتبت updated_at بتاعها، والعميل سحب قبل الـ commit
+    write_started = timezone.now()
+    monkeypatch.setattr("core.utils.delta_sync.oldest_open_write", lambda now: write_started)
+    during = client.get(ITEMS_URL, {"since": token})
+    assert during.data["changed"] == []
+    assert during.data["token"] == encode_token(write_started)
+
+    Item.objects.filter(pk=tea.pk).update(updated_at=write_started)  # الـ commit
+    monkeypatch.setattr("core.utils.delta_sync.oldest_open_write", lambda now: None)
+    after = client.get(ITEMS_URL, {"since": during.data["token"]})
+
+    assert _ids(after) == [tea.id]
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="pg_stat_activity على PostgreSQL بس")
+@pytest.mark.django_db(transaction=True)
+def test_oldest_open_write_sees_other_connections(sync_store):
+    assert oldest_open_write(timezone.now()) is None
+    opened, release = threading.Event(), threading.Event()
+
+    def writer():
+        with transaction.atomic():
+            Item.objects.filter(name="Tea").update(updated_at=timezone.now())
+            opened.set()
+            release.wait(5)
+        connection.close()
+
+    started = timezone.now()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    opened.wait(5)
+    try:
+        assert started - timedelta(seconds=1) <= oldest_open_write(timezone.now()) <= timezone.now()
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_inventory_feed_follows_bulk_updates_and_item_changes(sync_store):
+    client, store, branch, _, tea, coffee = sync_store
+    tea_row = Inventory.objects.create(item=tea, branch=branch, quantity=10)
+    coffee_row = Inventory.objects.create(item=coffee, branch=branch, quantity=10)
+
+    first = client.get(INVENTORY_URL)
+    assert first.data["reset"] is True
+    assert len(first.data["changed"]) == 3  # الـ reset بينشئ السجل الناقص زي الـ list
+
+    apply_stocktake(store, [{"inventory": tea_row.pk, "counted": 4}])
+    coffee.name = "Espresso"
+    coffee.save()
+
+    delta = client.get(INVENTORY_URL, {"since": first.data["token"]})
+    assert _ids(delta) == sorted([tea_row.pk, coffee_row.pk])
+    rows = {row["id"]: row for row in delta.data["changed"]}
+    assert rows[tea_row.pk]["quantity"] == 4
+    assert rows[coffee_row.pk]["item"]["name"] == "Espresso"
+
+    coffee.delete()
+    after_delete = client.get(INVENTORY_URL, {"since": delta.data["token"]})
+    assert after_delete.data["deleted"] == [coffee_row.pk]
+
+
+def test_table_feed_includes_availability_changes(sync_store):
+    client, store, branch, _, _, _ = sync_store
+    table = Table.objects.create(store=store, branch=branch, number="1")
+    other = Table.objects.create(store=store, branch=branch, number="2")
+    token = client.get(TABLES_URL).data["token"]
+
+    Reservation.objects.create(
+        table=table, customer_name="Sara", customer_phone="0100",
+        reservation_time=timezone.now() + timedelta(days=1), party_size=2, status="CONFIRMED",
+    )
+    other_id = other.id
+    other.delete()
+
+    delta = client.get(TABLES_URL, {"since": token})
+    assert _ids(delta) == [table.id]
+    assert delta.data["changed"][0]["is_available"] is False
+    assert delta.data["deleted"] == [other_id]
+
+
+def test_store_delete_leaves_no_tombstones_and_old_ones_are_pruned(sync_store, settings):
+    _, store, branch, _, tea, _ = sync_store
+    settings.DELTA_SYNC_TOMBSTONE_RETENTION_DAYS = 30
+    Table.objects.create(store=store, branch=branch, number="1")
+    Inventory.objects.create(item=tea, branch=branch, quantity=1)
+    Item.objects.filter(name="Cake").delete()
+    SyncTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=40))
+    Item.objects.filter(name="Coffee").delete()
+
+    assert prune_sync_tombstones() == 1
+    assert SyncTombstone.objects.count() == 1
+
+    store.delete()
+    assert not SyncTombstone.objects.exists()
@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.models import Employee, User
+from core.utils.store_context import _claims_store
+
+LOGIN_URL = "/api/v1/auth/login/"
+REFRESH_URL = "/api/v1/auth/refresh/"
+LOGOUT_URL = "/api/v1/auth/logout/"
+KDS_URL = "/api/v1/orders/kds/"
+
+IDENTITY_TABLES = ('"core_user"', '"core_employee"', '"core_store"')
+
+
+@pytest.fixture
+def staff(owner_store):
+    _, _, store, branch = owner_store
+    user = User.objects.create_user(
+        email="jwt-staff@example.com", password="pass", is_active=True, role="STAFF", is_payment_verified=True
+    )
+    employee = Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100"))
+    return user, employee, store, branch
+
+
+def _login(email="jwt-staff@example.com"):
+    response = APIClient().post(LOGIN_URL, {"email": email, "password": "pass"}, format="json")
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def _client(access):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+    return client
+
+
+@pytest.mark.django_db
+def test_login_embeds_tenant_claims(staff):
+    user, employee, store, branch = staff
+    token = AccessToken(_login()["access"])
+
+    assert token["role"] == "STAFF"
+    assert token["store_id"] == store.id
+    assert token["branch_id"] == branch.id
+    assert token["employee_id"] == employee.id
+    assert token["access_until"] is None
+
+
+@pytest.mark.django_db
+def test_kds_request_skips_identity_queries(staff):
+    client = _client(_login()["access"])
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(KDS_URL)
+
+    assert response.status_code == 200
+    identity = [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in IDENTITY_TABLES)]
+    assert identity == []
+
+
+@pytest.mark.django_db
+def test_logout_denies_access_token(staff):
+    tokens = _login()
+    client = _client(tokens["access"])
+
+    response = client.post(LOGOUT_URL, {"refresh": tokens["refresh"]}, format="json")
+    assert response.status_code == 205
+    assert client.get(KDS_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_role_change_revokes_tokens_and_refresh_reissues_claims(staff):
+    user, *_ = staff
+    tokens = _login()
+
+    user.role = "MANAGER"
+    user.save()
+    assert _client(tokens["access"]).get(KDS_URL).status_code == 401
+
+    response = APIClient().post(REFRESH_URL, {"refresh": tokens["refresh"]}, format="json")
+    assert response.status_code == 200
+    assert AccessToken(response.data["access"])["role"] == "MANAGER"
+
+
+@pytest.mark.django_db
+def test_token_without_claims_uses_database_user(staff):
+    user, *_ = staff
+    access = RefreshToken.for_user(user).access_token
+
+    response = _client(str(access)).get(KDS_URL)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_unreadable_deny_list_falls_back_to_database_user(staff, monkeypatch):
+    user, *_ = staff
+    access = _login()["access"]
+
+    def _down(*args, **kwargs):
+        raise ConnectionError("cache down")
+
+    monkeypatch.setattr(cache, "get_many", _down)
+    client = _client(access)
+    assert client.get(KDS_URL).status_code == 200
+
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    assert client.get(KDS_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_claims_store_loads_remaining_fields_in_one_query(staff):
+    user, employee, store, _ = staff
+    claims_store = _claims_store({"store_id": store.id, "employee_id": employee.id, "role": "STAFF"}, user)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert (claims_store.name, claims_store.address, claims_store.owner_id) == (store.name, None, store.owner_id)
+    assert len(ctx.captured_queries) == 1
@@ -0,0 +1,178 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.models import AttendanceLog
+from branches.models import Branch
+from core.models import Employee, NotificationOutbox, StoreSettings, User
+from core.services import outbox
+from core.services.store_settings import clear_store_settings_cache
+from core.testing import FakeTwilioServer
+from orders.models import Order
+
+NUMBERS = ["+201000000001", "+201000000002"]
+
+
+@pytest.fixture
+def outbox_store(owner_store, settings):
+    settings.NOTIFICATION_DIGEST_WINDOW_SECONDS = 60
+    StoreSettings.objects.filter(store=owner_store.store).update(
+        notification_email="store@example.com", notification_email_password="app-password"
+    )
+    clear_store_settings_cache()
+    return owner_store.store
+
+
+@pytest.fixture
+def twilio(settings, monkeypatch):
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "ACtest")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "secret")
+    settings.TWILIO_MESSAGES_PER_SECOND = 1000
+    server = FakeTwilioServer().start()
+    settings.TWILIO_API_BASE = server.api_base
+    yield server
+    server.stop()
+
+
+def _later(seconds=61):
+    return timezone.now() + timedelta(seconds=seconds)
+
+
+def test_notifications_roll_back_with_the_business_change(outbox_store):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            outbox.enqueue_notification("WHATSAPP", NUMBERS, "طلب جديد", "طلب #1", store=outbox_store)
+            raise RuntimeError("order failed")
+
+    assert not NotificationOutbox.objects.exists()
+
+    assert outbox.enqueue_notification("WHATSAPP", NUMBERS + ["0100", NUMBERS[0]], "t", "b", store=outbox_store) == 2
+
+
+def test_notifications_wait_for_the_digest_window(outbox_store, twilio):
+    outbox.enqueue_notification("WHATSAPP", NUMBERS, "طلب جديد", "طلب #1", store=outbox_store)
+
+    assert outbox.dispatch_outbox_batch() is None
+    assert twilio.messages == []
+
+    metrics = outbox.dispatch_outbox_batch(now=_later())
+    assert metrics["sent"] == 2
+    assert len(twilio.messages) == 2
+
+
+def test_events_for_the_same_recipient_collapse_into_one_digest(outbox_store, twilio):
+    for order_id in range(1, 4):
+        outbox.enqueue_notification("WHATSAPP", NUMBERS, "طلب جديد", f"طلب #{order_id}", store=outbox_store)
+
+    metrics = outbox.dispatch_outbox_batch(now=_later())
+
+    assert metrics["notifications"] == 6
+    assert metrics["messages"] == 2
+    assert len(twilio.messages) == 2
+    body = twilio.messages[0]["Body"]
+    assert "3 إشعارات جديدة" in body
+    assert all(f"طلب #{order_id}" in body for order_id in range(1, 4))
+
+    rows = NotificationOutbox.objects.all()
+    assert {row.status for row in rows} == {"SENT"}
+    assert {row.digest_size for row in rows} == {3}
+    assert outbox.dispatch_outbox_batch(now=_later()) is None
+
+
+def test_emails_share_one_connection_per_store(outbox_store):
+    outbox.enqueue_notification("EMAIL", "a@example.com", "تحديث الطلب #1", "جاهز", store=outbox_store)
+    outbox.enqueue_notification("EMAIL", "a@example.com", "تحديث الطلب #2", "جاهز", store=outbox_store)
+    outbox.enqueue_notification("EMAIL", "b@example.com", "تحديث الطلب #3", "جاهز", store=outbox_store)
+
+    metrics = outbox.dispatch_outbox_batch(now=_later())
+
+    assert metrics["messages"] == 2
+    assert sorted(message.to[0] for message in mail.outbox) == ["a@example.com", "b@example.com"]
+    digest = next(message for message in mail.outbox if message.to == ["a@example.com"])
+    assert digest.subject == "2 إشعارات جديدة"
+    assert digest.from_email == "store@example.com"
+
+
+def test_failed_deliveries_are_retried_then_marked_failed(outbox_store, monkeypatch):
+    monkeypatch.setitem(outbox.SENDERS, "WHATSAPP", lambda groups: [False] * len(groups))
+    outbox.enqueue_notification("WHATSAPP", NUMBERS[0], "t", "b", store=outbox_store)
+
+    step = outbox.RETRY_DELAY_SECONDS + 1
+    for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+        at = 61 + (attempt - 1) * step
+        metrics = outbox.dispatch_outbox_batch(now=_later(at))
+        row = NotificationOutbox.objects.get()
+        assert row.attempts == attempt
+        # الـ retry مابيتاخدش قبل RETRY_DELAY_SECONDS
+        assert outbox.dispatch_outbox_batch(now=_later(at + 1)) is None
+
+    assert metrics["failed"] == 1
+    assert metrics["retried"] == 0
+    assert row.status == "FAILED"
+    assert outbox.dispatch_outbox_batch(now=_later(61 + 10 * step)) is None
+
+
+def test_stale_claims_are_released(outbox_store):
+    outbox.enqueue_notification("EMAIL", "a@example.com", "t", "b", store=outbox_store)
+    NotificationOutbox.objects.update(status="SENDING", claimed_at=timezone.now() - timedelta(minutes=10))
+
+    assert outbox.release_stale_claims() == 1
+    assert NotificationOutbox.objects.get().status == "PENDING"
+
+
+def test_delivery_latency_is_recorded(outbox_store):
+    outbox.enqueue_notification("EMAIL", ["a@example.com", "b@example.com"], "t", "b", store=outbox_store)
+    NotificationOutbox.objects.update(created_at=timezone.now() - timedelta(seconds=90))
+
+    metrics = outbox.dispatch_outbox_batch()
+
+    assert metrics["latency"]["count"] == 2
+    assert 90 <= metrics["latency"]["p50"] < 100
+    stats = outbox.delivery_latency_stats(store=outbox_store, channel="EMAIL")
+    assert stats["count"] == 2
+    assert stats["max"] >= 90
+
+
+def test_order_status_email_goes_through_the_outbox(outbox_store, django_capture_on_commit_callbacks):
+    branch = Branch.objects.create(name="Outbox Branch", store=outbox_store)
+    order = Order.objects.create(store=outbox_store, branch=branch, customer_email="guest@example.com")
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        order.status = "READY"
+        order.save()
+
+    assert mail.outbox == []
+    row = NotificationOutbox.objects.get()
+    assert (row.channel, row.recipient, row.event_type) == ("EMAIL", "guest@example.com", "order_status")
+    assert len(callbacks) == 1
+
+    outbox.dispatch_outbox_batch(now=_later())
+    assert len(mail.outbox) == 1
+    assert f"#{order.id}" in mail.outbox[0].subject
+
+
+def test_new_order_and_late_employee_signals_enqueue_whatsapp(outbox_store, monkeypatch):
+    preferences = {"whatsapp_numbers": NUMBERS[:1]}
+    monkeypatch.setattr("orders.signals.notification_preferences", lambda store_id: preferences)
+    monkeypatch.setattr("attendance.signals.notification_preferences", lambda store_id: preferences)
+    StoreSettings.objects.filter(store=outbox_store).update(attendance_shift_start=time(9, 0), attendance_grace_minutes=0)
+    clear_store_settings_cache()
+    branch = Branch.objects.create(name="Outbox Branch", store=outbox_store)
+    user = User.objects.create_user(email="late@example.com", password="pass", is_active=True, name="Mona")
+    employee = Employee.objects.create(user=user, store=outbox_store, branch=branch)
+
+    order = Order.objects.create(store=outbox_store, branch=branch)
+    AttendanceLog.objects.create(
+        employee=employee,
+        check_in=timezone.make_aware(datetime(2024, 6, 3, 9, 20)),
+        check_out=timezone.make_aware(datetime(2024, 6, 3, 17, 0)),
+    )
+    AttendanceLog.objects.create(employee=employee, check_in=timezone.make_aware(datetime(2024, 6, 4, 8, 50)))
+
+    rows = {row.event_type: row for row in NotificationOutbox.objects.all()}
+    assert set(rows) == {"new_order", "employee_late"}
+    assert f"#{order.id}" in rows["new_order"].body
+    assert rows["employee_late"].body == "Mona تأخر اليوم 20 دقيقة"
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import AttendanceLog
+from branches.models import Branch
+from core.models import Employee, EmployeeLedger, Store, User
+from core.services.payroll_costs import store_payroll_costs, summarize_payroll_costs
+
+_counter = {"n": 0}
+
+
+def _make_tenant(employees=2):
+    _counter["n"] += 1
+    n = _counter["n"]
+    owner = User.objects.create_user(email=f"owner{n}@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name=f"Store {n}", owner=owner)
+    branch = Branch.objects.create(name=f"Branch {n}", store=store)
+
+    for i in range(employees):
+        user = User.objects.create_user(email=f"emp{n}-{i}@example.com", password="pass", is_active=True)
+        employee = Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100"))
+        for day in (3, 4):
+            AttendanceLog.objects.create(
+                employee=employee,
+                work_date=date(2024, 6, day),
+                check_in=timezone.make_aware(datetime(2024, 6, day, 9, 0)),
+                check_out=timezone.make_aware(datetime(2024, 6, day, 17, 0)),
+                penalty_applied=Decimal("5"),
+            )
+        EmployeeLedger.objects.create(
+            employee=employee, entry_type="BONUS", amount=Decimal("20"), payout_date=date(2024, 6, 10)
+        )
+        EmployeeLedger.objects.create(
+            employee=employee, entry_type="ADVANCE", amount=Decimal("30"), payout_date=date(2024, 6, 11)
+        )
+        # خارج الفترة
+        EmployeeLedger.objects.create(
+            employee=employee, entry_type="PENALTY", amount=Decimal("99"), payout_date=date(2024, 7, 1)
+        )
+    return owner, store
+
+
+def _count_queries(func):
+    with CaptureQueriesContext(connection) as ctx:
+        result = func()
+    return result, len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_store_payroll_costs_is_scoped_and_aggregated():
+    _, store = _make_tenant(employees=2)
+    _make_tenant(employees=3)
+
+    rows = store_payroll_costs(store=store, start=date(2024, 6, 1), end_exclusive=date(2024, 7, 1))
+
+    assert len(rows) == 2
+    assert {row["employee_id"] for row in rows} == set(store.employees.values_list("id", flat=True))
+
+    totals = summarize_payroll_costs(rows)
+    assert totals["attendance_days"] == 4
+    assert totals["attendance_value"] == Decimal("400")
+    assert totals["late_penalties"] == Decimal("20")
+    assert totals["bonuses"] == Decimal("40")
+    assert totals["advances"] == Decimal("60")
+    assert totals["penalties"] == Decimal("0")
+
+
+@pytest.mark.django_db
+def test_payroll_cost_queries_stay_constant_as_tenants_grow():
+    owner, store = _make_tenant(employees=2)
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    params = {"period_type": "month", "period_value": "2024-06"}
+
+    def service():
+        return store_payroll_costs(store=store, start=date(2024, 6, 1), end_exclusive=date(2024, 7, 1))
+
+    # warm-up: أول request بيعمل lookup لـ user.employee وبيتكاش على نفس الـ user object
+    client.get("/api/v1/reports/expenses/", params)
+
+    _, service_before = _count_queries(service)
+    expenses_before, expense_queries_before = _count_queries(
+        lambda: client.get("/api/v1/reports/expenses/", params)
+    )
+    accounting_before, accounting_queries_before = _count_queries(
+        lambda: client.get("/api/v1/reports/accounting/", params)
+    )
+
+    for _ in range(5):
+        _make_tenant(employees=4)
+
+    rows, service_after = _count_queries(service)
+    expenses_after, expense_queries_after = _count_queries(
+        lambda: client.get("/api/v1/reports/expenses/", params)
+    )
+    accounting_after, accounting_queries_after = _count_queries(
+        lambda: client.get("/api/v1/reports/accounting/", params)
+    )
+
+    assert service_before == service_after == 3
+    assert expense_queries_before == expense_queries_after
+    assert accounting_queries_before == accounting_queries_after
+
+    # نفس الأرقام بالظبط؛ التينانتس التانية مش بتدخل في الحساب
+    assert len(rows) == 2
+    assert expenses_before.data["payroll_total"] == expenses_after.data["payroll_total"]
+    assert accounting_after.data["payroll"]["payroll_total"] == accounting_before.data["payroll"]["payroll_total"]
+    assert len(accounting_after.data["payroll"]["rows"]) == 2
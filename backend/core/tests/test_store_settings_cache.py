@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, StoreSettings
+from core.services import store_settings as settings_cache
+from core.services.store_settings import get_store_settings
+from inventory.models import Item
+from orders.models import Order, OrderItem
+
+
+def _settings_queries(ctx):
+    return [q["sql"] for q in ctx.captured_queries if '"core_storesettings"' in q["sql"]]
+
+
+@pytest.fixture
+def settings_store(owner_store):
+    return owner_store.owner, owner_store.store
+
+
+@pytest.mark.django_db
+def test_store_settings_are_read_once(settings_store):
+    _, store = settings_store
+
+    with CaptureQueriesContext(connection) as ctx:
+        first = get_store_settings(store)
+        second = get_store_settings(store.id)
+
+    assert first is second
+    assert first.tax_rate == Decimal("14.00")
+    assert len(_settings_queries(ctx)) == 1
+
+
+@pytest.mark.django_db
+def test_settings_update_through_api_invalidates_cache(settings_store):
+    owner, store = settings_store
+    assert get_store_settings(store).tax_rate == Decimal("14.00")
+
+    client = APIClient()
+    client.force_authenticate(owner)
+    response = client.patch("/api/v1/store-settings/current/", {"tax_rate": "5.00"}, format="json")
+
+    assert response.status_code == 200
+    assert get_store_settings(store).tax_rate == Decimal("5.00")
+
+
+@pytest.mark.django_db
+def test_version_change_from_another_worker_reloads(settings_store):
+    _, store = settings_store
+    get_store_settings(store)
+    # worker تاني عمل save: الـ DB اتغيرت والـ version اتغير في الـ cache المشترك
+    StoreSettings.objects.filter(store=store).update(allow_negative_stock=True)
+    settings_cache._bump_version(store.id)
+
+    assert get_store_settings(store).allow_negative_stock is True
+
+
+@pytest.mark.django_db
+def test_cache_evicts_least_recently_used(settings_store, monkeypatch):
+    owner, store = settings_store
+    other = Store.objects.create(name="Other Settings Store", owner=owner)
+    monkeypatch.setattr(settings_cache, "STORE_SETTINGS_CACHE_SIZE", 1)
+
+    get_store_settings(store)
+    get_store_settings(other)
+
+    assert list(settings_cache._local_settings) == [other.id]
+
+
+@pytest.mark.django_db
+def test_order_totals_use_cached_tax_rate(settings_store):
+    _, store = settings_store
+    branch = Branch.objects.create(name="Settings Branch", store=store)
+    item = Item.objects.create(name="Tea", store=store, unit_price=10, cost_price=2)
+    get_store_settings(store)
+
+    with CaptureQueriesContext(connection) as ctx:
+        order = Order.objects.create(store=store, branch=branch)
+        OrderItem.objects.create(order=order, item=item, quantity=2, unit_price=item.unit_price)
+
+    assert _settings_queries(ctx) == []
+    order.refresh_from_db()
+    assert order.tax_amount == Decimal("2.80")
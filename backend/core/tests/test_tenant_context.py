@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Employee, Store, User
+from core.permissions import IsEmployeeOfStore, IsStaff
+from core.utils.store_context import get_branch_from_request, get_store_from_request, get_tenant_context
+
+
+def _request(user, **params):
+    request = Request(APIRequestFactory().get("/api/v1/orders/", params))
+    request.user = user
+    return request
+
+
+@pytest.fixture
+def tenant(owner_store):
+    _, owner, store, branch = owner_store
+    other_store = Store.objects.create(name="Other Store", owner=owner)
+    user = User.objects.create_user(email="tenant-staff@example.com", password="pass", is_active=True, role="STAFF")
+    Employee.objects.create(user=user, store=store, branch=branch, salary=Decimal("100"))
+    return owner, store, branch, other_store
+
+
+@pytest.mark.django_db
+def test_tenant_context_resolves_employee_store_and_branch_once(tenant):
+    _, store, branch, _ = tenant
+    staff = User.objects.get(email="tenant-staff@example.com")
+    request = _request(staff, store_id=store.id)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_store_from_request(request) == store
+        assert get_branch_from_request(request) == branch
+        assert get_branch_from_request(request, store=store, allow_store_default=True) == branch
+        assert get_store_from_request(request) == store
+        assert IsStaff().has_permission(request, None) is True
+        assert IsEmployeeOfStore().has_permission(request, None) is True
+        assert staff.employee.store == store
+
+        context = get_tenant_context(request)
+        assert context.role == "STAFF"
+        assert context.store == store
+        assert context.branch == branch
+
+    # employee + store + branch في query واحدة
+    assert len(ctx.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_tenant_context_memoizes_owner_lookups(tenant):
+    owner, store, branch, other_store = tenant
+    request = _request(owner, store_id=other_store.id, branch=branch.id)
+
+    assert get_store_from_request(request) == other_store
+    with pytest.raises(PermissionDenied):
+        get_branch_from_request(request)
+
+    request = _request(owner)
+    get_store_from_request(request)
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(3):
+            assert get_store_from_request(request) == store
+            assert get_branch_from_request(request, allow_store_default=True) == branch
+    # أول branch default بس (الـ store والـ employee متخزنين)
+    assert len(ctx.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_tenant_context_denies_foreign_store(tenant):
+    _, _, _, other_store = tenant
+    staff = User.objects.get(email="tenant-staff@example.com")
+
+    with pytest.raises(PermissionDenied):
+        get_store_from_request(_request(staff, store_id=other_store.id))
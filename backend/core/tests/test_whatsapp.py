@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from core.services.whatsapp import MAX_RETRIES, TokenBucket, WhatsAppDispatcher
+from core.tasks import send_notification_whatsapp
+from core.testing import FakeTwilioServer
+
+NUMBERS = [f"+2010000000{i:02d}" for i in range(8)]
+
+
+@pytest.fixture
+def twilio(settings, monkeypatch):
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "ACtest")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "secret")
+
+    def start(**kwargs):
+        server = FakeTwilioServer(**kwargs).start()
+        settings.TWILIO_API_BASE = server.api_base
+        servers.append(server)
+        return server
+
+    servers = []
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_send_many_runs_concurrently_on_pooled_connections(twilio):
+    server = twilio(latency=0.1, slow_numbers={NUMBERS[0]: 0.4})
+    dispatcher = WhatsAppDispatcher(concurrency=8, rate=1000)
+
+    started = time.monotonic()
+    summary = dispatcher.send_many(NUMBERS + [NUMBERS[1]], "hello")
+    elapsed = time.monotonic() - started
+
+    assert summary == {"sent": 8, "failed": []}
+    assert len(server.messages) == 8
+    assert server.peak_in_flight > 1
+    # بالتسلسل: 8 × 0.1 + 0.4 = 1.2 ثانية
+    assert elapsed < 0.9
+    assert server.connections <= 8
+
+
+def test_server_errors_are_not_retried(twilio):
+    # الـ POST مش idempotent: 5xx ممكن يكون بعد ما الرسالة اتبعتت → الـ outbox هو اللي يقرر يعيد
+    server = twilio(fail_first={NUMBERS[0]: 1})
+    dispatcher = WhatsAppDispatcher(rate=1000, backoff=0.01)
+
+    assert dispatcher.send(NUMBERS[0], "hi") is False
+    assert server.attempts[NUMBERS[0]] == 1
+    assert dispatcher.send(NUMBERS[0], "hi") is True
+
+
+def test_only_connection_failures_are_retried_by_the_adapter(twilio):
+    twilio()
+    retry = WhatsAppDispatcher(rate=1000).session.get_adapter("https://api.twilio.com").max_retries
+
+    assert (retry.connect, retry.read, retry.status, retry.other) == (MAX_RETRIES, 0, 0, 0)
+
+
+def test_rate_limited_responses_honour_retry_after(twilio):
+    server = twilio(rate_limit=4)
+    dispatcher = WhatsAppDispatcher(concurrency=8, rate=1000, max_retries=30)
+
+    summary = dispatcher.send_many(NUMBERS, "hi")
+
+    assert summary["sent"] == 8
+    assert sum(server.attempts.values()) > 8
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    # 2 burst وبعدين توكن كل نص ثانية
+    assert sleeps == [0.5, 0.5]
+
+
+def test_dispatcher_spreads_messages_at_account_rate(twilio):
+    server = twilio()
+    dispatcher = WhatsAppDispatcher(account_sid="ACrate", auth_token="secret", concurrency=8, rate=20)
+
+    started = time.monotonic()
+    dispatcher.send_many([f"+2011{i:08d}" for i in range(30)], "hi")
+
+    # 20 burst + 10 بمعدل 20/ثانية
+    assert time.monotonic() - started >= 0.45
+    assert len(server.messages) == 30
+
+
+def test_notification_task_filters_numbers(twilio):
+    server = twilio()
+
+    summary = send_notification_whatsapp([NUMBERS[0], "0100", None, NUMBERS[0], NUMBERS[1]], "تنبيه", "رسالة")
+
+    assert summary == {"sent": 2, "failed": []}
+    assert {m["To"] for m in server.messages} == {f"whatsapp:{NUMBERS[0]}", f"whatsapp:{NUMBERS[1]}"}
+    assert server.messages[0]["Body"].startswith("*تنبيه*")
@@ -0,0 +1,146 @@
+# core/utils/delta_sync.py
+"""
+Delta sync لعملاء الـ POS / KDS بدل تحميل القوايم كاملة (أصناف، طاولات، مخزون):
+
+- الـ token هو وقت السيرفر في بداية الـ request (microseconds من epoch). العميل بيرجّعه في ?since=
+  والرد فيه الصفوف اللي updated_at بتاعها بعده + ids الصفوف اللي اتمسحت (SyncTombstone).
+- الـ updated_at بيتكتب وقت الكتابة مش وقت الـ commit، فـ transaction طويلة (مزامنة الـ offline، الجرد)
+  ممكن تعمل commit لصفوف أقدم من token اتسلم في النص. علشان كده الـ token مابيعديش بداية أقدم
+  transaction مفتوحة في الـ DB (oldest_open_write، Postgres بس) لحد DELTA_SYNC_MAX_OPEN_WRITE_SECONDS،
+  واللي بيكتب بياخد الوقت جوه الـ transaction.
+- بنرجع DELTA_SYNC_OVERLAP_SECONDS لورا عن الـ token لفرق الساعة بين السيرفر والـ DB وللـ saves
+  اللي برا atomic. نفس الصف ممكن يوصل مرتين → العميل بيعمل upsert بالـ id.
+- من غير since، أو token أقدم من مدة الاحتفاظ بالـ tombstones → reset: القايمة كاملة والعميل يستبدل اللي عنده.
+- الـ tombstones بتتكتب من post_delete (record_tombstone) وبتتمسح بعد DELTA_SYNC_TOMBSTONE_RETENTION_DAYS
+  (core.tasks.prune_sync_tombstones).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def get_sync_overlap():
+    return timedelta(seconds=int(getattr(settings, "DELTA_SYNC_OVERLAP_SECONDS", 5)))
+
+
+def get_tombstone_retention():
+    return timedelta(days=int(getattr(settings, "DELTA_SYNC_TOMBSTONE_RETENTION_DAYS", 30)))
+
+
+def get_max_open_write():
+    return timedelta(seconds=int(getattr(settings, "DELTA_SYNC_MAX_OPEN_WRITE_SECONDS", 600)))
+
+
+def oldest_open_write(now):
+    """
+    بداية أقدم transaction مفتوحة لـ connection تاني على نفس الـ DB (أي صف بتكتبه لسه ماظهرش).
+    الأقدم من get_max_open_write بنعتبرها عالقة ومانستناهاش. غير Postgres → None.
+    """
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT min(xact_start) FROM pg_stat_activity
+            WHERE datname = current_database()
+              AND pid <> pg_backend_pid()
+              AND backend_type = 'client backend'
+              AND xact_start > %s
+            """,
+            [now - get_max_open_write()],
+        )
+        return cursor.fetchone()[0]
+
+
+def encode_token(moment):
+    delta = moment - _EPOCH
+    return str((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def decode_token(token):
+    try:
+        value = int(token)
+        if value < 0:
+            raise ValueError(token)
+        return _EPOCH + timedelta(microseconds=value)
+    except (TypeError, ValueError, OverflowError):
+        raise InvalidSyncToken(token)
+
+
+def deleted_with_store(origin):
+    """
+    الحذف جاي من حذف المتجر نفسه (cascade) → مفيش عميل هيزامن، ومفيش store نربط بيه الـ tombstone.
+    """
+    from core.models import Store
+
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Store
+
+
+def record_tombstone(store_id, instance):
+    from core.models import SyncTombstone
+
+    if not store_id:
+        return
+    SyncTombstone.objects.create(store_id=store_id, model=instance._meta.label_lower, object_id=instance.pk)
+
+
+def changes_since(queryset, field, store_id, token, now=None):
+    """
+    يرجع {"token", "reset", "changed" (queryset), "deleted" (ids)}. بيرمي InvalidSyncToken لو الـ token بايظ.
+    """
+    from core.models import SyncTombstone
+
+    now = now or timezone.now()
+    since = decode_token(token) if token else None
+    open_write = oldest_open_write(now)
+    next_token = encode_token(min(now, open_write) if open_write else now)
+    if since is None or since < now - get_tombstone_retention():
+        return {"token": next_token, "reset": True, "changed": queryset, "deleted": []}
+
+    # >= مش >: الـ token ممكن يساوي بداية transaction كتبت بنفس اللحظة
+    window_start = since - get_sync_overlap()
+    deleted = (
+        SyncTombstone.objects.filter(
+            store_id=store_id,
+            model=queryset.model._meta.label_lower,
+            deleted_at__gte=window_start,
+        )
+        .values_list("object_id", flat=True)
+        .distinct()
+    )
+    return {
+        "token": next_token,
+        "reset": False,
+        "changed": queryset.filter(**{f"{field}__gte": window_start}),
+        "deleted": list(deleted),
+    }
+
+
+def delta_sync_response(view, queryset, field, store):
+    """
+    رد endpoint الـ changes لأي ViewSet: الصفوف بنفس serializer الـ list.
+    """
+    try:
+        feed = changes_since(queryset, field, store.id, view.request.query_params.get("since"))
+    except InvalidSyncToken:
+        return Response({"detail": "since غير صالح."}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "token": feed["token"],
+        "reset": feed["reset"],
+        "changed": view.get_serializer(feed["changed"], many=True).data,
+        "deleted": feed["deleted"],
+    })
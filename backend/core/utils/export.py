@@ -0,0 +1,109 @@
+# core/utils/export.py
+"""
+تصدير CSV / XLSX بذاكرة ثابتة:
+الـ rows بتيجي كـ iterator (عادةً values_list(...).iterator(chunk_size=...))
+وبتتكتب صف صف في StreamingHttpResponse من غير ما نحمل الداتا كلها في list.
+"""
+import csv
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.response import Response
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX اختياري؛ CSV شغال دايمًا
+    Workbook = None
+
+EXPORT_CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Echo:
+    """pseudo-buffer: csv.writer بيرجع السطر بدل ما يكتبه في ملف."""
+
+    def write(self, value):
+        return value
+
+
+# نص العميل اللي بيبدأ بحرف من دول Excel بيفتحه كـ formula (CSV injection) → نسبقه بـ '
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _escape_formula(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return _escape_formula(value)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        # openpyxl مش بيقبل datetime فيه timezone
+        return timezone.make_naive(value)
+    return _escape_formula(value)
+
+
+def stream_csv(filename, header, rows):
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield "\ufeff"  # BOM علشان Excel يقرا العربي صح
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_csv_cell(value) for value in row])
+
+    response = StreamingHttpResponse(generate(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_xlsx(filename, header, rows):
+    # write-only workbook: الصفوف بتتكتب على الديسك أول بأول مش بتتخزن في الذاكرة
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append([_xlsx_cell(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+def export_response(request, filename, header, rows):
+    """
+    ?file_type=csv (default) | xlsx
+    (مش بنستخدم ?format= لأنه محجوز لـ DRF)
+    """
+    file_type = (request.query_params.get("file_type") or "csv").lower()
+
+    if file_type == "csv":
+        return stream_csv(filename, header, rows)
+
+    if file_type == "xlsx":
+        if Workbook is None:
+            return Response({"detail": "تصدير XLSX غير متاح على السيرفر (openpyxl مش متسطب)."}, status=400)
+        return stream_xlsx(filename, header, rows)
+
+    return Response({"detail": "file_type لازم يكون csv أو xlsx."}, status=400)
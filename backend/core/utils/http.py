@@ -0,0 +1,53 @@
+# core/utils/http.py
+"""
+requests.Session مشتركة لكل خدمة خارجية (PayMob / Twilio) في الـ process:
+
+- keep-alive + connection pool بدل requests.post جديدة (handshake) في كل call.
+- بتتعمل من جديد بعد الـ fork (Celery prefork / gunicorn) علشان الـ sockets ماتتشاركش بين الـ processes.
+- الـ retry اللي على مستوى الـ adapter لفشل الاتصال بس (connect_retries)؛ الطلب ماوصلش للسيرفر
+  فإعادته آمنة حتى لو POST. أي retry تاني (429 مثلًا) مسؤولية الخدمة نفسها.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sessions = {}  # name → (pid, session)
+_sessions_lock = threading.Lock()
+
+
+def _build_session(pool_connections, pool_maxsize, connect_retries, backoff_factor):
+    session = requests.Session()
+    retry = Retry(
+        total=connect_retries,
+        connect=connect_retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=backoff_factor,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_process_session(name, pool_connections=4, pool_maxsize=10, connect_retries=2, backoff_factor=0.2):
+    """
+    Session باسم الخدمة. الإعدادات بتتطبق أول مرة الـ session تتعمل في الـ process.
+    """
+    pid = os.getpid()
+    entry = _sessions.get(name)
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+
+    with _sessions_lock:
+        entry = _sessions.get(name)
+        if entry is None or entry[0] != pid:
+            entry = (pid, _build_session(pool_connections, pool_maxsize, connect_retries, backoff_factor))
+            _sessions[name] = entry
+    return entry[1]
@@ -1,9 +1,117 @@
 # core/utils/store_context.py
 
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework.exceptions import PermissionDenied
-from core.models import Store, Employee
+from core.models import Store, Employee, User
 from branches.models import Branch
 
+_UNSET = object()
+
+
+class TenantContext:
+    """
+    سياق المتجر للـ request الحالي — بيتحسب مرة واحدة ويتخزن على الـ request:
+    - employee: ملف الموظف (محمّل معاه store و branch) أو None
+    - role: دور المستخدم
+    - store / branch: نفس نتيجة get_store_from_request / get_branch_from_request
+
+    كل الـ helpers اللي تحت بتقرا منه، فتكرار النداء في نفس الـ request مابيعملش queries.
+    """
+
+    def __init__(self, request, user):
+        self.request = request
+        self.user = user
+        self._employee = _UNSET
+        self._stores = {}
+        self._branches = {}
+
+    @property
+    def role(self):
+        return getattr(self.user, "role", None)
+
+    @property
+    def employee(self):
+        if self._employee is _UNSET:
+            self._employee = _load_employee(self.user)
+        return self._employee
+
+    @property
+    def store(self):
+        return get_store_from_request(self.request)
+
+    @property
+    def branch(self):
+        return get_branch_from_request(self.request, store=self.store)
+
+
+def _claims_store(claims, user):
+    """Store من claims التوكن (باقي الحقول deferred وبتتحمّل كلها في query واحدة لما حقل منهم يتطلب)."""
+    if not claims.get("store_id"):
+        return None
+    if claims.get("role") == User.RoleChoices.OWNER and not claims.get("employee_id"):
+        return Store.from_db(DEFAULT_DB_ALIAS, ["id", "owner_id"], [claims["store_id"], user.id])
+    return Store.from_db(DEFAULT_DB_ALIAS, ["id"], [claims["store_id"]])
+
+
+def _claims_employee(claims, user):
+    """Employee من claims التوكن من غير DB (store/branch كمان من الـ claims)."""
+    if not claims.get("employee_id"):
+        return None
+
+    employee = Employee.from_db(
+        DEFAULT_DB_ALIAS,
+        ["id", "user_id", "store_id", "branch_id"],
+        [claims["employee_id"], user.id, claims["store_id"], claims.get("branch_id")],
+    )
+    Employee.store.field.set_cached_value(employee, _claims_store(claims, user))
+    if claims.get("branch_id"):
+        branch = Branch.from_db(DEFAULT_DB_ALIAS, ["id", "store_id"], [claims["branch_id"], claims["store_id"]])
+        Employee.branch.field.set_cached_value(employee, branch)
+    return employee
+
+
+def _load_employee(user):
+    """
+    query واحدة للموظف (store + branch) وبنحطه في cache الـ user،
+    علشان user.employee / user.employee.store في الـ permissions مايعملوش queries تاني.
+    لو الـ user جاي من JWT claims (ClaimsUser) بنبنيه من الـ claims من غير queries.
+    """
+    if not user or not getattr(user, "is_authenticated", False):
+        return None
+
+    claims = getattr(user, "tenant_claims", None)
+    if claims is not None:
+        return _claims_employee(claims, user)
+
+    related = User.employee.related
+    if related.is_cached(user):
+        employee = related.get_cached_value(user)
+        if employee is None or (
+            Employee.store.field.is_cached(employee) and Employee.branch.field.is_cached(employee)
+        ):
+            return employee
+
+    employee = Employee.objects.select_related("store", "branch__store").filter(user=user).first()
+    related.set_cached_value(user, employee)
+    if employee is not None:
+        Employee.user.field.set_cached_value(employee, user)
+    return employee
+
+
+def get_tenant_context(request):
+    """
+    يرجع TenantContext للـ request (DRF Request أو HttpRequest) ويخزنه عليه.
+    """
+    http_request = getattr(request, "_request", request)
+    user = getattr(request, "user", None)
+
+    context = getattr(http_request, "_tenant_context", None)
+    if context is None or context.user is not user:
+        context = TenantContext(request, user)
+        http_request._tenant_context = context
+    return context
+
+
 def get_user_default_store(user):
     """
     Default store:
@@ -74,17 +182,32 @@ def get_store_from_request(request):
     """
     - لو store_id موجود في query params -> نتحقق من الصلاحيات ونرجع الـ store
     - لو مش موجود -> نرجع default store للمستخدم
+    (النتيجة بتتخزن في TenantContext للـ request)
     """
-    store_id = request.query_params.get("store_id")
-    if store_id:
-        store = Store.objects.filter(id=store_id).first()
-        if not store:
-            return None
-        if not user_can_access_store(request.user, store):            
+    context = get_tenant_context(request)
+    store_id = request.query_params.get("store_id") or None
+    if store_id in context._stores:
+        return context._stores[store_id]
+
+    employee = context.employee
+    claims = getattr(request.user, "tenant_claims", None)
+    if claims is not None and claims.get("store_id") and (
+        not store_id or str(store_id) == str(claims["store_id"])
+    ):
+        # المتجر الموقّع في التوكن → من غير query ولا تحقق صلاحيات
+        store = employee.store if employee is not None else _claims_store(claims, request.user)
+    elif store_id:
+        if employee is not None and str(employee.store_id) == str(store_id):
+            store = employee.store
+        else:
+            store = Store.objects.filter(id=store_id).first()
+        if store and not user_can_access_store(request.user, store):
             raise PermissionDenied("لا تملك صلاحية الوصول لهذا الفرع.")
-        return store
+    else:
+        store = get_user_default_store(request.user)
 
-    return get_user_default_store(request.user)
+    context._stores[store_id] = store
+    return store
 
 
 def get_branch_from_request(request, store: Store = None, allow_store_default: bool = False):
@@ -92,22 +215,32 @@ def get_branch_from_request(request, store: Store = None, allow_store_default: b
     if not store:
         return None
 
+    context = get_tenant_context(request)
     branch_param = request.query_params.get("branch") or request.query_params.get("branch_id")
-    if branch_param:
-        branch = Branch.objects.filter(id=branch_param, store=store).first()
-        if not branch:
-            raise PermissionDenied("لا تملك صلاحية الوصول لهذا الفرع.")
-
-        if not user_can_access_branch(request.user, branch):
-            raise PermissionDenied("لا تملك صلاحية الوصول لهذا الفرع.")
-
-        return branch
-
-    employee_branch = get_employee_branch(request.user)
-    if employee_branch and employee_branch.store_id == store.id:
-        return employee_branch
+    key = (store.id, branch_param or None, allow_store_default)
+    if key in context._branches:
+        return context._branches[key]
 
-    if allow_store_default:
-        return store.branches.first()
-
-    return None
\ No newline at end of file
+    employee = context.employee
+    employee_branch = employee.branch if employee is not None and employee.branch_id else None
+    if branch_param:
+        if employee_branch and str(employee_branch.id) == str(branch_param) and employee_branch.store_id == store.id:
+            # فرع الموظف نفسه → مسموح دايمًا
+            branch = employee_branch
+        else:
+            branch = Branch.objects.select_related("store").filter(id=branch_param, store=store).first()
+            if not branch:
+                raise PermissionDenied("لا تملك صلاحية الوصول لهذا الفرع.")
+
+            if not user_can_access_branch(request.user, branch):
+                raise PermissionDenied("لا تملك صلاحية الوصول لهذا الفرع.")
+    else:
+        if employee_branch and employee_branch.store_id == store.id:
+            branch = employee_branch
+        elif allow_store_default:
+            branch = store.branches.first()
+        else:
+            branch = None
+
+    context._branches[key] = branch
+    return branch
@@ -9,6 +9,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.shortcuts import redirect
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
 
 from core.models import (
     User,
@@ -141,9 +142,30 @@ from core.serializers.user import UserSerializer
 
 from core.permissions import IsManager, IsOwner
 from core.services.payroll import generate_payroll as generate_payroll_service
+from core.utils.store_context import get_branch_from_request, get_store_from_request
 
 import calendar
 
+# صاحب كل task مرتبات جماعية (task_id → store_id) لحد ما نتيجتها تنتهي من الـ result backend
+PAYROLL_BULK_TASK_TTL_SECONDS = 24 * 60 * 60
+
+
+def _payroll_task_key(task_id):
+    return f"core:payroll-bulk-task:{task_id}"
+
+
+def _parse_payroll_month(month):
+    """YYYY-MM أو YYYY-MM-DD → أول يوم في الشهر (أو None لو التنسيق غلط)."""
+    if not month:
+        return None
+    try:
+        if len(month) == 7:  # YYYY-MM
+            year, month_num = [int(p) for p in month.split("-")]
+            return timezone.datetime(year, month_num, 1).date()
+        return timezone.datetime.fromisoformat(month).date().replace(day=1)
+    except Exception:
+        return None
+
 
 # =========================
 # Auth & User
@@ -413,6 +435,34 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             for log in logs
         ])
         
+    @action(detail=False, methods=['get'], url_path='attendance-matrix')
+    def attendance_matrix(self, request):
+        """
+        مصفوفة حضور الشهر لكل موظفين المتجر (أو فرع) في request واحدة:
+        ?month=YYYY-MM&branch=<id اختياري>
+        arrays لكل موظف (present / late_minutes / penalty / worked_minutes) بطول أيام الشهر.
+        """
+        from attendance.services.matrix import monthly_attendance_matrix
+
+        month = (request.query_params.get('month') or "").strip()
+        month_date = _parse_payroll_month(month) if month else timezone.localdate().replace(day=1)
+        if not month_date:
+            return Response({"detail": "تنسيق الشهر غير صحيح. استخدم YYYY-MM أو YYYY-MM-DD."}, status=400)
+
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=400)
+
+        employees = self.get_queryset().filter(store=store)
+        branch = get_branch_from_request(request, store=store)
+        if branch:
+            employees = employees.filter(branch=branch)
+
+        payload = monthly_attendance_matrix(employees, month_date)
+        payload["store"] = store.id
+        payload["branch"] = branch.id if branch else None
+        return Response(payload)
+
     @action(detail=True, methods=["get"])
     def payrolls(self, request, pk=None):
         employee = self.get_object()
@@ -443,13 +493,8 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         if not month:
             return Response({"detail": "month مطلوب"}, status=400)
 
-        try:
-            if len(month) == 7:  # YYYY-MM
-                year, month_num = [int(p) for p in month.split("-")]
-                month_date = timezone.datetime(year, month_num, 1).date()
-            else:
-                month_date = timezone.datetime.fromisoformat(month).date().replace(day=1)
-        except Exception:
+        month_date = _parse_payroll_month(month)
+        if not month_date:
             return Response({"detail": "تنسيق الشهر غير صحيح. استخدم YYYY-MM أو YYYY-MM-DD."}, status=400)
 
         try:
@@ -474,6 +519,57 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             "paid_by": payroll.paid_by_id,                                   
         })
 
+    @action(detail=False, methods=['post'], url_path='generate-payroll-bulk')
+    def generate_payroll_bulk(self, request):
+        """
+        توليد مرتبات الشهر لكل موظفين المتجر (أو فرع) في Celery task واحدة:
+        body: {"month": "YYYY-MM", "branch": <id اختياري>}
+        بيرجع task_id ونتابع التقدم من generate-payroll-bulk/<task_id>/
+        """
+        from core.tasks import generate_store_payroll_task
+
+        month_date = _parse_payroll_month((request.data.get('month') or "").strip())
+        if not month_date:
+            return Response({"detail": "تنسيق الشهر غير صحيح. استخدم YYYY-MM أو YYYY-MM-DD."}, status=400)
+
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=400)
+
+        branch_id = request.data.get('branch') or None
+        if branch_id and not store.branches.filter(id=branch_id).exists():
+            return Response({"detail": "الفرع غير تابع لهذا المتجر."}, status=400)
+
+        result = generate_store_payroll_task.delay(store.id, month_date.isoformat(), branch_id)
+        # الـ task_id لوحده مش كفاية للمتابعة: بنسجل صاحبه عشان متجر تاني مايشوفش نتيجته
+        cache.set(_payroll_task_key(result.id), store.id, PAYROLL_BULK_TASK_TTL_SECONDS)
+        return Response(
+            {"task_id": result.id, "store": store.id, "month": month_date.isoformat()},
+            status=202,
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'generate-payroll-bulk/(?P<task_id>[0-9a-f-]+)',
+    )
+    def generate_payroll_bulk_status(self, request, task_id=None):
+        from celery.result import AsyncResult
+
+        store = get_store_from_request(request)
+        if not store or cache.get(_payroll_task_key(task_id)) != store.id:
+            return Response({"detail": "المهمة غير موجودة."}, status=404)
+
+        result = AsyncResult(task_id)
+        payload = {"task_id": task_id, "state": result.state}
+        if result.state == "PROGRESS":
+            payload["progress"] = result.info
+        elif result.successful():
+            payload["summary"] = result.result
+        elif result.failed():
+            payload["detail"] = str(result.result)
+        return Response(payload)
+
     @action(detail=True, methods=['post'])
     def mark_paid(self, request, pk=None):
         payroll_id = request.data.get("payroll_id")
@@ -779,8 +875,15 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             from rest_framework_simplejwt.tokens import RefreshToken
+
+            from core.authentication import deny_token
+
             token = RefreshToken(request.data.get("refresh"))
             token.blacklist()
+            deny_token(token)
+            # الـ access الحالي كمان (مش هيستنى لحد ما يخلص عمره)
+            if request.auth is not None:
+                deny_token(request.auth)
             return Response({"detail": "تم تسجيل الخروج"}, status=205)
         except Exception:
             return Response({"detail": "توكن غير صالح"}, status=400)
@@ -0,0 +1,86 @@
+# inventory/management/commands/benchmark_item_lookup.py
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.models import Store
+from inventory.models import Item
+from inventory.services.item_lookup import DEFAULT_LIMIT, build_item_index
+
+WORDS = ["chicken", "beef", "shawarma", "pepsi", "fries", "large", "spicy", "فراخ", "شاورما", "كبير"]
+QUERIES = ["c", "ch", "chi", "chicken", "chicken s", "chicken sp", "ش", "شا", "شاورما ك", "9999"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_lookup(store, query):
+    """
+    زي SearchFilter القديم (icontains على الاسم والباركود) للمقارنة بس.
+    """
+    return list(
+        Item.objects.filter(Q(name__icontains=query) | Q(barcode__icontains=query), store=store, is_active=True)
+        .order_by("name")
+        .values("id", "name", "unit_price", "category_id")[:DEFAULT_LIMIT]
+    )
+
+
+def _timings(func, repeat):
+    timings = []
+    for query in QUERIES:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(query)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark لبحث أصناف الـ POS (كل حرف بيتكتب) على كتالوج صناعي كبير. "
+        "الداتا بتتعمل جوه transaction وبتترجع (rollback) في الآخر."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=20, help="عدد مرات تكرار كل query")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        store = Store.objects.create(name="Benchmark Store", qr_menu="bench.png", qr_attendance="bench.png")
+        Item.objects.bulk_create(
+            [
+                Item(name=f"{WORDS[i % 10]} {WORDS[(i // 10) % 10]} {WORDS[(i // 100) % 10]} {i}", store=store, unit_price=10)
+                for i in range(options["items"])
+            ],
+            batch_size=5000,
+        )
+
+        started = time.perf_counter()
+        index = build_item_index(store.id)
+        build = time.perf_counter() - started
+        self.stdout.write(f"catalog: {len(index)} items, index build {build:.3f}s, {len(QUERIES)} queries x {options['repeat']}")
+
+        for query in QUERIES:
+            assert index.lookup(query), query
+
+        legacy = _timings(lambda query: _legacy_lookup(store, query), options["repeat"])
+        current = _timings(index.lookup, options["repeat"])
+
+        self.stdout.write(f"{'':10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}")
+        for label, timings in (("legacy", legacy), ("current", current)):
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(
+                f"{label:10}{statistics.median(timings) * 1000:>10.3f}{p95 * 1000:>10.3f}{max(timings) * 1000:>10.3f}"
+            )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_inventorymovement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('is_low', True)), fields=['branch'], name='inventory_low_stock_idx'),
+        ),
+    ]
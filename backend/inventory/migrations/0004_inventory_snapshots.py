@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0004_branch_working_hours'),
+        ('inventory', '0003_inventory_low_stock_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('taken_at', models.DateTimeField()),
+                ('items_count', models.PositiveIntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('total_cost_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_sale_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventorySnapshotLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('cost_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sale_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['branch', 'created_at'], name='inv_movement_branch_created'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshotline',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.item'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshotline',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.inventorysnapshot'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='branches.branch'),
+        ),
+        migrations.AddConstraint(
+            model_name='inventorysnapshotline',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'item'), name='inventory_snapshot_line_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorysnapshot',
+            index=models.Index(fields=['branch', 'taken_at'], name='inventory_snapshot_branch_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='inventorysnapshot',
+            constraint=models.UniqueConstraint(fields=('branch', 'snapshot_date'), name='inventory_snapshot_branch_date_uniq'),
+        ),
+    ]
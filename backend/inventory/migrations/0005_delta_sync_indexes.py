@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_inventory_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['branch', 'last_updated'], name='inventory_branch_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['store', 'updated_at'], name='inventory_item_store_updated'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:23
+
+from django.db import migrations, models
+
+
+def classify_existing_movements(apps, schema_editor):
+    """
+    الحركات القديمة اتسجلت بـ reason ثابت من الكود (بيع/إرجاع طلب، تعديل يدوي، جرد) → نحدد مصدرها منه.
+    الباقي يفضل ADJUSTMENT زي adjust-stock.
+    """
+    InventoryMovement = apps.get_model("inventory", "InventoryMovement")
+
+    InventoryMovement.objects.filter(reason__startswith="بيع طلب #").update(source="SALE")
+    InventoryMovement.objects.filter(reason__startswith="إرجاع طلب #").update(source="RETURN")
+    InventoryMovement.objects.filter(reason="تعديل يدوي").update(source="EDIT")
+    InventoryMovement.objects.filter(reason="جرد").update(source="STOCKTAKE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_delta_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='source',
+            field=models.CharField(choices=[('ADJUSTMENT', 'توريد / صرف'), ('STOCKTAKE', 'جرد'), ('EDIT', 'تعديل يدوي'), ('SALE', 'بيع'), ('RETURN', 'إرجاع طلب')], default='ADJUSTMENT', max_length=10),
+        ),
+        migrations.RunPython(classify_existing_movements, migrations.RunPython.noop),
+    ]
@@ -22,12 +22,17 @@ class Item(models.Model):
     barcode = models.CharField(max_length=50, blank=True, null=True, unique=True)
     store = models.ForeignKey('core.Store', on_delete=models.CASCADE, related_name='items')
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
     class Meta:
         unique_together = ('store', 'name')
+        indexes = [
+            # delta sync: الأصناف اللي اتغيرت من آخر token
+            models.Index(fields=['store', 'updated_at'], name='inventory_item_store_updated'),
+        ]
 
 class InventoryQuerySet(models.QuerySet):
     def low_stock(self):
@@ -111,12 +116,21 @@ class Inventory(models.Model):
 
         # نجيب القيمة الحقيقية من الداتابيز
         self.refresh_from_db(fields=['quantity', 'min_stock'])
+        self.refresh_low_state()
 
-        # نحدّث is_low بناءً على القيم الحقيقية
+    def refresh_low_state(self):
+        """
+        يحدّث is_low من quantity/min_stock الحالية (بعد save أو update بـ F).
+        الـ UPDATE مشروط بالحالة القديمة، فاللي غيّرها فعلًا بس هو اللي بيسجل تنبيه النزول تحت الحد.
+        """
         new_is_low = self.quantity <= self.min_stock
-        if self.is_low != new_is_low:
-            self.is_low = new_is_low
-            super().save(update_fields=['is_low'])
+        changed = Inventory.objects.filter(pk=self.pk, is_low=not new_is_low).update(is_low=new_is_low)
+        self.is_low = new_is_low
+        if changed and new_is_low:
+            from .services.stock_alerts import record_low_stock_transition
+
+            record_low_stock_transition(self)
+        return bool(changed)
 
     def __str__(self):
         return f"{self.item.name} @ {self.branch.name}: {self.quantity}"
@@ -124,11 +138,26 @@ class Inventory(models.Model):
     class Meta:
         unique_together = ('item', 'branch')
         verbose_name_plural = "Inventory"
+        indexes = [
+            # الملخص الليلي بيقرا الصفوف المنخفضة بس
+            models.Index(fields=['branch'], condition=models.Q(is_low=True), name='inventory_low_stock_idx'),
+            models.Index(fields=['branch', 'last_updated'], name='inventory_branch_updated'),
+        ]
 class InventoryMovement(models.Model):
     class MovementType(models.TextChoices):
         IN = 'IN', 'إضافة'
         OUT = 'OUT', 'خصم'
 
+    class Source(models.TextChoices):
+        ADJUSTMENT = 'ADJUSTMENT', 'توريد / صرف'  # adjust-stock
+        STOCKTAKE = 'STOCKTAKE', 'جرد'
+        EDIT = 'EDIT', 'تعديل يدوي'  # create/update العادي للمخزون
+        SALE = 'SALE', 'بيع'
+        RETURN = 'RETURN', 'إرجاع طلب'
+
+    # التقارير بتحسب البيع من OrderItem، فحركات الطلبات ماتتحسبش تاني في الوارد/المنصرف
+    ORDER_SOURCES = (Source.SALE, Source.RETURN)
+
     inventory = models.ForeignKey(
         Inventory,
         on_delete=models.CASCADE,
@@ -146,6 +175,8 @@ class InventoryMovement(models.Model):
     )
     change = models.IntegerField(help_text="الكمية المضافة (+) أو المخصومة (-)")
     movement_type = models.CharField(max_length=3, choices=MovementType.choices)
+    # مصدر الحركة: المشتريات في التقارير = ADJUSTMENT الداخل بس
+    source = models.CharField(max_length=10, choices=Source.choices, default=Source.ADJUSTMENT)
     reason = models.CharField(max_length=255, blank=True, null=True)
     created_by = models.ForeignKey(
         'core.Employee',
@@ -164,3 +195,46 @@ class InventoryMovement(models.Model):
         ordering = ['-created_at']
         verbose_name = "حركة مخزون"
         verbose_name_plural = "حركات المخزون"
+        indexes = [
+            # فرق الحركات من آخر snapshot (تقييم المخزون في تاريخ معين)
+            models.Index(fields=['branch', 'created_at'], name='inv_movement_branch_created'),
+        ]
+
+
+class InventorySnapshot(models.Model):
+    """
+    صورة يومية لمخزون فرع (header). السطور في InventorySnapshotLine للأصناف اللي كميتها غير صفر بس.
+    taken_at هو اللحظة الفعلية: التقييم في أي وقت = أقرب snapshot + الحركات بعد taken_at.
+    """
+    branch = models.ForeignKey('branches.Branch', on_delete=models.CASCADE, related_name='inventory_snapshots')
+    snapshot_date = models.DateField()
+    taken_at = models.DateTimeField()
+    items_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    total_cost_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_sale_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.branch} @ {self.snapshot_date}"
+
+    class Meta:
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'snapshot_date'], name='inventory_snapshot_branch_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['branch', 'taken_at'], name='inventory_snapshot_branch_at'),
+        ]
+
+
+class InventorySnapshotLine(models.Model):
+    snapshot = models.ForeignKey(InventorySnapshot, on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField()
+    cost_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sale_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'item'], name='inventory_snapshot_line_uniq'),
+        ]
@@ -1,5 +1,6 @@
 from .category import CategorySerializer
 from .item import ItemSerializer
 from .inventory import InventorySerializer
+from .stocktake import StocktakeLineSerializer, StocktakeSerializer
 
-__all__ = ['CategorySerializer', 'ItemSerializer', 'InventorySerializer']
\ No newline at end of file
+__all__ = ['CategorySerializer', 'ItemSerializer', 'InventorySerializer', 'StocktakeLineSerializer', 'StocktakeSerializer']
\ No newline at end of file
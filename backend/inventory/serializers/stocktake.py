@@ -0,0 +1,30 @@
+# backend/serializers/stocktake.py
+from rest_framework import serializers
+
+MAX_STOCKTAKE_LINES = 5000
+
+
+class StocktakeLineSerializer(serializers.Serializer):
+    """
+    سطر جرد/تعديل: inventory أو (item + branch)، ومعاه change (+/-) أو counted (الكمية المعدودة).
+    """
+    inventory = serializers.IntegerField(required=False, min_value=1)
+    item = serializers.IntegerField(required=False, min_value=1)
+    branch = serializers.IntegerField(required=False, min_value=1)
+    change = serializers.IntegerField(required=False)
+    counted = serializers.IntegerField(required=False, min_value=0)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+    def validate(self, attrs):
+        if not attrs.get('inventory') and not attrs.get('item'):
+            raise serializers.ValidationError("لازم inventory أو item.")
+        if ('change' in attrs) == ('counted' in attrs):
+            raise serializers.ValidationError("لازم change أو counted (واحد بس).")
+        if 'change' in attrs and attrs['change'] == 0:
+            raise serializers.ValidationError("change لازم يكون غير صفر.")
+        return attrs
+
+
+class StocktakeSerializer(serializers.Serializer):
+    lines = StocktakeLineSerializer(many=True, allow_empty=False, max_length=MAX_STOCKTAKE_LINES)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=255)
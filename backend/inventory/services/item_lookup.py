@@ -0,0 +1,187 @@
+# inventory/services/item_lookup.py
+"""
+بحث أصناف الـ POS من index في ذاكرة الـ process بدل SearchFilter (icontains على كل الأصناف):
+
+- لكل متجر: dict للباركود (مطابقة تامة) + قائمة كلمات مرتبة (كلمة → صنف) للبحث بأول الحروف بـ bisect.
+  الاستعلام "لبن كا" بيلاقي "لبن كامل الدسم": كل كلمة في البحث لازم تكون بداية كلمة من كلمات الاسم.
+- الأسماء بتتوحد قبل المقارنة (حروف صغيرة، من غير تشكيل، أ/إ/آ → ا، ى → ي، ة → ه).
+- الـ index بيتبني بـ query واحدة للأصناف النشطة ويتكاش زي إعدادات المتجر: LRU محلي + version في
+  الـ Django cache بيتغير مع أي save/delete لصنف أو حذف تصنيف (inventory.signals)، و TTL كحد أقصى.
+- النتيجة مختصرة: id, name, price, category (id التصنيف).
+"""
+import bisect
+import heapq
+import re
+import time as _time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+
+ITEM_INDEX_CACHE_TTL_SECONDS = 300
+ITEM_INDEX_CACHE_SIZE = 64
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+_DIACRITICS = re.compile("[\u064B-\u0652\u0640]")  # التشكيل + التطويل
+_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_SPLIT = re.compile(r"[\s\-_/\\.,()+&]+")
+
+
+def normalize(text):
+    return _DIACRITICS.sub("", (text or "").casefold()).translate(_LETTERS).strip()
+
+
+def tokenize(text):
+    return [token for token in _SPLIT.split(normalize(text)) if token]
+
+
+class ItemIndex:
+    def __init__(self, rows):
+        """
+        rows: (id, name, unit_price, category_id, barcode)
+        """
+        self.items = []
+        self.names = []
+        self.tokens = []
+        self.by_barcode = {}
+        entries = []
+
+        for position, (item_id, name, unit_price, category_id, barcode) in enumerate(rows):
+            self.items.append({
+                "id": item_id,
+                "name": name,
+                "price": str(unit_price),
+                "category": category_id,
+            })
+            self.names.append(normalize(name))
+            tokens = tuple(tokenize(name))
+            self.tokens.append(tokens)
+            entries.extend((token, position) for token in set(tokens))
+            if barcode:
+                self.by_barcode[barcode.strip()] = position
+
+        entries.sort()
+        self._keys = [token for token, _ in entries]
+        self._positions = [position for _, position in entries]
+
+    def __len__(self):
+        return len(self.items)
+
+    def barcode(self, code):
+        position = self.by_barcode.get((code or "").strip())
+        return self.items[position] if position is not None else None
+
+    def _prefix_matches(self, word):
+        start = bisect.bisect_left(self._keys, word)
+        end = bisect.bisect_left(self._keys, word + "\uffff", lo=start)
+        return set(self._positions[start:end])
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # أطول كلمة غالبًا أقل نتايج → نبدأ بيها ونفلتر بالباقي
+        words.sort(key=len, reverse=True)
+        candidates = self._prefix_matches(words[0])
+        rest = words[1:]
+        if rest:
+            candidates = [
+                position for position in candidates
+                if all(any(token.startswith(word) for token in self.tokens[position]) for word in rest)
+            ]
+
+        full = normalize(query)
+        ranked = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda position: (not self.names[position].startswith(full), self.names[position], position),
+        )
+        return [self.items[position] for position in ranked]
+
+    def lookup(self, query, limit=DEFAULT_LIMIT):
+        """
+        باركود مطابق (ماسح الباركود بيكتب في نفس الخانة) وإلا بحث بأول الحروف.
+        """
+        hit = self.barcode(query)
+        if hit is not None:
+            return [hit]
+        return self.search(query, limit)
+
+
+# store_id -> (version, expires_at, ItemIndex)
+_local_indexes = OrderedDict()
+_lock = Lock()
+
+
+def _version_key(store_id):
+    return f"inventory:item-index-version:{store_id}"
+
+
+def _store_version(store_id):
+    try:
+        return cache.get(_version_key(store_id))
+    except Exception:
+        return None
+
+
+def _bump_version(store_id):
+    try:
+        cache.set(_version_key(store_id), uuid.uuid4().hex, None)
+    except Exception:
+        pass
+
+
+def invalidate_item_index(store_id):
+    """
+    زي invalidate_store_settings: نشيل المحلي ونغيّر الـ version دلوقتي وبعد الـ commit.
+    """
+    if not store_id:
+        return
+
+    with _lock:
+        _local_indexes.pop(store_id, None)
+
+    _bump_version(store_id)
+    transaction.on_commit(lambda: _bump_version(store_id))
+
+
+def clear_item_index_cache():
+    with _lock:
+        _local_indexes.clear()
+
+
+def build_item_index(store_id):
+    from inventory.models import Item
+
+    rows = (
+        Item.objects.filter(store_id=store_id, is_active=True)
+        .order_by('id')
+        .values_list('id', 'name', 'unit_price', 'category_id', 'barcode')
+    )
+    return ItemIndex(rows.iterator(chunk_size=2000))
+
+
+def get_item_index(store):
+    store_id = getattr(store, "pk", store)
+    version = _store_version(store_id)
+    now = _time.monotonic()
+
+    with _lock:
+        entry = _local_indexes.get(store_id)
+        if entry and entry[0] == version and entry[1] > now:
+            _local_indexes.move_to_end(store_id)
+            return entry[2]
+
+    index = build_item_index(store_id)
+
+    with _lock:
+        _local_indexes[store_id] = (version, now + ITEM_INDEX_CACHE_TTL_SECONDS, index)
+        _local_indexes.move_to_end(store_id)
+        while len(_local_indexes) > ITEM_INDEX_CACHE_SIZE:
+            _local_indexes.popitem(last=False)
+
+    return index
@@ -0,0 +1,213 @@
+# inventory/services/snapshots.py
+"""
+Snapshots يومية للمخزون + تقييم المخزون في أي لحظة سابقة:
+
+- take_inventory_snapshots (ليلي): لكل فرع header (InventorySnapshot) + سطر لكل صنف كميته غير صفر
+  (الكمية + قيمة التكلفة + قيمة البيع بأسعار وقتها). اتنين bulk_create ومفيش query لكل صنف.
+- value_inventory_at: لكل فرع أقرب snapshot قبل اللحظة المطلوبة + الحركات بين taken_at واللحظة دي بس.
+  الفروع اللي مالهاش snapshot قبلها بتبدأ من المخزون الحالي وتطرح الحركات بعد اللحظة المطلوبة.
+  عدد الـ queries ثابت، وحجم الحركات المقروءة محدود بالفترة من آخر snapshot (يوم لو الـ job شغال يوميًا)
+  مهما كان تاريخ المخزون طويل.
+- فرق الحركات بيتقيّم بأسعار الصنف الحالية (الـ snapshot نفسه بأسعار يومه).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from branches.models import Branch
+from inventory.models import Inventory, InventoryMovement, InventorySnapshot, InventorySnapshotLine
+
+logger = logging.getLogger(__name__)
+
+LINE_BATCH_SIZE = 1000
+ZERO = Decimal("0")
+
+
+def take_inventory_snapshots(snapshot_date=None, branches=None, now=None):
+    """
+    يصوّر مخزون كل الفروع (أو branches) مرة واحدة في اليوم. الفروع اللي اتصورت في نفس اليوم بتتخطى.
+    يرجع {"branches": n, "lines": n, "skipped": n}.
+    """
+    now = now or timezone.now()
+    snapshot_date = snapshot_date or timezone.localdate(now)
+    branch_qs = Branch.objects.all() if branches is None else branches
+
+    branch_ids = set(branch_qs.values_list('id', flat=True))
+    done = set(
+        InventorySnapshot.objects.filter(snapshot_date=snapshot_date, branch_id__in=branch_ids)
+        .values_list('branch_id', flat=True)
+    )
+    branch_ids -= done
+    summary = {"branches": 0, "lines": 0, "skipped": len(done)}
+    if not branch_ids:
+        return summary
+
+    per_branch = defaultdict(list)
+    rows = (
+        Inventory.objects.filter(branch_id__in=branch_ids)
+        .exclude(quantity=0)
+        .values_list('branch_id', 'item_id', 'quantity', 'item__cost_price', 'item__unit_price')
+        .order_by('branch_id', 'item_id')
+    )
+    for branch_id, item_id, quantity, cost_price, unit_price in rows.iterator(chunk_size=LINE_BATCH_SIZE):
+        per_branch[branch_id].append((
+            item_id,
+            quantity,
+            quantity * (cost_price or ZERO),
+            quantity * (unit_price or ZERO),
+        ))
+
+    with transaction.atomic():
+        InventorySnapshot.objects.bulk_create(
+            [
+                InventorySnapshot(
+                    branch_id=branch_id,
+                    snapshot_date=snapshot_date,
+                    taken_at=now,
+                    items_count=len(per_branch[branch_id]),
+                    total_quantity=sum(line[1] for line in per_branch[branch_id]),
+                    total_cost_value=sum((line[2] for line in per_branch[branch_id]), ZERO),
+                    total_sale_value=sum((line[3] for line in per_branch[branch_id]), ZERO),
+                )
+                for branch_id in branch_ids
+            ],
+            ignore_conflicts=True,
+        )
+        snapshot_ids = dict(
+            InventorySnapshot.objects.filter(snapshot_date=snapshot_date, branch_id__in=branch_ids, taken_at=now)
+            .values_list('branch_id', 'id')
+        )
+        InventorySnapshotLine.objects.bulk_create(
+            (
+                InventorySnapshotLine(
+                    snapshot_id=snapshot_ids[branch_id],
+                    item_id=item_id,
+                    quantity=quantity,
+                    cost_value=cost_value,
+                    sale_value=sale_value,
+                )
+                for branch_id, lines in per_branch.items() if branch_id in snapshot_ids
+                for item_id, quantity, cost_value, sale_value in lines
+            ),
+            batch_size=LINE_BATCH_SIZE,
+        )
+
+    summary["branches"] = len(snapshot_ids)
+    summary["lines"] = sum(len(per_branch[branch_id]) for branch_id in snapshot_ids)
+    logger.info("Inventory snapshots for %s: %s", snapshot_date, summary)
+    return summary
+
+
+def _item_entry(items, row):
+    return items.setdefault(row['item_id'], {
+        "item_id": row['item_id'],
+        "name": row['item__name'],
+        "category_id": row['item__category_id'],
+        "category_name": row['item__category__name'],
+        "quantity": 0,
+        "cost_value": ZERO,
+        "sale_value": ZERO,
+    })
+
+
+ITEM_FIELDS = ('item_id', 'item__name', 'item__category_id', 'item__category__name')
+
+
+def _apply_movements(items, movements, sign):
+    rows = movements.values(*ITEM_FIELDS, 'item__cost_price', 'item__unit_price').annotate(delta=Sum('change'))
+    for row in rows:
+        delta = sign * (row['delta'] or 0)
+        if not delta:
+            continue
+        entry = _item_entry(items, row)
+        entry["quantity"] += delta
+        entry["cost_value"] += delta * (row['item__cost_price'] or ZERO)
+        entry["sale_value"] += delta * (row['item__unit_price'] or ZERO)
+
+
+def value_inventory_at(store, as_of, branch=None, category_id=None):
+    """
+    قيمة المخزون في لحظة as_of (datetime) بنفس شكل inventory_value_report + مصدر كل فرع.
+    """
+    branches = Branch.objects.filter(store=store)
+    if branch is not None:
+        branches = branches.filter(pk=getattr(branch, 'pk', branch))
+
+    nearest = InventorySnapshot.objects.filter(branch=OuterRef('pk'), taken_at__lte=as_of).order_by('-taken_at')
+    branch_rows = list(
+        branches.annotate(
+            snapshot_id=Subquery(nearest.values('id')[:1]),
+            snapshot_at=Subquery(nearest.values('taken_at')[:1]),
+            snapshot_date=Subquery(nearest.values('snapshot_date')[:1]),
+        ).values_list('id', 'snapshot_id', 'snapshot_at', 'snapshot_date')
+    )
+
+    item_filter = Q(item__category_id=category_id) if category_id else Q()
+    items = {}
+
+    snapshot_ids = [snapshot_id for _, snapshot_id, _, _ in branch_rows if snapshot_id]
+    if snapshot_ids:
+        lines = (
+            InventorySnapshotLine.objects.filter(item_filter, snapshot_id__in=snapshot_ids)
+            .values(*ITEM_FIELDS)
+            .annotate(qty=Sum('quantity'), cost=Sum('cost_value'), sale=Sum('sale_value'))
+        )
+        for row in lines:
+            entry = _item_entry(items, row)
+            entry["quantity"] += row['qty'] or 0
+            entry["cost_value"] += row['cost'] or ZERO
+            entry["sale_value"] += row['sale'] or ZERO
+
+        # الحركات من taken_at لحد as_of بس (الفروع اللي اتصورت مع بعض ليها نفس الـ taken_at)
+        windows = defaultdict(list)
+        for branch_id, snapshot_id, snapshot_at, _ in branch_rows:
+            if snapshot_id:
+                windows[snapshot_at].append(branch_id)
+        forward = Q()
+        for snapshot_at, ids in windows.items():
+            forward |= Q(branch_id__in=ids, created_at__gt=snapshot_at)
+        _apply_movements(items, InventoryMovement.objects.filter(forward, item_filter, created_at__lte=as_of), 1)
+
+    live_branches = [branch_id for branch_id, snapshot_id, _, _ in branch_rows if not snapshot_id]
+    if live_branches:
+        # مفيش snapshot قبل as_of → من المخزون الحالي ونرجع بالحركات اللي بعد as_of
+        live = Inventory.objects.filter(item_filter, branch_id__in=live_branches).with_value_totals()
+        for row in live:
+            entry = _item_entry(items, row)
+            entry["quantity"] += row['total_quantity'] or 0
+            entry["cost_value"] += row['total_cost_value'] or ZERO
+            entry["sale_value"] += row['total_sale_value'] or ZERO
+        _apply_movements(
+            items,
+            InventoryMovement.objects.filter(item_filter, branch_id__in=live_branches, created_at__gt=as_of),
+            -1,
+        )
+
+    payload = [
+        {
+            **entry,
+            "cost_value": float(entry["cost_value"]),
+            "sale_value": float(entry["sale_value"]),
+            "margin": float(entry["sale_value"] - entry["cost_value"]),
+        }
+        for entry in sorted(items.values(), key=lambda entry: entry["name"] or "")
+        if entry["quantity"] or entry["cost_value"] or entry["sale_value"]
+    ]
+    total_cost = sum((entry["cost_value"] for entry in items.values()), ZERO)
+    total_sale = sum((entry["sale_value"] for entry in items.values()), ZERO)
+
+    return {
+        "as_of": as_of.isoformat(),
+        "total_cost_value": float(total_cost),
+        "total_sale_value": float(total_sale),
+        "total_margin": float(total_sale - total_cost),
+        "snapshots": {
+            str(branch_id): snapshot_date.isoformat() if snapshot_date else None
+            for branch_id, _, _, snapshot_date in branch_rows
+        },
+        "items": payload,
+    }
@@ -0,0 +1,195 @@
+# inventory/services/stock_alerts.py
+"""
+تنبيهات المخزون المنخفض من انتقالات is_low بدل مسح كل المخزون:
+
+- Inventory.refresh_low_state بيعمل UPDATE مشروط (is_low القديم) → الـ process اللي غيّر الحالة فعلًا
+  بس هو اللي بيسجل الانتقال، فمفيش تنبيه مكرر من حفظين متوازيين.
+- الانتقالات جوه batch_low_stock_alerts (زي خصم مخزون طلب كامل) بتتجمع في تنبيه واحد لكل فرع.
+- تنبيه نفس الصنف/الفرع مابيتكررش قبل LOW_STOCK_ALERT_COOLDOWN_SECONDS (صنف بيتذبذب حوالين الحد الأدنى).
+- التنبيهات بتتكتب في الـ outbox في نفس الـ transaction (واتساب + بريد الإشعارات بتاع المتجر)،
+  والـ outbox بيجمع تنبيهات نفس المستلم في digest.
+- reconcile_low_stock (ليلي): بيصلّح is_low لو اتغير بـ bulk update، ويبعت ملخص لكل فرع من query واحدة
+  على is_low=True (partial index).
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_ITEMS_PER_ALERT = 30
+
+_state = threading.local()
+
+
+def get_alert_cooldown():
+    return int(getattr(settings, "LOW_STOCK_ALERT_COOLDOWN_SECONDS", 6 * 60 * 60))
+
+
+def _cooldown_key(inventory_id):
+    return f"inventory:low-stock-alerted:{inventory_id}"
+
+
+@contextmanager
+def batch_low_stock_alerts():
+    """
+    يجمع انتقالات is_low لحد آخر الـ block ويبعتها تنبيه واحد لكل فرع.
+    لو الـ block رمى exception مفيش تنبيه (التغيير نفسه هيتعمله rollback).
+    """
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+
+    _state.pending = []
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    enqueue_low_stock_alerts(pending)
+
+
+def record_low_stock_transition(inventory):
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending.append(inventory)
+    else:
+        enqueue_low_stock_alerts([inventory])
+
+
+def _recipients(store_id):
+    from core.services.outbox import notification_preferences
+    from core.services.store_settings import get_store_settings
+
+    notifications = notification_preferences(store_id)
+    if not notifications.get("low_stock_enabled", True):
+        return [], []
+
+    store_settings = get_store_settings(store_id)
+    email = getattr(store_settings, "notification_email", None) if store_settings else None
+    return notifications.get("whatsapp_numbers", []) or [], [email] if email else []
+
+
+def _format_lines(rows):
+    lines = [
+        f"• {row.item.name}: {row.quantity} (الحد الأدنى: {row.min_stock})"
+        for row in rows[:MAX_ITEMS_PER_ALERT]
+    ]
+    if len(rows) > MAX_ITEMS_PER_ALERT:
+        lines.append(f"… و {len(rows) - MAX_ITEMS_PER_ALERT} أصناف تانية")
+    return "\n".join(lines)
+
+
+def _enqueue_branch_alert(branch, rows, title, event_type):
+    from core.services.outbox import enqueue_notification
+
+    store_id = branch.store_id
+    numbers, emails = _recipients(store_id)
+    if not numbers and not emails:
+        return 0
+
+    body = f"فرع {branch.name}\n\n{_format_lines(rows)}"
+    sent = 0
+    for channel, recipients in (("WHATSAPP", numbers), ("EMAIL", emails)):
+        if recipients:
+            sent += enqueue_notification(channel, recipients, title, body, store=store_id, event_type=event_type)
+    return sent
+
+
+def enqueue_low_stock_alerts(inventories):
+    """
+    تنبيه واحد لكل فرع للأصناف اللي لسه نزلت تحت الحد الأدنى (بعد استبعاد اللي في الـ cooldown).
+    """
+    from inventory.models import Inventory
+
+    ids = {inv.pk for inv in inventories if inv.is_low}
+    if not ids:
+        return 0
+
+    cooldown = get_alert_cooldown()
+    keys = {pk: _cooldown_key(pk) for pk in ids}
+    try:
+        recent = cache.get_many(list(keys.values())) if cooldown else {}
+    except Exception:
+        recent = {}
+    ids = [pk for pk in ids if keys[pk] not in recent]
+    if not ids:
+        return 0
+
+    rows = (
+        Inventory.objects.filter(pk__in=ids, item__is_active=True)
+        .select_related("item", "branch")
+        .order_by("branch_id", "item__name")
+    )
+    by_branch = {}
+    for row in rows:
+        by_branch.setdefault(row.branch_id, (row.branch, []))[1].append(row)
+
+    alerts = 0
+    for branch, branch_rows in by_branch.values():
+        alerts += _enqueue_branch_alert(branch, branch_rows, "تنبيه: مخزون منخفض!", "low_stock")
+
+    if cooldown:
+        marks = {keys[pk]: 1 for pk in ids}
+
+        def _mark():
+            try:
+                cache.set_many(marks, cooldown)
+            except Exception:
+                pass
+
+        transaction.on_commit(_mark)
+    return alerts
+
+
+def sync_low_flags():
+    """
+    يصلّح is_low للصفوف اللي الكمية اتغيرت فيها من غير save (bulk update / admin actions).
+    """
+    from inventory.models import Inventory
+
+    # last_updated مع is_low عشان التصليح يوصل لعملاء الـ delta sync
+    now = timezone.now()
+    became_low = Inventory.objects.filter(is_low=False, quantity__lte=F("min_stock")).update(is_low=True, last_updated=now)
+    recovered = Inventory.objects.filter(is_low=True, quantity__gt=F("min_stock")).update(is_low=False, last_updated=now)
+    return became_low, recovered
+
+
+def reconcile_low_stock():
+    """
+    الملخص الليلي: query واحدة على is_low=True مرتبة بالفرع → تنبيه واحد لكل فرع.
+    """
+    from inventory.models import Inventory
+
+    became_low, recovered = sync_low_flags()
+
+    rows = (
+        Inventory.objects.low_stock()
+        .filter(item__is_active=True, branch__is_active=True)
+        .select_related("item", "branch")
+        .order_by("branch_id", "item__name")
+    )
+
+    branches = {}
+    for row in rows.iterator():
+        branches.setdefault(row.branch_id, (row.branch, []))[1].append(row)
+
+    alerts = 0
+    with transaction.atomic():
+        for branch, branch_rows in branches.values():
+            alerts += _enqueue_branch_alert(branch, branch_rows, "ملخص المخزون المنخفض", "low_stock_daily")
+
+    summary = {
+        "branches": len(branches),
+        "low_items": sum(len(branch_rows) for _, branch_rows in branches.values()),
+        "alerts": alerts,
+        "flags_fixed": became_low + recovered,
+    }
+    logger.info("Low stock reconciliation: %s", summary)
+    return summary
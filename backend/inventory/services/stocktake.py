@@ -0,0 +1,180 @@
+# inventory/services/stocktake.py
+"""
+جرد / تعديل مخزون بالجملة بدل adjust-stock لكل صنف:
+
+- الأصناف والفروع بتتأكد إنها تبع المتجر في query لكل نوع، وصفوف Inventory الناقصة
+  (item + branch) بتتعمل bulk للأزواج المطلوبة بس (مش الـ cross product كله).
+- الصفوف بتتقفل (select_for_update) وبيتحسب الفرق لكل سطر: change أو counted - الكمية الحالية.
+  أي سطر يخلي الكمية بالسالب → مفيش حاجة بتتطبق خالص. ده حتى لو المتجر مفعّل allow_negative_stock:
+  عمود quantity موجب بس (PositiveIntegerField) فالجرد مايقدرش يكتب رقم سالب.
+- التحديث UPDATE واحد بـ CASE لكل chunk (quantity + is_low + last_updated)، والحركات bulk_create.
+- الأصناف اللي نزلت تحت الحد الأدنى → تنبيه واحد لكل فرع (batch_low_stock_alerts).
+"""
+from django.db import transaction
+from django.db.models import BooleanField, Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from inventory.models import Inventory, InventoryMovement, Item
+from inventory.services.stock_alerts import batch_low_stock_alerts, record_low_stock_transition
+
+UPDATE_CHUNK_SIZE = 500
+DEFAULT_REASON = "جرد"
+
+
+class StocktakeError(Exception):
+    def __init__(self, errors):
+        super().__init__("stocktake validation failed")
+        self.errors = errors  # [{"line": index, "detail": "..."}]
+
+
+def _resolve_lines(store, lines, default_branch):
+    """
+    يرجع [(line_index, inventory_id أو None, (item_id, branch_id) أو None)] + أخطاء.
+    """
+    branch_ids = set(store.branches.values_list('id', flat=True))
+    requested_items = {line['item'] for line in lines if not line.get('inventory') and line.get('item')}
+    item_ids = set(
+        Item.objects.filter(store=store, id__in=requested_items).values_list('id', flat=True)
+    ) if requested_items else set()
+
+    resolved, errors = [], []
+    for index, line in enumerate(lines):
+        if line.get('inventory'):
+            resolved.append((index, line['inventory'], None))
+            continue
+
+        branch_id = line.get('branch') or getattr(default_branch, 'id', None)
+        if not branch_id:
+            errors.append({"line": index, "detail": "لازم تحدد branch."})
+        elif branch_id not in branch_ids:
+            errors.append({"line": index, "detail": "الفرع غير موجود."})
+        elif line['item'] not in item_ids:
+            errors.append({"line": index, "detail": "الصنف غير موجود."})
+        else:
+            resolved.append((index, None, (line['item'], branch_id)))
+    return resolved, errors
+
+
+def _lock_rows(store, resolved):
+    inventory_ids = {inventory_id for _, inventory_id, _ in resolved if inventory_id}
+    pairs = {pair for _, _, pair in resolved if pair}
+
+    if pairs:
+        # صفوف ناقصة للأزواج المطلوبة بس
+        Inventory.objects.bulk_create(
+            [Inventory(item_id=item_id, branch_id=branch_id) for item_id, branch_id in pairs],
+            ignore_conflicts=True,
+        )
+
+    match = Q(pk__in=inventory_ids)
+    if pairs:
+        match |= Q(item_id__in={item_id for item_id, _ in pairs}, branch_id__in={branch_id for _, branch_id in pairs})
+
+    rows = (
+        Inventory.objects.select_for_update()
+        .filter(match, branch__store=store)
+        .order_by('pk')
+    )
+    by_id, by_pair = {}, {}
+    for row in rows:
+        by_id[row.pk] = row
+        by_pair[(row.item_id, row.branch_id)] = row
+    return by_id, by_pair
+
+
+def apply_stocktake(store, lines, employee=None, default_branch=None, reason=None):
+    """
+    lines: من StocktakeSerializer. يرجع dict بالملخص + نتيجة كل صف اتغير.
+    بيرمي StocktakeError (من غير أي تعديل) لو فيه سطر غلط.
+    """
+    resolved, errors = _resolve_lines(store, lines, default_branch)
+    if errors:
+        raise StocktakeError(errors)
+
+    with transaction.atomic(), batch_low_stock_alerts():
+        by_id, by_pair = _lock_rows(store, resolved)
+        now = timezone.now()  # بعد القفل جوه الـ transaction (core.utils.delta_sync)
+
+        before = {}
+        quantities = {}
+        deltas = []  # (line_index, row, delta)
+        for index, inventory_id, pair in resolved:
+            row = by_id.get(inventory_id) if inventory_id else by_pair.get(pair)
+            if row is None:
+                errors.append({"line": index, "detail": "سجل المخزون غير موجود."})
+                continue
+
+            line = lines[index]
+            current = quantities.get(row.pk, row.quantity)
+            before.setdefault(row.pk, row.quantity)
+            delta = line['counted'] - current if 'counted' in line else line['change']
+            new_quantity = current + delta
+            if new_quantity < 0:
+                errors.append({
+                    "line": index,
+                    "detail": f"الكمية هتبقى {new_quantity} ({row.item_id}) — المخزون مايقدرش يقل عن صفر.",
+                })
+                continue
+
+            quantities[row.pk] = new_quantity
+            if delta:
+                deltas.append((index, row, delta))
+
+        if errors:
+            raise StocktakeError(errors)
+
+        changed = [pk for pk, quantity in quantities.items() if quantity != before[pk]]
+        for start in range(0, len(changed), UPDATE_CHUNK_SIZE):
+            chunk = changed[start:start + UPDATE_CHUNK_SIZE]
+            Inventory.objects.filter(pk__in=chunk).update(
+                quantity=Case(
+                    *[When(pk=pk, then=Value(quantities[pk])) for pk in chunk],
+                    output_field=IntegerField(),
+                ),
+                is_low=Case(
+                    *[When(pk=pk, then=Value(quantities[pk] <= by_id[pk].min_stock)) for pk in chunk],
+                    output_field=BooleanField(),
+                ),
+                last_updated=now,
+            )
+
+        for pk in changed:
+            row = by_id[pk]
+            was_low = row.is_low
+            row.quantity = quantities[pk]
+            row.is_low = row.quantity <= row.min_stock
+            if row.is_low and not was_low:
+                record_low_stock_transition(row)
+
+        default_reason = (reason or "").strip() or DEFAULT_REASON
+        InventoryMovement.objects.bulk_create([
+            InventoryMovement(
+                inventory=row,
+                item_id=row.item_id,
+                branch_id=row.branch_id,
+                change=delta,
+                movement_type=InventoryMovement.MovementType.IN if delta > 0 else InventoryMovement.MovementType.OUT,
+                source=InventoryMovement.Source.STOCKTAKE,
+                reason=(lines[index].get('reason') or "").strip() or default_reason,
+                created_by=employee,
+            )
+            for index, row, delta in deltas
+        ])
+
+    return {
+        "lines": len(lines),
+        "adjusted": len(changed),
+        "unchanged": len(quantities) - len(changed),
+        "movements": len(deltas),
+        "results": [
+            {
+                "inventory": pk,
+                "item": by_id[pk].item_id,
+                "branch": by_id[pk].branch_id,
+                "before": before[pk],
+                "after": quantities[pk],
+                "is_low": by_id[pk].is_low,
+            }
+            for pk in changed
+        ],
+    }
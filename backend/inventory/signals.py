@@ -1,11 +1,62 @@
-# inventory/signals.py
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Inventory
-from core.tasks import check_low_stock
-
-@receiver(post_save, sender=Inventory)
-def inventory_updated(sender, instance, **kwargs):
-    # كل ما يتعدل المخزون، نشيك لو وصل للحد الأدنى
-    if instance.qty_on_hand <= instance.reorder_level and instance.item.track_inventory:
-        check_low_stock.delay(instance.store.id)
\ No newline at end of file
+# inventory/signals.py
+"""
+- invalidation لـ index بحث الأصناف (inventory.services.item_lookup) مع أي تغيير في الأصناف.
+- delta sync (core.utils.delta_sync): tombstone لكل صنف/سجل مخزون بيتمسح، وتحديث updated_at / last_updated
+  للصفوف اللي بتعرض بيانات اتغيرت في جدول تاني (اسم التصنيف جوه الصنف، الصنف جوه سجل المخزون).
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.utils.delta_sync import deleted_with_store, record_tombstone
+from inventory.models import Category, Inventory, Item
+from inventory.services.item_lookup import invalidate_item_index
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def _invalidate_item_index(sender, instance, **kwargs):
+    invalidate_item_index(instance.store_id)
+
+
+@receiver(post_delete, sender=Category)
+def _invalidate_item_index_on_category_delete(sender, instance, **kwargs):
+    # حذف التصنيف بيعمل SET_NULL للأصناف بـ update (من غير signals للأصناف)
+    invalidate_item_index(instance.store_id)
+
+
+@receiver(post_save, sender=Item)
+def _touch_item_inventory(sender, instance, created, **kwargs):
+    # InventorySerializer بيعرض الصنف كامل
+    if not created:
+        Inventory.objects.filter(item=instance).update(last_updated=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def _touch_category_items(sender, instance, created=False, **kwargs):
+    # category_name في الأصناف (والحذف بيعمل SET_NULL بـ update من غير auto_now)
+    if created:
+        return
+    now = timezone.now()
+    Item.objects.filter(category=instance).update(updated_at=now)
+    Inventory.objects.filter(item__category=instance).update(last_updated=now)
+
+
+@receiver(post_delete, sender=Item)
+def _item_tombstone(sender, instance, origin=None, **kwargs):
+    if not deleted_with_store(origin):
+        record_tombstone(instance.store_id, instance)
+
+
+@receiver(post_delete, sender=Inventory)
+def _inventory_tombstone(sender, instance, origin=None, **kwargs):
+    if deleted_with_store(origin):
+        return
+    # غالبًا cascade من حذف صنف أو فرع → المتجر معروف من غير query
+    store_id = getattr(origin, 'store_id', None)
+    if store_id is None:
+        from branches.models import Branch
+
+        store_id = Branch.objects.filter(pk=instance.branch_id).values_list('store_id', flat=True).first()
+    record_tombstone(store_id, instance)
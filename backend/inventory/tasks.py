@@ -0,0 +1,16 @@
+# inventory/tasks.py
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def take_daily_inventory_snapshots():
+    """
+    مهمة يومية (beat): snapshot لمخزون كل الفروع (أساس تقييم المخزون في تاريخ سابق).
+    """
+    from inventory.services.snapshots import take_inventory_snapshots
+
+    return take_inventory_snapshots()
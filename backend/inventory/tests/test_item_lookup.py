@@ -0,0 +1,103 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Category, Item
+from inventory.services.item_lookup import clear_item_index_cache, get_item_index
+
+URL = "/api/v1/inventory/items/lookup/"
+
+
+@pytest.fixture
+def lookup_store(owner_store):
+    client, _, store, _ = owner_store
+    drinks = Category.objects.create(name="Drinks", store=store)
+    Item.objects.create(name="لبن كامل الدسم", store=store, unit_price="25.00", barcode="6221000000011")
+    Item.objects.create(name="Pepsi Can", store=store, unit_price="12.50", category=drinks, barcode="6221000000028")
+    Item.objects.create(name="Pepsi Diet", store=store, unit_price="13.00", category=drinks)
+    Item.objects.create(name="Apple Pie", store=store, unit_price="40.00")
+    Item.objects.create(name="Old Pepsi", store=store, unit_price="1.00", is_active=False, barcode="6221000000035")
+    return client, store, drinks
+
+
+def _names(response):
+    return [row["name"] for row in response.data["results"]]
+
+
+def test_barcode_hits_are_exact_and_compact(lookup_store):
+    client, _, drinks = lookup_store
+
+    response = client.get(URL, {"barcode": "6221000000028"})
+
+    assert response.status_code == 200
+    assert response.data["results"] == [{"id": response.data["results"][0]["id"], "name": "Pepsi Can", "price": "12.50", "category": drinks.id}]
+    assert client.get(URL, {"barcode": "62210000000"}).data["results"] == []
+    # غير نشط
+    assert client.get(URL, {"barcode": "6221000000035"}).data["results"] == []
+    # الماسح بيكتب في خانة البحث
+    assert _names(client.get(URL, {"q": "6221000000011"})) == ["لبن كامل الدسم"]
+
+
+def test_prefix_search_matches_word_starts(lookup_store):
+    client, _, _ = lookup_store
+
+    assert _names(client.get(URL, {"q": "pep"})) == ["Pepsi Can", "Pepsi Diet"]
+    assert _names(client.get(URL, {"q": "PEPSI d"})) == ["Pepsi Diet"]
+    assert _names(client.get(URL, {"q": "pie"})) == ["Apple Pie"]
+    assert _names(client.get(URL, {"q": "ple"})) == []
+    assert _names(client.get(URL, {"q": "لبن كا"})) == ["لبن كامل الدسم"]
+    assert _names(client.get(URL, {"q": "الدسم"})) == ["لبن كامل الدسم"]
+    assert _names(client.get(URL, {"q": "pep", "limit": 1})) == ["Pepsi Can"]
+
+
+def test_arabic_search_is_normalized(lookup_store):
+    _, store, _ = lookup_store
+    Item.objects.create(name="فراخ مشوية بالأعشاب", store=store, unit_price="90.00")
+    Item.objects.create(name="سَلَطة خضراء", store=store, unit_price="15.00")
+
+    index = get_item_index(store)
+
+    assert [row["name"] for row in index.search("بالاعشاب")] == ["فراخ مشوية بالأعشاب"]
+    assert [row["name"] for row in index.search("سلطه")] == ["سَلَطة خضراء"]
+
+
+def test_index_is_cached_and_invalidated_on_item_change(lookup_store, django_capture_on_commit_callbacks):
+    _, store, _ = lookup_store
+    get_item_index(store)
+
+    with CaptureQueriesContext(connection) as ctx:
+        get_item_index(store).search("pep")
+    assert len(ctx.captured_queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        pie = Item.objects.get(name="Apple Pie")
+        pie.name = "Cherry Pie"
+        pie.save()
+        Item.objects.create(name="Pepsi Max", store=store, unit_price="14.00")
+
+    index = get_item_index(store)
+    assert [row["name"] for row in index.search("pie")] == ["Cherry Pie"]
+    assert [row["name"] for row in index.search("pepsi m")] == ["Pepsi Max"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Item.objects.filter(name="Pepsi Max").delete()
+    assert get_item_index(store).search("pepsi m") == []
+
+
+def test_keystroke_search_finds_items_at_10k_items(lookup_store):
+    _, store, _ = lookup_store
+    words = ["chicken", "beef", "shawarma", "pepsi", "fries", "large", "spicy", "فراخ", "شاورما", "كبير"]
+    Item.objects.bulk_create([
+        Item(name=f"{words[i % 10]} {words[(i // 10) % 10]} {words[(i // 100) % 10]} {i}", store=store, unit_price=10)
+        for i in range(10_000)
+    ])
+    clear_item_index_cache()
+    index = get_item_index(store)
+    assert len(index) > 10_000
+
+    # الزمن بيتقاس في manage.py benchmark_item_lookup، هنا السلوك بس
+    for query in ["c", "ch", "chi", "chicken", "chicken s", "chicken sp", "ش", "شا", "شاورما ك"]:
+        results = index.lookup(query)
+        assert 0 < len(results) <= 20
+        assert all(query.split()[-1] in row["name"] for row in results)
+    assert [row["name"] for row in index.lookup("9999")] == ["كبير كبير كبير 9999"]
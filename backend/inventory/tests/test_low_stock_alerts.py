@@ -0,0 +1,139 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import NotificationOutbox, StoreSettings
+from core.services.store_settings import clear_store_settings_cache
+from core.tasks import check_low_stock_daily
+from inventory.models import Inventory, Item
+from inventory.services.stock_alerts import batch_low_stock_alerts
+from orders.models import Order, OrderItem
+
+
+@pytest.fixture
+def stock_store(owner_store):
+    StoreSettings.objects.filter(store=owner_store.store).update(notification_email="alerts@example.com")
+    clear_store_settings_cache()
+    return owner_store.owner, owner_store.store, owner_store.branch
+
+
+def _inventory(store, branch, name, quantity, min_stock=5):
+    item = Item.objects.create(name=name, store=store, unit_price=10, cost_price=4)
+    return Inventory.objects.create(item=item, branch=branch, quantity=quantity, min_stock=min_stock)
+
+
+def _alerts(event_type="low_stock"):
+    return list(NotificationOutbox.objects.filter(event_type=event_type))
+
+
+def test_only_crossing_the_minimum_raises_an_alert(stock_store):
+    _, store, branch = stock_store
+    inventory = _inventory(store, branch, "Milk", quantity=10)
+    assert _alerts() == []
+
+    inventory.quantity = 8
+    inventory.save()
+    assert _alerts() == []
+
+    inventory.quantity = 4
+    inventory.save()
+    inventory.refresh_from_db()
+    assert inventory.is_low is True
+    [alert] = _alerts()
+    assert alert.channel == "EMAIL" and alert.recipient == "alerts@example.com"
+    assert "Milk: 4" in alert.body and "Main" in alert.body
+
+    # لسه تحت الحد → مفيش انتقال جديد
+    inventory.quantity = 3
+    inventory.save()
+    assert len(_alerts()) == 1
+
+
+def test_alerts_are_debounced_while_stock_flaps(stock_store, django_capture_on_commit_callbacks):
+    _, store, branch = stock_store
+    inventory = _inventory(store, branch, "Sugar", quantity=10)
+
+    for quantity in (4, 9, 3, 8, 2):
+        with django_capture_on_commit_callbacks(execute=True):
+            inventory.quantity = quantity
+            inventory.save()
+
+    assert len(_alerts()) == 1
+    assert Inventory.objects.get(pk=inventory.pk).is_low is True
+
+
+def test_transitions_in_one_batch_are_aggregated_per_branch(stock_store):
+    _, store, branch = stock_store
+    other = Branch.objects.create(name="Airport", store=store)
+    rows = [
+        _inventory(store, branch, "Tea", 10),
+        _inventory(store, branch, "Coffee", 10),
+        _inventory(store, other, "Juice", 10),
+    ]
+
+    with batch_low_stock_alerts():
+        for row in rows:
+            row.quantity = 1
+            row.save()
+
+    alerts = _alerts()
+    assert len(alerts) == 2
+    main = next(alert for alert in alerts if "Main" in alert.body)
+    assert "Coffee: 1" in main.body and "Tea: 1" in main.body
+
+
+def test_order_deduction_alerts_once_for_the_branch(stock_store):
+    _, store, branch = stock_store
+    tea = _inventory(store, branch, "Tea", 6)
+    cake = _inventory(store, branch, "Cake", 6)
+    order = Order.objects.create(store=store, branch=branch)
+    OrderItem.objects.create(order=order, item=tea.item, quantity=3, unit_price=10)
+    OrderItem.objects.create(order=order, item=cake.item, quantity=2, unit_price=10)
+
+    order.status = "READY"
+    order.save()
+
+    [alert] = _alerts()
+    assert "Tea: 3" in alert.body and "Cake: 4" in alert.body
+
+
+def test_adjust_stock_updates_is_low_and_alerts(stock_store):
+    owner, store, branch = stock_store
+    inventory = _inventory(store, branch, "Rice", 10)
+    client = APIClient()
+    client.force_authenticate(user=owner)
+
+    response = client.post(
+        f"/api/v1/inventory/inventory/{inventory.pk}/adjust-stock/",
+        {"movement_type": "OUT", "change": 7},
+        format="json",
+    )
+
+    assert response.status_code == 200, response.data
+    assert response.data["is_low"] is True
+    assert Inventory.objects.get(pk=inventory.pk).is_low is True
+    assert len(_alerts()) == 1
+
+
+def test_nightly_reconciliation_reads_low_rows_in_one_query(stock_store):
+    _, store, branch = stock_store
+    _inventory(store, branch, "Tea", 1)
+    drifted = _inventory(store, branch, "Flour", 10)
+    _inventory(store, branch, "Salt", 50)
+    # تعديل bulk من غير save → is_low مش متحدث
+    Inventory.objects.filter(pk=drifted.pk).update(quantity=2)
+
+    with CaptureQueriesContext(connection) as ctx:
+        summary = check_low_stock_daily()
+
+    inventory_selects = [
+        q["sql"] for q in ctx.captured_queries
+        if q["sql"].startswith("SELECT") and '"inventory_inventory"' in q["sql"]
+    ]
+    assert len(inventory_selects) == 1
+    assert summary["low_items"] == 2
+    assert summary["flags_fixed"] == 1
+    [digest] = _alerts("low_stock_daily")
+    assert "Flour: 2" in digest.body and "Tea: 1" in digest.body and "Salt" not in digest.body
@@ -0,0 +1,55 @@
+# inventory/tests/test_movements_export.py
+import csv
+import io
+
+import pytest
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, User
+from inventory.models import Inventory, InventoryMovement, Item
+
+
+@pytest.mark.django_db
+def test_inventory_movements_export_filters_by_type():
+    owner = User.objects.create_user(email="moves@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name="Moves Store", owner=owner)
+    branch = Branch.objects.create(name="Moves Branch", store=store)
+    item = Item.objects.create(name="Milk", store=store, unit_price=20, cost_price=12, barcode="123")
+    inventory = Inventory.objects.create(item=item, branch=branch, quantity=10)
+
+    InventoryMovement.objects.create(inventory=inventory, item=item, branch=branch, change=5, movement_type="IN")
+    InventoryMovement.objects.create(inventory=inventory, item=item, branch=branch, change=-2, movement_type="OUT")
+
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    response = client.get("/api/v1/inventory/inventory/movements/export/", {"movement_type": "OUT"})
+
+    assert response.status_code == 200
+    content = b"".join(response.streaming_content).decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(content)))
+    assert len(rows) == 2
+    assert rows[1][rows[0].index("change")] == "-2"
+    assert rows[1][rows[0].index("barcode")] == "123"
+
+
+@pytest.mark.django_db
+def test_inventory_movements_export_escapes_formulas():
+    owner = User.objects.create_user(email="formula@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name="Formula Store", owner=owner)
+    branch = Branch.objects.create(name="Formula Branch", store=store)
+    item = Item.objects.create(name='=HYPERLINK("http://evil","x")', store=store, unit_price=20, cost_price=12)
+    inventory = Inventory.objects.create(item=item, branch=branch, quantity=10)
+    InventoryMovement.objects.create(
+        inventory=inventory, item=item, branch=branch, change=-2, movement_type="OUT", reason="@SUM(1+1)"
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    response = client.get("/api/v1/inventory/inventory/movements/export/")
+
+    content = b"".join(response.streaming_content).decode("utf-8-sig")
+    header, row = list(csv.reader(io.StringIO(content)))
+    assert row[header.index("item")] == '\'=HYPERLINK("http://evil","x")'
+    assert row[header.index("reason")] == "'@SUM(1+1)"
+    assert row[header.index("change")] == "-2"  # الأرقام مابتتغيرش
@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, InventoryMovement, InventorySnapshot, InventorySnapshotLine, Item
+from inventory.services.snapshots import take_inventory_snapshots, value_inventory_at
+from orders.models import Order, OrderItem
+
+
+@pytest.fixture
+def snapshot_store(owner_store):
+    _, owner, store, branch = owner_store
+    milk = Item.objects.create(name="Milk", store=store, unit_price=10, cost_price=4)
+    tea = Item.objects.create(name="Tea", store=store, unit_price=5, cost_price=2)
+    Inventory.objects.create(item=milk, branch=branch, quantity=10)
+    Inventory.objects.create(item=tea, branch=branch, quantity=4)
+    return owner, store, branch, milk, tea
+
+
+def _move(branch, item, change, at):
+    inventory = Inventory.objects.get(item=item, branch=branch)
+    Inventory.objects.filter(pk=inventory.pk).update(quantity=inventory.quantity + change)
+    movement = InventoryMovement.objects.create(
+        inventory=inventory, item=item, branch=branch, change=change,
+        movement_type="IN" if change > 0 else "OUT",
+    )
+    InventoryMovement.objects.filter(pk=movement.pk).update(created_at=at)
+
+
+def _quantities(report):
+    return {row["name"]: row["quantity"] for row in report["items"]}
+
+
+def test_snapshot_stores_compact_lines_once_per_day(snapshot_store):
+    _, store, branch, milk, _ = snapshot_store
+    Inventory.objects.create(item=Item.objects.create(name="Empty", store=store, unit_price=1), branch=branch)
+
+    first = take_inventory_snapshots()
+    second = take_inventory_snapshots()
+
+    assert first == {"branches": 1, "lines": 2, "skipped": 0}
+    assert second == {"branches": 0, "lines": 0, "skipped": 1}
+    snapshot = InventorySnapshot.objects.get(branch=branch)
+    assert (snapshot.items_count, snapshot.total_quantity) == (2, 14)
+    assert float(snapshot.total_cost_value) == 10 * 4 + 4 * 2
+    line = InventorySnapshotLine.objects.get(snapshot=snapshot, item=milk)
+    assert (line.quantity, float(line.sale_value)) == (10, 100.0)
+
+
+def test_historical_value_is_snapshot_plus_movements_since(snapshot_store):
+    _, store, branch, milk, tea = snapshot_store
+    t0 = timezone.now() - timedelta(days=5)
+    take_inventory_snapshots(now=t0)
+    _move(branch, milk, -3, t0 + timedelta(days=1))
+    _move(branch, tea, 6, t0 + timedelta(days=2))
+
+    before_snapshot = value_inventory_at(store, t0 - timedelta(days=1))
+    day_one = value_inventory_at(store, t0 + timedelta(days=1, hours=1))
+    day_three = value_inventory_at(store, t0 + timedelta(days=3))
+
+    # مفيش snapshot قبلها → من المخزون الحالي بالرجوع
+    assert before_snapshot["snapshots"] == {str(branch.id): None}
+    assert _quantities(before_snapshot) == {"Milk": 10, "Tea": 4}
+    assert _quantities(day_one) == {"Milk": 7, "Tea": 4}
+    assert day_one["total_cost_value"] == 7 * 4 + 4 * 2
+    assert day_one["snapshots"] == {str(branch.id): timezone.localdate(t0).isoformat()}
+    assert _quantities(day_three) == {"Milk": 7, "Tea": 10}
+    assert day_three["total_sale_value"] == 7 * 10 + 10 * 5
+
+
+def test_valuation_cost_does_not_grow_with_history(snapshot_store):
+    _, store, branch, milk, _ = snapshot_store
+    start = timezone.now() - timedelta(days=40)
+
+    def history(days):
+        for day in range(days):
+            at = start + timedelta(days=day)
+            take_inventory_snapshots(now=at)
+            _move(branch, milk, 1, at + timedelta(hours=1))
+
+    history(2)
+    with CaptureQueriesContext(connection) as short:
+        value_inventory_at(store, start + timedelta(days=1, hours=2))
+
+    history(30)
+    with CaptureQueriesContext(connection) as long:
+        report = value_inventory_at(store, start + timedelta(days=29, hours=2))
+
+    assert len(long.captured_queries) == len(short.captured_queries)
+    assert report["snapshots"][str(branch.id)] == timezone.localdate(start + timedelta(days=29)).isoformat()
+
+
+def test_report_accepts_a_past_date(snapshot_store):
+    owner, _, branch, milk, _ = snapshot_store
+    t0 = timezone.now() - timedelta(days=3)
+    take_inventory_snapshots(now=t0)
+    _move(branch, milk, -4, timezone.now())
+    client = APIClient()
+    client.force_authenticate(user=owner)
+
+    past = client.get("/api/v1/reports/inventory/value/", {"date": timezone.localdate(t0).isoformat()})
+    current = client.get("/api/v1/reports/inventory/value/")
+    invalid = client.get("/api/v1/reports/inventory/value/", {"date": "yesterday"})
+
+    assert past.status_code == 200
+    assert _quantities(past.data)["Milk"] == 10
+    assert {row["name"]: row["quantity"] for row in current.data["items"]}["Milk"] == 6
+    assert invalid.status_code == 400
+
+
+def test_order_stock_deductions_are_recorded_as_movements(snapshot_store):
+    _, store, branch, milk, _ = snapshot_store
+    order = Order.objects.create(store=store, branch=branch)
+    OrderItem.objects.create(order=order, item=milk, quantity=3, unit_price=10)
+
+    order.status = "READY"
+    order.save()
+
+    movement = InventoryMovement.objects.get(item=milk)
+    assert (movement.change, movement.movement_type) == (-3, "OUT")
+    assert f"#{order.id}" in movement.reason
@@ -0,0 +1,130 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from branches.models import Branch
+from core.models import Store, StoreSettings, User
+from core.services.store_settings import clear_store_settings_cache
+from inventory.models import Inventory, InventoryMovement, Item
+
+URL = "/api/v1/inventory/inventory/stocktake/"
+
+
+@pytest.fixture
+def stocktake_store(owner_store):
+    return owner_store.client, owner_store.store, owner_store.branch
+
+
+def _item(store, name):
+    return Item.objects.create(name=name, store=store, unit_price=10, cost_price=4)
+
+
+def test_stocktake_applies_counts_and_changes_in_one_request(stocktake_store):
+    client, store, branch = stocktake_store
+    milk = Inventory.objects.create(item=_item(store, "Milk"), branch=branch, quantity=10, min_stock=3)
+    tea = Inventory.objects.create(item=_item(store, "Tea"), branch=branch, quantity=5, min_stock=3)
+    sugar = _item(store, "Sugar")  # مالوش سجل مخزون لسه
+
+    response = client.post(URL, {
+        "reason": "جرد شهري",
+        "lines": [
+            {"inventory": milk.pk, "counted": 7},
+            {"inventory": tea.pk, "change": -3, "reason": "تالف"},
+            {"item": sugar.pk, "branch": branch.pk, "counted": 12},
+            {"inventory": milk.pk, "change": 1},
+        ],
+    }, format="json")
+
+    assert response.status_code == 200, response.data
+    assert response.data["adjusted"] == 3
+    assert response.data["movements"] == 4
+
+    milk.refresh_from_db()
+    tea.refresh_from_db()
+    assert milk.quantity == 8
+    assert (tea.quantity, tea.is_low) == (2, True)
+    assert Inventory.objects.get(item=sugar, branch=branch).quantity == 12
+
+    movements = InventoryMovement.objects.filter(inventory=milk).order_by("id")
+    assert [(m.change, m.movement_type, m.reason) for m in movements] == [(-3, "OUT", "جرد شهري"), (1, "IN", "جرد شهري")]
+    assert InventoryMovement.objects.get(inventory=tea).reason == "تالف"
+    # مفيش provisioning للأصناف × الفروع كلها
+    assert Inventory.objects.filter(branch__store=store).count() == 3
+
+
+def test_negative_stock_rejects_the_whole_batch(stocktake_store):
+    client, store, branch = stocktake_store
+    milk = Inventory.objects.create(item=_item(store, "Milk"), branch=branch, quantity=10)
+    tea = Inventory.objects.create(item=_item(store, "Tea"), branch=branch, quantity=2)
+
+    response = client.post(URL, {"lines": [
+        {"inventory": milk.pk, "counted": 4},
+        {"inventory": tea.pk, "change": -5},
+    ]}, format="json")
+
+    assert response.status_code == 400
+    assert [error["line"] for error in response.data["errors"]] == [1]
+    milk.refresh_from_db()
+    assert milk.quantity == 10
+    assert not InventoryMovement.objects.exists()
+
+
+def test_negative_result_is_a_line_error_even_when_negative_stock_is_allowed(stocktake_store):
+    client, store, branch = stocktake_store
+    StoreSettings.objects.filter(store=store).update(allow_negative_stock=True)
+    clear_store_settings_cache()
+    tea = Inventory.objects.create(item=_item(store, "Tea"), branch=branch, quantity=2)
+
+    response = client.post(URL, {"lines": [{"inventory": tea.pk, "change": -5}]}, format="json")
+
+    assert response.status_code == 400
+    assert response.data["errors"][0]["line"] == 0
+    tea.refresh_from_db()
+    assert tea.quantity == 2
+
+
+def test_lines_outside_the_store_are_rejected(stocktake_store):
+    client, store, branch = stocktake_store
+    other_owner = User.objects.create_user(email="other-st@example.com", password="pass", is_active=True, role="OWNER")
+    other_store = Store.objects.create(name="Other", owner=other_owner)
+    other_branch = Branch.objects.create(name="Other Main", store=other_store)
+    foreign = Inventory.objects.create(item=_item(other_store, "Foreign"), branch=other_branch, quantity=5)
+
+    response = client.post(URL, {"lines": [
+        {"inventory": foreign.pk, "counted": 0},
+        {"item": foreign.item_id, "branch": branch.pk, "counted": 1},
+        {"item": 999999, "counted": 1},
+    ]}, format="json")
+
+    assert response.status_code == 400
+    assert sorted(error["line"] for error in response.data["errors"]) == [1, 2]
+    foreign.refresh_from_db()
+    assert foreign.quantity == 5
+
+
+def test_invalid_lines_fail_serializer_validation(stocktake_store):
+    client, _, _ = stocktake_store
+
+    response = client.post(URL, {"lines": [{"inventory": 1}, {"change": 2}]}, format="json")
+
+    assert response.status_code == 400
+    assert "lines" in response.data
+
+
+def test_stocktake_query_count_does_not_grow_with_lines(stocktake_store):
+    client, store, branch = stocktake_store
+    rows = [
+        Inventory.objects.create(item=_item(store, f"Item {i}"), branch=branch, quantity=20, min_stock=0)
+        for i in range(40)
+    ]
+
+    def run(count):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(URL, {"lines": [
+                {"inventory": row.pk, "counted": 10 + count} for row in rows[:count]
+            ]}, format="json")
+        assert response.status_code == 200, response.data
+        return len(ctx.captured_queries)
+
+    run(3)  # warm-up (الـ auth / store context / إعدادات المتجر بتتكاش)
+    assert run(40) == run(5)
@@ -7,13 +7,17 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Category, Item, Inventory
-from .serializers import CategorySerializer, ItemSerializer, InventorySerializer
+from .serializers import CategorySerializer, ItemSerializer, InventorySerializer, StocktakeSerializer
 from .filters import CategoryFilter, ItemFilter, InventoryFilter
 from core.permissions import IsManager, IsEmployeeOfStore
 from core.utils.store_context import get_store_from_request, get_branch_from_request
+from core.utils.export import EXPORT_CHUNK_SIZE, export_response
+from core.utils.delta_sync import delta_sync_response
+from core.services.store_settings import get_store_settings
 from django.db import transaction
 from django.db.utils import OperationalError, ProgrammingError
 from django.db.models import F
+from django.utils.dateparse import parse_date
 
 from core.models import Employee
 
@@ -114,6 +118,46 @@ class ItemViewSet(viewsets.ModelViewSet):
             raise ValidationError({"detail": "لا يوجد متجر مرتبط بهذا الحساب لإضافة الأصناف."})
 
         serializer.save(store=store)
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        الأصناف اللي اتغيرت من ?since=<token> + ids المحذوف (أول مرة من غير since → القايمة كاملة).
+        """
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset().select_related('category').order_by('updated_at', 'id')
+        return delta_sync_response(self, queryset, 'updated_at', store)
+
+    @action(detail=False, methods=['get'], url_path='lookup')
+    def lookup(self, request):
+        """
+        بحث الـ POS (كل ضغطة زرار / ماسح باركود):
+        ?barcode=...  مطابقة تامة للباركود
+        ?q=...        باركود مطابق أو بحث بأول حروف كلمات الاسم
+        &limit=20
+        النتيجة: {"results": [{"id", "name", "price", "category"}]} للأصناف النشطة بس.
+        """
+        from .services.item_lookup import DEFAULT_LIMIT, MAX_LIMIT, get_item_index
+
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"results": []})
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except (TypeError, ValueError):
+            limit = DEFAULT_LIMIT
+
+        index = get_item_index(store)
+        barcode = request.query_params.get('barcode')
+        if barcode:
+            hit = index.barcode(barcode)
+            return Response({"results": [hit] if hit else []})
+
+        return Response({"results": index.lookup(request.query_params.get('q', ''), limit)})
         
 
 class InventoryViewSet(viewsets.ModelViewSet):
@@ -129,7 +173,7 @@ class InventoryViewSet(viewsets.ModelViewSet):
         ✅ عرض المخزون GET للموظف
         ✅ أي تعديل للمخزون (adjust-stock) للـ Manager فقط
         """
-        if self.action in ("adjust_stock",):
+        if self.action in ("adjust_stock", "stocktake"):
             return [IsManager()]
 
         if self.request.method in ("GET", "HEAD", "OPTIONS"):
@@ -187,7 +231,60 @@ class InventoryViewSet(viewsets.ModelViewSet):
         except (ProgrammingError, OperationalError) as exc:
             logger.exception("Inventory list DB error: %s", exc)
             return Response([], status=200)
-        
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        سجلات المخزون اللي اتغيرت من ?since=<token> + ids المحذوف.
+        الـ reset (من غير since) بيمر على get_queryset زي الـ list (بما فيه إنشاء السجلات الناقصة)،
+        الـ delta لأ: الصنف اللي مالوش سجل لسه كميته 0.
+        """
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('since'):
+            queryset = Inventory.objects.filter(branch__store=store)
+            branch = get_branch_from_request(request, store=store)
+            if branch:
+                queryset = queryset.filter(branch=branch)
+        else:
+            queryset = self.get_queryset()
+
+        queryset = queryset.select_related('item__category', 'branch').order_by('last_updated', 'id')
+        return delta_sync_response(self, queryset, 'last_updated', store)
+
+    def _log_quantity_change(self, inventory, change):
+        """
+        تعديل الكمية من create/update العادي بيتسجل كحركة زي adjust-stock
+        (تقييم المخزون في تاريخ معين بيعتمد على الحركات).
+        """
+        from .models import InventoryMovement
+
+        if not change:
+            return
+        InventoryMovement.objects.create(
+            inventory=inventory,
+            item=inventory.item,
+            branch=inventory.branch,
+            change=change,
+            movement_type=InventoryMovement.MovementType.IN if change > 0 else InventoryMovement.MovementType.OUT,
+            source=InventoryMovement.Source.EDIT,
+            reason="تعديل يدوي",
+            created_by=getattr(self.request.user, 'employee', None),
+        )
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            inventory = serializer.save()
+            self._log_quantity_change(inventory, inventory.quantity)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            before = serializer.instance.quantity
+            inventory = serializer.save()
+            self._log_quantity_change(inventory, inventory.quantity - before)
+
     @action(detail=True, methods=['post'], url_path='adjust-stock')
     def adjust_stock(self, request, pk=None):
         """
@@ -230,7 +327,7 @@ class InventoryViewSet(viewsets.ModelViewSet):
             )
 
         # التحقق من إعدادات الفرع (السماح بمخزون سالب)
-        store_settings = getattr(inventory.branch.store, 'settings', None)
+        store_settings = get_store_settings(inventory.branch.store_id)
         allow_negative = store_settings.allow_negative_stock if store_settings else False
 
         if not allow_negative and inventory.quantity + change < 0:
@@ -247,8 +344,9 @@ class InventoryViewSet(viewsets.ModelViewSet):
                 quantity=F('quantity') + change
             )
 
-            # نرجّع القيم الحقيقية بعد التحديث (وبعد save() هيحدّث is_low)
+            # نرجّع القيم الحقيقية بعد التحديث ونحدّث is_low (الـ update مابيناديش save)
             inventory.refresh_from_db()
+            inventory.refresh_low_state()
 
             # إنشاء حركة المخزون
             employee = getattr(request.user, 'employee', None)
@@ -266,6 +364,46 @@ class InventoryViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(inventory)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='stocktake')
+    def stocktake(self, request):
+        """
+        جرد / تعديل مخزون بالجملة في transaction واحدة:
+        body:
+        {
+          "reason": "جرد شهري" (اختياري),
+          "lines": [
+            {"inventory": 12, "counted": 40},
+            {"item": 5, "branch": 2, "change": -3, "reason": "تالف"}
+          ]
+        }
+        لو أي سطر غلط مفيش حاجة بتتطبق (400 + errors برقم السطر).
+        """
+        from .services.stocktake import StocktakeError, apply_stocktake
+
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = StocktakeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # مش بنستخدم get_queryset هنا علشان مانعملش provisioning لكل الأصناف × الفروع
+        try:
+            summary = apply_stocktake(
+                store,
+                serializer.validated_data['lines'],
+                employee=getattr(request.user, 'employee', None),
+                default_branch=get_branch_from_request(request, store=store),
+                reason=serializer.validated_data.get('reason'),
+            )
+        except StocktakeError as exc:
+            return Response(
+                {"detail": "لم يتم تطبيق الجرد.", "errors": exc.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(summary, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get'], url_path='movements')
     def movements(self, request, pk=None):
         """
@@ -284,9 +422,54 @@ class InventoryViewSet(viewsets.ModelViewSet):
                 "id": m.id,
                 "change": m.change,
                 "movement_type": m.movement_type,
+                "source": m.source,
                 "reason": m.reason,
                 "created_at": m.created_at,
                 "created_by": created_by_name,
             })
 
         return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='movements/export')
+    def export_movements(self, request):
+        """
+        تصدير حركات المخزون CSV/XLSX:
+        ?branch=&item=&movement_type=IN|OUT&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&file_type=csv|xlsx
+        """
+        from .models import InventoryMovement
+
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # مش بنستخدم get_queryset هنا علشان مانعملش provisioning للـ Inventory في كل export
+        qs = InventoryMovement.objects.filter(branch__store=store)
+
+        branch = get_branch_from_request(request, store=store)
+        if branch:
+            qs = qs.filter(branch=branch)
+
+        item_id = request.query_params.get('item')
+        if item_id:
+            qs = qs.filter(item_id=item_id)
+
+        movement_type = request.query_params.get('movement_type')
+        if movement_type in InventoryMovement.MovementType.values:
+            qs = qs.filter(movement_type=movement_type)
+
+        date_from = parse_date(request.query_params.get('date_from') or '')
+        date_to = parse_date(request.query_params.get('date_to') or '')
+        if date_from:
+            qs = qs.filter(created_at__date__gte=date_from)
+        if date_to:
+            qs = qs.filter(created_at__date__lte=date_to)
+
+        header = [
+            "id", "created_at", "branch", "item", "barcode",
+            "movement_type", "source", "change", "reason", "created_by",
+        ]
+        rows = qs.order_by('created_at', 'id').values_list(
+            "id", "created_at", "branch__name", "item__name", "item__barcode",
+            "movement_type", "source", "change", "reason", "created_by__user__email",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, "inventory-movements", header, rows)
@@ -0,0 +1,23 @@
+# loyalty/management/commands/recompute_loyalty_balances.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Store
+from loyalty.services.accrual import RECOMPUTE_BATCH_SIZE, recompute_balances
+
+
+class Command(BaseCommand):
+    help = "إعادة حساب نقاط وإجمالي صرف عملاء الولاء من سجل الحركات (LoyaltyTransaction)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--store", type=int, default=None, help="store_id (الافتراضي: كل المتاجر)")
+        parser.add_argument("--batch-size", type=int, default=RECOMPUTE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        store = None
+        if options["store"] is not None:
+            store = Store.objects.filter(pk=options["store"]).first()
+            if store is None:
+                raise CommandError(f"المتجر {options['store']} غير موجود.")
+
+        changed = recompute_balances(store=store, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"تم تحديث رصيد {changed} عميل."))
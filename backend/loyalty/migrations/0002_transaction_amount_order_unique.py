@@ -0,0 +1,60 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def prepare_ledger(apps, schema_editor):
+    """
+    قبل الـ unique constraint: لو فيه أكتر من حركة من نفس النوع لنفس الطلب
+    بنسيب أقدم واحدة. وبنملا amount لحركات الإضافة من إجمالي الطلب.
+    """
+    LoyaltyTransaction = apps.get_model("loyalty", "LoyaltyTransaction")
+    Order = apps.get_model("orders", "Order")
+
+    seen = set()
+    duplicates = []
+    rows = (
+        LoyaltyTransaction.objects.filter(order__isnull=False)
+        .order_by("order_id", "type", "id")
+        .values_list("id", "order_id", "type")
+    )
+    for transaction_id, order_id, transaction_type in rows.iterator():
+        if (order_id, transaction_type) in seen:
+            duplicates.append(transaction_id)
+        else:
+            seen.add((order_id, transaction_type))
+
+    LoyaltyTransaction.objects.filter(id__in=duplicates).delete()
+
+    LoyaltyTransaction.objects.filter(type="EARN", order__isnull=False).update(
+        amount=Subquery(Order.objects.filter(pk=OuterRef("order_id")).values("total")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("loyalty", "0001_initial"),
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="loyaltytransaction",
+            name="amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0.0,
+                help_text="قيمة الطلب اللي اتحسبت عليه النقاط (بتدخل في total_spent)",
+                max_digits=12,
+            ),
+        ),
+        migrations.RunPython(prepare_ledger, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="loyaltytransaction",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("order__isnull", False)),
+                fields=("order", "type"),
+                name="loyalty_one_transaction_per_order_type",
+            ),
+        ),
+    ]
@@ -56,11 +56,23 @@ class LoyaltyTransaction(models.Model):
     order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True)
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     points = models.IntegerField(help_text="موجب = إضافة، سالب = خصم")
+    amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0.00,
+        help_text="قيمة الطلب اللي اتحسبت عليه النقاط (بتدخل في total_spent)"
+    )
     note = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # حركة واحدة بس من كل نوع لكل طلب (إضافة النقاط idempotent)
+            models.UniqueConstraint(
+                fields=['order', 'type'],
+                condition=models.Q(order__isnull=False),
+                name='loyalty_one_transaction_per_order_type',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer.phone} | {self.points:+} | {self.get_type_display()}"
\ No newline at end of file
@@ -0,0 +1,115 @@
+# loyalty/services/accrual.py
+"""
+محرك نقاط الولاء.
+
+- النقاط بتتضاف مرة واحدة لما الطلب يتحول لمدفوع (Order._became_paid من الـ pre_save).
+- الـ idempotency من الـ unique constraint (order, type) على الـ ledger:
+  لو الحركة موجودة الـ INSERT بيفشل ومفيش أي تعديل في الرصيد.
+- الرصيد (points / total_spent) بيتحدث بـ F() في UPDATE واحد (من غير read-modify-write).
+- recompute_balances بيعيد بناء الأرصدة من الـ ledger في aggregate واحد (للتصحيح/الترحيل).
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from loyalty.models import CustomerLoyalty, LoyaltyProgram, LoyaltyTransaction
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+
+def calculate_points(amount, points_per_egp):
+    if not points_per_egp or points_per_egp <= 0:
+        return 0
+    return int(Decimal(amount or 0) / Decimal(points_per_egp))
+
+
+def award_order_points(order):
+    """
+    يضيف نقاط الطلب لعميل الولاء (بالموبايل). يرجع LoyaltyTransaction أو None
+    (البرنامج مش مفعل / مفيش موبايل / النقاط صفر / الطلب اتحسب قبل كده).
+    """
+    phone = order.customer_phone
+    if not phone:
+        return None
+
+    points_per_egp = (
+        LoyaltyProgram.objects.filter(store_id=order.store_id, is_active=True)
+        .values_list("points_per_egp", flat=True)
+        .first()
+    )
+    if points_per_egp is None:
+        return None
+
+    amount = Decimal(order.total or 0)
+    points = calculate_points(amount, points_per_egp)
+    if points <= 0:
+        return None
+
+    customer, _ = CustomerLoyalty.objects.get_or_create(
+        store_id=order.store_id,
+        phone=phone,
+        defaults={"name": order.customer_name or phone},
+    )
+
+    try:
+        with transaction.atomic():
+            entry = LoyaltyTransaction.objects.create(
+                customer=customer,
+                order=order,
+                type="EARN",
+                points=points,
+                amount=amount,
+                note=f"طلب رقم {order.id}",
+            )
+            CustomerLoyalty.objects.filter(pk=customer.pk).update(
+                points=F("points") + points,
+                total_spent=F("total_spent") + amount,
+                last_visit=timezone.now(),
+            )
+    except IntegrityError:
+        # الطلب ده اتحسبله نقاط قبل كده
+        return None
+
+    return entry
+
+
+def recompute_balances(store=None, batch_size=RECOMPUTE_BATCH_SIZE):
+    """
+    يعيد حساب points / total_spent لكل العملاء من الـ ledger:
+    aggregate واحد مجمّع بالعميل + bulk_update على batches.
+    العملاء اللي مالهمش حركات بيترجعوا صفر. يرجع عدد العملاء اللي رصيدهم اتغير.
+    """
+    ledger = LoyaltyTransaction.objects.all()
+    customers = CustomerLoyalty.objects.all()
+    if store is not None:
+        ledger = ledger.filter(customer__store=store)
+        customers = customers.filter(store=store)
+
+    totals = {
+        row["customer_id"]: row
+        for row in ledger.order_by().values("customer_id").annotate(
+            points_sum=Sum("points"),
+            # amount بيتسجل لحركات الإضافة بس
+            spent_sum=Sum("amount"),
+        )
+    }
+
+    changed = []
+    for customer in customers.only("id", "points", "total_spent").iterator(chunk_size=batch_size):
+        row = totals.get(customer.id)
+        points = max(int(row["points_sum"] or 0), 0) if row else 0
+        spent = Decimal(row["spent_sum"] or 0) if row else Decimal("0")
+
+        if customer.points == points and customer.total_spent == spent:
+            continue
+
+        customer.points = points
+        customer.total_spent = spent
+        changed.append(customer)
+
+    with transaction.atomic():
+        CustomerLoyalty.objects.bulk_update(changed, ["points", "total_spent"], batch_size=batch_size)
+
+    return len(changed)
@@ -0,0 +1,134 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from inventory.models import Item
+from loyalty.models import CustomerLoyalty, LoyaltyProgram, LoyaltyTransaction
+from loyalty.services.accrual import award_order_points
+from orders.models import Order, OrderItem
+
+PHONE = "01000000000"
+
+
+@pytest.fixture
+def loyalty_store(owner_store):
+    _, _, store, branch = owner_store
+    item = Item.objects.create(name="Cake", store=store, unit_price=50, cost_price=10)
+    LoyaltyProgram.objects.create(store=store, is_active=True, points_per_egp=Decimal("10.00"))
+    return store, branch, item
+
+
+def _order(store, branch, item, quantity=2, phone=PHONE):
+    order = Order.objects.create(store=store, branch=branch, customer_phone=phone, customer_name="Mona")
+    OrderItem.objects.create(order=order, item=item, quantity=quantity, unit_price=item.unit_price)
+    order.refresh_from_db()
+    return order
+
+
+def _ledger_queries(ctx):
+    return [q["sql"] for q in ctx.captured_queries if "loyalty_" in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_points_awarded_once_on_paid_transition(loyalty_store):
+    store, branch, item = loyalty_store
+    order = _order(store, branch, item)  # 100 + 14% = 114
+
+    order.status = "PREPARING"
+    order.save()
+    assert not LoyaltyTransaction.objects.exists()
+
+    order.status = "PAID"
+    order.save()
+    # re-save بعد الدفع (update_total / تعديل حالة) مايضيفش نقاط تاني
+    order.update_total()
+    order.status = "SERVED"
+    order.save()
+
+    customer = CustomerLoyalty.objects.get(store=store, phone=PHONE)
+    assert customer.points == 11
+    assert customer.total_spent == Decimal("114.00")
+    entry = LoyaltyTransaction.objects.get(order=order)
+    assert (entry.type, entry.points, entry.amount) == ("EARN", 11, Decimal("114.00"))
+
+
+@pytest.mark.django_db
+def test_unpaid_saves_skip_loyalty_queries(loyalty_store):
+    store, branch, item = loyalty_store
+    order = _order(store, branch, item)
+
+    with CaptureQueriesContext(connection) as ctx:
+        order.update_total()
+        order.status = "READY"
+        order.save()
+
+    assert _ledger_queries(ctx) == []
+
+
+@pytest.mark.django_db
+def test_award_is_idempotent_per_order(loyalty_store):
+    store, branch, item = loyalty_store
+    order = _order(store, branch, item)
+
+    assert award_order_points(order) is not None
+    assert award_order_points(order) is None
+
+    assert LoyaltyTransaction.objects.filter(order=order).count() == 1
+    assert CustomerLoyalty.objects.get(phone=PHONE).points == 11
+
+
+@pytest.mark.django_db
+def test_inactive_program_awards_nothing(loyalty_store):
+    store, branch, item = loyalty_store
+    LoyaltyProgram.objects.filter(store=store).update(is_active=False)
+    order = _order(store, branch, item)
+
+    order.status = "PAID"
+    order.save()
+
+    assert not CustomerLoyalty.objects.exists()
+
+
+@pytest.mark.django_db
+def test_recompute_command_rebuilds_balances_from_ledger(loyalty_store):
+    store, branch, item = loyalty_store
+    for quantity in (2, 4):
+        award_order_points(_order(store, branch, item, quantity=quantity))
+    customer = CustomerLoyalty.objects.get(phone=PHONE)
+    LoyaltyTransaction.objects.create(customer=customer, type="REDEEM", points=-5)
+    stale = CustomerLoyalty.objects.create(store=store, phone="01111111111", points=40, total_spent=Decimal("9"))
+    CustomerLoyalty.objects.filter(pk=customer.pk).update(points=0, total_spent=0)
+
+    with CaptureQueriesContext(connection) as ctx:
+        call_command("recompute_loyalty_balances", store=store.id)
+
+    customer.refresh_from_db()
+    stale.refresh_from_db()
+    assert customer.points == 11 + 22 - 5
+    assert customer.total_spent == Decimal("114.00") + Decimal("228.00")
+    assert (stale.points, stale.total_spent) == (0, Decimal("0.00"))
+    # store + aggregate + customers + bulk update (مش query لكل عميل)
+    assert len(ctx.captured_queries) <= 6
+
+
+@pytest.mark.django_db
+def test_order_created_as_paid_earns_points_on_final_total(loyalty_store):
+    store, branch, item = loyalty_store
+    client = APIClient()
+    client.force_authenticate(user=store.owner)
+
+    response = client.post("/api/v1/orders/", {
+        "customer_phone": PHONE,
+        "status": "PAID",
+        "items_write": [{"item": item.id, "quantity": 3, "unit_price": "50.00"}],
+    }, format="json")
+
+    assert response.status_code == 201, response.data
+    order = Order.objects.get(pk=response.data["id"])
+    assert (order.is_paid, order.total) == (True, Decimal("171.00"))  # 150 + 14%
+    entry = LoyaltyTransaction.objects.get(order=order)
+    assert (entry.points, entry.amount) == (17, Decimal("171.00"))
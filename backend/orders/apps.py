@@ -5,4 +5,5 @@ class OrdersConfig(AppConfig):
     name = 'orders'
 
     def ready(self):
-        import orders.models 
\ No newline at end of file
+        import orders.models
+        import orders.signals
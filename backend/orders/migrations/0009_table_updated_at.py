@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='table',
+            index=models.Index(fields=['store', 'updated_at'], name='orders_table_store_updated'),
+        ),
+    ]
@@ -6,13 +6,12 @@ from io import BytesIO
 from django.core.files import File
 from django.conf import settings
 
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .utils import update_inventory_for_order
+from core.utils.delta_sync import deleted_with_store, record_tombstone
 from django.core.exceptions import ValidationError
 import base64
-from django.core.mail import EmailMessage, get_connection
-import logging
 
 class TableQuerySet(models.QuerySet):
     def at_branch(self, branch):
@@ -68,11 +67,16 @@ class Table(models.Model):
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     objects = TableManager()
     qr_code_base64 = models.TextField(blank=True, null=True, editable=False)
 
     class Meta:
         unique_together = ('store', 'branch', 'number')
+        indexes = [
+            # delta sync: الطاولات اللي اتغيرت من آخر token
+            models.Index(fields=['store', 'updated_at'], name='orders_table_store_updated'),
+        ]
 
     def __str__(self):
         branch_label = f" - {self.branch.name}" if self.branch else ""
@@ -207,20 +211,29 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)    
     notes = models.TextField(blank=True, null=True)
+    # مفتاح من جهاز الكاشير للطلبات اللي اتعملت offline (المزامنة بتتكرر من غير ما الطلب يتكرر)
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
     objects = OrderManager()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='order_unique_idempotency_key',
+            ),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.total} EGP"
 
     def update_total(self):
-        from core.models import StoreSettings
+        from core.services.store_settings import get_store_settings
 
         subtotal = sum((item.subtotal for item in self.items.all()), Decimal("0"))
 
-        try:
-            tax_rate = Decimal(self.store.settings.tax_rate)
-        except StoreSettings.DoesNotExist:
-            tax_rate = Decimal("0")
+        store_settings = get_store_settings(self.store_id)
+        tax_rate = Decimal(store_settings.tax_rate) if store_settings else Decimal("0")
 
         tax_amount = (subtotal * tax_rate / Decimal("100")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
         total = (subtotal + tax_amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
@@ -329,7 +342,13 @@ def update_table_availability(sender, instance, **kwargs):
         table.is_available = False
     elif instance.status in ['CANCELLED', 'NO_SHOW']:
         table.is_available = True
-    table.save(update_fields=['is_available'])
+    table.save(update_fields=['is_available', 'updated_at'])
+
+@receiver(post_delete, sender=Table)
+def record_table_tombstone(sender, instance, origin=None, **kwargs):
+    # delta sync للـ POS / KDS (core.utils.delta_sync)
+    if not deleted_with_store(origin):
+        record_tombstone(instance.store_id, instance)
 
 @receiver(pre_save, sender=Reservation)
 def check_availability_before_save(sender, instance, **kwargs):
@@ -345,7 +364,7 @@ def prepare_inventory_change(sender, instance, **kwargs):
         return  # طلب جديد
 
     try:
-        old = Order.objects.only('status').get(pk=instance.pk)
+        old = Order.objects.only('status', 'is_paid').get(pk=instance.pk)
     except Order.DoesNotExist:
         return
 
@@ -358,6 +377,9 @@ def prepare_inventory_change(sender, instance, **kwargs):
     if new_status == 'PAID' and not instance.is_paid:
         instance.is_paid = True
 
+    # أول انتقال لمدفوع (نقاط الولاء بتتحسب هنا مرة واحدة)
+    instance._became_paid = not old.is_paid and instance.is_paid
+
     # خصم المخزون يحصل عند أول انتقال لـ READY فقط
     instance._deduct_stock = old_status != 'READY' and new_status == 'READY'
 
@@ -451,20 +473,13 @@ def notify_customer_on_status_change(sender, instance: Order, created, **kwargs)
     if not instance.customer_email:
         return
 
-    logger = logging.getLogger(__name__)
-    store_settings = getattr(instance.store, "settings", None)
-    email_user = getattr(store_settings, "notification_email", None) if store_settings else None
-    email_password = (
-        getattr(store_settings, "notification_email_password", None) if store_settings else None
-    )
-
-    if not email_user or not email_password:
-        email_user = getattr(settings, "EMAIL_HOST_USER", None)
-        email_password = getattr(settings, "EMAIL_HOST_PASSWORD", None)
+    from core.services.outbox import email_credentials, enqueue_notification
 
+    # الإيميل بيتبعت من الـ outbox بعد الـ commit (مش جوه الـ save)
+    email_user, email_password = email_credentials(instance.store_id)
     if not email_user or not email_password:
         return
-    
+
     status_map = {
         "PENDING": "جديد",
         "PREPARING": "قيد التحضير",
@@ -484,20 +499,11 @@ def notify_customer_on_status_change(sender, instance: Order, created, **kwargs)
         "شكرًا لتعاملك معنا."
     )
 
-    try:
-        connection = get_connection(
-            username=email_user,
-            password=email_password,
-            fail_silently=False,
-        )
-        message = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=email_user,
-            to=[instance.customer_email],
-            connection=connection,
-        )
-        message.send(fail_silently=False)
-    except Exception as exc:
-        logger.exception("Failed to send order status email: %s", exc)
-        return
\ No newline at end of file
+    enqueue_notification(
+        "EMAIL",
+        instance.customer_email,
+        subject,
+        body,
+        store=instance.store_id,
+        event_type="order_status",
+    )
\ No newline at end of file
@@ -4,6 +4,7 @@ from .order import OrderSerializer
 from .invoice import InvoiceSerializer
 from .payment import PaymentSerializer
 from .reservation import ReservationSerializer
+from .offline_sync import OfflineOrderSerializer, OfflineOrderSyncSerializer
 
 __all__ = [
     'TableSerializer',
@@ -11,5 +12,7 @@ __all__ = [
     'OrderSerializer',
     'InvoiceSerializer',
     'PaymentSerializer',
-    'ReservationSerializer'
+    'ReservationSerializer',
+    'OfflineOrderSerializer',
+    'OfflineOrderSyncSerializer',
 ]
\ No newline at end of file
@@ -0,0 +1,42 @@
+#serializers\offline_sync.py
+from rest_framework import serializers
+from ..models import Order
+
+MAX_SYNC_ORDERS = 1000
+MAX_ITEMS_PER_ORDER = 200
+
+
+class OfflineOrderItemSerializer(serializers.Serializer):
+    # ids بس (من غير PrimaryKeyRelatedField) → التأكد من الأصناف بيحصل مرة واحدة للـ batch كله
+    item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class OfflineOrderSerializer(serializers.Serializer):
+    """
+    طلب اتعمل على جهاز الكاشير وهو offline. idempotency_key بيتولد على الجهاز ويفضل ثابت مع كل إعادة مزامنة.
+    """
+    idempotency_key = serializers.CharField(max_length=64)
+    table = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    items = OfflineOrderItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS_PER_ORDER)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, default='PENDING')
+    order_type = serializers.ChoiceField(choices=Order.ORDER_TYPE_CHOICES, default='IN_STORE')
+    payment_method = serializers.ChoiceField(choices=Order.PAYMENT_METHOD_CHOICES, default='CASH')
+    is_paid = serializers.BooleanField(default=False)
+    customer_name = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=255)
+    customer_phone = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=20)
+    customer_email = serializers.EmailField(required=False, allow_blank=True, allow_null=True)
+    delivery_address = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    created_at = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data['order_type'] == 'DELIVERY' and not data.get('delivery_address'):
+            raise serializers.ValidationError({
+                "delivery_address": "العنوان مطلوب في حالة الدليفري."
+            })
+        return data
+
+
+class OfflineOrderSyncSerializer(serializers.Serializer):
+    orders = OfflineOrderSerializer(many=True, allow_empty=False, max_length=MAX_SYNC_ORDERS)
@@ -44,13 +44,19 @@ class OrderSerializer(serializers.ModelSerializer):
         # Always start new orders as PENDING so they appear in the KDS as "جديد"
         validated_data['status'] = 'PENDING'
 
-        order = Order.objects.create(is_paid=is_paid, **validated_data)
+        order = Order.objects.create(**validated_data)
 
         for item_data in items_data:
             OrderItem.objects.create(order=order, **item_data)
 
         # Totals are recalculated after each item save, but ensure consistency
         order.update_total()
+
+        # الطلب المدفوع من أول مرة بيعدي بنفس انتقال الدفع (_became_paid) بعد ما الإجمالي اتحسب،
+        # علشان نقاط الولاء وغيرها تتحسب على الإجمالي الحقيقي زي أي طلب اتدفع بعدين
+        if is_paid:
+            order.is_paid = True
+            order.save(update_fields=['is_paid'])
         return order
 
     def update(self, instance, validated_data):
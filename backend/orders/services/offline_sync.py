@@ -0,0 +1,325 @@
+# orders/services/offline_sync.py
+"""
+مزامنة طلبات الكاشير اللي اتعملت offline بالجملة بدل إعادتها طلب طلب على OrderViewSet.create
+(update_total مع كل صنف + الـ signals مع كل save):
+
+- idempotency_key لكل طلب (unique لكل متجر): الطلب اللي اتزامن قبل كده بيرجع duplicate بنفس الـ id
+  من غير ما يتكرر. مزامنات نفس المتجر بتتنفذ ورا بعض (قفل على صف المتجر) فمفيش سباق على نفس المفتاح.
+- الأصناف والطاولات بتتأكد إنها تبع المتجر/الفرع في query لكل نوع للـ batch كله.
+- الإجماليات بتتحسب في Python بنفس حسبة update_total، والطلبات والأصناف والفواتير bulk_create.
+- الطلبات اللي حالتها READY أو أبعد (READY/SERVED/PAID) بيتخصم مخزونها: صفوف Inventory بتتقفل مرة واحدة
+  والخصم بيتحسب طلب طلب بترتيب وقت الطلب بنفس قواعد update_inventory_for_order (allow_order_without_stock)،
+  وبعدين UPDATE بـ CASE + حركات bulk + تنبيه مخزون منخفض واحد لكل فرع.
+  PENDING/PREPARING بيتخصموا لما يوصلوا READY من المسار العادي (الـ pre_save).
+- الطلب اللي فيه مشكلة (صنف/طاولة مش موجودة، مخزون مش كفاية) بيترفض لوحده والباقي بيكمل.
+"""
+from collections import Counter
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, DateTimeField, IntegerField, Value, When
+from django.utils import timezone
+
+from core.models import Store
+from core.services.store_settings import get_store_settings
+from inventory.models import Inventory, InventoryMovement, Item
+from inventory.services.stock_alerts import batch_low_stock_alerts, record_low_stock_transition
+
+from ..models import Invoice, Order, OrderItem, Table
+from .invoice import generate_invoice_number
+
+CENTS = Decimal("0.01")
+BULK_BATCH_SIZE = 1000
+UPDATE_CHUNK_SIZE = 500
+DEDUCTED_STATUSES = ('READY', 'SERVED', 'PAID')
+
+
+def _money(value):
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+class _PendingOrder:
+    __slots__ = ('index', 'data', 'lines', 'placed_at', 'changes', 'order')
+
+    def __init__(self, index, data, lines, placed_at):
+        self.index = index
+        self.data = data
+        self.lines = lines  # [(item_id, quantity, unit_price)]
+        self.placed_at = placed_at
+        self.changes = []  # [(item_id, change)]
+        self.order = None
+
+
+def _result(key, status, order=None, errors=None):
+    result = {"idempotency_key": key, "status": status}
+    if order is not None:
+        order_id, total, invoice_number = order
+        result.update({"order": order_id, "total": str(total), "invoice_number": invoice_number})
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def _existing_orders(store, keys):
+    rows = Order.objects.filter(store=store, idempotency_key__in=keys).values_list(
+        'idempotency_key', 'id', 'total', 'invoice__invoice_number'
+    )
+    return {key: (order_id, total, invoice_number) for key, order_id, total, invoice_number in rows}
+
+
+def _reserve_stock(branch, pending, items, allow_without_stock):
+    """
+    يقفل صفوف المخزون ويحسب الخصم لكل طلب. يرجع (الصفوف، الكميات الجديدة، {index: errors}).
+    """
+    deducting = sorted(
+        (entry for entry in pending if entry.data['status'] in DEDUCTED_STATUSES),
+        key=lambda entry: (entry.placed_at, entry.index),
+    )
+    item_ids = {item_id for entry in deducting for item_id, _, _ in entry.lines}
+    if not item_ids:
+        return {}, {}, {}
+
+    rows = {
+        row.item_id: row
+        for row in Inventory.objects.select_for_update()
+        .filter(branch=branch, item_id__in=item_ids)
+        .order_by('pk')
+    }
+    quantities = {item_id: row.quantity for item_id, row in rows.items()}
+    rejected = {}
+
+    for entry in deducting:
+        wanted = Counter()
+        for item_id, quantity, _ in entry.lines:
+            wanted[item_id] += quantity
+
+        if not allow_without_stock:
+            errors = [
+                f"الصنف {items[item_id][1]} غير موجود في المخزون" if item_id not in rows
+                else f"الكمية غير كافية: {items[item_id][1]}"
+                for item_id, quantity in wanted.items()
+                if item_id not in rows or quantities[item_id] < quantity
+            ]
+            if errors:
+                rejected[entry.index] = errors
+                continue
+
+        for item_id, quantity in wanted.items():
+            if item_id not in rows:
+                continue
+            # لو مسموح بدون مخزون → خصم على قد الموجود بس
+            deductible = min(quantities[item_id], quantity) if allow_without_stock else quantity
+            if deductible:
+                quantities[item_id] -= deductible
+                entry.changes.append((item_id, -deductible))
+
+    return rows, quantities, rejected
+
+
+def _apply_stock(pending, rows, quantities, now):
+    changed = [row for item_id, row in rows.items() if quantities[item_id] != row.quantity]
+    for start in range(0, len(changed), UPDATE_CHUNK_SIZE):
+        chunk = changed[start:start + UPDATE_CHUNK_SIZE]
+        Inventory.objects.filter(pk__in=[row.pk for row in chunk]).update(
+            quantity=Case(
+                *[When(pk=row.pk, then=Value(quantities[row.item_id])) for row in chunk],
+                output_field=IntegerField(),
+            ),
+            is_low=Case(
+                *[When(pk=row.pk, then=Value(quantities[row.item_id] <= row.min_stock)) for row in chunk],
+                output_field=BooleanField(),
+            ),
+            last_updated=now,
+        )
+
+    for row in changed:
+        was_low = row.is_low
+        row.quantity = quantities[row.item_id]
+        row.is_low = row.quantity <= row.min_stock
+        if row.is_low and not was_low:
+            record_low_stock_transition(row)
+
+    InventoryMovement.objects.bulk_create(
+        (
+            InventoryMovement(
+                inventory=rows[item_id],
+                item_id=item_id,
+                branch_id=rows[item_id].branch_id,
+                change=change,
+                movement_type=InventoryMovement.MovementType.OUT,
+                source=InventoryMovement.Source.SALE,
+                reason=f"بيع طلب #{entry.order.pk}",
+            )
+            for entry in pending if entry.order is not None
+            for item_id, change in entry.changes
+        ),
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+def _create_orders(store, branch, pending, tax_rate, now):
+    orders = []
+    for entry in pending:
+        data = entry.data
+        subtotal = _money(sum((quantity * unit_price for _, quantity, unit_price in entry.lines), Decimal("0")))
+        tax_amount = _money(subtotal * tax_rate / Decimal("100"))
+        entry.order = Order(
+            store=store,
+            branch=branch,
+            table_id=data.get('table'),
+            order_type=data['order_type'],
+            payment_method=data['payment_method'],
+            is_paid=data['is_paid'] or data['status'] == 'PAID',
+            delivery_address=data.get('delivery_address') or None,
+            customer_name=data.get('customer_name') or None,
+            customer_phone=data.get('customer_phone') or None,
+            customer_email=data.get('customer_email') or None,
+            subtotal=subtotal,
+            tax_rate=_money(tax_rate),
+            tax_amount=tax_amount,
+            total=_money(subtotal + tax_amount),
+            status=data['status'],
+            notes=data.get('notes') or None,
+            idempotency_key=data['idempotency_key'],
+        )
+        orders.append(entry.order)
+
+    Order.objects.bulk_create(orders, batch_size=BULK_BATCH_SIZE)
+
+    # created_at بيتحط تلقائيًا وقت الـ INSERT → نرجّع وقت الطلب الفعلي من الجهاز (للتقارير)
+    backdated = [entry for entry in pending if entry.placed_at < now]
+    for start in range(0, len(backdated), UPDATE_CHUNK_SIZE):
+        chunk = backdated[start:start + UPDATE_CHUNK_SIZE]
+        Order.objects.filter(pk__in=[entry.order.pk for entry in chunk]).update(
+            created_at=Case(
+                *[When(pk=entry.order.pk, then=Value(entry.placed_at)) for entry in chunk],
+                output_field=DateTimeField(),
+            ),
+        )
+        for entry in chunk:
+            entry.order.created_at = entry.placed_at
+
+    OrderItem.objects.bulk_create(
+        (
+            OrderItem(
+                order=entry.order,
+                item_id=item_id,
+                quantity=quantity,
+                unit_price=unit_price,
+                subtotal=quantity * unit_price,
+            )
+            for entry in pending
+            for item_id, quantity, unit_price in entry.lines
+        ),
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    invoices = [
+        Invoice(
+            order=entry.order,
+            store=store,
+            branch=branch,
+            invoice_number=generate_invoice_number(entry.order),
+            subtotal=entry.order.subtotal,
+            tax_rate=entry.order.tax_rate,
+            tax_amount=entry.order.tax_amount,
+            customer_name=entry.order.customer_name,
+            customer_phone=entry.order.customer_phone,
+            order_type=entry.order.order_type,
+            delivery_address=entry.order.delivery_address,
+            notes=entry.order.notes,
+            total=entry.order.total,
+        )
+        for entry in pending
+    ]
+    Invoice.objects.bulk_create(invoices, batch_size=BULK_BATCH_SIZE)
+    return {invoice.order_id: invoice.invoice_number for invoice in invoices}
+
+
+def _award_loyalty(store, pending):
+    # الطلبات المدفوعة بتاخد نقاطها زي انتقال الطلب لمدفوع (bulk_create مابيشغلش الـ post_save)
+    from loyalty.models import LoyaltyProgram
+    from loyalty.services.accrual import award_order_points
+
+    paid = [entry.order for entry in pending if entry.order.is_paid and entry.order.customer_phone]
+    if paid and LoyaltyProgram.objects.filter(store=store, is_active=True).exists():
+        for order in paid:
+            award_order_points(order)
+
+
+def sync_offline_orders(store, branch, orders):
+    """
+    orders: من OfflineOrderSyncSerializer. يرجع ملخص + نتيجة لكل طلب بنفس ترتيب الـ request.
+    """
+    store_settings = get_store_settings(store.id)
+    tax_rate = Decimal(store_settings.tax_rate) if store_settings else Decimal("0")
+    allow_without_stock = store_settings.allow_order_without_stock if store_settings else True
+
+    item_ids = {line['item'] for data in orders for line in data['items']}
+    items = {
+        item_id: (unit_price, name)
+        for item_id, unit_price, name in Item.objects.filter(store=store, id__in=item_ids)
+        .values_list('id', 'unit_price', 'name')
+    }
+    table_ids = {data['table'] for data in orders if data.get('table')}
+    tables = set(
+        Table.objects.filter(store=store, id__in=table_ids).at_branch(branch).values_list('id', flat=True)
+    ) if table_ids else set()
+
+    results = [None] * len(orders)
+
+    with transaction.atomic(), batch_low_stock_alerts():
+        list(Store.objects.select_for_update().filter(pk=store.pk).values_list('pk', flat=True))
+        # بعد القفل جوه الـ transaction: last_updated مايبقاش أقدم من بدايتها (core.utils.delta_sync)
+        now = timezone.now()
+        existing = _existing_orders(store, {data['idempotency_key'] for data in orders})
+
+        pending = []
+        first_index = {}  # نفس المفتاح متكرر في نفس الـ batch → أول واحد بس
+        for index, data in enumerate(orders):
+            key = data['idempotency_key']
+            if key in existing:
+                results[index] = _result(key, "duplicate", existing[key])
+                continue
+            if key in first_index:
+                continue
+            first_index[key] = index
+
+            errors = [f"الصنف {line['item']} غير موجود." for line in data['items'] if line['item'] not in items]
+            if data.get('table') and data['table'] not in tables:
+                errors.append("الطاولة غير موجودة في الفرع.")
+            if errors:
+                results[index] = _result(key, "rejected", errors=errors)
+                continue
+
+            lines = [(line['item'], line['quantity'], items[line['item']][0]) for line in data['items']]
+            pending.append(_PendingOrder(index, data, lines, min(data.get('created_at') or now, now)))
+
+        rows, quantities, rejected = _reserve_stock(branch, pending, items, allow_without_stock)
+        for entry in pending:
+            if entry.index in rejected:
+                results[entry.index] = _result(entry.data['idempotency_key'], "rejected", errors=rejected[entry.index])
+        pending = [entry for entry in pending if entry.index not in rejected]
+
+        if pending:
+            invoice_numbers = _create_orders(store, branch, pending, tax_rate, now)
+            _apply_stock(pending, rows, quantities, now)
+            _award_loyalty(store, pending)
+            for entry in pending:
+                order = entry.order
+                results[entry.index] = _result(
+                    order.idempotency_key, "created", (order.pk, order.total, invoice_numbers[order.pk])
+                )
+
+    for index, data in enumerate(orders):
+        if results[index] is None:
+            # تكرار جوه نفس الـ batch → نفس نتيجة أول ظهور
+            first = results[first_index[data['idempotency_key']]]
+            results[index] = {**first, "status": "duplicate"} if first["status"] == "created" else first
+
+    return {
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+        "rejected": sum(1 for result in results if result["status"] == "rejected"),
+        "results": results,
+    }
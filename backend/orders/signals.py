@@ -3,7 +3,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from .models import Order
-from core.tasks import send_notification_whatsapp
+from core.services.outbox import enqueue_notification, notification_preferences
 
 
 @receiver(post_save, sender=Order)
@@ -23,8 +23,7 @@ def new_order_notification(sender, instance, created, **kwargs):
     if not store:
         return
 
-    settings = getattr(store, "settings", {}) or {}
-    notifications = settings.get("notifications", {}) or {}
+    notifications = notification_preferences(store.id)
 
     if not notifications.get("new_order_enabled", True):
         return
@@ -40,4 +39,5 @@ def new_order_notification(sender, instance, created, **kwargs):
         f"الطاولة: {table_number}"
     )
 
-    send_notification_whatsapp.delay(numbers, f"طلب جديد في {store.name}", message)
+    # في نفس transaction إنشاء الطلب → الـ outbox يبعتها (digest لو طلبات كتير ورا بعض)
+    enqueue_notification("WHATSAPP", numbers, f"طلب جديد في {store.name}", message, store=store, event_type="new_order")
@@ -0,0 +1,72 @@
+# orders/tests/test_exports.py
+import csv
+import io
+
+import pytest
+from django.http import StreamingHttpResponse
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, User
+from inventory.models import Item
+from orders.models import Order, OrderItem
+
+
+def _read_csv(response):
+    assert isinstance(response, StreamingHttpResponse)
+    content = b"".join(response.streaming_content).decode("utf-8-sig")
+    return list(csv.reader(io.StringIO(content)))
+
+
+@pytest.fixture
+def export_setup(db):
+    owner = User.objects.create_user(email="export@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name="Export Store", owner=owner)
+    branch = Branch.objects.create(name="Export Branch", store=store)
+    item = Item.objects.create(name="Latte", store=store, unit_price=40, cost_price=10)
+
+    for name in ("أحمد", "Sara", "Omar"):
+        order = Order.objects.create(store=store, branch=branch, customer_name=name, status="PAID", is_paid=True)
+        OrderItem.objects.create(order=order, item=item, quantity=1, unit_price=item.unit_price)
+
+    other_owner = User.objects.create_user(email="other@example.com", password="pass", is_active=True, role="OWNER")
+    other_store = Store.objects.create(name="Other Store", owner=other_owner)
+    other_branch = Branch.objects.create(name="Other Branch", store=other_store)
+    Order.objects.create(store=other_store, branch=other_branch, customer_name="Hidden")
+
+    client = APIClient()
+    client.force_authenticate(user=owner)
+    return {"client": client, "store": store}
+
+
+@pytest.mark.django_db
+def test_orders_export_streams_store_orders_as_csv(export_setup):
+    response = export_setup["client"].get("/api/v1/orders/export/", {"ordering": "created_at"})
+
+    assert response.status_code == 200
+    assert "orders.csv" in response["Content-Disposition"]
+    rows = _read_csv(response)
+    assert rows[0][0] == "id"
+    names = [row[rows[0].index("customer_name")] for row in rows[1:]]
+    assert sorted(names) == sorted(["أحمد", "Sara", "Omar"])
+
+
+@pytest.mark.django_db
+def test_orders_export_respects_list_filters(export_setup):
+    response = export_setup["client"].get("/api/v1/orders/export/", {"customer_name": "sara"})
+
+    rows = _read_csv(response)
+    assert len(rows) == 2
+    assert rows[1][rows[0].index("customer_name")] == "Sara"
+
+
+@pytest.mark.django_db
+def test_invoices_export_and_unknown_file_type(export_setup):
+    client = export_setup["client"]
+
+    rows = _read_csv(client.get("/api/v1/orders/invoices/export/"))
+    assert rows[0][0] == "invoice_number"
+    assert len(rows) == 4
+
+    bad = client.get("/api/v1/orders/invoices/export/", {"file_type": "pdf"})
+    assert bad.status_code == 400
@@ -0,0 +1,171 @@
+# orders/tests/test_offline_sync.py
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Store, StoreSettings, User
+from core.services.store_settings import clear_store_settings_cache
+from inventory.models import Inventory, InventoryMovement, Item
+from loyalty.models import CustomerLoyalty, LoyaltyProgram
+from orders.models import Invoice, Order, OrderItem, Table
+
+URL = "/api/v1/orders/sync/"
+
+
+@pytest.fixture
+def sync_store(owner_store):
+    client, _, store, branch = owner_store
+    StoreSettings.objects.filter(store=store).update(tax_rate=10)
+    burger = Item.objects.create(name="Burger", store=store, unit_price="50.00")
+    cola = Item.objects.create(name="Cola", store=store, unit_price="12.50")
+    Inventory.objects.create(item=burger, branch=branch, quantity=10, min_stock=2)
+    Inventory.objects.create(item=cola, branch=branch, quantity=20)
+    return client, store, branch, burger, cola
+
+
+def _order(key, *lines, **extra):
+    return {"idempotency_key": key, "items": [{"item": item.id, "quantity": qty} for item, qty in lines], **extra}
+
+
+def _stock(item, branch):
+    return Inventory.objects.get(item=item, branch=branch).quantity
+
+
+def test_sync_creates_orders_invoices_and_deducts_ready_orders(sync_store):
+    client, store, branch, burger, cola = sync_store
+    table = Table.objects.create(store=store, branch=branch, number="5")
+    placed_at = timezone.now() - timedelta(hours=3)
+
+    response = client.post(URL, {"orders": [
+        _order("pos1-1", (burger, 2), (cola, 1), status="PAID", table=table.id, created_at=placed_at.isoformat()),
+        _order("pos1-2", (burger, 1)),
+    ]}, format="json")
+
+    assert response.status_code == 200, response.data
+    assert (response.data["created"], response.data["duplicates"], response.data["rejected"]) == (2, 0, 0)
+    paid_result, pending_result = response.data["results"]
+    assert paid_result["status"] == "created"
+    assert paid_result["total"] == "123.75"  # (100 + 12.50) + 10%
+
+    paid = Order.objects.get(pk=paid_result["order"])
+    assert (paid.status, paid.is_paid, paid.table_id) == ("PAID", True, table.id)
+    assert (paid.subtotal, paid.tax_amount) == (Decimal("112.50"), Decimal("11.25"))
+    assert abs(paid.created_at - placed_at) < timedelta(seconds=1)
+    assert OrderItem.objects.filter(order=paid).count() == 2
+    assert Invoice.objects.get(order=paid).invoice_number == paid_result["invoice_number"]
+    assert Invoice.objects.filter(order_id=pending_result["order"]).exists()
+
+    # PENDING مابيتخصمش غير لما يوصل READY
+    assert (_stock(burger, branch), _stock(cola, branch)) == (8, 19)
+    reasons = set(InventoryMovement.objects.values_list("reason", flat=True))
+    assert reasons == {f"بيع طلب #{paid.id}"}
+
+
+def test_replaying_a_batch_is_idempotent(sync_store):
+    client, _, branch, burger, _ = sync_store
+    batch = {"orders": [_order("pos1-1", (burger, 3), status="READY"), _order("pos1-2", (burger, 1), status="SERVED")]}
+
+    first = client.post(URL, batch, format="json")
+    batch["orders"].append(_order("pos1-2", (burger, 1), status="SERVED"))
+    second = client.post(URL, batch, format="json")
+
+    assert second.status_code == 200
+    assert (second.data["created"], second.data["duplicates"]) == (0, 3)
+    assert [result["order"] for result in second.data["results"]] == [
+        first.data["results"][0]["order"], first.data["results"][1]["order"], first.data["results"][1]["order"],
+    ]
+    assert Order.objects.count() == 2
+    assert _stock(burger, branch) == 6
+
+
+def test_bad_orders_are_rejected_individually(sync_store):
+    client, store, branch, burger, cola = sync_store
+    StoreSettings.objects.filter(store=store).update(allow_order_without_stock=False)
+    clear_store_settings_cache()
+    other_owner = User.objects.create_user(email="other-sync@example.com", password="pass", is_active=True, role="OWNER")
+    other_store = Store.objects.create(name="Other", owner=other_owner)
+    foreign_item = Item.objects.create(name="Foreign", store=other_store, unit_price=1)
+    foreign_table = Table.objects.create(store=other_store, number="1")
+
+    response = client.post(URL, {"orders": [
+        _order("ok", (burger, 6), status="READY"),
+        _order("too-much", (burger, 6), (cola, 1), status="READY"),
+        _order("foreign-item", (foreign_item, 1)),
+        _order("foreign-table", (cola, 1), table=foreign_table.id),
+        _order("still-ok", (burger, 4), status="PAID"),
+    ]}, format="json")
+
+    assert response.status_code == 200, response.data
+    statuses = {result["idempotency_key"]: result["status"] for result in response.data["results"]}
+    assert statuses == {
+        "ok": "created", "too-much": "rejected", "foreign-item": "rejected",
+        "foreign-table": "rejected", "still-ok": "created",
+    }
+    assert response.data["results"][1]["errors"] == ["الكمية غير كافية: Burger"]
+    assert (_stock(burger, branch), _stock(cola, branch)) == (0, 20)
+    assert Inventory.objects.get(item=burger, branch=branch).is_low
+    assert not Order.objects.filter(idempotency_key__in=["too-much", "foreign-item", "foreign-table"]).exists()
+
+
+def test_invalid_payload_fails_validation(sync_store):
+    client, _, _, burger, _ = sync_store
+
+    response = client.post(URL, {"orders": [
+        {"items": [{"item": burger.id}]},
+        _order("delivery", (burger, 1), order_type="DELIVERY"),
+    ]}, format="json")
+
+    assert response.status_code == 400
+    assert not Order.objects.exists()
+
+
+def test_paid_offline_orders_earn_loyalty_points(sync_store):
+    client, store, _, burger, _ = sync_store
+    LoyaltyProgram.objects.create(store=store, is_active=True, points_per_egp=10)
+
+    client.post(URL, {"orders": [
+        _order("p1", (burger, 2), status="PAID", customer_phone="01000000000"),
+        _order("p2", (burger, 2), customer_phone="01000000000"),
+    ]}, format="json")
+
+    assert CustomerLoyalty.objects.get(store=store, phone="01000000000").points == 11  # 110 / 10
+
+
+def test_large_backlog_syncs_in_constant_queries(sync_store):
+    client, store, branch, burger, cola = sync_store
+    Inventory.objects.filter(branch=branch).update(quantity=100_000)
+    items = [Item.objects.create(name=f"Item {i}", store=store, unit_price=5 + i) for i in range(20)]
+    placed_at = timezone.now() - timedelta(hours=1)
+
+    def run(prefix, count):
+        batch = {"orders": [
+            _order(
+                f"{prefix}-{i}", (burger, 1), (cola, 2), (items[i % 20], 1),
+                status="PAID" if i % 2 else "PENDING", created_at=placed_at.isoformat(),
+            )
+            for i in range(count)
+        ]}
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(URL, batch, format="json")
+        assert response.status_code == 200, response.data
+        assert response.data["created"] == count
+        statements = [query["sql"].split(" ", 1)[0] for query in ctx.captured_queries]
+        # الـ INSERT بيتقسم batches (SQLite بيحدد عدد الصفوف بحد الـ parameters)، الباقي ثابت
+        return statements.count("INSERT"), len(statements) - statements.count("INSERT")
+
+    run("warm", 2)
+    _, small = run("small", 20)
+    started = time.perf_counter()
+    inserts, large = run("large", 500)
+    elapsed = time.perf_counter() - started
+
+    assert large == small
+    assert inserts < 50  # 500 طلب + 1500 صنف + 500 فاتورة + الحركات
+    assert elapsed < 5
+    assert OrderItem.objects.filter(order__idempotency_key__startswith="large-").count() == 1500
+    assert _stock(burger, branch) == 100_000 - 1 - 10 - 250
@@ -2,8 +2,9 @@
 
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from inventory.models import Inventory
-from core.models import StoreSettings
+from inventory.models import Inventory, InventoryMovement
+from core.services.store_settings import get_store_settings
+from inventory.services.stock_alerts import batch_low_stock_alerts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,13 +14,23 @@ def update_inventory_for_order(order, reverse=False):
     if order.status in ['PENDING', 'CANCELLED'] and not reverse:
         return
 
-    try:
-        store_settings = order.store.settings
+    # أصناف الطلب اللي نزلت تحت الحد الأدنى → تنبيه واحد للفرع
+    with batch_low_stock_alerts():
+        _apply_order_to_inventory(order, reverse)
+
+
+def _apply_order_to_inventory(order, reverse):
+    store_settings = get_store_settings(order.store_id)
+    if store_settings is not None:
         allow_without_stock = store_settings.allow_order_without_stock
-    except StoreSettings.DoesNotExist:
+    else:
         logger.warning("Store settings not found for %s. Defaulting to allow ordering without stock.", order.store)
         allow_without_stock = True
 
+    # كل خصم/إرجاع بيتسجل كحركة (تقييم المخزون في تاريخ معين بيعتمد على الحركات)
+    movements = []
+    reason = f"{'إرجاع' if reverse else 'بيع'} طلب #{order.id}"
+
     for order_item in order.items.all():
         try:
             inventory = Inventory.objects.select_for_update().get(
@@ -36,6 +47,7 @@ def update_inventory_for_order(order, reverse=False):
         if reverse:
             # إرجاع المخزون (ممنوع يزيد عن الليميت؟ لا طبعًا، خليه يرجع كله)
             inventory.quantity += qty
+            change = qty
             logger.info(f"إرجاع {qty} من {order_item.item.name}")
         else:
             # خصم المخزون
@@ -45,10 +57,24 @@ def update_inventory_for_order(order, reverse=False):
             # لو مسموح بدون مخزون → خصم على قد ما يقدر بس
             deductible = min(inventory.quantity, qty) if allow_without_stock else qty
             inventory.quantity -= deductible
+            change = -deductible
 
             # لو خصمنا أقل من المطلوب → نسجل عجز (اختياري لاحقًا)
             if deductible < qty:
                 shortage = qty - deductible
                 logger.warning(f"عجز في المخزون: {order_item.item.name} بكمية {shortage}")
 
-        inventory.save()
\ No newline at end of file
+        inventory.save()
+        if change:
+            movements.append(InventoryMovement(
+                inventory=inventory,
+                item_id=inventory.item_id,
+                branch_id=inventory.branch_id,
+                change=change,
+                movement_type=InventoryMovement.MovementType.IN if change > 0 else InventoryMovement.MovementType.OUT,
+                source=InventoryMovement.Source.RETURN if reverse else InventoryMovement.Source.SALE,
+                reason=reason,
+            ))
+
+    if movements:
+        InventoryMovement.objects.bulk_create(movements)
\ No newline at end of file
@@ -20,7 +20,9 @@ from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
 from .models import Table, Order, Reservation, OrderItem, Invoice
-from .serializers import TableSerializer, OrderSerializer, ReservationSerializer, InvoiceSerializer
+from .serializers import (
+    TableSerializer, OrderSerializer, ReservationSerializer, InvoiceSerializer, OfflineOrderSyncSerializer,
+)
 from .filters import OrderFilter, InvoiceFilter
 from core.permissions import IsEmployeeOfStore, IsManager
 from inventory.models import Item
@@ -29,6 +31,8 @@ from branches.models import Branch
 
 # ✅ NEW: store switcher context
 from core.utils.store_context import get_store_from_request, get_branch_from_request
+from core.utils.export import EXPORT_CHUNK_SIZE, export_response
+from core.utils.delta_sync import delta_sync_response
 from django.db.models import Sum
 from .services.invoice import ensure_invoice_for_order
 
@@ -158,6 +162,18 @@ class TableViewSet(viewsets.ModelViewSet):
         except (ProgrammingError, OperationalError) as exc:
             logger.exception("Table list DB error: %s", exc)
             return Response([], status=200)
+
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        """
+        الطاولات اللي اتغيرت من ?since=<token> + ids المحذوف (أول مرة من غير since → القايمة كاملة).
+        """
+        store = get_store_from_request(request)
+        if not store:
+            return Response({"detail": "لا يوجد متجر مرتبط بهذا الحساب."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset().select_related("branch").order_by("updated_at", "id")
+        return delta_sync_response(self, queryset, "updated_at", store)
             
     def perform_create(self, serializer):
         """
@@ -220,6 +236,35 @@ class OrderViewSet(viewsets.ModelViewSet):
             order = serializer.save(store=store, branch=branch)
             ensure_invoice_for_order(order)
             
+    @action(detail=False, methods=["post"], url_path="sync")
+    def sync(self, request):
+        """
+        مزامنة طلبات الكاشير اللي اتعملت offline دفعة واحدة:
+        body:
+        {
+          "orders": [
+            {"idempotency_key": "pos1-000123", "items": [{"item": 5, "quantity": 2}],
+             "table": 3, "status": "PAID", "created_at": "2026-01-01T12:30:00Z", ...}
+          ]
+        }
+        النتيجة لكل طلب (بنفس الترتيب): created / duplicate (اتزامن قبل كده) / rejected + errors.
+        """
+        from .services.offline_sync import sync_offline_orders
+
+        store = get_store_from_request(request)
+        if not store:
+            raise ValidationError({"detail": "لا يوجد متجر مرتبط بهذا الحساب أو store_id غير صحيح."})
+
+        branch = get_branch_from_request(request, store=store, allow_store_default=True)
+        if not branch:
+            raise ValidationError({"detail": "لا يوجد فرع مرتبط بهذا الحساب."})
+
+        serializer = OfflineOrderSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        summary = sync_offline_orders(store, branch, serializer.validated_data['orders'])
+        return Response(summary, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"], url_path="kds")
     def kds_orders(self, request):
         qs = self.get_queryset().filter(
@@ -229,6 +274,24 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """
+        تصدير الطلبات (نفس فلاتر الـ list) CSV/XLSX من غير pagination.
+        """
+        qs = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        header = [
+            "id", "created_at", "branch", "table", "order_type", "status",
+            "payment_method", "is_paid", "customer_name", "customer_phone",
+            "subtotal", "tax_amount", "total",
+        ]
+        rows = qs.values_list(
+            "id", "created_at", "branch__name", "table__number", "order_type", "status",
+            "payment_method", "is_paid", "customer_name", "customer_phone",
+            "subtotal", "tax_amount", "total",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, "orders", header, rows)
+
 
 class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = InvoiceSerializer
@@ -256,6 +319,19 @@ class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(branch=branch)
         return qs
 
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        qs = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        header = [
+            "invoice_number", "created_at", "order_id", "branch", "order_type",
+            "customer_name", "customer_phone", "subtotal", "tax_rate", "tax_amount", "total",
+        ]
+        rows = qs.values_list(
+            "invoice_number", "created_at", "order_id", "branch__name", "order_type",
+            "customer_name", "customer_phone", "subtotal", "tax_rate", "tax_amount", "total",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, "invoices", header, rows)
+
     @action(detail=False, methods=["post"], url_path="for-order")
     def for_order(self, request):
         store = get_store_from_request(request)
@@ -0,0 +1,74 @@
+# payments/management/commands/benchmark_paymob_checkout.py
+import time
+from types import SimpleNamespace
+
+import requests
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from payments.services.paymob import PayMobService
+from payments.testing import PayMobStubServer
+
+
+def _legacy_checkout(api_base, api_key, merchant_order_id):
+    """
+    الطريقة القديمة للمقارنة بس: requests.post جديد (connection جديدة) و auth في كل checkout.
+    """
+    token = requests.post(f"{api_base}/auth/tokens", json={"api_key": api_key}, timeout=30).json()["token"]
+    order = requests.post(
+        f"{api_base}/ecommerce/orders",
+        json={"auth_token": token, "amount_cents": 10000, "merchant_order_id": str(merchant_order_id)},
+        timeout=30,
+    ).json()
+    requests.post(
+        f"{api_base}/acceptance/payment_keys",
+        json={"auth_token": token, "order_id": order["id"], "amount_cents": 10000},
+        timeout=30,
+    ).json()
+
+
+class Command(BaseCommand):
+    help = "مقارنة زمن checkout PayMob (القديم vs session + auth cache) على سيرفر PayMob محلي."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=50)
+        parser.add_argument("--latency-ms", type=float, default=20.0, help="تأخير السيرفر لكل request")
+
+    def handle(self, *args, **options):
+        checkouts = options["checkouts"]
+        store = SimpleNamespace(paymob_keys={
+            "enabled": True,
+            "api_key": "test-api-key",
+            "hmac_secret": "benchmark",
+            "iframe_id": "1",
+            "integration_id_card": "1",
+        })
+        billing = {"email": "na@example.com", "phone_number": "+201000000000"}
+
+        with PayMobStubServer(latency=options["latency_ms"] / 1000) as server:
+            started = time.perf_counter()
+            for i in range(checkouts):
+                _legacy_checkout(server.api_base, "test-api-key", i)
+            legacy = time.perf_counter() - started
+            legacy_connections = server.connections
+
+            server.connections = 0
+            with override_settings(PAYMOB_API_BASE=server.api_base):
+                service = PayMobService(store=store)
+                service.forget_auth_token()
+                started = time.perf_counter()
+                for i in range(checkouts):
+                    service.create_checkout(10000, i, billing)
+                pooled = time.perf_counter() - started
+                service.forget_auth_token()
+
+        cache.close()
+        self.stdout.write(f"{'':10}{'total (s)':>12}{'per checkout (ms)':>20}{'connections':>14}")
+        for label, seconds, connections in (
+            ("legacy", legacy, legacy_connections),
+            ("pooled", pooled, server.connections),
+        ):
+            self.stdout.write(
+                f"{label:10}{seconds:>12.3f}{seconds / checkouts * 1000:>20.1f}{connections:>14}"
+            )
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0007_order_customer_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('gateway', models.CharField(choices=[('paymob', 'PayMob')], default='paymob', max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('transaction_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'معلق'), ('SUCCESS', 'ناجح'), ('FAILED', 'فشل'), ('EXPIRED', 'منتهي')], default='PENDING', max_length=20)),
+                ('iframe_url', models.URLField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gateway', models.CharField(choices=[('paymob', 'PayMob')], default='paymob', max_length=20)),
+                ('transaction_id', models.CharField(max_length=255)),
+                ('merchant_order_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('success', models.BooleanField(default=False)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'في الانتظار'), ('PROCESSED', 'تم التنفيذ'), ('IGNORED', 'تم التجاهل'), ('FAILED', 'فشل')], db_index=True, default='PENDING', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='webhookevent',
+            constraint=models.UniqueConstraint(fields=('gateway', 'transaction_id'), name='payments_webhook_unique_transaction'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='order',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment', to='orders.order'),
+        ),
+    ]
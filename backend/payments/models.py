@@ -26,4 +26,36 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"دفع {self.order.id} - {self.status}"
\ No newline at end of file
+        return f"دفع {self.order.id} - {self.status}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Webhook خام من بوابة الدفع. الـ view بيسجله ويرد فورًا،
+    والـ Celery consumer (process_webhook_events) بيطبقه على الطلبات/المدفوعات على batches.
+    (gateway, transaction_id) unique → إعادة إرسال نفس الـ webhook مابتعملش شغل مكرر.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'في الانتظار'),
+        ('PROCESSED', 'تم التنفيذ'),
+        ('IGNORED', 'تم التجاهل'),
+        ('FAILED', 'فشل'),
+    ]
+
+    gateway = models.CharField(max_length=20, choices=Payment.GATEWAY_CHOICES, default='paymob')
+    transaction_id = models.CharField(max_length=255)
+    merchant_order_id = models.CharField(max_length=64, blank=True, null=True)
+    success = models.BooleanField(default=False)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    error = models.CharField(max_length=255, blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'transaction_id'], name='payments_webhook_unique_transaction'),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway} {self.transaction_id} - {self.status}"
\ No newline at end of file
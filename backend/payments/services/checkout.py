@@ -0,0 +1,39 @@
+# payments/services/checkout.py
+"""
+بدء دفع PayMob لطلب: التسلسل (auth → order → payment key) + حفظ Payment.
+بيتنادى من InitiatePaymentView مباشرة أو من Celery task (initiate_paymob_checkout)
+علشان الـ web worker مايستناش الـ 3 calls.
+"""
+from payments.models import Payment
+from payments.services.paymob import PayMobService
+
+
+def build_billing_data(order, email=None):
+    return {
+        "email": email or "na@example.com",
+        "phone_number": order.customer_phone or "+201000000000",
+        "first_name": "Customer",
+        "last_name": "User",
+        **{k: "NA" for k in ["apartment", "floor", "street", "building", "city", "state", "country", "postal_code"]}
+    }
+
+
+def start_order_checkout(order, billing_data, integration_id=None):
+    service = PayMobService(store=order.store)
+    checkout = service.create_checkout(
+        amount_cents=int(order.total * 100),
+        merchant_order_id=order.id,
+        billing_data=billing_data,
+        integration_id=integration_id,
+    )
+
+    payment, _ = Payment.objects.update_or_create(
+        order=order,
+        defaults={
+            'amount': order.total,
+            'transaction_id': str(checkout["paymob_order_id"]),
+            'iframe_url': checkout["iframe_url"],
+            'status': 'PENDING'
+        }
+    )
+    return payment, checkout
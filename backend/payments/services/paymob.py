@@ -1,14 +1,35 @@
-import requests
 import hashlib
 import hmac
 from decouple import config
+from django.conf import settings
+from django.core.cache import cache
+
+from core.utils.http import get_process_session
+
+
+def get_http_session():
+    """
+    Session واحدة لكل process (keep-alive + connection pool)؛ retry على فشل الاتصال بس
+    (الـ POST نفسه مش idempotent).
+    """
+    return get_process_session("paymob", pool_maxsize=PayMobService.POOL_MAXSIZE, connect_retries=2)
+
+
+class PayMobAuthError(Exception):
+    """
+    PayMob رفض الـ auth token (انتهى أو اتلغى).
+    """
 
 
 class PayMobService:
     API_BASE = "https://accept.paymob.com/api"
-    AUTH_URL = f"{API_BASE}/auth/tokens"
-    ORDER_REGISTRATION_URL = f"{API_BASE}/ecommerce/orders"
-    PAYMENT_KEY_URL = f"{API_BASE}/acceptance/payment_keys"
+
+    # (connect, read) بالثواني: الـ checkout جوه web worker فمانستناش 30 ثانية
+    TIMEOUT = (3.05, 10)
+    POOL_MAXSIZE = 10
+
+    # توكن الـ auth بتاع PayMob عمره ساعة → بنخزنه أقل من كده
+    AUTH_TOKEN_TTL_SECONDS = 50 * 60
 
     def __init__(self, store=None):
         """
@@ -16,6 +37,8 @@ class PayMobService:
         لو مش اتبعت → استخدم env (اختياري)
         """
         self.store = store
+        self.api_base = str(getattr(settings, "PAYMOB_API_BASE", "") or self.API_BASE).rstrip("/")
+        self.session = get_http_session()
         keys = (getattr(store, "paymob_keys", None) or {}) if store else {}
 
         # Toggle
@@ -54,14 +77,57 @@ class PayMobService:
         if missing:
             raise ValueError(f"PayMob keys missing: {', '.join(missing)}")
 
-    def authenticate(self):
+    @property
+    def auth_url(self):
+        return f"{self.api_base}/auth/tokens"
+
+    @property
+    def order_registration_url(self):
+        return f"{self.api_base}/ecommerce/orders"
+
+    @property
+    def payment_key_url(self):
+        return f"{self.api_base}/acceptance/payment_keys"
+
+    def _post(self, url, payload):
+        response = self.session.post(url, json=payload, timeout=self.TIMEOUT)
+        if response.status_code == 401:
+            raise PayMobAuthError("PayMob رفض الـ auth token")
+        response.raise_for_status()
+        return response.json()
+
+    def _auth_cache_key(self):
+        # مفتاح لكل credential (من غير ما نخزن الـ api_key نفسه)
+        digest = hashlib.sha256(f"{self.api_base}|{self.api_key}".encode("utf-8")).hexdigest()[:32]
+        return f"payments:paymob:auth:{digest}"
+
+    def forget_auth_token(self):
+        try:
+            cache.delete(self._auth_cache_key())
+        except Exception:
+            pass
+
+    def authenticate(self, use_cache=True):
         self._require_enabled()
         self._require_keys()
 
+        key = self._auth_cache_key()
+        if use_cache:
+            try:
+                token = cache.get(key)
+            except Exception:
+                token = None
+            if token:
+                return token
+
         payload = {"api_key": self.api_key}
-        response = requests.post(self.AUTH_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()["token"]
+        token = self._post(self.auth_url, payload)["token"]
+
+        try:
+            cache.set(key, token, self.AUTH_TOKEN_TTL_SECONDS)
+        except Exception:
+            pass
+        return token
 
     def register_order(self, auth_token, amount_cents, merchant_order_id):
         payload = {
@@ -72,9 +138,7 @@ class PayMobService:
             "merchant_order_id": str(merchant_order_id),
             "items": [],
         }
-        response = requests.post(self.ORDER_REGISTRATION_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        return self._post(self.order_registration_url, payload)
 
     def get_payment_key(self, auth_token, paymob_order_id, amount_cents, billing_data, integration_id=None):
         """
@@ -94,18 +158,53 @@ class PayMobService:
             "integration_id": int(chosen_integration_id),
             "lock_order_when_paid": True,
         }
-        response = requests.post(self.PAYMENT_KEY_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()["token"]
+        return self._post(self.payment_key_url, payload)["token"]
 
     def get_iframe_url(self, payment_token):
         self._require_enabled()
         self._require_keys()
-        return f"https://accept.paymob.com/api/acceptance/iframes/{self.iframe_id}?payment_token={payment_token}"
+        return f"{self.api_base}/acceptance/iframes/{self.iframe_id}?payment_token={payment_token}"
 
-    def verify_webhook_signature(self, payload_obj, received_hmac):
+    def create_checkout(self, amount_cents, merchant_order_id, billing_data, integration_id=None):
         """
-        PayMob HMAC verification
+        التسلسل كامل (auth → register order → payment key) بتوكن من الـ cache.
+        لو PayMob رفض التوكن المتخزن بنجيب واحد جديد ونعيد مرة واحدة.
+        لو الطلب اتسجل قبل الرفض بنكمل بنفس paymob order (PayMob بيرفض merchant_order_id متكرر)
+        ونجيب الـ payment key بس بالتوكن الجديد.
+        يرجع {"paymob_order_id", "payment_token", "iframe_url"}.
+        """
+        paymob_order = None
+        for attempt in range(2):
+            auth_token = self.authenticate(use_cache=(attempt == 0))
+            try:
+                if paymob_order is None:
+                    paymob_order = self.register_order(
+                        auth_token=auth_token,
+                        amount_cents=amount_cents,
+                        merchant_order_id=merchant_order_id,
+                    )
+                payment_token = self.get_payment_key(
+                    auth_token=auth_token,
+                    paymob_order_id=paymob_order["id"],
+                    amount_cents=amount_cents,
+                    billing_data=billing_data,
+                    integration_id=integration_id,
+                )
+                break
+            except PayMobAuthError:
+                self.forget_auth_token()
+                if attempt:
+                    raise
+
+        return {
+            "paymob_order_id": paymob_order["id"],
+            "payment_token": payment_token,
+            "iframe_url": self.get_iframe_url(payment_token),
+        }
+
+    def compute_webhook_hmac(self, payload_obj):
+        """
+        PayMob HMAC للـ transaction callback
         """
         keys = [
             "amount_cents", "created_at", "currency", "error_occured", "has_parent_transaction",
@@ -121,10 +220,14 @@ class PayMobService:
                 value = value.get(part, "") if isinstance(value, dict) else ""
             concatenated += str(value)
 
-        digest = hmac.new(
+        return hmac.new(
             (self.hmac_secret or "").encode("utf-8"),
             concatenated.encode("utf-8"),
             hashlib.sha512,
         ).hexdigest()
 
-        return hmac.compare_digest(digest, received_hmac)
+    def verify_webhook_signature(self, payload_obj, received_hmac):
+        """
+        PayMob HMAC verification
+        """
+        return hmac.compare_digest(self.compute_webhook_hmac(payload_obj), received_hmac)
@@ -0,0 +1,201 @@
+# payments/services/webhooks.py
+"""
+استقبال webhooks الدفع على مرحلتين:
+
+1) record_webhook_event (جوه الـ request): INSERT واحد للـ event الخام
+   بـ ON CONFLICT DO NOTHING على (gateway, transaction_id) → إعادة الإرسال مابتعملش حاجة.
+2) process_webhook_batch (Celery): بياخد batch من الـ PENDING (skip_locked على Postgres)
+   ويطبقه bulk: Payment → SUCCESS، Order → is_paid، ويعلّم الـ events.
+   الطلب المدفوع قبل كده مابيتلمسش تاني، فالتنفيذ idempotent.
+   الـ UPDATE الـ bulk مابيشغلش post_save، فبعد الـ commit بنعمل اللي الـ signals كانت بتعمله:
+   نقاط الولاء وتحديث is_paid للـ KDS.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order, serialize_order_for_kds
+from payments.models import Payment, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = 200
+# أقل مدة بين تشغيلين للـ consumer من الـ view (الباقي بيتجمع في نفس الـ batch)
+CONSUMER_KICK_SECONDS = 2
+
+
+def record_webhook_event(gateway, obj):
+    """
+    يسجل الـ event الخام. يرجع False لو الـ transaction_id مش موجود.
+    """
+    transaction_id = obj.get("id")
+    if transaction_id in (None, ""):
+        return False
+
+    order_info = obj.get("order") if isinstance(obj.get("order"), dict) else {}
+    merchant_order_id = order_info.get("merchant_order_id")
+
+    WebhookEvent.objects.bulk_create(
+        [
+            WebhookEvent(
+                gateway=gateway,
+                transaction_id=str(transaction_id),
+                merchant_order_id=str(merchant_order_id) if merchant_order_id not in (None, "") else None,
+                success=bool(obj.get("success")) and not obj.get("is_voided") and not obj.get("is_refunded"),
+                payload=obj,
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+def kick_webhook_consumer():
+    """
+    يشغّل الـ consumer في Celery (مرة كل CONSUMER_KICK_SECONDS على الأكتر).
+    لو الـ broker واقع الـ beat schedule بيكمل الشغل.
+    """
+    if not getattr(settings, "PAYMOB_WEBHOOK_KICK_CONSUMER", True):
+        return
+
+    try:
+        if not cache.add("payments:webhook-consumer-kick", 1, CONSUMER_KICK_SECONDS):
+            return
+    except Exception:
+        pass
+
+    try:
+        from payments.tasks import process_webhook_events
+
+        process_webhook_events.apply_async(retry=False)
+    except Exception:
+        logger.warning("Could not enqueue webhook consumer; beat schedule will pick the events up.")
+
+
+def _order_id(event):
+    try:
+        return int(event.merchant_order_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def process_webhook_batch(batch_size=WEBHOOK_BATCH_SIZE, now=None):
+    """
+    يطبق batch واحد من الـ events المعلقة. يرجع dict بعدد كل حالة أو None لو مفيش events.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status="PENDING")
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return None
+
+        outcome = {}  # event_id -> (status, error)
+        paid_events = {}  # order_id -> أول event ناجح للطلب في الـ batch
+        for event in events:
+            if not event.success:
+                outcome[event.id] = ("IGNORED", None)
+                continue
+
+            order_id = _order_id(event)
+            if order_id is None:
+                outcome[event.id] = ("FAILED", "merchant_order_id غير صالح")
+            elif order_id in paid_events:
+                outcome[event.id] = ("IGNORED", "الطلب اتدفع بمعاملة تانية في نفس الـ batch")
+            else:
+                paid_events[order_id] = event
+
+        orders = Order.objects.select_for_update().only("id", "total", "is_paid").in_bulk(list(paid_events))
+        payments = {
+            payment.order_id: payment
+            for payment in Payment.objects.select_for_update().filter(order_id__in=list(orders))
+        }
+
+        changed_payments = []
+        new_payments = []
+        newly_paid = []
+        for order_id, event in paid_events.items():
+            order = orders.get(order_id)
+            if order is None:
+                outcome[event.id] = ("FAILED", "الطلب غير موجود")
+                continue
+
+            outcome[event.id] = ("PROCESSED", None)
+            if not order.is_paid:
+                newly_paid.append(order_id)
+
+            payment = payments.get(order_id)
+            if payment is None:
+                new_payments.append(Payment(
+                    order=order,
+                    gateway=event.gateway,
+                    amount=order.total,
+                    transaction_id=event.transaction_id,
+                    status="SUCCESS",
+                ))
+            elif payment.status != "SUCCESS":
+                payment.status = "SUCCESS"
+                payment.transaction_id = event.transaction_id
+                payment.updated_at = now
+                changed_payments.append(payment)
+
+        if new_payments:
+            Payment.objects.bulk_create(new_payments)
+        if changed_payments:
+            Payment.objects.bulk_update(changed_payments, ["status", "transaction_id", "updated_at"])
+        if newly_paid:
+            Order.objects.filter(id__in=newly_paid).update(is_paid=True, payment_method="PAYMOB", updated_at=now)
+
+        by_outcome = {}
+        for event_id, result in outcome.items():
+            by_outcome.setdefault(result, []).append(event_id)
+        for (status, error), ids in by_outcome.items():
+            WebhookEvent.objects.filter(id__in=ids).update(status=status, error=error, processed_at=now)
+
+        if newly_paid:
+            transaction.on_commit(lambda: _after_paid(newly_paid))
+
+    counts = {"PROCESSED": 0, "IGNORED": 0, "FAILED": 0}
+    for status, _ in outcome.values():
+        counts[status] += 1
+    counts["paid_orders"] = len(newly_paid)
+    return counts
+
+
+def _after_paid(order_ids):
+    """
+    نقاط الولاء + تحديث الـ KDS للطلبات اللي اتدفعت (بدل notify_kds_on_order_change).
+    """
+    from loyalty.services.accrual import award_order_points
+
+    orders = list(Order.objects.filter(id__in=order_ids).select_related("branch", "table"))
+    for order in orders:
+        try:
+            award_order_points(order)
+        except Exception:
+            logger.exception("Loyalty award failed for order %s", order.id)
+
+    _notify_kds(orders)
+
+
+def _notify_kds(orders):
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+
+    for order in orders:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                "kds", {"type": "kds_order_updated", "order": serialize_order_for_kds(order)}
+            )
+        except Exception:
+            logger.exception("KDS update failed for paid order %s", order.id)
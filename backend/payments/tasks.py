@@ -3,6 +3,41 @@ from celery import shared_task
 from orders.models import Order
 from inventory.models import Inventory
 
+
+@shared_task
+def initiate_paymob_checkout(order_id, billing_data, integration_id=None):
+    """
+    نفس InitiatePaymentView بس في الخلفية: الـ 3 calls بتاعة PayMob + حفظ Payment.
+    """
+    from payments.services.checkout import start_order_checkout
+
+    order = Order.objects.select_related('store').get(id=order_id)
+    payment, checkout = start_order_checkout(order, billing_data, integration_id=integration_id)
+    return {
+        "payment_id": str(payment.id),
+        "paymob_order_id": checkout["paymob_order_id"],
+        "iframe_url": checkout["iframe_url"],
+    }
+
+
+# ignore_result: الـ view بيشغلها ومش بيستنى نتيجة (ومن غير subscribe على الـ result backend)
+@shared_task(ignore_result=True)
+def process_webhook_events(batch_size=None, max_batches=20):
+    """
+    Consumer لـ webhooks الدفع المتسجلة (WebhookEvent): batches لحد ما الـ PENDING يخلص.
+    """
+    from payments.services.webhooks import WEBHOOK_BATCH_SIZE, process_webhook_batch
+
+    totals = {"PROCESSED": 0, "IGNORED": 0, "FAILED": 0, "paid_orders": 0}
+    for _ in range(max_batches):
+        counts = process_webhook_batch(batch_size=batch_size or WEBHOOK_BATCH_SIZE)
+        if counts is None:
+            break
+        for key, value in counts.items():
+            totals[key] += value
+    return totals
+
+
 @shared_task
 def process_successful_payment(order_id):
     try:
@@ -0,0 +1,181 @@
+# payments/testing.py
+"""
+أدوات تست لـ PayMob:
+
+- PayMobStubServer: سيرفر محلي بيقلّد PayMob (auth / register order / payment key) للتستات والـ benchmarks.
+- build_transaction_callback / replay_webhooks: webhooks موقعة وإعادة إرسالها بالتوازي (load test).
+
+    with PayMobStubServer(latency=0.05) as server:
+        settings.PAYMOB_API_BASE = server.api_base
+        ...
+        server.calls["/api/auth/tokens"], server.connections
+
+- HTTP/1.1 keep-alive علشان نقدر نقيس إعادة استخدام الـ connections.
+- expire_tokens() بيلغي كل التوكنات (يحاكي انتهاء توكن الـ auth عند PayMob).
+"""
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _PayMobHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # الـ headers والـ body بيتكتبوا منفصلين → من غير كده keep-alive بيستنى delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub.register_connection()
+
+    def log_message(self, format, *args):
+        return
+
+    def _reply(self, status, body):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        status, body = self.server.stub.handle(self.path, payload)
+        self._reply(status, body)
+
+
+class PayMobStubServer:
+    def __init__(self, latency=0.0, api_key="test-api-key"):
+        self.latency = latency
+        self.api_key = api_key
+        self.calls = Counter()
+        self.connections = 0
+        self._tokens = set()
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def register_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def expire_tokens(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def handle(self, path, payload):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.calls[path] += 1
+
+            if path == "/api/auth/tokens":
+                if payload.get("api_key") != self.api_key:
+                    return 403, {"detail": "incorrect credentials"}
+                token = f"auth-{next(self._ids)}"
+                self._tokens.add(token)
+                return 201, {"token": token}
+
+            if payload.get("auth_token") not in self._tokens:
+                return 401, {"detail": "invalid token"}
+
+            if path == "/api/ecommerce/orders":
+                return 201, {"id": next(self._ids), "merchant_order_id": payload.get("merchant_order_id")}
+
+            if path == "/api/acceptance/payment_keys":
+                return 201, {"token": f"pay-{payload.get('order_id')}-{next(self._ids)}"}
+
+        return 404, {"detail": "not found"}
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _PayMobHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def build_transaction_callback(transaction_id, merchant_order_id, amount_cents, hmac_secret, success=True):
+    """
+    payload زي "transaction processed callback" بتاع PayMob + الـ HMAC بتاعه.
+    """
+    from types import SimpleNamespace
+
+    from payments.services.paymob import PayMobService
+
+    obj = {
+        "id": transaction_id,
+        "amount_cents": amount_cents,
+        "created_at": "2024-01-01T12:00:00",
+        "currency": "EGP",
+        "error_occured": False,
+        "has_parent_transaction": False,
+        "integration_id": 1,
+        "is_3d_secure": True,
+        "is_auth": False,
+        "is_capture": False,
+        "is_refunded": False,
+        "is_standalone_payment": True,
+        "is_voided": False,
+        "order": {"id": transaction_id + 1, "merchant_order_id": str(merchant_order_id)},
+        "owner": 1,
+        "pending": False,
+        "source_data": {"pan": "2346", "sub_type": "MasterCard", "type": "card"},
+        "success": success,
+    }
+    signer = PayMobService(store=SimpleNamespace(paymob_keys={"hmac_secret": hmac_secret}))
+    return {"type": "TRANSACTION", "obj": obj}, signer.compute_webhook_hmac(obj)
+
+
+def replay_webhooks(url, callbacks, duplicates=5, concurrency=8, max_attempts=20):
+    """
+    يبعت كل callback (payload, hmac) عدد duplicates مرة بالتوازي (زي retries البوابة).
+    أي رد 5xx أو خطأ اتصال بيتعاد لحد max_attempts. يرجع (Counter للـ status codes, latencies بالثواني).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    session = requests.Session()
+    jobs = [callback for callback in callbacks for _ in range(duplicates)]
+
+    def send(callback):
+        payload, signature = callback
+        for _ in range(max_attempts):
+            started = time.perf_counter()
+            try:
+                response = session.post(url, params={"hmac": signature}, json=payload, timeout=10)
+            except requests.RequestException:
+                continue
+            if response.status_code < 500:
+                return response.status_code, time.perf_counter() - started
+        return None, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, jobs))
+
+    return Counter(status for status, _ in results), [latency for _, latency in results if latency is not None]
@@ -0,0 +1,130 @@
+import pytest
+import requests
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, User
+from inventory.models import Item
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from payments.services.paymob import PayMobService
+from payments.tasks import initiate_paymob_checkout
+from payments.testing import PayMobStubServer
+
+AUTH_PATH = "/api/auth/tokens"
+ORDER_PATH = "/api/ecommerce/orders"
+KEY_PATH = "/api/acceptance/payment_keys"
+
+PAYMOB_KEYS = {
+    "enabled": True,
+    "api_key": "test-api-key",
+    "hmac_secret": "secret",
+    "iframe_id": "77",
+    "integration_id_card": "123",
+}
+
+
+@pytest.fixture
+def paymob(settings):
+    with PayMobStubServer() as server:
+        settings.PAYMOB_API_BASE = server.api_base
+        yield server
+
+
+@pytest.fixture
+def paymob_order(db):
+    owner = User.objects.create_user(email="paymob-owner@example.com", password="pass", is_active=True, role="OWNER")
+    store = Store.objects.create(name="PayMob Store", owner=owner, paymob_keys=PAYMOB_KEYS)
+    branch = Branch.objects.create(name="PayMob Branch", store=store)
+    item = Item.objects.create(name="Pizza", store=store, unit_price=100, cost_price=30)
+    order = Order.objects.create(store=store, branch=branch, customer_phone="01000000000")
+    OrderItem.objects.create(order=order, item=item, quantity=1, unit_price=item.unit_price)
+    order.refresh_from_db()
+    return owner, store, order
+
+
+def _billing():
+    return {"email": "a@example.com", "phone_number": "01000000000", "first_name": "A", "last_name": "B"}
+
+
+@pytest.mark.django_db
+def test_checkout_reuses_cached_token_and_pooled_connection(paymob, paymob_order):
+    _, store, _ = paymob_order
+    service = PayMobService(store=store)
+
+    for merchant_order_id in (1, 2, 3):
+        checkout = service.create_checkout(100_00, merchant_order_id, _billing())
+        assert checkout["iframe_url"].startswith(f"{paymob.api_base}/acceptance/iframes/77?payment_token=pay-")
+
+    assert paymob.calls[AUTH_PATH] == 1
+    assert paymob.calls[ORDER_PATH] == 3
+    assert paymob.calls[KEY_PATH] == 3
+    # keep-alive: كل الـ requests على connection واحدة
+    assert paymob.connections == 1
+
+
+@pytest.mark.django_db
+def test_expired_cached_token_is_refreshed_once(paymob, paymob_order):
+    _, store, _ = paymob_order
+    service = PayMobService(store=store)
+    service.create_checkout(100_00, 1, _billing())
+
+    paymob.expire_tokens()
+    service.create_checkout(100_00, 2, _billing())
+
+    assert paymob.calls[AUTH_PATH] == 2
+    assert paymob.calls[ORDER_PATH] == 3  # واحد اترفض بـ 401 واتعاد
+
+
+@pytest.mark.django_db
+def test_token_expiring_after_order_registration_reuses_the_paymob_order(paymob, paymob_order, monkeypatch):
+    _, store, _ = paymob_order
+    service = PayMobService(store=store)
+    register_order = service.register_order
+
+    def register_then_expire(**kwargs):
+        registered = register_order(**kwargs)
+        paymob.expire_tokens()
+        return registered
+
+    monkeypatch.setattr(service, "register_order", register_then_expire)
+    checkout = service.create_checkout(100_00, 1, _billing())
+
+    assert paymob.calls[AUTH_PATH] == 2
+    assert paymob.calls[ORDER_PATH] == 1  # مفيش تسجيل تاني لنفس merchant_order_id
+    assert paymob.calls[KEY_PATH] == 2
+    assert checkout["payment_token"].startswith(f"pay-{checkout['paymob_order_id']}-")
+
+
+@pytest.mark.django_db
+def test_auth_tokens_are_cached_per_credential(paymob, paymob_order):
+    owner, store, _ = paymob_order
+    other = Store.objects.create(name="Other PayMob", owner=owner, paymob_keys={**PAYMOB_KEYS, "api_key": "other-key"})
+
+    PayMobService(store=store).authenticate()
+    with pytest.raises(requests.HTTPError):
+        # مفتاح تاني → مايستخدمش توكن المتجر الأول (والسيرفر بيرفض المفتاح ده)
+        PayMobService(store=other).authenticate()
+
+    assert paymob.calls[AUTH_PATH] == 2
+
+
+@pytest.mark.django_db
+def test_initiate_view_and_celery_task_save_payment(paymob, paymob_order):
+    owner, _, order = paymob_order
+    client = APIClient()
+    client.force_authenticate(owner)
+
+    response = client.post(f"/api/v1/payments/initiate/{order.id}/", {}, format="json")
+    assert response.status_code == 200, response.data
+    payment = Payment.objects.get(order=order)
+    assert payment.amount == order.total
+    assert payment.iframe_url == response.data["iframe_url"]
+
+    result = initiate_paymob_checkout(order.id, _billing())
+    payment.refresh_from_db()
+    assert result["iframe_url"] == payment.iframe_url
+    assert paymob.calls[AUTH_PATH] == 1
+
+    status = client.get(f"/api/v1/payments/initiate/{order.id}/")
+    assert status.data["iframe_url"] == payment.iframe_url
@@ -0,0 +1,153 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, User
+from inventory.models import Item
+from loyalty.models import CustomerLoyalty, LoyaltyProgram
+from orders.models import Order, OrderItem
+from payments.models import Payment, WebhookEvent
+from payments.services.webhooks import process_webhook_batch
+from payments.tasks import process_webhook_events
+from payments.testing import build_transaction_callback, replay_webhooks
+
+WEBHOOK_URL = "/api/v1/payments/paymob/webhook/"
+SECRET = "webhook-secret"
+
+
+@pytest.fixture(autouse=True)
+def webhook_settings(settings, monkeypatch):
+    monkeypatch.setenv("PAYMOB_HMAC_SECRET", SECRET)
+    settings.PAYMOB_WEBHOOK_KICK_CONSUMER = False
+
+
+@pytest.fixture
+def paid_orders(db):
+    def make(count):
+        owner = User.objects.create_user(
+            email=f"webhook-owner-{count}@example.com", password="pass", is_active=True, role="OWNER"
+        )
+        store = Store.objects.create(name="Webhook Store", owner=owner)
+        branch = Branch.objects.create(name="Webhook Branch", store=store)
+        item = Item.objects.create(name="Burger", store=store, unit_price=100, cost_price=40)
+        LoyaltyProgram.objects.create(store=store, is_active=True, points_per_egp=10)
+        orders = []
+        for i in range(count):
+            order = Order.objects.create(store=store, branch=branch, customer_phone=f"0100000000{i}")
+            OrderItem.objects.create(order=order, item=item, quantity=1, unit_price=item.unit_price)
+            orders.append(order)
+        return orders
+
+    return make
+
+
+def _post(client, callback):
+    payload, signature = callback
+    return client.post(f"{WEBHOOK_URL}?hmac={signature}", payload, format="json")
+
+
+@pytest.mark.django_db
+def test_webhook_acks_and_records_event_once(paid_orders):
+    (order,) = paid_orders(1)
+    client = APIClient()
+    callback = build_transaction_callback(5001, order.id, 11400, SECRET)
+
+    bad = client.post(f"{WEBHOOK_URL}?hmac=nope", callback[0], format="json")
+    assert bad.status_code == 400
+
+    for _ in range(3):
+        response = _post(client, callback)
+        assert response.status_code == 200
+        assert response.json() == {"status": "received"}
+
+    event = WebhookEvent.objects.get()
+    assert (event.transaction_id, event.merchant_order_id, event.status) == ("5001", str(order.id), "PENDING")
+    # لسه ماتطبقش على الطلب
+    order.refresh_from_db()
+    assert order.is_paid is False
+
+
+@pytest.mark.django_db
+def test_consumer_applies_batch_idempotently(paid_orders, django_capture_on_commit_callbacks):
+    first, second = paid_orders(2)
+    Payment.objects.create(order=first, amount=first.total, transaction_id="paymob-order", status="PENDING")
+    client = APIClient()
+    for callback in (
+        build_transaction_callback(6001, first.id, 11400, SECRET),
+        build_transaction_callback(6002, first.id, 11400, SECRET),  # معاملة تانية لنفس الطلب
+        build_transaction_callback(6003, second.id, 11400, SECRET),
+        build_transaction_callback(6004, second.id, 11400, SECRET, success=False),
+        build_transaction_callback(6005, 999999, 11400, SECRET),
+    ):
+        assert _post(client, callback).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        counts = process_webhook_batch()
+
+    assert counts == {"PROCESSED": 2, "IGNORED": 2, "FAILED": 1, "paid_orders": 2}
+    assert set(Order.objects.filter(is_paid=True).values_list("id", flat=True)) == {first.id, second.id}
+    payments = {p.order_id: p for p in Payment.objects.all()}
+    assert (payments[first.id].status, payments[first.id].transaction_id) == ("SUCCESS", "6001")
+    assert (payments[second.id].status, payments[second.id].amount) == ("SUCCESS", second.total)
+    assert CustomerLoyalty.objects.count() == 2
+    assert WebhookEvent.objects.get(transaction_id="6005").error == "الطلب غير موجود"
+
+    assert process_webhook_batch() is None
+    assert process_webhook_events() == {"PROCESSED": 0, "IGNORED": 0, "FAILED": 0, "paid_orders": 0}
+
+
+@pytest.mark.django_db
+def test_consumer_pushes_paid_orders_to_kds(paid_orders, monkeypatch, django_capture_on_commit_callbacks):
+    orders = paid_orders(2)
+    sent = []
+
+    class Layer:
+        async def group_send(self, group, message):
+            sent.append((group, message["type"], message["order"]["id"], message["order"]["is_paid"]))
+
+    client = APIClient()
+    for i, order in enumerate(orders):
+        _post(client, build_transaction_callback(6100 + i, order.id, 11400, SECRET))
+
+    monkeypatch.setattr("payments.services.webhooks.get_channel_layer", Layer)
+    with django_capture_on_commit_callbacks(execute=True):
+        process_webhook_batch()
+
+    assert sorted(sent) == [("kds", "kds_order_updated", order.id, True) for order in orders]
+
+
+@pytest.mark.django_db
+def test_consumer_query_count_does_not_grow_with_batch(paid_orders):
+    orders = paid_orders(12)
+    client = APIClient()
+
+    for i, order in enumerate(orders[:2]):
+        _post(client, build_transaction_callback(7000 + i, order.id, 11400, SECRET))
+    with CaptureQueriesContext(connection) as small:
+        process_webhook_batch()
+
+    for i, order in enumerate(orders[2:]):
+        _post(client, build_transaction_callback(7100 + i, order.id, 11400, SECRET))
+    with CaptureQueriesContext(connection) as large:
+        process_webhook_batch()
+
+    assert len(large.captured_queries) == len(small.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replayed_duplicate_webhooks_are_processed_once(paid_orders, live_server):
+    orders = paid_orders(10)
+    callbacks = [build_transaction_callback(8000 + i, order.id, 11400, SECRET) for i, order in enumerate(orders)]
+
+    statuses, latencies = replay_webhooks(f"{live_server.url}{WEBHOOK_URL}", callbacks, duplicates=5, concurrency=8)
+
+    assert statuses == {200: 50}
+    assert len(latencies) == 50
+    assert WebhookEvent.objects.count() == 10
+
+    process_webhook_events()
+    assert Order.objects.filter(is_paid=True).count() == 10
+    assert Payment.objects.filter(status="SUCCESS").count() == 10
+    assert not WebhookEvent.objects.exclude(status="PROCESSED").exists()
@@ -6,6 +6,6 @@ router = DefaultRouter()
 urlpatterns = router.urls
 
 urlpatterns = [
-    path('initiate/<uuid:order_id>/', InitiatePaymentView.as_view(), name='initiate-payment'),
+    path('initiate/<int:order_id>/', InitiatePaymentView.as_view(), name='initiate-payment'),
     path('paymob/webhook/', paymob_webhook, name='paymob-webhook'),
 ]
\ No newline at end of file
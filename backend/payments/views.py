@@ -1,7 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from .services.checkout import build_billing_data, start_order_checkout
 from .services.paymob import PayMobService
+from .services.webhooks import kick_webhook_consumer, record_webhook_event
 from .models import Payment
 from orders.models import Order
 
@@ -13,12 +15,27 @@ import json
 class InitiatePaymentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def get(self, request, order_id):
+        """
+        حالة الدفع (للـ checkout اللي اتبدأ في الخلفية بـ async).
+        """
+        payment = Payment.objects.filter(order_id=order_id, order__store__owner=request.user).first()
+        if payment is None:
+            return Response({"error": "لا يوجد دفع لهذا الطلب"}, status=404)
+
+        return Response({
+            "payment_id": str(payment.id),
+            "status": payment.status,
+            "iframe_url": payment.iframe_url,
+            "paymob_order_id": payment.transaction_id,
+        })
+
     def post(self, request, order_id):
         try:
             order = Order.objects.select_related('store').get(
                 id=order_id,
                 store__owner=request.user,
-                payment_status__in=['PENDING', 'UNPAID']
+                is_paid=False
             )
 
             # PayMob Enabled check per store
@@ -29,55 +46,25 @@ class InitiatePaymentView(APIView):
             if hasattr(order, 'payment') and order.payment.status == 'SUCCESS':
                 return Response({"error": "الطلب مدفوع بالفعل"}, status=400)
 
-            # ✅ use store keys
-            service = PayMobService(store=order.store)
-
-            # 1. Authentication
-            auth_token = service.authenticate()
+            # Billing Data (ممكن تتحسن لاحقًا)
+            billing_data = build_billing_data(order, email=request.user.email)
+            integration_id = keys.get("integration_id_card") or None
 
-            # 2. Register Order
-            paymob_order = service.register_order(
-                auth_token=auth_token,
-                amount_cents=int(order.total * 100),
-                merchant_order_id=order.id
-            )
+            # async=true → الـ 3 calls بتاعة PayMob في Celery، والواجهة تسأل بـ GET على نفس الرابط
+            if str(request.data.get("async", "")).lower() in ("1", "true"):
+                from payments.tasks import initiate_paymob_checkout
 
-            # 3. Billing Data (ممكن تتحسن لاحقًا)
-            billing_data = {
-                "email": request.user.email or "na@example.com",
-                "phone_number": order.customer_phone or "+201000000000",
-                "first_name": "Customer",
-                "last_name": "User",
-                **{k: "NA" for k in ["apartment", "floor", "street", "building", "city", "state", "country", "postal_code"]}
-            }
-
-            # 4. Get Payment Key (Card integration by default)
-            payment_token = service.get_payment_key(
-                auth_token=auth_token,
-                paymob_order_id=paymob_order['id'],
-                amount_cents=int(order.total * 100),
-                billing_data=billing_data,
-                integration_id=(keys.get("integration_id_card") or None),
-            )
+                task = initiate_paymob_checkout.delay(order.id, billing_data, integration_id)
+                return Response({"success": True, "task_id": task.id}, status=202)
 
-            iframe_url = service.get_iframe_url(payment_token)
-
-            # حفظ أو تحديث الدفع
-            payment, created = Payment.objects.update_or_create(
-                order=order,
-                defaults={
-                    'amount': order.total,
-                    'transaction_id': str(paymob_order['id']),
-                    'iframe_url': iframe_url,
-                    'status': 'PENDING'
-                }
-            )
+            # auth (من الـ cache) → register order → payment key
+            payment, checkout = start_order_checkout(order, billing_data, integration_id=integration_id)
 
             return Response({
                 "success": True,
-                "iframe_url": iframe_url,
+                "iframe_url": checkout["iframe_url"],
                 "payment_id": str(payment.id),
-                "paymob_order_id": paymob_order['id']
+                "paymob_order_id": checkout["paymob_order_id"]
             })
 
         except Order.DoesNotExist:
@@ -107,38 +94,13 @@ def paymob_webhook(request):
         if not service.verify_webhook_signature(obj, received_hmac):
             return JsonResponse({"error": "Invalid HMAC"}, status=400)
 
-        # فقط لو المعاملة ناجحة وغير ملغاة
-        if obj.get('success') and not obj.get('is_voided') and not obj.get('is_refunded'):
-            merchant_order_id = obj['order']['merchant_order_id']
-
-            try:
-                order = Order.objects.get(id=merchant_order_id)
-
-                # منع التكرار
-                if order.payment_status == 'PAID':
-                    return JsonResponse({"status": "already processed"})
-
-                # تحديث حالة الدفع
-                payment = order.payment
-                payment.status = 'SUCCESS'
-                payment.transaction_id = str(obj['id'])
-                payment.save()
-
-                # تحديث حالة الطلب
-                order.payment_status = 'PAID'
-                order.status = 'CONFIRMED'  # أو 'PREPARING'
-                order.save()
-
-                # تشغيل المهام الخلفية (خصم مخزون، نقاط ولاء، إشعار)
-                from payments.tasks import process_successful_payment
-                process_successful_payment.delay(order.id)
-
-                return JsonResponse({"status": "success"})
-
-            except Order.DoesNotExist:
-                return JsonResponse({"error": "order not found"}, status=404)
+        # بنسجل الـ event بس ونرد فورًا؛ التطبيق على الطلب/الدفع في process_webhook_events
+        # (نفس الـ transaction_id لو اتبعت تاني مابيتسجلش مرتين)
+        if not record_webhook_event('paymob', obj):
+            return JsonResponse({"error": "Missing transaction id"}, status=400)
 
-        return JsonResponse({"status": "ignored"})
+        kick_webhook_consumer()
+        return JsonResponse({"status": "received"})
 
     except Exception:
         # لا ترجع تفاصيل الخطأ للخارج
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ReportJob
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "report_type", "user", "store", "status", "progress", "created_at", "finished_at")
+    list_filter = ("status", "report_type")
+    search_fields = ("user__email", "store__name")
+    readonly_fields = ("result", "error", "created_at", "started_at", "finished_at")
@@ -0,0 +1,30 @@
+# backend/reports/consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+
+def report_jobs_group(user_id):
+    return f"report_jobs_{user_id}"
+
+
+class ReportJobConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+
+        # كل مستخدم بيستقبل تحديثات الـ jobs بتاعته بس
+        self.group_name = report_jobs_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        group_name = getattr(self, "group_name", None)
+        if group_name:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def report_job_updated(self, event):
+        await self.send_json({
+            "type": "report_job_updated",
+            "job": event["job"],
+        })
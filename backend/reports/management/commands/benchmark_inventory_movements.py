@@ -0,0 +1,198 @@
+# reports/management/commands/benchmark_inventory_movements.py
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from branches.models import Branch
+from core.models import Store
+from inventory.models import Inventory, InventoryMovement, Item
+from orders.models import Order, OrderItem
+from reports.views import _build_inventory_movement_items
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_build(store, start_date, end_date, days_in_period):
+    """
+    النسخة القديمة (items_map + nested defaultdict + sort لكل صنف) للمقارنة بس.
+    year فقط (TruncMonth) لأن ده السيناريو التقيل.
+    """
+    items_map = {
+        item.id: {
+            "item_id": item.id,
+            "name": item.name,
+            "category_id": item.category_id,
+            "category_name": item.category.name if item.category else None,
+            "incoming": 0,
+            "outgoing": 0,
+            "sales_quantity": 0,
+            "timeline": [],
+        }
+        for item in Item.objects.filter(store=store).select_related("category").distinct()
+    }
+    date_filters = {"created_at__date__gte": start_date, "created_at__date__lte": end_date}
+    movements_qs = InventoryMovement.objects.filter(branch__store=store, **date_filters)
+    for row in movements_qs.values("item_id").annotate(
+        incoming=Coalesce(Sum("change", filter=Q(change__gt=0)), Value(0)),
+        outgoing=Coalesce(-Sum("change", filter=Q(change__lt=0)), Value(0)),
+    ):
+        items_map[row["item_id"]]["incoming"] = float(row["incoming"] or 0)
+        items_map[row["item_id"]]["outgoing"] = float(row["outgoing"] or 0)
+
+    sales_qs = OrderItem.objects.filter(
+        Q(order__status="PAID") | Q(order__is_paid=True),
+        order__store=store,
+        order__created_at__date__gte=start_date,
+        order__created_at__date__lte=end_date,
+    )
+    for row in sales_qs.values("item_id").annotate(sales_qty=Coalesce(Sum("quantity"), Value(0))):
+        items_map[row["item_id"]]["sales_quantity"] = float(row["sales_qty"] or 0)
+
+    timeline_map = defaultdict(lambda: defaultdict(lambda: {"incoming": 0, "outgoing": 0, "sales": 0}))
+    for row in movements_qs.annotate(period=TruncMonth("created_at")).values("item_id", "period").annotate(
+        incoming=Coalesce(Sum("change", filter=Q(change__gt=0)), Value(0)),
+        outgoing=Coalesce(-Sum("change", filter=Q(change__lt=0)), Value(0)),
+    ):
+        timeline_map[row["item_id"]][row["period"]]["incoming"] += float(row["incoming"] or 0)
+        timeline_map[row["item_id"]][row["period"]]["outgoing"] += float(row["outgoing"] or 0)
+    for row in sales_qs.annotate(period=TruncMonth("order__created_at")).values("item_id", "period").annotate(
+        sales_qty=Coalesce(Sum("quantity"), Value(0)),
+    ):
+        timeline_map[row["item_id"]][row["period"]]["sales"] += float(row["sales_qty"] or 0)
+
+    for item_id, payload in items_map.items():
+        sales_qty = payload["sales_quantity"]
+        total_outgoing = payload["outgoing"] + sales_qty
+        payload["total_outgoing"] = total_outgoing
+        payload["net_change"] = payload["incoming"] - total_outgoing
+        payload["consumption_rate"] = round(sales_qty / max(days_in_period, 1), 2)
+        for period in sorted(timeline_map[item_id].keys()):
+            stats = timeline_map[item_id][period]
+            total_out = stats["outgoing"] + stats["sales"]
+            payload["timeline"].append(
+                {
+                    "label": period.strftime("%Y-%m"),
+                    "incoming": stats["incoming"],
+                    "outgoing": stats["outgoing"],
+                    "sales": stats["sales"],
+                    "total_outgoing": total_out,
+                    "net_change": stats["incoming"] - total_out,
+                }
+            )
+    return sorted(items_map.values(), key=lambda x: x["name"].lower())
+
+
+def _measure(func):
+    tracemalloc.start()
+    started = time.process_time()
+    wall_started = time.perf_counter()
+    result = func()
+    cpu = time.process_time() - started
+    wall = time.perf_counter() - wall_started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, cpu, wall, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark لتقرير حركات المخزون (سنة مجمعة بالشهر) على كتالوج صناعي كبير. "
+        "الداتا بتتعمل جوه transaction وبتترجع (rollback) في الآخر."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=3000)
+        parser.add_argument("--active-ratio", type=float, default=0.3, help="نسبة الأصناف اللي عليها حركة")
+        parser.add_argument("--movements-per-item", type=int, default=24)
+        parser.add_argument("--year", type=int, default=2024)
+        parser.add_argument("--page-size", type=int, default=0)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options["seed"])
+        year = options["year"]
+        start_date, end_date = date(year, 1, 1), date(year, 12, 31)
+        days_in_period = (end_date - start_date).days + 1
+
+        store = Store.objects.create(name="Benchmark Store", qr_menu="bench.png", qr_attendance="bench.png")
+        branch = Branch.objects.create(
+            name="Benchmark Branch", store=store, qr_menu="bench.png", qr_menu_base64="-"
+        )
+
+        items = Item.objects.bulk_create(
+            [Item(name=f"Item {i:05d}", store=store, unit_price=10, cost_price=5) for i in range(options["items"])]
+        )
+        inventories = Inventory.objects.bulk_create([Inventory(item=item, branch=branch) for item in items])
+
+        active = rng.sample(list(zip(items, inventories)), int(len(items) * options["active_ratio"]))
+        start_dt = timezone.make_aware(datetime(year, 1, 1, 9, 0))
+        movements = []
+        for item, inventory in active:
+            for _ in range(options["movements_per_item"]):
+                change = rng.choice([1, -1]) * rng.randint(1, 20)
+                movements.append(
+                    InventoryMovement(
+                        inventory=inventory,
+                        item=item,
+                        branch=branch,
+                        change=change,
+                        movement_type="IN" if change > 0 else "OUT",
+                    )
+                )
+        created = InventoryMovement.objects.bulk_create(movements, batch_size=5000)
+        # auto_now_add بيتجاهل القيمة في bulk_create؛ نوزع التواريخ على السنة بعدها
+        for movement in created:
+            movement.created_at = start_dt + timedelta(days=rng.randint(0, days_in_period - 1))
+        InventoryMovement.objects.bulk_update(created, ["created_at"], batch_size=2000)
+
+        order = Order.objects.create(store=store, branch=branch, status="PAID", is_paid=True)
+        Order.objects.filter(pk=order.pk).update(created_at=start_dt + timedelta(days=100))
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=order, item=item, quantity=2, unit_price=10, subtotal=20) for item, _ in active],
+            batch_size=5000,
+        )
+
+        self.stdout.write(
+            f"catalog: {len(items)} items, {len(active)} active, {len(movements)} movements ({year}, by month)"
+        )
+
+        legacy, legacy_cpu, legacy_wall, legacy_peak = _measure(
+            lambda: _legacy_build(store, start_date, end_date, days_in_period)
+        )
+        # الـ items بتيجي generator (الـ view بيعمل stream) → نستهلكها صف صف من غير ما نحتفظ بيها
+        current, cpu, wall, peak = _measure(
+            lambda: [
+                row["item_id"]
+                for row in _build_inventory_movement_items(
+                    store, None, "year", start_date, end_date, days_in_period, page_size=options["page_size"]
+                )[0]
+            ]
+        )
+
+        if not options["page_size"]:
+            assert [row["item_id"] for row in legacy] == current
+
+        self.stdout.write(f"{'':10}{'cpu (s)':>10}{'wall (s)':>10}{'peak (MB)':>12}")
+        for label, c, w, p in (
+            ("legacy", legacy_cpu, legacy_wall, legacy_peak),
+            ("current", cpu, wall, peak),
+        ):
+            self.stdout.write(f"{label:10}{c:>10.3f}{w:>10.3f}{p / 1024 / 1024:>12.2f}")
@@ -1,3 +1,62 @@
+# reports/models.py
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+class ReportJob(models.Model):
+    """
+    تقرير بيتحسب في الخلفية (Celery) بدل ما يعطل الـ web worker.
+    الـ params هي نفس الـ query params بتاعة endpoint التقرير الأصلي.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        SUCCESS = "SUCCESS", "Success"
+        FAILED = "FAILED", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="report_jobs")
+    store = models.ForeignKey("core.Store", on_delete=models.CASCADE, null=True, blank=True, related_name="report_jobs")
+
+    report_type = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCESS, self.Status.FAILED)
+
+    def set_progress(self, progress, status=None, **fields):
+        """تحديث خفيف (update) من غير ما نعمل save للـ result كله."""
+        self.progress = progress
+        fields["progress"] = progress
+        if status:
+            self.status = status
+            fields["status"] = status
+        for key, value in fields.items():
+            setattr(self, key, value)
+        ReportJob.objects.filter(pk=self.pk).update(**fields)
+
+    def mark_failed(self, error):
+        self.set_progress(self.progress, status=self.Status.FAILED, error=str(error)[:2000], finished_at=timezone.now())
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.report_type} ({self.status}) - {self.user}"
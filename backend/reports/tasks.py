@@ -0,0 +1,96 @@
+# reports/tasks.py
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .consumers import report_jobs_group
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_report_job(job, include_result=False):
+    data = {
+        "id": str(job.id),
+        "report_type": job.report_type,
+        "params": job.params,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error or None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if include_result:
+        data["result"] = job.result
+    return data
+
+
+def notify_report_job(job):
+    """نبعت حالة الـ job على websocket لصاحبها (لو فيه channel layer)."""
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+
+    try:
+        async_to_sync(channel_layer.group_send)(
+            report_jobs_group(job.user_id),
+            {"type": "report_job_updated", "job": serialize_report_job(job)},
+        )
+    except Exception as exc:
+        # الإشعار إضافي؛ الـ polling على status كفاية لو الـ layer واقع
+        logger.warning("Report job notify failed for %s: %s", job.id, exc)
+
+
+def _call_report_view(view, user, params):
+    """
+    بنشغل نفس الـ view بتاع التقرير بـ request داخلي بنفس الـ query params
+    علشان الصلاحيات والـ store scoping يفضلوا زي ما هم بالظبط.
+    stream=false: التقارير اللي بتعمل stream (حركات المخزون) ترجع Response عادي بـ data نخزنها.
+    """
+    request = APIRequestFactory().get("/", {**params, "stream": "false"})
+    force_authenticate(request, user=user)
+    return view(request)
+
+
+@shared_task
+def run_report_job(job_id):
+    from .models import ReportJob
+    from .views import REPORT_JOB_VIEWS
+
+    job = ReportJob.objects.select_related("user").filter(pk=job_id).first()
+    if not job or job.status != ReportJob.Status.PENDING:
+        return
+
+    job.set_progress(10, status=ReportJob.Status.RUNNING, started_at=timezone.now())
+    notify_report_job(job)
+
+    view = REPORT_JOB_VIEWS.get(job.report_type)
+    if view is None:
+        job.mark_failed(f"نوع تقرير غير معروف: {job.report_type}")
+        notify_report_job(job)
+        return
+
+    try:
+        response = _call_report_view(view, job.user, job.params or {})
+        job.set_progress(80)
+
+        if response.status_code >= 400:
+            detail = response.data.get("detail") if isinstance(response.data, dict) else response.data
+            job.mark_failed(detail or f"HTTP {response.status_code}")
+        else:
+            # Decimal/date → JSON عادي قبل ما نخزنه
+            result = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+            job.result = result
+            job.save(update_fields=["result"])
+            job.set_progress(100, status=ReportJob.Status.SUCCESS, finished_at=timezone.now())
+    except Exception as exc:
+        logger.exception("Report job %s failed", job.id)
+        job.mark_failed(exc)
+
+    notify_report_job(job)
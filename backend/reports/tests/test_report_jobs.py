@@ -0,0 +1,95 @@
+# reports/tests/test_report_jobs.py
+import json
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from branches.models import Branch
+from core.models import Store, User
+from inventory.models import Category, Item
+from orders.models import Order, OrderItem
+from reports.models import ReportJob
+from reports.tasks import run_report_job
+
+
+@pytest.fixture
+def job_setup(db):
+    user = User.objects.create_user(email="jobs@example.com", password="pass", is_active=True)
+    store = Store.objects.create(name="Jobs Store", owner=user)
+    branch = Branch.objects.create(name="Jobs Branch", store=store)
+    category = Category.objects.create(name="Food", store=store)
+    item = Item.objects.create(name="Burger", store=store, category=category, unit_price=50, cost_price=25)
+
+    created_at = timezone.make_aware(datetime(2024, 5, 1, 10, 0))
+    order = Order.objects.create(store=store, branch=branch, status="PAID", is_paid=True, total=0)
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+    OrderItem.objects.create(order=order, item=item, quantity=2, unit_price=item.unit_price)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return {"user": user, "store": store, "client": client}
+
+
+@pytest.mark.django_db
+def test_report_job_runs_existing_report_and_is_downloadable(job_setup):
+    client = job_setup["client"]
+    params = {"from": "2024-05-01", "to": "2024-05-31", "group_by": "day"}
+
+    response = client.post(
+        "/api/v1/reports/jobs/",
+        {"report_type": "sales", "params": params},
+        format="json",
+    )
+    assert response.status_code == 202
+    assert response.data["status"] == ReportJob.Status.PENDING
+    job_id = response.data["id"]
+
+    run_report_job(job_id)
+
+    status_response = client.get(f"/api/v1/reports/jobs/{job_id}/")
+    assert status_response.status_code == 200
+    assert status_response.data["status"] == ReportJob.Status.SUCCESS
+    assert status_response.data["progress"] == 100
+
+    direct = client.get("/api/v1/reports/sales/", params)
+    download = client.get(f"/api/v1/reports/jobs/{job_id}/download/")
+    assert download.status_code == 200
+    assert "attachment" in download["Content-Disposition"]
+    payload = json.loads(download.content)
+    assert payload["summary"] == json.loads(json.dumps(direct.data["summary"]))
+
+
+@pytest.mark.django_db
+def test_report_job_rejects_unknown_type_and_hides_other_users_jobs(job_setup):
+    client = job_setup["client"]
+
+    bad = client.post("/api/v1/reports/jobs/", {"report_type": "nope"}, format="json")
+    assert bad.status_code == 400
+
+    job = ReportJob.objects.create(user=job_setup["user"], store=job_setup["store"], report_type="sales")
+    not_ready = client.get(f"/api/v1/reports/jobs/{job.id}/download/")
+    assert not_ready.status_code == 409
+
+    stranger = User.objects.create_user(email="stranger@example.com", password="pass", is_active=True)
+    other_client = APIClient()
+    other_client.force_authenticate(user=stranger)
+    assert other_client.get(f"/api/v1/reports/jobs/{job.id}/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_inventory_movements_job_stores_the_full_report(job_setup):
+    client = job_setup["client"]
+    params = {"period_type": "month", "period_value": "2024-05"}
+    job_id = client.post(
+        "/api/v1/reports/jobs/", {"report_type": "inventory_movements", "params": params}, format="json"
+    ).data["id"]
+
+    run_report_job(job_id)
+
+    job = ReportJob.objects.get(pk=job_id)
+    assert job.status == ReportJob.Status.SUCCESS, job.error
+    direct = json.loads(b"".join(client.get("/api/v1/reports/inventory/movements/", params).streaming_content))
+    assert job.result == direct
+    assert job.result["items"][0]["sales_quantity"] == 2
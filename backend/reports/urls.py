@@ -8,6 +8,9 @@ from .views import (
     inventory_movements_report,
     payroll_movements_report,
     period_sales_statistics,
+    report_job_detail,
+    report_job_download,
+    report_jobs,
     sales_report,
 )
 
@@ -26,4 +29,9 @@ urlpatterns = [
     path('inventory/value/', inventory_value_report, name='inventory_value_report'),
     path('inventory/movements/', inventory_movements_report, name='inventory_movements_report'),
 
+    # تقارير الفترات الطويلة بتتحسب في الخلفية (Celery)
+    path('jobs/', report_jobs, name='report_jobs'),
+    path('jobs/<uuid:job_id>/', report_job_detail, name='report_job_detail'),
+    path('jobs/<uuid:job_id>/download/', report_job_download, name='report_job_download'),
+
 ]
\ No newline at end of file
@@ -1,11 +1,16 @@
 # backend/reports/views.py
 from calendar import monthrange
-from datetime import date, timedelta
+import heapq
+import json
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 
-from django.db.models import Sum, F, Count, Q, Value, DecimalField, ExpressionWrapper
-from django.db.models.functions import TruncHour, TruncDate, TruncMonth, Coalesce
+from django.db import transaction
+from django.db.models import Sum, F, Count, Q, Value, DecimalField, ExpressionWrapper, Exists, OuterRef
+from django.db.models.functions import TruncHour, TruncDate, TruncMonth, Coalesce, Lower
 from django.db.utils import OperationalError, ProgrammingError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 
@@ -16,11 +21,19 @@ from rest_framework.response import Response
 from core.models import EmployeeLedger, PayrollPeriod
 from inventory.models import Inventory, InventoryMovement, Item
 from orders.models import Order, OrderItem, Payment
-from attendance.models import AttendanceLog
-from core.models import Employee
-from core.utils.store_context import get_branch_from_request, get_store_from_request
+from core.models import Store
+from core.services.payroll_costs import store_payroll_costs, summarize_payroll_costs
+from core.utils.store_context import (
+    get_branch_from_request,
+    get_store_from_request,
+    get_user_default_store,
+    user_can_access_store,
+)
 from collections import defaultdict
 
+from .models import ReportJob
+from .tasks import run_report_job, serialize_report_job
+
 
 def _resolve_inventory_period(now, period_type_param, period_value_param):
     period_type = (period_type_param or "day").lower()
@@ -515,32 +528,149 @@ def _serialize_products(rows):
     ]
 
 
-def _period_metrics(orders_qs, limit):
-    total_sales = orders_qs.aggregate(total=Sum("total"))['total'] or 0
-    orders_count = orders_qs.count()
-    avg_order_value = (total_sales / orders_count) if orders_count else 0
+MAX_COMPARE_PERIODS = 24
+
+
+def _rolling_periods(today, unit, count):
+    """
+    آخر count فترات (day/week/month) منتهية بالفترة الحالية، من الأقدم للأحدث.
+    """
+    periods = []
+    if unit == "day":
+        for offset in range(count - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            periods.append((day.isoformat(), day, day))
+    elif unit == "week":
+        week_start = today - timedelta(days=today.weekday())
+        for offset in range(count - 1, -1, -1):
+            start = week_start - timedelta(weeks=offset)
+            periods.append((start.isoformat(), start, start + timedelta(days=6)))
+    else:
+        month_start = today.replace(day=1)
+        for offset in range(count - 1, -1, -1):
+            month_index = month_start.year * 12 + month_start.month - 1 - offset
+            year, month = divmod(month_index, 12)
+            start = date(year, month + 1, 1)
+            end = start.replace(day=monthrange(start.year, start.month)[1])
+            periods.append((start.strftime("%Y-%m"), start, end))
+    return periods
+
+
+def _parse_compare_periods(request, now):
+    """
+    - periods=2024-06-01:2024-06-07,current_week,previous_month  (قائمة مخصصة)
+    - rolling=day|week|month&count=8                              (آخر N فترات)
+    بيرجع None لو مفيش أي منهم (الـ API القديم period_a/period_b).
+    """
+    today = now.date()
+    rolling = (request.query_params.get("rolling") or "").lower()
+    if rolling in {"day", "week", "month"}:
+        try:
+            count = int(request.query_params.get("count") or 8)
+        except (TypeError, ValueError):
+            count = 8
+        count = min(max(count, 1), MAX_COMPARE_PERIODS)
+        return _rolling_periods(today, rolling, count)
+
+    raw_periods = request.query_params.get("periods")
+    if not raw_periods:
+        return None
+
+    periods = []
+    for token in raw_periods.split(",")[:MAX_COMPARE_PERIODS]:
+        token = token.strip()
+        if not token:
+            continue
+        if ":" in token:
+            start_raw, _, end_raw = token.partition(":")
+            start_date = parse_date(start_raw.strip()) or today
+            end_date = parse_date(end_raw.strip()) or start_date
+            label = "custom"
+        else:
+            label = token.lower()
+            start_date, end_date = _preset_period_range(today, label)
+        if start_date > end_date:
+            start_date, end_date = end_date, start_date
+        periods.append((label, start_date, end_date))
+    return periods
+
+
+def _day_range_q(field, start_date, end_date):
+    start_dt = timezone.make_aware(datetime.combine(start_date, time.min))
+    end_dt = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return Q(**{f"{field}__gte": start_dt, f"{field}__lt": end_dt})
 
-    items_qs = (
+
+def _multi_period_metrics(orders_qs, periods, limit):
+    """
+    مقاييس N فترات في 2 queries ثابتين مهما كان عدد الفترات:
+    - totals: aggregate واحد بـ Sum/Count مشروط (CASE) لكل فترة
+    - products: group by item واحد بأعمدة (quantity/lines/sales) لكل فترة
+    الـ top/bottom بيتحسبوا في Python بـ heapq (الفترات ممكن تتداخل عادي).
+    """
+    if not periods:
+        return []
+
+    order_ranges = [_day_range_q("created_at", start, end) for _, start, end in periods]
+    item_ranges = [_day_range_q("order__created_at", start, end) for _, start, end in periods]
+    window = _day_range_q(
+        "created_at",
+        min(start for _, start, _ in periods),
+        max(end for _, _, end in periods),
+    )
+    orders_qs = orders_qs.filter(window)
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    totals_aggregates = {}
+    for index, period_q in enumerate(order_ranges):
+        totals_aggregates[f"sales_{index}"] = Coalesce(Sum("total", filter=period_q), Value(0), output_field=money)
+        totals_aggregates[f"orders_{index}"] = Count("id", filter=period_q)
+    totals = orders_qs.aggregate(**totals_aggregates)
+
+    line_sales = ExpressionWrapper(F("quantity") * F("unit_price"), output_field=money)
+    product_aggregates = {}
+    for index, period_q in enumerate(item_ranges):
+        product_aggregates[f"qty_{index}"] = Sum("quantity", filter=period_q)
+        product_aggregates[f"lines_{index}"] = Count("id", filter=period_q)
+        product_aggregates[f"sales_{index}"] = Sum(line_sales, filter=period_q)
+    product_rows = list(
         OrderItem.objects.filter(order__in=orders_qs)
-        .values("item_id", "item__name")
-        .annotate(
-            total_quantity=Sum("quantity"),
-            order_lines=Count("id"),
-            total_sales=Sum(F("quantity") * F("unit_price")),
-        )
         .exclude(item_id__isnull=True)
+        .values("item_id", "item__name")
+        .annotate(**product_aggregates)
+        .order_by()
     )
 
-    top_rows = list(items_qs.order_by("-total_quantity", "item__name")[:limit])
-    bottom_rows = list(items_qs.order_by("total_quantity", "item__name")[:limit])
+    results = []
+    for index in range(len(periods)):
+        total_sales = totals[f"sales_{index}"] or 0
+        orders_count = totals[f"orders_{index}"] or 0
+        avg_order_value = (total_sales / orders_count) if orders_count else 0
 
-    return {
-        "total_sales": float(total_sales or 0),
-        "total_orders": orders_count,
-        "avg_order_value": round(float(avg_order_value or 0), 2),
-        "top_products": _serialize_products(top_rows),
-        "bottom_products": _serialize_products(bottom_rows),
-    }
+        candidates = [
+            {
+                "item_id": row["item_id"],
+                "item__name": row["item__name"],
+                "total_quantity": row[f"qty_{index}"],
+                "order_lines": row[f"lines_{index}"],
+                "total_sales": row[f"sales_{index}"],
+            }
+            for row in product_rows
+            if row[f"lines_{index}"]
+        ]
+        top_rows = heapq.nsmallest(limit, candidates, key=lambda r: (-(r["total_quantity"] or 0), r["item__name"]))
+        bottom_rows = heapq.nsmallest(limit, candidates, key=lambda r: (r["total_quantity"] or 0, r["item__name"]))
+
+        results.append(
+            {
+                "total_sales": float(total_sales or 0),
+                "total_orders": orders_count,
+                "avg_order_value": round(float(avg_order_value or 0), 2),
+                "top_products": _serialize_products(top_rows),
+                "bottom_products": _serialize_products(bottom_rows),
+            }
+        )
+    return results
 
 
 def _delta(current, previous):
@@ -564,6 +694,11 @@ def compare_sales_periods(request):
     - period_a_preset / period_b_preset: today | yesterday | current_week | previous_week | current_month | previous_month
     - أو period_a_start / period_a_end (و نفس الشيء لـ period_b_*)
     - limit: عدد المنتجات الأعلى/الأقل مبيعًا في كل فترة
+
+    مقارنة N فترات (نفس عدد الـ queries مهما كان N):
+    - rolling=day|week|month&count=8 → آخر 8 فترات
+    - periods=2024-06-01:2024-06-07,previous_week,... → قائمة مخصصة
+    الرد: {"periods": [...]} وكل فترة فيها deltas مقارنة بالفترة اللي قبلها في القائمة.
     """
     try:
         now = timezone.now()
@@ -575,9 +710,6 @@ def compare_sales_periods(request):
         except (TypeError, ValueError):
             limit = 5
 
-        label_a, start_a, end_a = _resolve_period(request, "period_a", now)
-        label_b, start_b, end_b = _resolve_period(request, "period_b", now)
-
         paid_filter = Q(status="PAID") | Q(is_paid=True)
         qs = Order.objects.filter(paid_filter)
 
@@ -601,17 +733,38 @@ def compare_sales_periods(request):
         if branch_id:
             qs = qs.filter(branch_id=branch_id)
 
-        period_a_qs = qs.filter(
-            created_at__date__gte=start_a,
-            created_at__date__lte=end_a,
-        )
-        period_b_qs = qs.filter(
-            created_at__date__gte=start_b,
-            created_at__date__lte=end_b,
-        )
+        periods = _parse_compare_periods(request, now)
+        if periods is not None:
+            metrics = _multi_period_metrics(qs, periods, limit)
+            payload = []
+            previous = None
+            for (label, start, end), period_metrics in zip(periods, metrics):
+                deltas = None
+                if previous is not None:
+                    deltas = {
+                        key: _delta(period_metrics[key], previous[key])
+                        for key in ("total_sales", "total_orders", "avg_order_value")
+                    }
+                payload.append(
+                    {
+                        "label": label,
+                        "start": start.isoformat(),
+                        "end": end.isoformat(),
+                        **period_metrics,
+                        "deltas": deltas,
+                    }
+                )
+                previous = period_metrics
+            return Response({"periods": payload})
 
-        period_a_metrics = _period_metrics(period_a_qs, limit)
-        period_b_metrics = _period_metrics(period_b_qs, limit)
+        label_a, start_a, end_a = _resolve_period(request, "period_a", now)
+        label_b, start_b, end_b = _resolve_period(request, "period_b", now)
+
+        period_a_metrics, period_b_metrics = _multi_period_metrics(
+            qs,
+            [(label_a, start_a, end_a), (label_b, start_b, end_b)],
+            limit,
+        )
 
         deltas = {
             "total_sales": _delta(period_a_metrics["total_sales"], period_b_metrics["total_sales"]),
@@ -747,6 +900,23 @@ def period_sales_statistics(request):
             }
         )
 
+def _empty_expense_summary(period_type, period_value):
+    return {
+        "period_type": period_type,
+        "period_value": period_value,
+        "attendance_value_total": 0.0,
+        "bonuses_total": 0.0,
+        "penalties_total": 0.0,
+        "advances_total": 0.0,
+        "late_penalties_total": 0.0,
+        "payroll_total": 0.0,
+        "purchase_total": 0.0,
+        "purchase_tax": 0.0,
+        "tax_rate": 0.0,
+        "total_expense": 0.0,
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def expense_summary(request):
@@ -760,88 +930,46 @@ def expense_summary(request):
         period_type_param = request.query_params.get("period_type")
         period_value_param = request.query_params.get("period_value")
 
-        period_type, normalized_value, attendance_filter = _parse_period_for_field(
-            "work_date", period_type_param, period_value_param, now, use_date_lookup=False
-        )
-        _, _, ledger_filter = _parse_period_for_field(
-            "payout_date", period_type_param, period_value_param, now, use_date_lookup=False
+        period_type, normalized_value, start_date, end_date, _ = _resolve_inventory_period(
+            now, period_type_param, period_value_param
         )
         _, _, purchase_filter = _parse_period_for_field(
             "created_at", period_type_param, period_value_param, now
         )
 
         store = get_store_from_request(request)
+        if not store:
+            return Response(_empty_expense_summary(period_type, normalized_value))
         branch = get_branch_from_request(request, store=store)
 
-        employees_qs = Employee.objects.all()
-        if store:
-            employees_qs = employees_qs.filter(store=store)
-        if branch:
-            employees_qs = employees_qs.filter(branch=branch)
-
-        employees_map = {emp.id: Decimal(emp.salary or 0) for emp in employees_qs}
-
-        attendance_qs = AttendanceLog.objects.filter(**attendance_filter)
-        if store:
-            attendance_qs = attendance_qs.filter(employee__store=store)
-        if branch:
-            attendance_qs = attendance_qs.filter(employee__branch=branch)
-
-        attendance_rows = attendance_qs.values("employee_id").annotate(
-            days=Count("work_date", distinct=True),
-            late_penalties=Coalesce(
-                Sum("penalty_applied"),
-                Value(0),
-                output_field=DecimalField(max_digits=10, decimal_places=2),
-            ),            
+        payroll_totals = summarize_payroll_costs(
+            store_payroll_costs(
+                store=store,
+                branch=branch,
+                start=start_date,
+                end_exclusive=end_date + timedelta(days=1),
+            )
         )
-        attendance_map = {row["employee_id"]: row for row in attendance_rows}
-
-        ledger_qs = EmployeeLedger.objects.filter(**ledger_filter)
-        if store:
-            ledger_qs = ledger_qs.filter(employee__store=store)
-        if branch:
-            ledger_qs = ledger_qs.filter(employee__branch=branch)
-
-        ledger_rows = ledger_qs.values("employee_id", "entry_type").annotate(total=Sum("amount"))
-        ledger_map = defaultdict(lambda: defaultdict(Decimal))
-        for row in ledger_rows:
-            ledger_map[row["employee_id"]][row["entry_type"]] = row["total"] or Decimal("0")
-
-        attendance_value_total = Decimal("0")
-        bonuses_total = Decimal("0")
-        penalties_total = Decimal("0")
-        advances_total = Decimal("0")
-        late_penalties_total = Decimal("0")
-
-        for emp_id, salary in employees_map.items():
-            att_row = attendance_map.get(emp_id, {})
-            days = int(att_row.get("days") or 0)
-            late_penalties = Decimal(att_row.get("late_penalties") or 0)
-            
-            attendance_value = salary * Decimal(days)
-            bonuses = ledger_map[emp_id].get("BONUS", Decimal("0"))
-            penalties = ledger_map[emp_id].get("PENALTY", Decimal("0"))
-            advances = ledger_map[emp_id].get("ADVANCE", Decimal("0"))
-
-            attendance_value_total += attendance_value
-            bonuses_total += bonuses
-            penalties_total += penalties
-            advances_total += advances
-            late_penalties_total += late_penalties
+        attendance_value_total = payroll_totals["attendance_value"]
+        bonuses_total = payroll_totals["bonuses"]
+        penalties_total = payroll_totals["penalties"]
+        advances_total = payroll_totals["advances"]
+        late_penalties_total = payroll_totals["late_penalties"]
 
         payroll_total = (
             attendance_value_total + bonuses_total - penalties_total - advances_total - late_penalties_total
         )            
         purchase_qs = (
-            InventoryMovement.objects.filter(movement_type="IN", change__gt=0, **purchase_filter)
+            # التوريد بس (adjust-stock)؛ إرجاع الطلبات والجرد والتعديل اليدوي مش مشتريات
+            InventoryMovement.objects.filter(
+                movement_type="IN", change__gt=0, source=InventoryMovement.Source.ADJUSTMENT, **purchase_filter
+            )
             .annotate(
                 cost=F("change")
                 * Coalesce(F("item__cost_price"), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
             )
+            .filter(branch__store=store)
         )
-        if store:
-            purchase_qs = purchase_qs.filter(branch__store=store)
         if branch:
             purchase_qs = purchase_qs.filter(branch=branch)
             
@@ -874,22 +1002,8 @@ def expense_summary(request):
         )
     except (ProgrammingError, OperationalError) as e:
         print("Expense summary DB error:", e)
-        return Response(
-            {
-                "period_type": "day",
-                "period_value": None,
-                "attendance_value_total": 0.0,
-                "bonuses_total": 0.0,
-                "penalties_total": 0.0,
-                "advances_total": 0.0,
-                "late_penalties_total": 0.0,
-                "payroll_total": 0.0,
-                "purchase_total": 0.0,
-                "purchase_tax": 0.0,
-                "tax_rate": 0.0,
-                "total_expense": 0.0,
-            }
-        )
+        return Response(_empty_expense_summary("day", None))
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -974,6 +1088,43 @@ def payroll_movements_report(request):
 
 
 
+def _empty_accounting(period_type, period_value):
+    return {
+        "period_type": period_type,
+        "period_value": period_value,
+        "currency": "EGP",
+        "payroll": {
+            "attendance_days": 0,
+            "attendance_value_total": 0.0,
+            "bonuses_total": 0.0,
+            "penalties_total": 0.0,
+            "advances_total": 0.0,
+            "payroll_total": 0.0,
+            "rows": [],
+        },
+        "inventory": {
+            "purchase_cost_total": 0.0,
+            "purchase_sale_value_total": 0.0,
+            "purchase_tax_total": 0.0,
+            "current_cost_total": 0.0,
+            "current_sale_value_total": 0.0,
+        },
+        "sales": {"total_sales": 0.0, "total_tax": 0.0},
+        "tax_rate": 0.0,
+        "expenses": {
+            "payroll": 0.0,
+            "purchases": 0.0,
+            "purchase_tax": 0.0,
+            "bonuses": 0.0,
+            "advances": 0.0,
+            "penalties": 0.0,
+            "total": 0.0,
+        },
+        "profit": {"net_profit": 0.0},
+        "generated_at": None,
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_accounting(request):
@@ -998,64 +1149,18 @@ def api_accounting(request):
             period_type_param = "month"
             period_value_param = (month_override or "")[:7]
 
-        period_type, normalized_period, attendance_filter = _parse_period_for_field(
-            "work_date", period_type_param, period_value_param, now, use_date_lookup=False
-        )
-        _, _, ledger_filter = _parse_period_for_field(
-            "payout_date", period_type_param, period_value_param, now, use_date_lookup=False
+        period_type, normalized_period, start_date, end_date, _ = _resolve_inventory_period(
+            now, period_type_param, period_value_param
         )
         _, _, order_filter = _parse_period_for_field("created_at", period_type_param, period_value_param, now)
         _, _, purchase_filter = _parse_period_for_field("created_at", period_type_param, period_value_param, now)
 
         store = get_store_from_request(request)
+        if not store:
+            return Response(_empty_accounting(period_type, normalized_period))
         branch = get_branch_from_request(request, store=store)
 
-        employees_qs = Employee.objects.select_related("user")
-        if store:
-            employees_qs = employees_qs.filter(store=store)
-        if branch:
-            employees_qs = employees_qs.filter(branch=branch)
-
-        employees_map = {
-            emp.id: {
-                "employee_id": emp.id,
-                "employee_name": getattr(emp.user, "name", None) or emp.user.email,
-                "salary": Decimal(emp.salary or 0),
-            }
-            for emp in employees_qs
-        }
-
-        attendance_qs = AttendanceLog.objects.filter(**attendance_filter)
-        if store:
-            attendance_qs = attendance_qs.filter(employee__store=store)
-        if branch:
-            attendance_qs = attendance_qs.filter(employee__branch=branch)
-
-        attendance_rows = attendance_qs.values("employee_id").annotate(
-            days=Count("work_date", distinct=True),
-            total_minutes=Coalesce(Sum("duration_minutes"), Value(0)),
-            late_minutes=Coalesce(Sum("late_minutes"), Value(0)),
-                        late_penalties=Coalesce(
-                Sum("penalty_applied"),
-                Value(0),
-                output_field=DecimalField(max_digits=10, decimal_places=2),
-            ),
-        )
-
-        attendance_map = {row["employee_id"]: row for row in attendance_rows}
-
-        ledger_qs = EmployeeLedger.objects.filter(**ledger_filter)
-        if store:
-            ledger_qs = ledger_qs.filter(employee__store=store)
-        if branch:
-            ledger_qs = ledger_qs.filter(employee__branch=branch)
-
-        ledger_rows = ledger_qs.values("employee_id", "entry_type").annotate(total=Sum("amount"))
-        ledger_map = defaultdict(lambda: defaultdict(Decimal))
-        for row in ledger_rows:
-            ledger_map[row["employee_id"]][row["entry_type"]] = row["total"] or Decimal("0")
-
-        # payroll per employee
+        # payroll per employee (3 grouped queries للمتجر كله)
         payroll_rows = []
         attendance_value_total = Decimal("0")
         bonuses_total = Decimal("0")
@@ -1063,23 +1168,23 @@ def api_accounting(request):
         advances_total = Decimal("0")
         attendance_days_total = 0
 
-        for emp_id, meta in employees_map.items():
-            att_row = attendance_map.get(emp_id, {})
-            days = int(att_row.get("days") or 0)
-            late_minutes = int(att_row.get("late_minutes") or 0)
-            late_penalties = Decimal(att_row.get("late_penalties") or 0)           
-            worked_minutes = int(att_row.get("total_minutes") or 0)
+        for row in store_payroll_costs(
+            store=store,
+            branch=branch,
+            start=start_date,
+            end_exclusive=end_date + timedelta(days=1),
+        ):
+            days = row["attendance_days"]
+            late_penalties = row["late_penalties"]
+            attendance_value = row["attendance_value"]
 
-            daily_salary = meta["salary"]
-            attendance_value = daily_salary * Decimal(days)
-            
-            bonuses = ledger_map[emp_id].get("BONUS", Decimal("0"))
-            penalties = ledger_map[emp_id].get("PENALTY", Decimal("0")) + late_penalties            
-            advances = ledger_map[emp_id].get("ADVANCE", Decimal("0"))
+            bonuses = row["bonuses"]
+            penalties = row["penalties"] + late_penalties
+            advances = row["advances"]
 
             base_after_adjustments = attendance_value + bonuses - penalties
             net_salary = base_after_adjustments - advances
-                        
+
             attendance_value_total += attendance_value
             bonuses_total += bonuses
             penalties_total += penalties
@@ -1088,14 +1193,14 @@ def api_accounting(request):
 
             payroll_rows.append(
                 {
-                    "employee_id": emp_id,
-                    "employee_name": meta["employee_name"],
-                    "base_salary": float(base_after_adjustments),                    
-                    "daily_rate": float(daily_salary),                    
+                    "employee_id": row["employee_id"],
+                    "employee_name": row["employee_name"],
+                    "base_salary": float(base_after_adjustments),
+                    "daily_rate": float(row["daily_rate"]),
                     "attendance_days": days,
                     "attendance_value": float(attendance_value),
-                    "late_minutes": late_minutes,
-                    "worked_minutes": worked_minutes,
+                    "late_minutes": row["late_minutes"],
+                    "worked_minutes": row["worked_minutes"],
                     "bonuses": float(bonuses),
                     "penalties": float(penalties),
                     "late_penalties": float(late_penalties),
@@ -1109,11 +1214,10 @@ def api_accounting(request):
         purchase_qs = InventoryMovement.objects.filter(
             movement_type="IN",
             change__gt=0,
+            source=InventoryMovement.Source.ADJUSTMENT,
+            branch__store=store,
             **purchase_filter,
-        ).select_related("item")
-                
-        if store:
-            purchase_qs = purchase_qs.filter(branch__store=store)
+        )
         if branch:
             purchase_qs = purchase_qs.filter(branch=branch)
 
@@ -1135,40 +1239,28 @@ def api_accounting(request):
 
         purchase_cost_total = purchase_totals.get("cost_total") or Decimal("0")
         purchase_sale_total = purchase_totals.get("sale_total") or Decimal("0")
-        inventory_cost_total = Decimal("0")
-        inventory_sale_total = Decimal("0")
-        if store:
-            inventory_qs = Inventory.objects.select_related("item", "branch").for_store(store)
-            if branch:
-                inventory_qs = inventory_qs.filter(branch=branch)
-
-            inventory_totals = inventory_qs.with_value_totals().aggregate(
-                total_cost=Coalesce(
-                    Sum("total_cost_value"),
-                    Value(0),
-                    output_field=DecimalField(max_digits=14, decimal_places=2),
-                ),
-                total_sale=Coalesce(
-                    Sum("total_sale_value"),
-                    Value(0),
-                    output_field=DecimalField(max_digits=14, decimal_places=2),
-                ),
-            )
-            inventory_cost_total = inventory_totals.get("total_cost") or Decimal("0")
-            inventory_sale_total = inventory_totals.get("total_sale") or Decimal("0")
-
 
-        try:
-            tax_rate = Decimal(store.settings.tax_rate)
-        except Exception:
-            tax_rate = Decimal("0")
+        inventory_qs = Inventory.objects.for_store(store)
+        if branch:
+            inventory_qs = inventory_qs.filter(branch=branch)
 
-        purchase_tax_total = (purchase_cost_total * tax_rate / Decimal("100")).quantize(Decimal("0.01"))
+        inventory_totals = inventory_qs.with_value_totals().aggregate(
+            total_cost=Coalesce(
+                Sum("total_cost_value"),
+                Value(0),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            total_sale=Coalesce(
+                Sum("total_sale_value"),
+                Value(0),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        inventory_cost_total = inventory_totals.get("total_cost") or Decimal("0")
+        inventory_sale_total = inventory_totals.get("total_sale") or Decimal("0")
 
         paid_filter = Q(status="PAID") | Q(is_paid=True)
-        orders_qs = Order.objects.filter(paid_filter, **order_filter)
-        if store:
-            orders_qs = orders_qs.filter(store=store)
+        orders_qs = Order.objects.filter(paid_filter, store=store, **order_filter)
         if branch:
             orders_qs = orders_qs.filter(branch=branch)
 
@@ -1234,43 +1326,241 @@ def api_accounting(request):
         )
     except (ProgrammingError, OperationalError) as e:
         print("Accounting DB error:", e)
-        return Response(
-            {
-                "period_type": period_type_param or "month",
-                "period_value": period_value_param,
-                "currency": "EGP",
-                "payroll": {
-                    "attendance_days": 0,
-                    "attendance_value_total": 0.0,
-                    "bonuses_total": 0.0,
-                    "penalties_total": 0.0,
-                    "advances_total": 0.0,
-                    "payroll_total": 0.0,
-                    "rows": [],
-                },
-                "inventory": {
-                    "purchase_cost_total": 0.0,
-                    "purchase_sale_value_total": 0.0,
-                    "purchase_tax_total": 0.0,
-                    "current_cost_total": 0.0,
-                    "current_sale_value_total": 0.0,
-                },
-                "sales": {"total_sales": 0.0, "total_tax": 0.0},
-                "tax_rate": 0.0,                
-                "expenses": {
-                    "payroll": 0.0,
-                    "purchases": 0.0,
-                    "purchase_tax": 0.0,
-                    "bonuses": 0.0,
-                    "advances": 0.0,
-                    "penalties": 0.0,
-                    "total": 0.0,
-                },
-                "profit": {"net_profit": 0.0},
-                "generated_at": None,
+        return Response(_empty_accounting(period_type_param or "month", period_value_param))
+
+
+_INVENTORY_TIMELINE_TRUNC = {
+    "day": (TruncHour, "%Y-%m-%d %H:00"),
+    "month": (TruncDate, "%Y-%m-%d"),
+    "year": (TruncMonth, "%Y-%m"),
+}
+
+
+def _parse_optional_page(request, max_page_size=500):
+    """
+    pagination اختياري للتقارير الكبيرة: من غير page_size بيرجع كل حاجة زي الأول.
+    """
+    try:
+        page_size = int(request.query_params.get("page_size") or 0)
+    except (TypeError, ValueError):
+        page_size = 0
+    try:
+        page = max(int(request.query_params.get("page") or 1), 1)
+    except (TypeError, ValueError):
+        page = 1
+
+    page_size = min(max(page_size, 0), max_page_size)
+    return page, page_size
+
+
+def _merge_item_period_series(movement_rows, sales_rows):
+    """
+    الاتنين مترتبين (item_id, period) من الداتابيز → merge في pass واحد
+    بيرجع (item_id, period, incoming, outgoing, sales) لكل (صنف، فترة).
+    """
+    movement_iter = iter(movement_rows)
+    sales_iter = iter(sales_rows)
+    movement = next(movement_iter, None)
+    sale = next(sales_iter, None)
+
+    while movement is not None or sale is not None:
+        movement_key = (movement[0], movement[1]) if movement is not None else None
+        sale_key = (sale[0], sale[1]) if sale is not None else None
+
+        if sale_key is None or (movement_key is not None and movement_key < sale_key):
+            yield movement[0], movement[1], movement[2], movement[3], 0
+            movement = next(movement_iter, None)
+        elif movement_key is None or sale_key < movement_key:
+            yield sale[0], sale[1], 0, 0, sale[2]
+            sale = next(sales_iter, None)
+        else:
+            yield movement[0], movement[1], movement[2], movement[3], sale[2]
+            movement = next(movement_iter, None)
+            sale = next(sales_iter, None)
+
+
+STATS_ITEMS_PER_CHUNK = 500
+
+
+def _build_inventory_movement_items(
+    store, branch, period_type, start_date, end_date, days_in_period, page=1, page_size=0
+):
+    """
+    بيرجع (items, total_items) لتقرير حركات المخزون. items هنا generator مش list:
+    - الأصناف مترتبة بالاسم من الداتابيز (ومقسمة صفحات لو page_size موجود، والصفحة slice في الـ SQL)
+    - من غير page_size الأصناف بتتقري بـ iterator والـ view بيعمل stream للـ JSON (total_items = None)
+    - الأصناف بتتعالج chunks (STATS_ITEMS_PER_CHUNK): لكل chunk query واحد لكل مصدر (حركات/مبيعات)
+      مترتب بـ (item, period) والإجماليات بتتجمع من نفس الـ rows، فالذاكرة على قد الـ chunk مش الكتالوج.
+    """
+    items_qs = Item.objects.filter(store=store)
+    if branch:
+        # Exists بدل joins + distinct على كل الأصناف
+        items_qs = items_qs.filter(
+            Exists(Inventory.objects.filter(item=OuterRef("pk"), branch=branch))
+            | Exists(InventoryMovement.objects.filter(item=OuterRef("pk"), branch=branch))
+            | Exists(OrderItem.objects.filter(item=OuterRef("pk"), order__branch=branch))
+        )
+    items_qs = items_qs.order_by(Lower("name"), "id")
+
+    total_items = None
+    if page_size:
+        total_items = items_qs.count()
+        offset = (page - 1) * page_size
+        items_qs = items_qs[offset:offset + page_size]
+
+    trunc_func, label_format = _INVENTORY_TIMELINE_TRUNC.get(period_type, _INVENTORY_TIMELINE_TRUNC["month"])
+
+    # range على created_at نفسه (بيستخدم الـ index) بدل __date اللي بيحسب cast لكل صف
+    start_dt = timezone.make_aware(datetime.combine(start_date, time.min))
+    end_dt = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+
+    # البيع جاي من OrderItem (sales_quantity)، فحركات خصم/إرجاع الطلبات مش داخلة هنا
+    movements_qs = InventoryMovement.objects.filter(
+        branch__store=store,
+        created_at__gte=start_dt,
+        created_at__lt=end_dt,
+    ).exclude(source__in=InventoryMovement.ORDER_SOURCES)
+    paid_filter = Q(order__status="PAID") | Q(order__is_paid=True)
+    sales_qs = OrderItem.objects.filter(
+        paid_filter,
+        order__store=store,
+        order__created_at__gte=start_dt,
+        order__created_at__lt=end_dt,
+    )
+    if branch:
+        movements_qs = movements_qs.filter(branch=branch)
+        sales_qs = sales_qs.filter(order__branch=branch)
+
+    def _stats_for(item_ids):
+        """item_id → [incoming, outgoing, sales, timeline] لأصناف الـ chunk بس."""
+        movement_rows = (
+            movements_qs.filter(item_id__in=item_ids)
+            .annotate(period=trunc_func("created_at"))
+            .values("item_id", "period")
+            .annotate(
+                incoming=Coalesce(Sum("change", filter=Q(change__gt=0)), Value(0)),
+                outgoing=Coalesce(-Sum("change", filter=Q(change__lt=0)), Value(0)),
+            )
+            .order_by("item_id", "period")
+            .values_list("item_id", "period", "incoming", "outgoing")
+        )
+        sales_rows = (
+            sales_qs.filter(item_id__in=item_ids)
+            .annotate(period=trunc_func("order__created_at"))
+            .values("item_id", "period")
+            .annotate(sales_qty=Coalesce(Sum("quantity"), Value(0)))
+            .order_by("item_id", "period")
+            .values_list("item_id", "period", "sales_qty")
+        )
+
+        stats_by_item = {}
+        for item_id, period, incoming, outgoing, sales in _merge_item_period_series(movement_rows, sales_rows):
+            stats = stats_by_item.get(item_id)
+            if stats is None:
+                stats = stats_by_item[item_id] = [0.0, 0.0, 0.0, []]
+
+            incoming = float(incoming or 0)
+            outgoing = float(outgoing or 0)
+            sales = float(sales or 0)
+            stats[0] += incoming
+            stats[1] += outgoing
+            stats[2] += sales
+
+            if period is None:
+                continue
+            total_out = outgoing + sales
+            stats[3].append(
+                {
+                    "label": period.strftime(label_format),
+                    "incoming": incoming,
+                    "outgoing": outgoing,
+                    "sales": sales,
+                    "total_outgoing": total_out,
+                    "net_change": incoming - total_out,
+                }
+            )
+        return stats_by_item
+
+    days_divisor = max(days_in_period, 1)
+    empty_stats = (0, 0, 0, [])
+
+    def _chunk_items(chunk):
+        stats_by_item = _stats_for([row[0] for row in chunk])
+        for item_id, name, category_id, category_name in chunk:
+            incoming, outgoing, sales_qty, timeline = stats_by_item.get(item_id, empty_stats)
+            total_outgoing = outgoing + sales_qty
+            yield {
+                "item_id": item_id,
+                "name": name,
+                "category_id": category_id,
+                "category_name": category_name,
+                "incoming": incoming,
+                "outgoing": outgoing,
+                "sales_quantity": sales_qty,
+                "total_outgoing": total_outgoing,
+                "net_change": incoming - total_outgoing,
+                "consumption_rate": round(sales_qty / days_divisor, 2),
+                "timeline": timeline,
             }
-        )    
-    
+
+    def _iter_items():
+        rows = items_qs.values_list("id", "name", "category_id", "category__name")
+        if not page_size:
+            rows = rows.iterator(chunk_size=2000)
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= STATS_ITEMS_PER_CHUNK:
+                yield from _chunk_items(chunk)
+                chunk = []
+        if chunk:
+            yield from _chunk_items(chunk)
+
+    return _iter_items(), total_items
+
+
+STREAM_ROWS_PER_CHUNK = 200
+
+
+def _stream_json_response(payload, items_key, items):
+    """
+    JSON بـ StreamingHttpResponse: الـ payload مرة واحدة والـ items من الـ iterator على chunks
+    (من غير ما القايمة كلها تتبني في الذاكرة).
+    - أول صف بيتقري هنا جوه try الـ view، فغلطة DB في الأول بترجع رد الـ fallback العادي.
+    - غلطة DB في النص (بعد ما الـ 200 اتبعت) بتقفل الـ JSON صح وتضيف "error" بدل JSON مقطوع.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    items = iter(items)
+    first = next(items, None)
+
+    def chunks():
+        head = encoder.encode(payload)[:-1]
+        yield f'{head}{", " if payload else ""}"{items_key}": ['
+        if first is None:
+            yield "]}"
+            return
+
+        buffer = [encoder.encode(first)]
+        separator = ""
+        try:
+            for item in items:
+                buffer.append(encoder.encode(item))
+                if len(buffer) >= STREAM_ROWS_PER_CHUNK:
+                    yield separator + ", ".join(buffer)
+                    separator, buffer = ", ", []
+        except (ProgrammingError, OperationalError) as e:
+            print("Streaming report DB error:", e)
+            if buffer:
+                yield separator + ", ".join(buffer)
+            yield '], "error": ' + encoder.encode("التقرير اتقطع بسبب خطأ في قاعدة البيانات.") + "}"
+            return
+        if buffer:
+            yield separator + ", ".join(buffer)
+        yield "]}"
+
+    return StreamingHttpResponse(chunks(), content_type="application/json")
+
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -1280,6 +1570,7 @@ def inventory_movements_report(request):
     - period_type: day | month | year
     - period_value: 2024-06-10 (day) | 2024-06 (month) | 2024 (year)
     - branch (اختياري)
+    - page / page_size (اختياري). من غير page_size الرد stream، إلا لو stream=false (زي الـ report jobs)
     """
     try:
         now = timezone.now()
@@ -1305,166 +1596,33 @@ def inventory_movements_report(request):
 
         branch = get_branch_from_request(request, store=store)
 
-        # احضر كل الأصناف في المتجر (ومرتبطة بالفرع إن وجد) لضمان ظهور الأصناف بلا حركة
-        items_qs = Item.objects.filter(store=store)
-        if branch:
-            items_qs = items_qs.filter(
-                Q(inventory_entries__branch=branch)
-                | Q(inventory_movements__branch=branch)
-                | Q(orderitem__order__branch=branch)
-            )
-        items_qs = items_qs.select_related("category").distinct()
-
-        items_map = {
-            item.id: {
-                "item_id": item.id,
-                "name": item.name,
-                "category_id": item.category_id,
-                "category_name": item.category.name if item.category else None,
-                "incoming": 0,
-                "outgoing": 0,
-                "sales_quantity": 0,
-                "total_outgoing": 0,
-                "net_change": 0,
-                "consumption_rate": 0,
-                "timeline": [],
-            }
-            for item in items_qs
-        }
-
-        if not items_map:
-            return Response(
-                {
-                    "period_type": period_type,
-                    "period_value": normalized_value,
-                    "start": start_date.isoformat(),
-                    "end": end_date.isoformat(),
-                    "days": days_in_period,
-                    "items": [],
-                }
-            )
-
-        date_filters = {
-            "created_at__date__gte": start_date,
-            "created_at__date__lte": end_date,
-        }
-
-        movements_qs = InventoryMovement.objects.filter(branch__store=store, **date_filters)
-        if branch:
-            movements_qs = movements_qs.filter(branch=branch)
-
-        movements_rows = movements_qs.values("item_id").annotate(
-            incoming=Coalesce(Sum("change", filter=Q(change__gt=0)), Value(0)),
-            outgoing=Coalesce(-Sum("change", filter=Q(change__lt=0)), Value(0)),
-        )
-
-        for row in movements_rows:
-            item_id = row["item_id"]
-            if item_id not in items_map:
-                continue
-            items_map[item_id]["incoming"] = float(row["incoming"] or 0)
-            items_map[item_id]["outgoing"] = float(row["outgoing"] or 0)
-
-        paid_filter = Q(order__status="PAID") | Q(order__is_paid=True)
-        sales_qs = OrderItem.objects.filter(
-            paid_filter,
-            order__store=store,
-            order__created_at__date__gte=start_date,
-            order__created_at__date__lte=end_date,
-        )
-        if branch:
-            sales_qs = sales_qs.filter(order__branch=branch)
-
-        sales_rows = sales_qs.values("item_id").annotate(
-            sales_qty=Coalesce(Sum("quantity"), Value(0)),
+        page, page_size = _parse_optional_page(request)
+        items_payload, total_items = _build_inventory_movement_items(
+            store,
+            branch,
+            period_type,
+            start_date,
+            end_date,
+            days_in_period,
+            page=page,
+            page_size=page_size,
         )
 
-        for row in sales_rows:
-            item_id = row["item_id"]
-            if item_id not in items_map:
-                continue
-            items_map[item_id]["sales_quantity"] = float(row["sales_qty"] or 0)
-
-        # تجميع سلاسل زمنية
-        trunc_map = {
-            "day": TruncHour("created_at"),
-            "month": TruncDate("created_at"),
-            "year": TruncMonth("created_at"),
-        }
-        trunc = trunc_map.get(period_type, TruncDate("created_at"))
-        sales_trunc_map = {
-            "day": TruncHour("order__created_at"),
-            "month": TruncDate("order__created_at"),
-            "year": TruncMonth("order__created_at"),
+        payload = {
+            "period_type": period_type,
+            "period_value": normalized_value,
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "days": days_in_period,
         }
-        sales_trunc = sales_trunc_map.get(period_type, TruncDate("order__created_at"))
-
-        movement_series = movements_qs.annotate(period=trunc).values("item_id", "period").annotate(
-            incoming=Coalesce(Sum("change", filter=Q(change__gt=0)), Value(0)),
-            outgoing=Coalesce(-Sum("change", filter=Q(change__lt=0)), Value(0)),
-        )
-
-        sales_series = sales_qs.annotate(period=sales_trunc).values("item_id", "period").annotate(
-            sales_qty=Coalesce(Sum("quantity"), Value(0)),
-        )
-
-        timeline_map = defaultdict(lambda: defaultdict(lambda: {"incoming": 0, "outgoing": 0, "sales": 0}))
-
-        for row in movement_series:
-            item_id = row["item_id"]
-            if item_id not in items_map or row["period"] is None:
-                continue
-            timeline_map[item_id][row["period"]]["incoming"] += float(row["incoming"] or 0)
-            timeline_map[item_id][row["period"]]["outgoing"] += float(row["outgoing"] or 0)
-
-        for row in sales_series:
-            item_id = row["item_id"]
-            if item_id not in items_map or row["period"] is None:
-                continue
-            timeline_map[item_id][row["period"]]["sales"] += float(row["sales_qty"] or 0)
-
-        days_divisor = max(days_in_period, 1)
-        for item_id, payload in items_map.items():
-            sales_qty = payload["sales_quantity"]
-            total_outgoing = payload["outgoing"] + sales_qty
-            payload["total_outgoing"] = total_outgoing
-            payload["net_change"] = payload["incoming"] - total_outgoing
-            payload["consumption_rate"] = round(sales_qty / days_divisor, 2)
-
-            periods = sorted(timeline_map[item_id].keys())
-            for period in periods:
-                stats = timeline_map[item_id][period]
-                if period_type == "day":
-                    label = period.strftime("%Y-%m-%d %H:00")
-                elif period_type == "year":
-                    label = period.strftime("%Y-%m")
-                else:
-                    label = period.strftime("%Y-%m-%d")
-
-                total_out = stats["outgoing"] + stats["sales"]
-                payload["timeline"].append(
-                    {
-                        "label": label,
-                        "incoming": stats["incoming"],
-                        "outgoing": stats["outgoing"],
-                        "sales": stats["sales"],
-                        "total_outgoing": total_out,
-                        "net_change": stats["incoming"] - total_out,
-                    }
-                )
-
-        items_payload = sorted(items_map.values(), key=lambda x: x["name"].lower())
-
-        return Response(
-            {
-                "period_type": period_type,
-                "period_value": normalized_value,
-                "start": start_date.isoformat(),
-                "end": end_date.isoformat(),
-                "days": days_in_period,
-                "items": items_payload,
-            }
-        )
+        if not page_size and request.query_params.get("stream") != "false":
+            # كل الأصناف → stream بدل ما الـ payload كله يتبني في الذاكرة
+            return _stream_json_response(payload, "items", items_payload)
+
+        payload["items"] = list(items_payload)
+        if page_size:
+            payload.update({"count": total_items, "page": page, "page_size": page_size})
+        return Response(payload)
     except (ProgrammingError, OperationalError) as e:
         print("Inventory movements report DB error:", e)
         return Response(
@@ -1486,6 +1644,7 @@ def inventory_value_report(request):
     - store (ضمنيًا من المستخدم أو store_id)
     - branch (branch / branch_id)
     - category
+    - date=YYYY-MM-DD: القيمة في آخر اليوم ده (أقرب snapshot يومي + الحركات من بعده)
     """
     try:
         store = get_store_from_request(request)
@@ -1509,6 +1668,17 @@ def inventory_value_report(request):
         if category_id:
             qs = qs.filter(item__category_id=category_id)
 
+        date_param = request.query_params.get("date")
+        if date_param:
+            as_of_date = parse_date(date_param)
+            if not as_of_date:
+                return Response({"detail": "date لازم يكون YYYY-MM-DD"}, status=400)
+            as_of = timezone.make_aware(datetime.combine(as_of_date, time.max))
+            if as_of <= timezone.now():
+                from inventory.services.snapshots import value_inventory_at
+
+                return Response(value_inventory_at(store, as_of, branch=branch, category_id=category_id))
+
         annotated = qs.with_value_totals()
 
         totals = annotated.aggregate(
@@ -1558,4 +1728,99 @@ def inventory_value_report(request):
                 "total_margin": 0.0,
                 "items": [],
             }
-        )
\ No newline at end of file
+        )
+
+# ======================
+# Async report jobs
+# ======================
+
+# التقارير اللي ممكن تتحسب في الخلفية (نفس الـ views بنفس الـ query params)
+REPORT_JOB_VIEWS = {
+    "sales": sales_report,
+    "sales_period_stats": period_sales_statistics,
+    "sales_compare": compare_sales_periods,
+    "accounting": api_accounting,
+    "expenses": expense_summary,
+    "payroll_movements": payroll_movements_report,
+    "inventory_value": inventory_value_report,
+    "inventory_movements": inventory_movements_report,
+}
+
+
+def _get_user_report_job(request, job_id):
+    qs = ReportJob.objects.all()
+    if not request.user.is_superuser:
+        qs = qs.filter(user=request.user)
+    return qs.filter(pk=job_id).first()
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def report_jobs(request):
+    """
+    GET: آخر jobs بتاعة المستخدم.
+    POST: {"report_type": "...", "params": {...}} → job_id، والحساب بيتم في Celery.
+    """
+    if request.method == "GET":
+        jobs = ReportJob.objects.filter(user=request.user)[:20]
+        return Response([serialize_report_job(job) for job in jobs])
+
+    report_type = request.data.get("report_type")
+    if report_type not in REPORT_JOB_VIEWS:
+        return Response(
+            {"detail": "نوع التقرير غير مدعوم.", "allowed": sorted(REPORT_JOB_VIEWS)},
+            status=400,
+        )
+
+    params = request.data.get("params") or {}
+    if not isinstance(params, dict):
+        return Response({"detail": "params لازم تكون object."}, status=400)
+    params = {key: str(value) for key, value in params.items() if value not in (None, "")}
+
+    # نفس قواعد الصلاحيات بتاعة التقرير نفسه (store_id في الـ params)
+    store_id = params.get("store_id")
+    if store_id:
+        store = Store.objects.filter(id=store_id).first()
+        if not store or not user_can_access_store(request.user, store):
+            return Response({"detail": "لا تملك صلاحية الوصول لهذا الفرع."}, status=403)
+    else:
+        store = get_user_default_store(request.user)
+
+    job = ReportJob.objects.create(
+        user=request.user,
+        store=store,
+        report_type=report_type,
+        params=params,
+    )
+    transaction.on_commit(lambda: run_report_job.delay(str(job.id)))
+
+    return Response(serialize_report_job(job), status=202)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_job_detail(request, job_id):
+    job = _get_user_report_job(request, job_id)
+    if not job:
+        return Response({"detail": "التقرير غير موجود."}, status=404)
+    return Response(serialize_report_job(job))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_job_download(request, job_id):
+    job = _get_user_report_job(request, job_id)
+    if not job:
+        return Response({"detail": "التقرير غير موجود."}, status=404)
+    if job.status != ReportJob.Status.SUCCESS:
+        return Response(
+            {"detail": "التقرير لسه مش جاهز.", "status": job.status, "progress": job.progress},
+            status=409,
+        )
+
+    response = HttpResponse(
+        json.dumps(job.result, ensure_ascii=False),
+        content_type="application/json; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{job.report_type}-{job.id}.json"'
+    return response